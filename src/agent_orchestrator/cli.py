@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import socket
 import sys
 from pathlib import Path
 from typing import Optional
@@ -134,11 +136,31 @@ def _server(args: argparse.Namespace) -> int:
         sys.stderr.write("Install server extras: pip install 'agent-orchestrator[server]'\n")
         return 1
 
-    app = create_app(project_dir=_resolve_project_dir(args.project_dir))
+    app = create_app(project_dir=_resolve_project_dir(args.project_dir), max_workers=args.max_workers)
     uvicorn.run(app, host=args.host, port=args.port, reload=args.reload)
     return 0
 
 
+def _worker_serve(args: argparse.Namespace) -> int:
+    from .workers.agent import WorkerAgent, http_transport
+
+    agent = WorkerAgent(
+        http_transport(args.server),
+        name=args.name or socket.gethostname(),
+        labels=args.label or [],
+        capabilities=args.capability or ['codex', 'claude', 'ollama'],
+        checkout=Path(args.checkout).expanduser().resolve() if args.checkout else None,
+        repo_url=args.repo_url,
+        token=args.token or os.environ.get('AGENT_ORCHESTRATOR_WORKER_TOKEN'),
+        capacity=args.capacity,
+    )
+    try:
+        agent.serve(max_steps=args.max_steps)
+    except KeyboardInterrupt:
+        agent.stop()
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description='Agent Orchestrator CLI (UI-first minimal)')
     parser.add_argument('--project-dir', default=None, help='Target project directory (default: current working directory)')
@@ -148,8 +170,23 @@ def build_parser() -> argparse.ArgumentParser:
     server.add_argument('--host', default='127.0.0.1')
     server.add_argument('--port', default=8080, type=int)
     server.add_argument('--reload', action='store_true')
+    server.add_argument('--max-workers', default=None, type=int, help='Global worker budget shared by all projects')
     server.set_defaults(func=_server)
 
+    worker = subparsers.add_parser('worker', help='Run a remote worker agent')
+    worker_sub = worker.add_subparsers(dest='worker_cmd', required=True)
+    wserve = worker_sub.add_parser('serve', help='Lease and run pipeline steps for an orchestrator server')
+    wserve.add_argument('--server', required=True, help='Orchestrator server URL, e.g. http://host:8080')
+    wserve.add_argument('--name', default=None, help='Agent name (default: hostname)')
+    wserve.add_argument('--label', action='append', help='Agent label used for step routing (repeatable)')
+    wserve.add_argument('--capability', action='append', choices=['codex', 'claude', 'ollama'], help='Provider type this agent can run (repeatable; default: all)')
+    wserve.add_argument('--checkout', default=None, help='Checkout to run steps in (default: the task worktree when visible, else cwd)')
+    wserve.add_argument('--repo-url', default=None, help='Git URL to fetch task trees from (default: workers.remote.repo_url on the server)')
+    wserve.add_argument('--token', default=None, help='Server workers.remote.token (default: $AGENT_ORCHESTRATOR_WORKER_TOKEN)')
+    wserve.add_argument('--capacity', default=1, type=int, help='Leases run at once')
+    wserve.add_argument('--max-steps', default=None, type=int)
+    wserve.set_defaults(func=_worker_serve)
+
     project = subparsers.add_parser('project', help='Manage pinned projects')
     project_sub = project.add_subparsers(dest='project_cmd', required=True)
     ppin = project_sub.add_parser('pin', help='Pin a project path')
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+import gzip
+import io
 import json
 import os
 from datetime import datetime, timezone
@@ -125,6 +127,60 @@ def _read_text_tail(path: Path, *, max_chars: int = 4000, encoding: str = "utf-8
     return text[-max_chars:]
 
 
+def _read_text_range(
+    path: Path,
+    *,
+    offset: Optional[int] = None,
+    max_bytes: int = 64 * 1024,
+    encoding: str = "utf-8",
+) -> tuple[str, int, int, int]:
+    """Read up to `max_bytes` of a text file from byte `offset`, or its tail when None.
+
+    Returns ``(text, start, end, size)`` in bytes; ``end`` is where the next
+    read continues.  Multi-byte characters cut at either edge are left out,
+    so consecutive reads join up cleanly.  A ``.gz`` file is read as its
+    uncompressed content.
+    """
+    # Plain and gzip readers share this base (typeshed has GzipFile outside BinaryIO).
+    handle: io.BufferedIOBase
+    try:
+        if path.suffix == ".gz":
+            with open(path, "rb") as raw:
+                # The gzip trailer holds the uncompressed size (mod 2**32).
+                raw.seek(-4, os.SEEK_END)
+                size = int.from_bytes(raw.read(4), "little")
+            handle = gzip.open(path, "rb")
+        else:
+            handle = open(path, "rb")
+            size = os.fstat(handle.fileno()).st_size
+        with handle:
+            start = max(0, size - max_bytes) if offset is None else min(max(0, offset), size)
+            handle.seek(start)
+            data = handle.read(max(0, max_bytes))
+    except (OSError, EOFError):
+        return "", 0, 0, 0
+    if offset is None or start > 0:
+        # Skip UTF-8 continuation bytes of a character that began before `start`.
+        skip = 0
+        while skip < min(len(data), 3) and data[skip] & 0xC0 == 0x80:
+            skip += 1
+        data = data[skip:]
+        start += skip
+    end = start + len(data)
+    if end < size:
+        # Hold back a character whose remaining bytes lie past the range.
+        for back in range(1, min(len(data), 4) + 1):
+            lead = data[-back]
+            if lead & 0xC0 == 0x80:
+                continue
+            width = 2 if lead >> 5 == 0b110 else 3 if lead >> 4 == 0b1110 else 4 if lead >> 3 == 0b11110 else 1
+            if width > back:
+                data = data[:-back]
+                end -= back
+            break
+    return data.decode(encoding, errors="replace"), start, end, size
+
+
 def _heartbeat_from_progress(
     progress_path: Path,
     expected_run_id: Optional[str] = None,
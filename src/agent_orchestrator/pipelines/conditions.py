@@ -0,0 +1,208 @@
+"""Evaluate ``StepDef.condition`` expressions against task/run context.
+
+The grammar is intentionally tiny and never touches ``eval``::
+
+    expr       := and_expr ("or" and_expr)*
+    and_expr   := not_expr ("and" not_expr)*
+    not_expr   := "not" not_expr | comparison
+    comparison := operand (OP operand)?
+    OP         := == | != | > | >= | < | <= | contains | in
+    operand    := path | string | number | true | false | null | "(" expr ")"
+    path       := name ("." name)*
+
+Examples: ``diff.lines_changed > 0``, ``task.labels contains 'docs'``,
+``previous.verify.status == 'ok'``.  A path that does not resolve yields
+``None``; ordering comparisons against ``None`` raise ``ConditionError``.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Callable
+
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+        (?P<number>-?\d+(?:\.\d+)?)
+      | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+      | (?P<op>==|!=|>=|<=|>|<|\(|\))
+      | (?P<name>[A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z0-9_]+)*)
+    )""",
+    re.VERBOSE,
+)
+
+_KEYWORDS = {"and", "or", "not", "contains", "in", "true", "false", "null", "none"}
+_COMPARISONS = {"==", "!=", ">", ">=", "<", "<=", "contains", "in"}
+
+
+class ConditionError(ValueError):
+    """Raised when a condition cannot be parsed or evaluated."""
+
+
+def _tokenize(expression: str) -> list[tuple[str, str]]:
+    tokens: list[tuple[str, str]] = []
+    pos = 0
+    text = expression.rstrip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise ConditionError(f"Unexpected input at position {pos}: {text[pos:]!r}")
+        pos = match.end()
+        kind = match.lastgroup or ""
+        value = match.group(kind)
+        if kind == "name" and value.lower() in _KEYWORDS:
+            kind = "keyword"
+            value = value.lower()
+        tokens.append((kind, value))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens: list[tuple[str, str]], resolve: Callable[[str], Any]) -> None:
+        self._tokens = tokens
+        self._pos = 0
+        self._resolve = resolve
+        # False while parsing an operand that ``and``/``or`` short-circuits past.
+        self._live = True
+
+    def _peek(self) -> tuple[str, str] | None:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise ConditionError("Unexpected end of expression")
+        self._pos += 1
+        return token
+
+    def _accept(self, value: str) -> bool:
+        token = self._peek()
+        if token is not None and token[0] in {"keyword", "op"} and token[1] == value:
+            self._pos += 1
+            return True
+        return False
+
+    def parse(self) -> Any:
+        value = self._or()
+        if self._peek() is not None:
+            raise ConditionError(f"Unexpected token {self._peek()[1]!r}")  # type: ignore[index]
+        return value
+
+    def _or(self) -> Any:
+        value = self._and()
+        while self._accept("or"):
+            right = self._skipped(self._and) if value else self._and()
+            value = bool(value) or bool(right)
+        return value
+
+    def _and(self) -> Any:
+        value = self._not()
+        while self._accept("and"):
+            right = self._skipped(self._not) if not value else self._not()
+            value = bool(value) and bool(right)
+        return value
+
+    def _skipped(self, parse: Callable[[], Any]) -> Any:
+        """Parse an operand whose value is not needed, without resolving paths."""
+        live, self._live = self._live, False
+        try:
+            return parse()
+        finally:
+            self._live = live
+
+    def _not(self) -> Any:
+        if self._accept("not"):
+            return not bool(self._not())
+        return self._comparison()
+
+    def _comparison(self) -> Any:
+        left = self._operand()
+        token = self._peek()
+        if token is None or token[1] not in _COMPARISONS or token[0] not in {"keyword", "op"}:
+            return left
+        self._pos += 1
+        right = self._operand()
+        return _compare(token[1], left, right) if self._live else None
+
+    def _operand(self) -> Any:
+        kind, value = self._next()
+        if kind == "op" and value == "(":
+            inner = self._or()
+            if not self._accept(")"):
+                raise ConditionError("Missing closing parenthesis")
+            return inner
+        if kind == "number":
+            return float(value) if "." in value else int(value)
+        if kind == "string":
+            return re.sub(r"\\(.)", r"\1", value[1:-1])
+        if kind == "keyword" and value in {"true", "false"}:
+            return value == "true"
+        if kind == "keyword" and value in {"null", "none"}:
+            return None
+        if kind == "name":
+            return self._resolve(value) if self._live else None
+        raise ConditionError(f"Unexpected token {value!r}")
+
+
+def _compare(op: str, left: Any, right: Any) -> bool:
+    if op == "==":
+        return bool(left == right)
+    if op == "!=":
+        return bool(left != right)
+    if op == "contains":
+        left, right = right, left
+        op = "in"
+    if op == "in":
+        if right is None:
+            return False
+        try:
+            return left in right
+        except TypeError as exc:
+            raise ConditionError(f"Cannot test membership: {exc}") from exc
+    try:
+        if op == ">":
+            return bool(left > right)
+        if op == ">=":
+            return bool(left >= right)
+        if op == "<":
+            return bool(left < right)
+        return bool(left <= right)
+    except TypeError as exc:
+        raise ConditionError(f"Cannot compare {left!r} {op} {right!r}") from exc
+
+
+def resolve_path(context: dict[str, Any], path: str) -> Any:
+    """Look up a dotted *path* in *context*.
+
+    Only dict keys and list indexes are traversed.  A callable is invoked only
+    when it is a top-level context value (a lazily computed section such as
+    ``diff``); callables found deeper in the data are never called.
+    """
+    parts = path.split(".")
+    if any(part.startswith("_") for part in parts):
+        raise ConditionError(f"Private name in path {path!r}")
+    current: Any = context.get(parts[0])
+    if callable(current):
+        current = current()
+    for part in parts[1:]:
+        if isinstance(current, dict):
+            current = current.get(part)
+        elif isinstance(current, (list, tuple)) and part.isdigit():
+            index = int(part)
+            current = current[index] if index < len(current) else None
+        else:
+            return None
+        if current is None:
+            return None
+    return None if callable(current) else current
+
+
+def evaluate_condition(expression: str, context: dict[str, Any]) -> bool:
+    """Return the truth value of *expression* evaluated over *context*.
+
+    Raises ``ConditionError`` for malformed expressions or invalid comparisons.
+    """
+    tokens = _tokenize(expression)
+    if not tokens:
+        raise ConditionError("Empty condition")
+    return bool(_Parser(tokens, lambda path: resolve_path(context, path)).parse())
@@ -33,6 +33,7 @@ class StepDef:
     timeout_seconds: int = 600                     # max time for this step
     retry_limit: int = 3                           # retries before escalating
     agent_role: Optional[str] = None               # preferred agent role (None = auto)
+    group: Optional[str] = None                    # adjacent steps sharing a group run concurrently
     config: dict[str, Any] = field(default_factory=dict)  # step-specific config
 
 
@@ -55,6 +56,34 @@ class PipelineTemplate:
     def step_names(self) -> list[str]:
         return [s.name for s in self.steps]
 
+    def step_def(self, name: str) -> Optional[StepDef]:
+        """Return the step called *name*, or None if the template has no such step."""
+        for step in self.steps:
+            if step.name == name:
+                return step
+        return None
+
+    def step_groups(self, names: Optional[list[str]] = None) -> list[list[str]]:
+        """Partition step names into execution groups.
+
+        Adjacent steps that share the same ``group`` are returned together and
+        may run concurrently; every other step forms a group of one.  *names*
+        defaults to the template order, but a task's custom step list can be
+        passed in — steps unknown to the template are never grouped.
+        """
+        ordered = self.step_names() if names is None else list(names)
+        groups: list[list[str]] = []
+        previous: Optional[str] = None
+        for name in ordered:
+            step = self.step_def(name)
+            group = step.group if step else None
+            if group and group == previous and groups:
+                groups[-1].append(name)
+            else:
+                groups.append([name])
+            previous = group
+        return groups
+
 
 # ---------------------------------------------------------------------------
 # Built-in templates
@@ -163,8 +192,8 @@ SECURITY_AUDIT_PIPELINE = PipelineTemplate(
     description="Scan dependencies and code for security issues.",
     task_types=("security", "security_audit"),
     steps=(
-        StepDef(name="scan_deps", display_name="Scan Dependencies"),
-        StepDef(name="scan_code", display_name="Scan Code"),
+        StepDef(name="scan_deps", display_name="Scan Dependencies", group="scan"),
+        StepDef(name="scan_code", display_name="Scan Code", group="scan"),
         StepDef(name="report", display_name="Generate Report"),
         StepDef(name="generate_tasks", display_name="Generate Fix Tasks"),
     ),
@@ -356,7 +385,9 @@ class PipelineRegistry:
         - A directory containing multiple YAML files (one template each).
 
         Each YAML file must be a mapping with at least ``id``, ``display_name``,
-        ``description``, and ``steps`` (a list of step definitions).
+        ``description``, and ``steps`` (a list of step definitions).  A step
+        entry of the form ``{parallel: [...]}`` declares a group of steps that
+        run concurrently; steps may also set ``group`` directly.
         """
         if yaml is None:
             raise RuntimeError(
@@ -397,23 +428,17 @@ class PipelineRegistry:
             return
 
         step_defs: list[StepDef] = []
-        for raw_step in raw_steps:
-            if not isinstance(raw_step, dict) or "name" not in raw_step:
-                logger.warning("Skipping step entry without 'name' in %s", path)
+        for idx, raw_step in enumerate(raw_steps):
+            if isinstance(raw_step, dict) and isinstance(raw_step.get("parallel"), list):
+                group = str(raw_step.get("group") or f"parallel_{idx}")
+                for inner in raw_step["parallel"]:
+                    step_def = self._parse_yaml_step(inner, path, group=group)
+                    if step_def is not None:
+                        step_defs.append(step_def)
                 continue
-
-            step_kwargs: dict[str, Any] = {"name": raw_step["name"]}
-            # Copy recognized StepDef fields
-            for field_name in (
-                "display_name", "required", "condition", "timeout_seconds",
-                "retry_limit", "agent_role",
-            ):
-                if field_name in raw_step:
-                    step_kwargs[field_name] = raw_step[field_name]
-            if "config" in raw_step and isinstance(raw_step["config"], dict):
-                step_kwargs["config"] = raw_step["config"]
-
-            step_defs.append(StepDef(**step_kwargs))
+            step_def = self._parse_yaml_step(raw_step, path)
+            if step_def is not None:
+                step_defs.append(step_def)
 
         # Parse task_types
         task_types = data.get("task_types", ())
@@ -437,3 +462,32 @@ class PipelineRegistry:
         )
 
         self.register(template)
+
+    @staticmethod
+    def _parse_yaml_step(raw_step: Any, path: Path, *, group: Optional[str] = None) -> Optional[StepDef]:
+        if not isinstance(raw_step, dict) or "name" not in raw_step:
+            logger.warning("Skipping step entry without 'name' in %s", path)
+            return None
+
+        step_kwargs: dict[str, Any] = {"name": raw_step["name"]}
+        # Copy recognized StepDef fields
+        for field_name in (
+            "display_name", "required", "condition", "timeout_seconds",
+            "retry_limit", "agent_role", "group",
+        ):
+            if field_name in raw_step:
+                step_kwargs[field_name] = raw_step[field_name]
+        if group is not None:
+            step_kwargs["group"] = group
+        if "config" in raw_step and isinstance(raw_step["config"], dict):
+            step_kwargs["config"] = raw_step["config"]
+        return StepDef(**step_kwargs)
+
+
+def project_registry(state_root: Path) -> PipelineRegistry:
+    """Return a registry with built-ins plus ``<state_root>/pipelines/*.yaml``."""
+    registry = PipelineRegistry()
+    pipelines_dir = state_root / "pipelines"
+    if pipelines_dir.is_dir() and yaml is not None:
+        registry.load_from_yaml(pipelines_dir)
+    return registry
@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hmac
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel, Field
 
 from ...collaboration.modes import MODE_CONFIGS
-from ...pipelines.registry import PipelineRegistry
+from ...io_utils import _read_text_range
+from ...pipelines.registry import project_registry
+from ...workers.limits import parse_limits, provider_limiter
+from ...workers.sandbox import parse_resource_limits
 from ..domain.models import AgentRecord, QuickActionRun, Task, now_iso
 from ..events.bus import EventBus
+from ..orchestrator.remote_workers import RemoteWorkerRegistry, agent_token
 from ..orchestrator.service import OrchestratorService
 from ..storage.container import Container
 
@@ -106,6 +112,11 @@ class WorkerProviderSettingsRequest(BaseModel):
     model: Optional[str] = None
     temperature: Optional[float] = None
     num_ctx: Optional[int] = None
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    rate_limit_per_minute: Optional[float] = Field(None, gt=0)
+    rate_limit_burst: Optional[int] = Field(None, ge=1)
+    model_limits: Optional[dict[str, dict[str, Any]]] = None
+    resource_limits: Optional[dict[str, Any]] = None
 
 
 class WorkersSettingsRequest(BaseModel):
@@ -151,6 +162,17 @@ class SpawnAgentRequest(BaseModel):
     override_provider: Optional[str] = None
 
 
+class RegisterWorkerAgentRequest(BaseModel):
+    name: str
+    labels: list[str] = Field(default_factory=list)
+    capabilities: list[str] = Field(default_factory=list)
+    capacity: int = Field(1, ge=1, le=64)
+
+
+class LeaseRequest(BaseModel):
+    wait_seconds: float = Field(0.0, ge=0.0, le=60.0)
+
+
 class ReviewActionRequest(BaseModel):
     guidance: Optional[str] = None
 
@@ -186,6 +208,7 @@ VALID_TRANSITIONS: dict[str, set[str]] = {
 IMPORT_JOB_TTL_SECONDS = 60 * 60 * 24
 IMPORT_JOB_MAX_RECORDS = 200
 QUICK_ACTION_MAX_PENDING = 32
+STEP_LOG_FILES = {"stdout": "stdout.log", "stderr": "stderr.log", "prompt": "prompt.txt"}
 
 
 def _priority_rank(priority: str) -> int:
@@ -301,6 +324,33 @@ def _task_payload(task: Task) -> dict[str, Any]:
     return payload
 
 
+def _normalize_provider_limits(raw_item: dict[str, Any], provider: dict[str, Any]) -> None:
+    """Copy valid dispatch and sandbox limit fields from *raw_item* into *provider*."""
+    resource_limits = parse_resource_limits(raw_item.get("resource_limits")).to_dict()
+    if resource_limits:
+        provider["resource_limits"] = resource_limits
+    limits = parse_limits(raw_item)
+    if limits.max_concurrency:
+        provider["max_concurrency"] = limits.max_concurrency
+    if limits.rate_limit_per_minute:
+        provider["rate_limit_per_minute"] = limits.rate_limit_per_minute
+    if limits.rate_limit_burst:
+        provider["rate_limit_burst"] = limits.rate_limit_burst
+    model_limits: dict[str, dict[str, Any]] = {}
+    raw_models = raw_item.get("model_limits")
+    for raw_model, raw_limits in (raw_models.items() if isinstance(raw_models, dict) else []):
+        model = str(raw_model or "").strip()
+        entry: dict[str, Any] = {}
+        if model and isinstance(raw_limits, dict):
+            _normalize_provider_limits(
+                {k: v for k, v in raw_limits.items() if k not in {"model_limits", "resource_limits"}}, entry
+            )
+        if entry:
+            model_limits[model] = entry
+    if model_limits:
+        provider["model_limits"] = model_limits
+
+
 def _normalize_workers_providers(value: Any) -> dict[str, dict[str, Any]]:
     raw_providers = value if isinstance(value, dict) else {}
     providers: dict[str, dict[str, Any]] = {}
@@ -324,6 +374,7 @@ def _normalize_workers_providers(value: Any) -> dict[str, dict[str, Any]]:
             reasoning_effort = str(raw_item.get("reasoning_effort") or "").strip().lower()
             if reasoning_effort in {"low", "medium", "high"}:
                 provider["reasoning_effort"] = reasoning_effort
+            _normalize_provider_limits(raw_item, provider)
             providers[name] = provider
             continue
 
@@ -340,6 +391,7 @@ def _normalize_workers_providers(value: Any) -> dict[str, dict[str, Any]]:
         num_ctx = raw_item.get("num_ctx")
         if isinstance(num_ctx, int) and num_ctx > 0:
             provider["num_ctx"] = num_ctx
+        _normalize_provider_limits(raw_item, provider)
         providers[name] = provider
 
     codex = providers.get("codex")
@@ -351,7 +403,11 @@ def _normalize_workers_providers(value: Any) -> dict[str, dict[str, Any]]:
         codex_model = str(codex.get("model") or "").strip() or None
         raw_reasoning = str(codex.get("reasoning_effort") or "").strip().lower()
         codex_reasoning = raw_reasoning if raw_reasoning in {"low", "medium", "high"} else None
-    providers["codex"] = {"type": "codex", "command": codex_command}
+    codex_limits = {
+        key: value for key, value in (codex or {}).items()
+        if key in {"max_concurrency", "rate_limit_per_minute", "rate_limit_burst", "model_limits", "resource_limits"}
+    }
+    providers["codex"] = {"type": "codex", "command": codex_command, **codex_limits}
     if codex_model:
         providers["codex"]["model"] = codex_model
     if codex_reasoning:
@@ -370,6 +426,15 @@ def _settings_payload(cfg: dict[str, Any]) -> dict[str, Any]:
     workers_default_model = str(workers_cfg.get("default_model") or "").strip()
     if workers_default not in workers_providers:
         workers_default = "codex"
+    workers: dict[str, Any] = {
+        "default": workers_default,
+        "default_model": workers_default_model,
+        "routing": _normalize_str_map(workers_cfg.get("routing")),
+        "providers": workers_providers,
+    }
+    cgroup_parent = str(workers_cfg.get("cgroup_parent") or "").strip()
+    if cgroup_parent:
+        workers["cgroup_parent"] = cgroup_parent
     return {
         "orchestrator": {
             "concurrency": _coerce_int(orchestrator.get("concurrency"), 2, minimum=1, maximum=128),
@@ -389,12 +454,7 @@ def _settings_payload(cfg: dict[str, Any]) -> dict[str, Any]:
                 "low": _coerce_int(quality_gate.get("low"), 0, minimum=0),
             }
         },
-        "workers": {
-            "default": workers_default,
-            "default_model": workers_default_model,
-            "routing": _normalize_str_map(workers_cfg.get("routing")),
-            "providers": workers_providers,
-        },
+        "workers": workers,
         "project": {
             "commands": dict((cfg.get("project") or {}).get("commands") or {}),
         },
@@ -455,8 +515,10 @@ def create_router(
     resolve_container: Any,
     resolve_orchestrator: Any,
     job_store: dict[str, dict[str, Any]],
+    remote_workers: Optional[RemoteWorkerRegistry] = None,
 ) -> APIRouter:
     router = APIRouter(prefix="/api", tags=["api"])
+    remote_workers = remote_workers or RemoteWorkerRegistry()
 
     def _ctx(project_dir: Optional[str]) -> tuple[Container, EventBus, OrchestratorService]:
         container: Container = resolve_container(project_dir)
@@ -629,7 +691,7 @@ def create_router(
         container, bus, _ = _ctx(project_dir)
         pipeline_steps = body.pipeline_template
         if pipeline_steps is None:
-            registry = PipelineRegistry()
+            registry = project_registry(container.state_root)
             template = registry.resolve_for_task_type(body.task_type)
             pipeline_steps = template.step_names()
         task = Task(
@@ -773,13 +835,14 @@ def create_router(
 
     @router.post("/tasks/{task_id}/cancel")
     async def cancel_task(task_id: str, project_dir: Optional[str] = Query(None)) -> dict[str, Any]:
-        container, bus, _ = _ctx(project_dir)
+        container, bus, orchestrator = _ctx(project_dir)
         task = container.tasks.get(task_id)
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
         task.status = "cancelled"
         container.tasks.upsert(task)
-        bus.emit(channel="tasks", event_type="task.cancelled", entity_id=task.id, payload={})
+        terminated = orchestrator.cancel_task(task.id)
+        bus.emit(channel="tasks", event_type="task.cancelled", entity_id=task.id, payload={"terminated_workers": terminated})
         return {"task": _task_payload(task)}
 
     @router.post("/tasks/{task_id}/approve-gate")
@@ -975,6 +1038,42 @@ def create_router(
             raise HTTPException(status_code=404, detail="Import job not found")
         return {"job": job}
 
+    @router.get("/runs/{run_id}/steps/{step_index}/logs")
+    async def get_step_logs(
+        run_id: str,
+        step_index: int,
+        file: str = Query("stdout"),
+        offset: Optional[int] = Query(None, ge=0),
+        limit: int = Query(64 * 1024, ge=1024, le=1024 * 1024),
+        project_dir: Optional[str] = Query(None),
+    ) -> dict[str, Any]:
+        container, _, _ = _ctx(project_dir)
+        run = next((item for item in container.runs.list() if item.id == run_id), None)
+        if not run:
+            raise HTTPException(status_code=404, detail="Run not found")
+        if not 0 <= step_index < len(run.steps):
+            raise HTTPException(status_code=404, detail="Step not found")
+        if file not in STEP_LOG_FILES:
+            raise HTTPException(status_code=400, detail=f"file must be one of: {', '.join(STEP_LOG_FILES)}")
+        step = run.steps[step_index]
+        state_root = container.state_root.resolve()
+        run_dir = (state_root / str(step.get("run_dir") or "")).resolve()
+        if not step.get("run_dir") or not run_dir.is_relative_to(state_root) or not run_dir.is_dir():
+            raise HTTPException(status_code=404, detail="No logs recorded for this step")
+        # Without offset the tail is returned; pass next_offset back to follow the file.
+        path = container.artifacts.log_path(run_dir, STEP_LOG_FILES[file])
+        text, start, end, size = _read_text_range(path, offset=offset, max_bytes=limit)
+        return {
+            "run_id": run.id,
+            "step": step.get("step"),
+            "file": file,
+            "offset": start,
+            "next_offset": end,
+            "size": size,
+            "eof": end >= size,
+            "text": text,
+        }
+
     @router.get("/metrics")
     async def get_metrics(project_dir: Optional[str] = Query(None)) -> dict[str, Any]:
         container, _, orchestrator = _ctx(project_dir)
@@ -1001,6 +1100,8 @@ def create_router(
                 end = datetime.now(timezone.utc)
             wall_time_seconds += max((end - start).total_seconds(), 0.0)
         api_calls = len(events)
+        provider_queues = provider_limiter.snapshot()
+        artifacts = container.artifacts.usage()
         return {
             "tokens_used": 0,
             "api_calls": api_calls,
@@ -1013,6 +1114,12 @@ def create_router(
             "lines_removed": 0,
             "queue_depth": int(status.get("queue_depth", 0)),
             "in_progress": int(status.get("in_progress", 0)),
+            "worker_queue_wait_seconds": round(sum(item["total_wait_seconds"] for item in provider_queues.values()), 3),
+            "worker_queues": provider_queues,
+            "merge_queue_depth": int(dict(status.get("merge_queue") or {}).get("depth", 0)),
+            "merge_queue": dict(status.get("merge_queue") or {}),
+            "artifact_bytes": artifacts["bytes"],
+            "artifacts": artifacts,
         }
 
     @router.get("/phases")
@@ -1408,10 +1515,18 @@ def create_router(
             if "routing" in incoming_workers:
                 workers_cfg["routing"] = dict(incoming_workers.get("routing") or {})
             if "providers" in incoming_workers:
-                workers_cfg["providers"] = dict(incoming_workers.get("providers") or {})
+                existing_providers = dict(workers_cfg.get("providers") or {})
+                providers = dict(incoming_workers.get("providers") or {})
+                for name, item in providers.items():
+                    previous = existing_providers.get(name)
+                    # The settings form does not edit sandbox limits; keep them unless sent.
+                    if "resource_limits" not in item and isinstance(previous, dict) and previous.get("resource_limits"):
+                        item["resource_limits"] = previous["resource_limits"]
+                workers_cfg["providers"] = providers
 
             normalized_workers = _settings_payload({"workers": workers_cfg})["workers"]
-            cfg["workers"] = normalized_workers
+            # Sections the settings form does not manage (``remote`` and the like) are kept.
+            cfg["workers"] = {**workers_cfg, **normalized_workers}
             touched_sections.append("workers")
 
         if body.project is not None and body.project.commands is not None:
@@ -1493,6 +1608,64 @@ def create_router(
         bus.emit(channel="agents", event_type="agent.terminated", entity_id=agent.id, payload={})
         return {"agent": agent.to_dict()}
 
+    def _require_agent_token(authorization: Optional[str] = Header(None)) -> None:
+        # Leases carry full prompts and project snapshots; only token holders see them.
+        token = agent_token(resolve_container(None).config.load())
+        if token is None:
+            raise HTTPException(status_code=403, detail="Remote worker agents are disabled; set workers.remote.token")
+        scheme, _, supplied = (authorization or "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(supplied.strip().encode("utf-8"), token.encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Invalid worker agent token")
+
+    def _require_agent_key(agent_id: str, x_worker_agent_key: Optional[str] = Header(None)) -> None:
+        known = remote_workers.authenticate(agent_id, x_worker_agent_key or "")
+        if known is None:
+            raise HTTPException(status_code=404, detail="Worker agent not registered")
+        if not known:
+            raise HTTPException(status_code=403, detail="Worker agent key does not match")
+
+    agent_auth = [Depends(_require_agent_token)]
+    agent_self_auth = [Depends(_require_agent_token), Depends(_require_agent_key)]
+
+    @router.get("/worker-agents", dependencies=agent_auth)
+    async def list_worker_agents() -> dict[str, Any]:
+        return remote_workers.snapshot()
+
+    @router.post("/worker-agents/register", dependencies=agent_auth)
+    async def register_worker_agent(body: RegisterWorkerAgentRequest) -> dict[str, Any]:
+        agent = remote_workers.register(body.name, body.labels, body.capabilities, body.capacity)
+        return {
+            "agent_id": agent.id,
+            "agent_key": agent.key,
+            "heartbeat_timeout_seconds": remote_workers.agent_timeout_seconds,
+        }
+
+    @router.post("/worker-agents/{agent_id}/heartbeat", dependencies=agent_self_auth)
+    async def worker_agent_heartbeat(agent_id: str) -> dict[str, Any]:
+        if not remote_workers.heartbeat(agent_id):
+            raise HTTPException(status_code=404, detail="Worker agent not registered")
+        # Leases whose task was cancelled; the agent kills their workers.
+        return {"ok": True, "cancel": remote_workers.leases_to_abort(agent_id)}
+
+    @router.post("/worker-agents/{agent_id}/lease", dependencies=agent_self_auth)
+    async def lease_step(agent_id: str, body: LeaseRequest) -> dict[str, Any]:
+        try:
+            # Long-poll off the event loop.
+            lease = await asyncio.to_thread(remote_workers.lease, agent_id, body.wait_seconds)
+        except KeyError:
+            raise HTTPException(status_code=404, detail="Worker agent not registered")
+        return {"lease": lease}
+
+    @router.post("/worker-agents/{agent_id}/leases/{lease_id}/complete", dependencies=agent_self_auth)
+    async def complete_lease(agent_id: str, lease_id: str, body: dict[str, Any]) -> dict[str, Any]:
+        if not remote_workers.complete(agent_id, lease_id, body):
+            raise HTTPException(status_code=409, detail="Lease is not held by this worker agent")
+        return {"ok": True}
+
+    @router.post("/worker-agents/{agent_id}/deregister", dependencies=agent_self_auth)
+    async def deregister_worker_agent(agent_id: str) -> dict[str, Any]:
+        return {"removed": remote_workers.deregister(agent_id)}
+
     return router
 
 
@@ -0,0 +1,207 @@
+"""Live worker output on the ``logs`` WebSocket channel.
+
+Worker output arrives in many small writes.  :class:`LogStream` coalesces
+it per task/run/step/stream and publishes at most one ``worker.output``
+event per key every ``flush_seconds``.  When a key's pending output exceeds
+``max_chunk_chars`` before its flush, the oldest part is dropped and the
+event reports ``dropped_chars``.  A flooding worker therefore cannot swamp
+subscribers.
+
+The last ``backlog_lines`` complete lines of every task are kept in a ring
+buffer, so a client that subscribes while a step runs starts with recent
+context (see :meth:`LogStream.backlog`).  Buffers of tasks nobody wrote to
+for ``retain_seconds`` are dropped.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from ..domain.models import now_iso
+
+
+@dataclass(frozen=True)
+class _LogKey:
+    project_id: str
+    task_id: str
+    run_id: str
+    step: str
+    stream: str
+
+
+@dataclass
+class _Pending:
+    parts: list[str] = field(default_factory=list)
+    size: int = 0
+    dropped: int = 0
+    due: float = 0.0
+
+
+class LogStream:
+    """Coalesce worker output into rate-limited ``logs`` events."""
+
+    def __init__(
+        self,
+        publish: Callable[[dict[str, Any]], None],
+        *,
+        flush_seconds: float = 0.25,
+        max_chunk_chars: int = 16_384,
+        backlog_lines: int = 500,
+        retain_seconds: float = 3600.0,
+    ) -> None:
+        self._publish = publish
+        self.flush_seconds = flush_seconds
+        self.max_chunk_chars = max_chunk_chars
+        self.backlog_lines = backlog_lines
+        self.retain_seconds = retain_seconds
+        self._cond = threading.Condition()
+        self._pending: dict[_LogKey, _Pending] = {}
+        self._last_sent: dict[_LogKey, float] = {}
+        # Trailing text not yet terminated by a newline, held back from the ring.
+        self._partials: dict[_LogKey, str] = {}
+        self._rings: dict[str, deque[dict[str, Any]]] = {}
+        self._touched: dict[str, float] = {}
+        self._flusher: Optional[threading.Thread] = None
+
+    def writer(self, *, project_id: str, task_id: str, run_id: str, step: str) -> Callable[[str, str], None]:
+        """Return an ``on_output(stream, text)`` callback for one step."""
+
+        def _write(stream: str, text: str) -> None:
+            self.write(_LogKey(project_id, task_id, run_id, step, stream), text)
+
+        return _write
+
+    def write(self, key: _LogKey, text: str) -> None:
+        if not text:
+            return
+        now = time.monotonic()
+        with self._cond:
+            pending = self._pending.get(key)
+            if pending is None:
+                # Publish right away unless this key sent an event within the interval.
+                last = self._last_sent.get(key, float("-inf"))
+                pending = self._pending[key] = _Pending(due=max(now, last + self.flush_seconds))
+            pending.parts.append(text)
+            pending.size += len(text)
+            if pending.size > self.max_chunk_chars:
+                joined = "".join(pending.parts)
+                excess = len(joined) - self.max_chunk_chars
+                pending.parts = [joined[excess:]]
+                pending.size = self.max_chunk_chars
+                pending.dropped += excess
+            self._ensure_flusher()
+            self._cond.notify()
+
+    def flush(self, task_id: Optional[str] = None) -> None:
+        """Publish pending output now, for one task or for all of them."""
+        with self._cond:
+            keys = [key for key in self._pending if task_id is None or key.task_id == task_id]
+            events = [self._take(key, time.monotonic()) for key in keys]
+            for key in [key for key in self._partials if task_id is None or key.task_id == task_id]:
+                self._remember(key, self._partials.pop(key), final=True)
+        for event in events:
+            self._publish(event)
+
+    def backlog(self, task_ids: Iterable[str], project_ids: Iterable[str] = ()) -> list[dict[str, Any]]:
+        """Recent lines for *task_ids*, one ``backlog`` event per task with any."""
+        projects = set(project_ids)
+        events: list[dict[str, Any]] = []
+        with self._cond:
+            for task_id in sorted(set(task_ids)):
+                lines = [line for line in self._rings.get(task_id, ()) if not projects or line["project_id"] in projects]
+                if not lines:
+                    continue
+                events.append(
+                    {
+                        "channel": "logs",
+                        "type": "backlog",
+                        "entity_id": task_id,
+                        "project_id": lines[-1]["project_id"],
+                        "ts": now_iso(),
+                        "payload": {
+                            "task_id": task_id,
+                            "lines": [{k: v for k, v in line.items() if k != "project_id"} for line in lines],
+                        },
+                    }
+                )
+        return events
+
+    # -- internals (callers hold self._cond) --------------------------------
+
+    def _take(self, key: _LogKey, now: float) -> dict[str, Any]:
+        pending = self._pending.pop(key)
+        self._last_sent[key] = now
+        text = "".join(pending.parts)
+        self._remember(key, self._partials.pop(key, "") + text)
+        payload: dict[str, Any] = {
+            "task_id": key.task_id,
+            "run_id": key.run_id,
+            "step": key.step,
+            "stream": key.stream,
+            "text": text,
+        }
+        if pending.dropped:
+            payload["dropped_chars"] = pending.dropped
+        return {
+            "channel": "logs",
+            "type": "worker.output",
+            "entity_id": key.task_id,
+            "project_id": key.project_id,
+            "ts": now_iso(),
+            "payload": payload,
+        }
+
+    def _remember(self, key: _LogKey, text: str, final: bool = False) -> None:
+        lines = text.splitlines(keepends=True)
+        if lines and not lines[-1].endswith(("\n", "\r")) and not final:
+            # Carried into the next chunk of this key so lines stay whole.
+            self._partials[key] = lines.pop()
+        ring = self._rings.get(key.task_id)
+        if ring is None:
+            ring = self._rings[key.task_id] = deque(maxlen=self.backlog_lines)
+        for line in lines:
+            ring.append(
+                {
+                    "project_id": key.project_id,
+                    "run_id": key.run_id,
+                    "step": key.step,
+                    "stream": key.stream,
+                    "line": line.rstrip("\r\n"),
+                }
+            )
+        self._touched[key.task_id] = time.monotonic()
+
+    def _ensure_flusher(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(target=self._flush_forever, daemon=True, name="log-stream")
+            self._flusher.start()
+
+    def _flush_forever(self) -> None:
+        while True:
+            with self._cond:
+                now = time.monotonic()
+                due = [key for key, pending in self._pending.items() if pending.due <= now]
+                events = [self._take(key, now) for key in due]
+                if not events:
+                    self._expire(now)
+                    waits = [pending.due - now for pending in self._pending.values()]
+                    self._cond.wait(timeout=min(waits) if waits else self.retain_seconds)
+                    continue
+            for event in events:
+                try:
+                    self._publish(event)
+                except Exception:
+                    pass
+
+    def _expire(self, now: float) -> None:
+        for task_id, touched in list(self._touched.items()):
+            if now - touched > self.retain_seconds:
+                self._touched.pop(task_id, None)
+                self._rings.pop(task_id, None)
+                for known in (self._last_sent, self._partials):
+                    for key in [key for key in known if key.task_id == task_id]:
+                        known.pop(key, None)
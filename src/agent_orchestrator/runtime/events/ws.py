@@ -8,6 +8,8 @@ from typing import Any
 
 from fastapi import WebSocket
 
+from .logs import LogStream
+
 
 CHANNELS = {
     "tasks",
@@ -16,6 +18,7 @@ CHANNELS = {
     "review",
     "quick_actions",
     "notifications",
+    "logs",
     "system",
 }
 
@@ -25,6 +28,8 @@ class _WsClient:
     ws: WebSocket
     channels: set[str] = field(default_factory=set)
     project_ids: set[str] = field(default_factory=set)
+    # Tasks whose ``logs`` events the client wants; empty means all.
+    task_ids: set[str] = field(default_factory=set)
 
 
 class WebSocketHub:
@@ -33,6 +38,8 @@ class WebSocketHub:
         self._counter = 0
         self._loop: asyncio.AbstractEventLoop | None = None
         self._lock = threading.Lock()
+        # Live worker output; published straight to clients, not stored as events.
+        self.logs = LogStream(self.publish_sync)
 
     def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
         with self._lock:
@@ -60,9 +67,14 @@ class WebSocketHub:
                 single_project_id = str(message.get("project_id") or "").strip()
                 if single_project_id:
                     project_ids.add(single_project_id)
+                task_ids = {str(task_id).strip() for task_id in message.get("task_ids", []) if str(task_id).strip()}
+                single_task_id = str(message.get("task_id") or "").strip()
+                if single_task_id:
+                    task_ids.add(single_task_id)
                 if action == "subscribe":
                     client.channels |= channels & CHANNELS
                     client.project_ids |= project_ids
+                    client.task_ids |= task_ids
                     await websocket.send_text(
                         json.dumps(
                             {
@@ -71,13 +83,19 @@ class WebSocketHub:
                                 "payload": {
                                     "channels": sorted(client.channels),
                                     "project_ids": sorted(client.project_ids),
+                                    "task_ids": sorted(client.task_ids),
                                 },
                             }
                         )
                     )
+                    if "logs" in client.channels and task_ids:
+                        # Late joiners start with the task's recent output.
+                        for event in self.logs.backlog(task_ids, client.project_ids):
+                            await websocket.send_text(json.dumps(event))
                 elif action == "unsubscribe":
                     client.channels -= channels
                     client.project_ids -= project_ids
+                    client.task_ids -= task_ids
                     await websocket.send_text(
                         json.dumps(
                             {
@@ -86,6 +104,7 @@ class WebSocketHub:
                                 "payload": {
                                     "channels": sorted(client.channels),
                                     "project_ids": sorted(client.project_ids),
+                                    "task_ids": sorted(client.task_ids),
                                 },
                             }
                         )
@@ -108,6 +127,8 @@ class WebSocketHub:
                 event_project_id = str(event.get("project_id") or "").strip()
                 if not event_project_id or event_project_id not in client.project_ids:
                     continue
+            if event.get("channel") == "logs" and client.task_ids and event.get("entity_id") not in client.task_ids:
+                continue
             try:
                 await client.ws.send_text(payload)
             except Exception:
@@ -1,12 +1,17 @@
 from .live_worker_adapter import LiveWorkerAdapter
+from .remote_workers import RemoteWorkerAdapter, RemoteWorkerRegistry
 from .service import OrchestratorService, create_orchestrator
+from .supervisor import ProjectSupervisor
 from .worker_adapter import DefaultWorkerAdapter, StepResult, WorkerAdapter
 
 __all__ = [
     "OrchestratorService",
     "create_orchestrator",
+    "ProjectSupervisor",
     "WorkerAdapter",
     "DefaultWorkerAdapter",
     "LiveWorkerAdapter",
+    "RemoteWorkerAdapter",
+    "RemoteWorkerRegistry",
     "StepResult",
 ]
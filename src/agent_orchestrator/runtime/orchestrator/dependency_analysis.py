@@ -0,0 +1,145 @@
+"""Background, debounced, cached automatic dependency analysis.
+
+The scheduler must never wait on an ``analyze_deps`` worker call.  Instead
+``tick_once`` notices unanalyzed ready tasks while claiming, holds them back
+and notifies a :class:`DebouncedWorker`.  The worker waits until no new
+candidates have shown up for ``orchestrator.dependency_debounce_seconds``
+(default 2, capped at ``dependency_debounce_max_seconds``, default 10) so a
+burst of created tasks is analyzed together, then runs the analysis on its
+own thread.
+
+Results are cached by :func:`task_fingerprint` (title, description, labels).
+A candidate whose fingerprint was analyzed before reuses the cached edges
+instead of going back to the worker, and a task whose content changes after
+analysis becomes a candidate again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from ..domain.models import Task
+
+logger = logging.getLogger(__name__)
+
+
+def task_fingerprint(task: Task) -> str:
+    """Stable hash of the task fields dependency inference looks at."""
+    digest = hashlib.sha256()
+    for part in (task.title or "", task.description or "", "\x1f".join(sorted(task.labels or []))):
+        digest.update(part.strip().encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()[:16]
+
+
+class DependencyCache:
+    """LRU of fingerprint -> inferred edges ``(from_fp, to_fp, reason)``."""
+
+    def __init__(self, max_entries: int = 2048) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, list[tuple[str, str, str]]] = OrderedDict()
+        self._max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, fingerprint: str) -> Optional[list[tuple[str, str, str]]]:
+        with self._lock:
+            edges = self._entries.get(fingerprint)
+            if edges is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return list(edges)
+
+    def put(self, fingerprint: str, edges: list[tuple[str, str, str]]) -> None:
+        with self._lock:
+            self._entries[fingerprint] = list(edges)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class DebouncedWorker:
+    """Run *callback* on a daemon thread once notifications go quiet."""
+
+    def __init__(self, callback: Callable[[], None], *, name: str) -> None:
+        self._callback = callback
+        self._name = name
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._seen: set[str] = set()
+        self._pending = False
+        self._running = False
+        self._first_notified = 0.0
+        self._last_notified = 0.0
+        self._window = 2.0
+        self._max_wait = 10.0
+        self._runs = 0
+
+    def notify(self, keys: Iterable[str], *, window: float, max_wait: float) -> None:
+        """Schedule a run; only keys not seen since the last run restart the window."""
+        with self._cond:
+            new = set(keys) - self._seen
+            if not new:
+                return
+            self._seen |= new
+            now = time.monotonic()
+            if not self._pending:
+                self._first_notified = now
+            self._pending = True
+            self._last_notified = now
+            self._window = max(window, 0.0)
+            self._max_wait = max(max_wait, self._window)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name=self._name)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                while True:
+                    now = time.monotonic()
+                    fire_at = min(self._last_notified + self._window, self._first_notified + self._max_wait)
+                    if now >= fire_at:
+                        break
+                    self._cond.wait(fire_at - now)
+                self._pending = False
+                self._running = True
+                self._seen = set()
+            try:
+                self._callback()
+            except Exception:
+                logger.exception("%s run failed", self._name)
+            finally:
+                with self._cond:
+                    self._running = False
+                    self._runs += 1
+                    self._cond.notify_all()
+
+    def wait_idle(self, timeout: float = 30.0) -> bool:
+        """Block until no run is pending or in flight (used by tests and shutdown)."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            return {"pending": self._pending, "running": self._running, "runs": self._runs}
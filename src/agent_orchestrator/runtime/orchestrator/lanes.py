@@ -0,0 +1,135 @@
+"""Execution lanes: separately sized capacity per step category.
+
+Without lanes every in-flight task holds one ``concurrency`` slot for its
+whole pipeline, so a task that only needs a one-minute ``plan`` waits behind
+tasks deep in ten-minute ``implement``/``verify`` steps.  With lanes
+configured::
+
+    orchestrator:
+      lanes: {heavy: 2, light: 2}
+      lane_categories: {review: light}   # optional overrides
+
+each worker call first takes a slot in the lane of its step category (see
+``step_category``), and the number of tasks in flight grows to the sum of
+lane capacities.  Cheap steps then only queue behind other cheap steps.
+A step of a cancelled task stops waiting for its lane within a second.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+from ...workers.limits import SlotCancelled
+from .live_worker_adapter import step_category
+
+DEFAULT_LANE_BY_CATEGORY = {
+    "planning": "light",
+    "reporting": "light",
+    "scanning": "light",
+    "task_generation": "light",
+    "dependency_analysis": "light",
+    "implementation": "heavy",
+    "verification": "heavy",
+    "review": "heavy",
+    "merge_resolution": "heavy",
+    "general": "heavy",
+}
+
+
+def lane_capacities(orchestrator_cfg: dict[str, Any]) -> dict[str, int]:
+    """Return the configured ``orchestrator.lanes`` with invalid entries dropped."""
+    raw = orchestrator_cfg.get("lanes")
+    if not isinstance(raw, dict):
+        return {}
+    lanes: dict[str, int] = {}
+    for name, capacity in raw.items():
+        try:
+            value = int(capacity)
+        except (TypeError, ValueError):
+            continue
+        if str(name).strip() and value > 0:
+            lanes[str(name).strip()] = value
+    return lanes
+
+
+def lane_for_step(step: str, orchestrator_cfg: dict[str, Any]) -> Optional[str]:
+    """Return the lane *step* runs in, or None when it is not lane-limited."""
+    lanes = lane_capacities(orchestrator_cfg)
+    if not lanes:
+        return None
+    category = step_category(step)
+    overrides = orchestrator_cfg.get("lane_categories")
+    lane = (overrides or {}).get(category) if isinstance(overrides, dict) else None
+    lane = lane or DEFAULT_LANE_BY_CATEGORY.get(category, "heavy")
+    return lane if lane in lanes else None
+
+
+class _Lane:
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.active = 0
+        self.queued = 0
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+
+
+class ExecutionLanes:
+    """Counting slots per lane with live utilization and queue depth."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._lanes: dict[str, _Lane] = {}
+
+    def configure(self, capacities: dict[str, int]) -> None:
+        with self._cond:
+            for name, capacity in capacities.items():
+                lane = self._lanes.get(name)
+                if lane is None:
+                    self._lanes[name] = _Lane(capacity)
+                elif lane.capacity != capacity:
+                    lane.capacity = capacity
+                    self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, lane_name: Optional[str], cancelled: Optional[Callable[[], bool]] = None) -> Iterator[None]:
+        """Hold a slot of *lane_name*; raises :class:`SlotCancelled` if *cancelled* turns true first."""
+        if lane_name is None:
+            yield
+            return
+        started = time.monotonic()
+        with self._cond:
+            lane = self._lanes.setdefault(lane_name, _Lane(1))
+            lane.queued += 1
+            try:
+                while lane.active >= lane.capacity:
+                    if cancelled is not None and cancelled():
+                        raise SlotCancelled()
+                    self._cond.wait(timeout=1.0)
+            finally:
+                lane.queued -= 1
+            lane.active += 1
+            lane.acquired += 1
+            lane.total_wait_seconds += time.monotonic() - started
+        try:
+            yield
+        finally:
+            with self._cond:
+                lane.active -= 1
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._cond:
+            return {
+                name: {
+                    "capacity": lane.capacity,
+                    "active": lane.active,
+                    "queued": lane.queued,
+                    "utilization": round(lane.active / lane.capacity, 3) if lane.capacity else 0.0,
+                    "acquired": lane.acquired,
+                    "total_wait_seconds": round(lane.total_wait_seconds, 3),
+                }
+                for name, lane in sorted(self._lanes.items())
+            }
@@ -4,16 +4,21 @@ from __future__ import annotations
 
 import json
 import logging
-import tempfile
-from dataclasses import replace
+import re
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Any
 
-from ...pipelines.registry import PipelineRegistry
-from ...workers.config import get_workers_runtime_config, resolve_worker_for_step
+from ...pipelines.registry import project_registry
+from ...workers.cancellation import CancellationRegistry, cancellation_registry
+from ...workers.config import WorkerProviderSpec, get_workers_runtime_config, resolve_worker_for_step
 from ...workers.diagnostics import test_worker
+from ...workers.limits import ProviderLimiter, SlotCancelled, provider_limiter
 from ...workers.run import WorkerRunResult, run_worker
+from ...workers.sandbox import ResourceLimits, parse_resource_limits
 from ..domain.models import Task
+from ..events import hub
+from ..events.logs import LogStream
 from ..storage.container import Container
 from .worker_adapter import StepResult
 
@@ -32,6 +37,20 @@ _DEP_ANALYSIS_STEPS = {"analyze_deps"}
 _STEP_TIMEOUT_ALIASES = {"implement_fix": "implement"}
 _DEFAULT_STEP_TIMEOUT_SECONDS = 600
 
+# Provider/transport failures worth retrying.  Only the last few lines of
+# stderr are matched: that is where a worker CLI reports the error it died
+# of, while earlier lines may hold output of the tests or code the agent ran
+# (a failing pytest timeout or an HTTP test asserting 500 must not match).
+_TRANSIENT_ERROR_RE = re.compile(
+    r"rate.?limit|too many requests|\b429\b|overloaded|service unavailable|bad gateway|gateway time-?out"
+    r"|^\[runner\] Ollama (?:URL error|HTTP error: (?:429|50[0234])\b)"
+    r"|\bapi error: (?:429|5\d\d)\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+_TRANSIENT_ERROR_TAIL_LINES = 5
+# Exit statuses of processes killed by SIGKILL/SIGTERM (128 + signal).
+_SIGNAL_EXIT_CODES = {137, 143}
+
 # ---------------------------------------------------------------------------
 # Prompt layers
 # ---------------------------------------------------------------------------
@@ -155,7 +174,8 @@ def _format_project_commands(
     return "\n".join(parts)
 
 
-def _step_category(step: str) -> str:
+def step_category(step: str) -> str:
+    """Return the category of *step* that selects its prompt instructions and lane."""
     if step in _PLANNING_STEPS:
         return "planning"
     if step in _IMPL_STEPS:
@@ -266,7 +286,7 @@ def build_step_prompt(
     project_commands: dict[str, dict[str, str]] | None = None,
 ) -> str:
     """Build a prompt from Task fields with step-specific instructions."""
-    category = _step_category(step)
+    category = step_category(step)
     instruction = _CATEGORY_INSTRUCTIONS[category]
 
     # Special prompt for dependency analysis
@@ -435,11 +455,39 @@ def _extract_json(text: str) -> dict[str, Any] | None:
         return None
 
 
+@dataclass(frozen=True)
+class PreparedStep:
+    """A step resolved to a worker and prompt, ready to run locally or remotely."""
+
+    spec: WorkerProviderSpec
+    prompt: str
+    project_dir: Path
+    timeout_seconds: int
+    config: dict[str, Any]
+    resource_limits: ResourceLimits = ResourceLimits()
+
+
+def _is_transient_error(text: str) -> bool:
+    """Return True when the end of failure output reports a transient provider/network issue."""
+    tail = "\n".join(text.strip().splitlines()[-_TRANSIENT_ERROR_TAIL_LINES:])
+    return bool(tail) and _TRANSIENT_ERROR_RE.search(tail) is not None
+
+
 class LiveWorkerAdapter:
     """Worker adapter that dispatches to real Codex/Ollama providers."""
 
-    def __init__(self, container: Container) -> None:
+    def __init__(
+        self,
+        container: Container,
+        *,
+        limiter: ProviderLimiter | None = None,
+        cancellations: CancellationRegistry | None = None,
+        logs: LogStream | None = None,
+    ) -> None:
         self._container = container
+        self._limiter = limiter or provider_limiter
+        self._cancellations = cancellations or cancellation_registry
+        self._logs = logs or hub.logs
 
     @staticmethod
     def _coerce_timeout(value: Any, default: int = _DEFAULT_STEP_TIMEOUT_SECONDS) -> int:
@@ -460,7 +508,7 @@ class LiveWorkerAdapter:
                     return self._coerce_timeout(overrides.get(key))
 
         try:
-            template = PipelineRegistry().resolve_for_task_type(task.task_type)
+            template = project_registry(self._container.state_root).resolve_for_task_type(task.task_type)
         except Exception:
             return _DEFAULT_STEP_TIMEOUT_SECONDS
 
@@ -470,6 +518,18 @@ class LiveWorkerAdapter:
                 return step_timeouts[key]
         return _DEFAULT_STEP_TIMEOUT_SECONDS
 
+    def _resource_limits_for_step(self, task: Task, step: str, spec: WorkerProviderSpec) -> ResourceLimits:
+        """Provider resource limits, overridden by the step's ``config.resource_limits``."""
+        try:
+            template = project_registry(self._container.state_root).resolve_for_task_type(task.task_type)
+        except Exception:
+            return spec.resource_limits
+        for key in (step, _STEP_TIMEOUT_ALIASES.get(step)):
+            step_def = template.step_def(key) if key else None
+            if step_def is not None:
+                return spec.resource_limits.override(parse_resource_limits(step_def.config.get("resource_limits")))
+        return spec.resource_limits
+
     @staticmethod
     def _human_blocker_summary(issues: list[dict[str, str]]) -> str:
         count = len(issues)
@@ -480,6 +540,13 @@ class LiveWorkerAdapter:
         return f"Human intervention required ({count} {suffix}): {first}"
 
     def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+        prepared = self._prepare_step(task, step, attempt)
+        if isinstance(prepared, StepResult):
+            return prepared
+        return self._execute_local(task, step, prepared)
+
+    def _prepare_step(self, task: Task, step: str, attempt: int) -> PreparedStep | StepResult:
+        """Resolve the worker and build the prompt; a StepResult on failure."""
         # 1. Resolve worker
         try:
             cfg = self._container.config.load()
@@ -493,9 +560,6 @@ class LiveWorkerAdapter:
                 effective_model = task_model or default_model or str(spec.model or "").strip()
                 if effective_model and effective_model != (spec.model or ""):
                     spec = replace(spec, model=effective_model)
-            available, reason = test_worker(spec)
-            if not available:
-                return StepResult(status="error", summary=f"Worker not available: {reason}")
         except (ValueError, KeyError) as exc:
             return StepResult(status="error", summary=f"Cannot resolve worker: {exc}")
 
@@ -513,41 +577,110 @@ class LiveWorkerAdapter:
             is_codex=(spec.type in {"codex", "claude"}), project_languages=langs or None,
             project_commands=project_commands,
         )
+        return PreparedStep(
+            spec=spec,
+            prompt=prompt,
+            project_dir=project_dir,
+            timeout_seconds=self._timeout_for_step(task, step),
+            config=cfg,
+            resource_limits=self._resource_limits_for_step(task, step, spec),
+        )
 
-        # 3. Execute
-        run_dir = Path(tempfile.mkdtemp(dir=str(self._container.state_root)))
-        progress_path = run_dir / "progress.json"
-        timeout_seconds = self._timeout_for_step(task, step)
-        try:
-            result = run_worker(
-                spec=spec,
-                prompt=prompt,
-                project_dir=project_dir,
-                run_dir=run_dir,
-                timeout_seconds=timeout_seconds,
-                heartbeat_seconds=30,
-                heartbeat_grace_seconds=15,
-                progress_path=progress_path,
+    def _execute_local(self, task: Task, step: str, prepared: PreparedStep) -> StepResult:
+        spec = prepared.spec
+        available, reason = test_worker(spec)
+        if not available:
+            return StepResult(
+                status="error",
+                summary=f"Worker not available: {reason}",
+                retryable=_is_transient_error(reason),
             )
-        except Exception as exc:
-            return StepResult(status="error", summary=f"Worker execution failed: {exc}")
 
-        # 4. Map result
-        return self._map_result(result, spec, step)
+        # 3. Execute; the run dir is finalized on every way out, including a cancel while queued.
+        artifacts = self._container.artifacts
+        run_dir = artifacts.create_run_dir()
+        progress_path = run_dir / "progress.json"
+        logs_dir = run_dir.relative_to(self._container.state_root).as_posix()
+        on_output = self._logs.writer(
+            project_id=self._container.project_id,
+            task_id=task.id,
+            run_id=task.run_ids[-1] if task.run_ids else "",
+            step=step,
+        )
+        try:
+            try:
+                # Queue on the provider's concurrency/rate limits before launching.
+                with self._limiter.slot(spec.limit_keys(), cancelled=lambda: self._cancellations.is_cancelled(task.id)) as waited:
+                    if waited >= 1.0:
+                        logger.info("Step %s for task %s waited %.1fs for worker '%s'", step, task.id, waited, spec.name)
+                    if self._cancellations.is_cancelled(task.id):
+                        return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+                    with self._cancellations.scope(task.id) as on_spawn:
+                        result = run_worker(
+                            spec=spec,
+                            prompt=prepared.prompt,
+                            project_dir=prepared.project_dir,
+                            run_dir=run_dir,
+                            timeout_seconds=prepared.timeout_seconds,
+                            heartbeat_seconds=30,
+                            heartbeat_grace_seconds=15,
+                            progress_path=progress_path,
+                            on_spawn=on_spawn,
+                            resource_limits=prepared.resource_limits,
+                            cgroup_parent=(prepared.config.get("workers") or {}).get("cgroup_parent"),
+                            on_output=on_output,
+                        )
+            except SlotCancelled:
+                return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+            except Exception as exc:
+                return StepResult(
+                    status="error",
+                    summary=f"Worker execution failed: {exc}",
+                    retryable=isinstance(exc, OSError) or _is_transient_error(str(exc)),
+                    run_dir=logs_dir,
+                )
+            finally:
+                self._logs.flush(task.id)
+
+            # 4. Map result, then compress the logs it read
+            if self._cancellations.is_cancelled(task.id):
+                return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+            return replace(self._map_result(result, spec, step), run_dir=logs_dir)
+        finally:
+            artifacts.finalize(run_dir)
 
     def _map_result(self, result: WorkerRunResult, spec: Any, step: str) -> StepResult:
+        mapped = self._classify_result(result, spec, step)
+        if result.resource_usage:
+            mapped = replace(mapped, resource_usage=dict(result.resource_usage))
+        return mapped
+
+    def _classify_result(self, result: WorkerRunResult, spec: Any, step: str) -> StepResult:
         if result.human_blocking_issues:
             return StepResult(
                 status="human_blocked",
                 summary=self._human_blocker_summary(result.human_blocking_issues),
                 human_blocking_issues=result.human_blocking_issues,
             )
+        if result.limit_breach:
+            # Raising the limit is a config change; a retry would hit it again.
+            return StepResult(
+                status="error",
+                summary=f"Worker exceeded its {result.limit_breach} limit",
+                failure_reason=f"resource_limit:{result.limit_breach}",
+            )
         if result.no_heartbeat:
-            return StepResult(status="error", summary="Worker stalled (no heartbeat or output activity).")
+            return StepResult(
+                status="error",
+                summary="Worker stalled (no heartbeat or output activity).",
+                retryable=True,
+            )
         if result.timed_out:
+            # A step that exhausted its full time budget will most likely do so again.
             return StepResult(status="error", summary="Worker timed out")
         if result.exit_code != 0:
             summary = f"Worker exited with code {result.exit_code}"
+            err_text = ""
             # Try to include stderr info
             if result.stderr_path:
                 try:
@@ -556,10 +689,15 @@ class LiveWorkerAdapter:
                         summary = err_text[:500]
                 except Exception:
                     pass
-            return StepResult(status="error", summary=summary)
+            retryable = (
+                result.exit_code < 0
+                or result.exit_code in _SIGNAL_EXIT_CODES
+                or _is_transient_error(err_text)
+            )
+            return StepResult(status="error", summary=summary, retryable=retryable)
 
         # Dependency analysis: always parse response text (both codex and ollama)
-        category = _step_category(step)
+        category = step_category(step)
         if category == "dependency_analysis" and result.response_text:
             return self._parse_dep_analysis_output(result.response_text)
 
@@ -583,7 +721,7 @@ class LiveWorkerAdapter:
         if parsed is None:
             return StepResult(status="ok", summary=text[:500] if text else None)
 
-        category = _step_category(step)
+        category = step_category(step)
 
         if category == "review" or category == "scanning":
             findings = parsed.get("findings")
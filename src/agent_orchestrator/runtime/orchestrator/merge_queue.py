@@ -0,0 +1,196 @@
+"""Merge queue that integrates finished task branches into the run branch in batches.
+
+Finished tasks call :meth:`MergeQueue.merge` with their ``task-<id>``
+branch.  Requests queue up; whichever caller takes the merge lock drains up
+to ``orchestrator.merge_batch_size`` of them as one batch.  It can first
+linger ``merge_batch_wait_seconds`` for stragglers.
+
+A batch is merged speculatively in memory: each branch is folded onto the
+previous result with ``git merge-tree --write-tree`` and ``commit-tree``,
+so nothing touches the project checkout until the whole batch is known to
+merge.  When a batch conflicts it is bisected: the first half is integrated,
+then the second half on top, recursively.  Only the branches that actually
+conflict are isolated.  The surviving merges then land with one ref update
+and one two-tree ``read-tree -m -u`` of the project checkout.
+
+Outcomes per branch are ``"merged"``, the new run branch head sha when the
+branch conflicts (callers rebase onto it), or None when the in-memory path is
+unavailable (detached HEAD, git without ``merge-tree --write-tree``, local
+edits in the way) and the caller should fall back to ``git merge``.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+MERGED = "merged"
+
+
+class _Unavailable(Exception):
+    """``git merge-tree --write-tree`` cannot be used here."""
+
+
+class _MergeRequest:
+    def __init__(self, branch: str) -> None:
+        self.branch = branch
+        self.enqueued_at = time.monotonic()
+        self.done = threading.Event()
+        self.outcome: Optional[str] = None
+
+
+class MergeQueue:
+    def __init__(self, project_dir: Path, lock: threading.Lock) -> None:
+        self._project_dir = project_dir
+        self._lock = lock  # the orchestrator's merge lock: one batch at a time
+        self._pending_lock = threading.Lock()
+        self._pending: list[_MergeRequest] = []
+        self._batch_size = 8
+        self._batch_wait_seconds = 0.0
+        self._batches = 0
+        self._merged = 0
+        self._conflicts = 0
+        self._bisections = 0
+        self._last_batch_size = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._completed = 0
+
+    def configure(self, batch_size: int, batch_wait_seconds: float = 0.0) -> None:
+        self._batch_size = max(int(batch_size), 1)
+        self._batch_wait_seconds = max(float(batch_wait_seconds), 0.0)
+
+    def _git(self, *args: str) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(["git", *args], cwd=self._project_dir, capture_output=True, text=True)
+
+    # -- queue -----------------------------------------------------------
+
+    def merge(self, branch: str) -> Optional[str]:
+        """Queue *branch* and block until its batch has been integrated."""
+        request = _MergeRequest(branch)
+        with self._pending_lock:
+            self._pending.append(request)
+        while not request.done.is_set():
+            if not self._lock.acquire(timeout=0.05):
+                continue
+            try:
+                if not request.done.is_set():
+                    self._drain_batch()
+            finally:
+                self._lock.release()
+        return request.outcome
+
+    def _drain_batch(self) -> None:
+        if self._batch_wait_seconds:
+            with self._pending_lock:
+                short = len(self._pending) < self._batch_size
+            if short:
+                time.sleep(self._batch_wait_seconds)
+        with self._pending_lock:
+            batch = self._pending[: self._batch_size]
+            del self._pending[: self._batch_size]
+        if not batch:
+            return
+        try:
+            outcomes = self._integrate([request.branch for request in batch])
+        except Exception:
+            logger.exception("Merge queue batch failed")
+            outcomes = {}
+        now = time.monotonic()
+        self._batches += 1
+        self._last_batch_size = len(batch)
+        for request in batch:
+            request.outcome = outcomes.get(request.branch)
+            if request.outcome == MERGED:
+                self._merged += 1
+            elif request.outcome is not None:
+                self._conflicts += 1
+            latency = now - request.enqueued_at
+            self._completed += 1
+            self._latency_total += latency
+            self._latency_max = max(self._latency_max, latency)
+            request.done.set()
+
+    # -- speculative integration -----------------------------------------
+
+    def _integrate(self, branches: list[str]) -> dict[str, Optional[str]]:
+        target_ref = self._git("symbolic-ref", "-q", "HEAD").stdout.strip()
+        head = self._git("rev-parse", "HEAD").stdout.strip()
+        if not target_ref or not head:
+            return {}
+        merged: list[str] = []
+        conflicted: list[str] = []
+        try:
+            new_head = self._integrate_range(head, branches, merged, conflicted)
+        except _Unavailable:
+            return {}
+        if new_head != head:
+            # Touch only the paths that differ; this refuses (like ``git
+            # merge`` would) when one of them has local edits.
+            if self._git("read-tree", "-m", "-u", head, new_head).returncode != 0:
+                return {}
+            if self._git("update-ref", "-m", "merge queue", target_ref, new_head, head).returncode != 0:
+                self._git("read-tree", "-m", "-u", new_head, head)
+                return {}
+            logger.info("Merge queue integrated %s into %s", ", ".join(merged), target_ref)
+        outcomes: dict[str, Optional[str]] = {branch: MERGED for branch in merged}
+        outcomes.update({branch: new_head for branch in conflicted})
+        return outcomes
+
+    def _integrate_range(self, base: str, batch: list[str], merged: list[str], conflicted: list[str]) -> str:
+        """Merge *batch* onto *base*, bisecting on conflict; returns the new tip."""
+        tip = self._fold(base, batch)
+        if tip is not None:
+            merged.extend(batch)
+            return tip
+        if len(batch) == 1:
+            conflicted.extend(batch)
+            return base
+        self._bisections += 1
+        mid = len(batch) // 2
+        base = self._integrate_range(base, batch[:mid], merged, conflicted)
+        return self._integrate_range(base, batch[mid:], merged, conflicted)
+
+    def _fold(self, base: str, batch: list[str]) -> Optional[str]:
+        """Merge each branch of *batch* onto *base* in memory; None on any conflict."""
+        for branch in batch:
+            tip = self._git("rev-parse", branch).stdout.strip()
+            if not tip:
+                return None
+            if self._git("merge-base", "--is-ancestor", tip, base).returncode == 0:
+                continue  # nothing new on this branch
+            result = self._git("merge-tree", "--write-tree", "--no-messages", "--name-only", base, tip)
+            if result.returncode == 1:
+                return None
+            if result.returncode != 0:
+                raise _Unavailable(result.stderr.strip())
+            if self._git("merge-base", "--is-ancestor", base, tip).returncode == 0:
+                base = tip
+                continue
+            tree = result.stdout.splitlines()[0].strip()
+            commit = self._git("commit-tree", tree, "-p", base, "-p", tip, "-m", f"Merge branch '{branch}'")
+            if commit.returncode != 0:
+                raise _Unavailable(commit.stderr.strip())
+            base = commit.stdout.strip()
+        return base
+
+    def stats(self) -> dict[str, Any]:
+        with self._pending_lock:
+            depth = len(self._pending)
+        return {
+            "depth": depth,
+            "batch_size": self._batch_size,
+            "batches": self._batches,
+            "last_batch_size": self._last_batch_size,
+            "merged": self._merged,
+            "conflicts": self._conflicts,
+            "bisections": self._bisections,
+            "avg_latency_seconds": round(self._latency_total / self._completed, 3) if self._completed else 0.0,
+            "max_latency_seconds": round(self._latency_max, 3),
+        }
@@ -0,0 +1,133 @@
+"""Predicted touched files per task, used to keep likely-conflicting tasks apart.
+
+Two tasks that edit the same files in parallel both spend agent time, and
+then one ends in ``resolve_merge`` or blocked on ``merge_conflict``.  The
+orchestrator therefore keeps a *footprint* per task:
+
+* files named in the task description and in plan output (persisted as
+  ``metadata["predicted_files"]``),
+* for running tasks, the files currently changed in their worktree.
+
+When claiming, ready tasks whose footprint overlaps a running task's by at
+least ``orchestrator.overlap_threshold`` (default 0.5, measured against the
+smaller footprint) move behind non-conflicting work.  They are deferred, not
+excluded: if nothing else is runnable they still start.  Set
+``orchestrator.overlap_avoidance: false`` to turn this off.
+"""
+
+from __future__ import annotations
+
+import re
+import subprocess
+from pathlib import Path
+from typing import Any, Iterable
+
+from ..domain.models import Task
+
+# Path-like tokens whose last segment has an extension: ``src/app.py``,
+# ``./web/src/App.tsx``, ``README.md``.
+_FILE_TOKEN_RE = re.compile(r"(?<![\w./-])(?:\./)?((?:[\w.-]+/)*[\w-][\w.-]*\.[A-Za-z][A-Za-z0-9]{0,7})(?![\w/])")
+_BARE_FILE_RE = re.compile(r"^[\w-]{2,}\.[A-Za-z][A-Za-z0-9]{0,7}$")
+
+
+def overlap_enabled(orchestrator_cfg: dict[str, Any]) -> bool:
+    return orchestrator_cfg.get("overlap_avoidance", True) is not False
+
+
+def overlap_threshold(orchestrator_cfg: dict[str, Any]) -> float:
+    try:
+        return float(orchestrator_cfg.get("overlap_threshold", 0.5))
+    except (TypeError, ValueError):
+        return 0.5
+
+
+def files_from_text(text: str) -> list[str]:
+    """File paths mentioned in free-form text (descriptions, plans)."""
+    files: list[str] = []
+    for match in _FILE_TOKEN_RE.finditer(str(text or "")):
+        token = match.group(1)
+        if ".." in token.split("/"):
+            continue
+        # A bare name needs a real-looking stem so "e.g." or "v1.2" do not count.
+        if "/" not in token and not _BARE_FILE_RE.match(token):
+            continue
+        if token not in files:
+            files.append(token)
+    return files
+
+
+def changed_files(worktree_dir: Path) -> set[str]:
+    """Files modified, added or untracked in *worktree_dir*."""
+    result = subprocess.run(
+        ["git", "status", "--porcelain", "-z", "--untracked-files=all"],
+        cwd=worktree_dir,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return set()
+    files: set[str] = set()
+    entries = result.stdout.split("\0")
+    idx = 0
+    while idx < len(entries):
+        entry = entries[idx]
+        idx += 1
+        if len(entry) < 4:
+            continue
+        if entry[0] in "RC":
+            idx += 1  # skip the rename source
+        files.add(entry[3:])
+    return files
+
+
+def predicted_files(task: Task) -> set[str]:
+    metadata = task.metadata if isinstance(task.metadata, dict) else {}
+    files = {str(f) for f in metadata.get("predicted_files") or [] if f}
+    files.update(files_from_text(task.description))
+    for plan in metadata.get("plans") or []:
+        if isinstance(plan, dict):
+            files.update(files_from_text(str(plan.get("content") or "")))
+    return files
+
+
+def record_predicted_files(task: Task, files: Iterable[str]) -> bool:
+    """Merge *files* into ``metadata["predicted_files"]``; True when it grew."""
+    current = set(task.metadata.get("predicted_files") or [])
+    merged = current | {f for f in files if f}
+    if merged == current:
+        return False
+    task.metadata["predicted_files"] = sorted(merged)
+    return True
+
+
+def overlap_ratio(a: set[str], b: set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def defer_overlapping(
+    ordered: list[Task], running: dict[str, set[str]], threshold: float
+) -> tuple[list[Task], dict[str, tuple[str, list[str]]]]:
+    """Stable-partition *ordered* so candidates clashing with running work go last.
+
+    Returns the new order and, per deferred task id, the running task it
+    clashes with and the shared files.
+    """
+    clear: list[Task] = []
+    deferred: list[Task] = []
+    clashes: dict[str, tuple[str, list[str]]] = {}
+    for task in ordered:
+        footprint = predicted_files(task)
+        clash = None
+        for other_id, other_files in running.items():
+            ratio = overlap_ratio(footprint, other_files) if other_id != task.id else 0.0
+            if ratio > 0 and ratio >= threshold:
+                clash = (other_id, sorted(footprint & other_files))
+                break
+        if clash:
+            deferred.append(task)
+            clashes[task.id] = clash
+        else:
+            clear.append(task)
+    return clear + deferred, clashes
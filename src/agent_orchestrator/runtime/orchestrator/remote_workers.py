@@ -0,0 +1,503 @@
+"""Dispatch pipeline steps to worker agents running on other machines.
+
+A worker agent (``agent-orchestrator worker serve``, see
+``workers/agent.py``) registers with the server, advertising labels such as
+``linux`` or ``gpu`` and the provider types it can run (``codex``,
+``claude``, ``ollama``).  It then heartbeats and long-polls for leases over
+HTTP (``/api/worker-agents``).
+
+Steps listed under ``workers.remote.routing`` are leased to a live agent
+whose labels include the step's required labels and which can run the
+step's provider::
+
+    workers:
+      remote:
+        routing:
+          verify: [linux]      # step -> required agent labels
+          review: []           # any agent
+        fallback_local: true   # run locally when no matching agent is live
+        repo_url: ssh://orchestrator-host/srv/project   # where agents fetch task trees
+        token: <shared secret>   # required; agents send it as a bearer token
+
+Every ``/api/worker-agents`` route needs ``token``; without one configured
+remote agents are disabled.  Registering also hands the agent a private
+key, and its later calls must carry it, so an agent can only heartbeat,
+lease and complete as itself, and only complete leases it holds.
+
+Only read-only steps (planning, verification, review, scanning, reporting,
+task generation and dependency analysis) are leased.  Their output is a
+result, not file changes, so nothing has to be brought back to the task
+branch.  Other routed steps run locally.
+
+The server still resolves the worker and builds the prompt.  For git
+projects it also snapshots the task worktree, uncommitted and untracked
+files included, into ``refs/agent-orchestrator/leases/<name>`` and puts the
+ref and commit in the lease.  The agent fetches that commit from
+``repo_url`` into a temporary worktree of its checkout, so the step sees
+exactly the server's tree.  It runs ``run_worker`` there and posts back the
+exit status, response text and log tails, which land in a run directory of
+the artifact store like a local step's logs.  When an agent stops
+heartbeating, its leases fail as retryable so the orchestrator's normal
+retry policy takes over.  When a task is cancelled, its pending leases are
+withdrawn and running ones are listed in the agent's next heartbeat reply,
+and the agent kills their workers.
+"""
+
+from __future__ import annotations
+
+import hmac
+import logging
+import os
+import secrets
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from ...workers.cancellation import CancellationRegistry
+from ...workers.limits import ProviderLimiter, SlotCancelled
+from ...workers.run import WorkerRunResult
+from ..domain.models import Task, now_iso
+from ..storage.container import Container
+from .live_worker_adapter import LiveWorkerAdapter, PreparedStep, step_category
+from .worker_adapter import StepResult
+
+logger = logging.getLogger(__name__)
+
+# Spec fields an agent needs to rebuild a WorkerProviderSpec; limits stay server-side.
+_SPEC_FIELDS = ("name", "type", "command", "model", "reasoning_effort", "endpoint", "temperature", "num_ctx")
+# Step categories whose outcome is a result rather than file changes.
+_READ_ONLY_CATEGORIES = frozenset(
+    {"planning", "verification", "review", "scanning", "reporting", "task_generation", "dependency_analysis"}
+)
+_SNAPSHOT_REF_PREFIX = "refs/agent-orchestrator/leases/"
+_SNAPSHOT_IDENTITY = {
+    "GIT_AUTHOR_NAME": "agent-orchestrator",
+    "GIT_AUTHOR_EMAIL": "agent-orchestrator@localhost",
+    "GIT_COMMITTER_NAME": "agent-orchestrator",
+    "GIT_COMMITTER_EMAIL": "agent-orchestrator@localhost",
+}
+
+
+@dataclass
+class RemoteAgent:
+    id: str
+    name: str
+    labels: frozenset[str]
+    capabilities: frozenset[str]
+    capacity: int = 1
+    registered_at: str = field(default_factory=now_iso)
+    last_seen: float = field(default_factory=time.monotonic)
+    leases: set[str] = field(default_factory=set)
+    # Leases cancelled server-side that the agent has not reported back yet.
+    aborted: set[str] = field(default_factory=set)
+    completed: int = 0
+    # Per-agent secret issued at registration; never listed.
+    key: str = field(default_factory=lambda: secrets.token_urlsafe(24), repr=False)
+
+    def accepts(self, labels: frozenset[str], capability: str) -> bool:
+        """Whether this agent has all *labels* and can run *capability*."""
+        if not labels <= self.labels:
+            return False
+        return not self.capabilities or capability in self.capabilities
+
+    def to_dict(self) -> dict[str, Any]:
+        """Listing entry for ``GET /api/worker-agents`` (without the key)."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "labels": sorted(self.labels),
+            "capabilities": sorted(self.capabilities),
+            "capacity": self.capacity,
+            "registered_at": self.registered_at,
+            "seconds_since_heartbeat": round(time.monotonic() - self.last_seen, 1),
+            "active_leases": len(self.leases),
+            "completed": self.completed,
+        }
+
+
+@dataclass
+class _Lease:
+    id: str
+    payload: dict[str, Any]
+    labels: frozenset[str]
+    capability: str
+    agent_id: Optional[str] = None
+    result: Optional[dict[str, Any]] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class RemoteWorkerRegistry:
+    """Live worker agents and the step leases queued for them."""
+
+    def __init__(self, *, agent_timeout_seconds: float = 30.0) -> None:
+        self.agent_timeout_seconds = agent_timeout_seconds
+        self._cond = threading.Condition()
+        self._agents: dict[str, RemoteAgent] = {}
+        self._pending: list[_Lease] = []
+        self._leases: dict[str, _Lease] = {}
+
+    # -- agent side ------------------------------------------------------
+
+    def register(
+        self, name: str, labels: Iterable[str] = (), capabilities: Iterable[str] = (), capacity: int = 1
+    ) -> RemoteAgent:
+        """Add a live agent; its ``id`` and ``key`` identify it from then on."""
+        agent = RemoteAgent(
+            id=f"wa-{uuid.uuid4().hex[:10]}",
+            name=name,
+            labels=frozenset(str(label) for label in labels if label),
+            capabilities=frozenset(str(cap) for cap in capabilities if cap),
+            capacity=max(int(capacity), 1),
+        )
+        with self._cond:
+            self._agents[agent.id] = agent
+            self._cond.notify_all()
+        return agent
+
+    def authenticate(self, agent_id: str, key: str) -> Optional[bool]:
+        """Whether *key* is *agent_id*'s key; None when the agent is unknown."""
+        with self._cond:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return None
+            return hmac.compare_digest(agent.key.encode("utf-8"), key.encode("utf-8"))
+
+    def deregister(self, agent_id: str) -> bool:
+        """Drop *agent_id*, failing its leases as retryable; False if unknown."""
+        with self._cond:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return False
+            self._drop_agent(agent, "Remote worker agent deregistered")
+            return True
+
+    def heartbeat(self, agent_id: str) -> bool:
+        """Mark *agent_id* alive; False if it is unknown (and must re-register)."""
+        with self._cond:
+            agent = self._agents.get(agent_id)
+            if agent is None:
+                return False
+            agent.last_seen = time.monotonic()
+            return True
+
+    def leases_to_abort(self, agent_id: str) -> list[str]:
+        """Leases *agent_id* is running whose task was cancelled; sent with heartbeats."""
+        with self._cond:
+            agent = self._agents.get(agent_id)
+            return sorted(agent.aborted) if agent is not None else []
+
+    def lease(self, agent_id: str, wait_seconds: float = 0.0) -> Optional[dict[str, Any]]:
+        """Hand the oldest matching pending step to *agent_id*, waiting up to *wait_seconds*."""
+        deadline = time.monotonic() + max(wait_seconds, 0.0)
+        with self._cond:
+            while True:
+                agent = self._agents.get(agent_id)
+                if agent is None:
+                    raise KeyError(agent_id)
+                agent.last_seen = time.monotonic()
+                if len(agent.leases) < agent.capacity:
+                    for lease in self._pending:
+                        if agent.accepts(lease.labels, lease.capability):
+                            self._pending.remove(lease)
+                            lease.agent_id = agent.id
+                            agent.leases.add(lease.id)
+                            return {"lease_id": lease.id, **lease.payload}
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def complete(self, agent_id: str, lease_id: str, result: dict[str, Any]) -> bool:
+        """Record *result* for *lease_id*; False unless *agent_id* holds that lease."""
+        with self._cond:
+            lease = self._leases.get(lease_id)
+            agent = self._agents.get(agent_id)
+            if agent is None or lease_id not in agent.leases:
+                return False
+            if lease_id in agent.aborted:
+                # Already finished as cancelled; this frees the agent's slot.
+                agent.aborted.discard(lease_id)
+                agent.leases.discard(lease_id)
+                agent.last_seen = time.monotonic()
+                self._cond.notify_all()
+                return True
+            if lease is None or lease.agent_id != agent_id:
+                return False
+            agent.leases.discard(lease_id)
+            agent.completed += 1
+            agent.last_seen = time.monotonic()
+            self._finish(lease, dict(result))
+            return True
+
+    # -- orchestrator side -----------------------------------------------
+
+    def has_agent(self, labels: Iterable[str], capability: str) -> bool:
+        """Whether a live agent could take a step needing *labels* and *capability*."""
+        wanted = frozenset(labels)
+        with self._cond:
+            self._reap()
+            return any(agent.accepts(wanted, capability) for agent in self._agents.values())
+
+    def submit(self, payload: dict[str, Any], labels: Iterable[str], capability: str) -> _Lease:
+        """Queue a step for the first matching agent to lease."""
+        lease = _Lease(id=f"lease-{uuid.uuid4().hex[:12]}", payload=payload, labels=frozenset(labels), capability=capability)
+        with self._cond:
+            self._leases[lease.id] = lease
+            self._pending.append(lease)
+            self._cond.notify_all()
+        return lease
+
+    def wait(
+        self, lease: _Lease, timeout: float, cancelled: Optional[Callable[[], bool]] = None
+    ) -> Optional[dict[str, Any]]:
+        """Block until *lease* completes or its agent is lost; None on timeout.
+
+        When *cancelled* turns true the lease is withdrawn, or flagged for its
+        agent to abort on the next heartbeat, and ``{"cancelled": True}`` is
+        returned.
+        """
+        deadline = time.monotonic() + timeout
+        while not lease.done.wait(min(1.0, max(deadline - time.monotonic(), 0.0))):
+            with self._cond:
+                self._reap()
+                if lease.done.is_set():
+                    break
+                if cancelled is not None and cancelled():
+                    agent = self._agents.get(lease.agent_id or "")
+                    if agent is not None:
+                        agent.aborted.add(lease.id)
+                    elif lease in self._pending:
+                        self._pending.remove(lease)
+                    self._finish(lease, {"cancelled": True})
+                    break
+                if time.monotonic() >= deadline:
+                    self._withdraw(lease)
+                    return None
+        return lease.result
+
+    def snapshot(self) -> dict[str, Any]:
+        """Live agents plus pending and leased step counts."""
+        with self._cond:
+            self._reap()
+            return {
+                "agents": [agent.to_dict() for agent in self._agents.values()],
+                "pending": len(self._pending),
+                "leased": sum(len(agent.leases) for agent in self._agents.values()),
+            }
+
+    # -- internals (hold ``_cond``) --------------------------------------
+
+    def _reap(self) -> None:
+        now = time.monotonic()
+        for agent in list(self._agents.values()):
+            if now - agent.last_seen > self.agent_timeout_seconds:
+                self._drop_agent(agent, f"Remote worker agent '{agent.name}' stopped heartbeating")
+
+    def _drop_agent(self, agent: RemoteAgent, reason: str) -> None:
+        self._agents.pop(agent.id, None)
+        for lease_id in list(agent.leases):
+            lease = self._leases.get(lease_id)
+            if lease is not None:
+                self._finish(lease, {"error": reason, "retryable": True})
+        agent.leases.clear()
+        agent.aborted.clear()
+
+    def _finish(self, lease: _Lease, result: dict[str, Any]) -> None:
+        lease.result = result
+        self._leases.pop(lease.id, None)
+        lease.done.set()
+
+    def _withdraw(self, lease: _Lease) -> None:
+        if lease in self._pending:
+            self._pending.remove(lease)
+        agent = self._agents.get(lease.agent_id or "")
+        if agent is not None:
+            agent.leases.discard(lease.id)
+        self._leases.pop(lease.id, None)
+
+
+def _remote_config(config: dict[str, Any]) -> dict[str, Any]:
+    workers_cfg = config.get("workers") or {}
+    remote_cfg = workers_cfg.get("remote") if isinstance(workers_cfg, dict) else None
+    return remote_cfg if isinstance(remote_cfg, dict) else {}
+
+
+def agent_token(config: dict[str, Any]) -> Optional[str]:
+    """The shared ``workers.remote.token`` agents must present, or None (agents disabled)."""
+    token = str(_remote_config(config).get("token") or "").strip()
+    return token or None
+
+
+def remote_route(config: dict[str, Any], step: str) -> Optional[tuple[list[str], bool]]:
+    """Required labels and ``fallback_local`` for *step*, or None when it runs locally."""
+    remote_cfg = _remote_config(config)
+    routing = remote_cfg.get("routing") or {}
+    if not isinstance(routing, dict) or step not in routing:
+        return None
+    if step_category(step) not in _READ_ONLY_CATEGORIES:
+        logger.warning("Step '%s' changes files and cannot run on a remote agent; running it locally", step)
+        return None
+    raw = routing.get(step)
+    labels = [str(raw)] if isinstance(raw, str) else [str(label) for label in raw or []]
+    return labels, remote_cfg.get("fallback_local", True) is not False
+
+
+def snapshot_tree(project_dir: Path, name: str, *, exclude: Optional[Path] = None) -> Optional[dict[str, str]]:
+    """Commit the working tree of *project_dir* to a lease ref; None outside git.
+
+    Uncommitted and untracked (but not ignored) files are included, except
+    under *exclude* (the state root).  A temporary index is used, so the
+    worktree's own index, HEAD and branch are left alone.
+    """
+    if not (project_dir / ".git").exists():
+        return None
+
+    def _git(*args: str, env: Optional[dict[str, str]] = None) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=project_dir, check=True, capture_output=True, text=True, env=env
+        ).stdout.strip()
+
+    head = _git("rev-parse", "HEAD")
+    with tempfile.TemporaryDirectory(prefix="lease-index-") as tmp:
+        env = {**os.environ, **_SNAPSHOT_IDENTITY, "GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        _git("read-tree", head, env=env)
+        pathspec = ["."]
+        if exclude is not None and exclude.resolve().is_relative_to(project_dir.resolve()):
+            pathspec.append(f":(exclude){exclude.resolve().relative_to(project_dir.resolve()).as_posix()}")
+        _git("add", "-A", "--", *pathspec, env=env)
+        tree = _git("write-tree", env=env)
+        commit = _git("commit-tree", tree, "-p", head, "-m", f"Lease snapshot {name}", env=env)
+    ref = _SNAPSHOT_REF_PREFIX + name
+    _git("update-ref", ref, commit)
+    return {"ref": ref, "commit": commit, "base": head, "branch": _git("rev-parse", "--abbrev-ref", "HEAD")}
+
+
+def _drop_snapshot(project_dir: Path, snapshot: dict[str, str]) -> None:
+    subprocess.run(
+        ["git", "update-ref", "-d", snapshot["ref"]], cwd=project_dir, capture_output=True, text=True
+    )
+
+
+class RemoteWorkerAdapter(LiveWorkerAdapter):
+    """Live adapter that leases routed steps to remote worker agents."""
+
+    def __init__(
+        self,
+        container: Container,
+        registry: RemoteWorkerRegistry,
+        *,
+        limiter: ProviderLimiter | None = None,
+        cancellations: CancellationRegistry | None = None,
+    ) -> None:
+        super().__init__(container, limiter=limiter, cancellations=cancellations)
+        self._registry = registry
+
+    def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+        """Run *step* on a matching remote agent when routed there, else locally."""
+        prepared = self._prepare_step(task, step, attempt)
+        if isinstance(prepared, StepResult):
+            return prepared
+        route = remote_route(prepared.config, step)
+        if route is None:
+            return self._execute_local(task, step, prepared)
+        labels, fallback_local = route
+        if fallback_local and not self._registry.has_agent(labels, prepared.spec.type):
+            return self._execute_local(task, step, prepared)
+        return self._execute_remote(task, step, attempt, prepared, labels)
+
+    def _execute_remote(
+        self, task: Task, step: str, attempt: int, prepared: PreparedStep, labels: list[str]
+    ) -> StepResult:
+        spec = prepared.spec
+        artifacts = self._container.artifacts
+        run_dir = artifacts.create_run_dir()
+        logs_dir = run_dir.relative_to(self._container.state_root).as_posix()
+        snapshot: Optional[dict[str, str]] = None
+        try:
+            # Remote runs count against the same provider limits as local ones.
+            with self._limiter.slot(spec.limit_keys(), cancelled=lambda: self._cancellations.is_cancelled(task.id)):
+                if self._cancellations.is_cancelled(task.id):
+                    return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+                try:
+                    snapshot = snapshot_tree(
+                        prepared.project_dir,
+                        f"{task.id}-{uuid.uuid4().hex[:8]}",
+                        exclude=self._container.state_root,
+                    )
+                except subprocess.CalledProcessError as exc:
+                    return StepResult(
+                        status="error",
+                        summary=f"Could not snapshot the task tree for a remote worker: {exc.stderr or exc}",
+                        run_dir=logs_dir,
+                    )
+                payload: dict[str, Any] = {
+                    "project_id": self._container.project_id,
+                    "task_id": task.id,
+                    "step": step,
+                    "attempt": attempt,
+                    "spec": {key: value for key, value in asdict(spec).items() if key in _SPEC_FIELDS},
+                    "prompt": prepared.prompt,
+                    "timeout_seconds": prepared.timeout_seconds,
+                    "resource_limits": prepared.resource_limits.to_dict(),
+                    "worktree_dir": str(prepared.project_dir),
+                }
+                if snapshot is not None:
+                    payload["git"] = {**snapshot, "url": _remote_config(prepared.config).get("repo_url")}
+                lease = self._registry.submit(payload, labels, spec.type)
+                # The agent enforces the step timeout; allow for queueing and upload on top.
+                wait_seconds = prepared.timeout_seconds + self._registry.agent_timeout_seconds + 60
+                outcome = self._registry.wait(
+                    lease, wait_seconds, cancelled=lambda: self._cancellations.is_cancelled(task.id)
+                )
+            if outcome is None:
+                return StepResult(
+                    status="error",
+                    summary="No remote worker agent completed the step in time",
+                    retryable=True,
+                    run_dir=logs_dir,
+                )
+            if outcome.get("cancelled"):
+                return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+            if outcome.get("error"):
+                return StepResult(
+                    status="error",
+                    summary=f"Remote worker failed: {outcome['error']}",
+                    retryable=bool(outcome.get("retryable", True)),
+                    run_dir=logs_dir,
+                )
+
+            # Materialize the returned logs so result mapping reads them like a local run.
+            prompt_path = run_dir / "prompt.txt"
+            stdout_path = run_dir / "stdout.log"
+            stderr_path = run_dir / "stderr.log"
+            prompt_path.write_text(prepared.prompt, encoding="utf-8")
+            stdout_path.write_text(str(outcome.get("stdout_tail") or ""), encoding="utf-8")
+            stderr_path.write_text(str(outcome.get("stderr_tail") or ""), encoding="utf-8")
+            result = WorkerRunResult(
+                provider=f"{spec.name}@{outcome.get('agent') or 'remote'}",
+                prompt_path=str(prompt_path),
+                stdout_path=str(stdout_path),
+                stderr_path=str(stderr_path),
+                start_time=str(outcome.get("start_time") or now_iso()),
+                end_time=str(outcome.get("end_time") or now_iso()),
+                runtime_seconds=int(outcome.get("runtime_seconds") or 0),
+                exit_code=int(outcome.get("exit_code") or 0),
+                timed_out=bool(outcome.get("timed_out")),
+                no_heartbeat=bool(outcome.get("no_heartbeat")),
+                response_text=str(outcome.get("response_text") or ""),
+                human_blocking_issues=list(outcome.get("human_blocking_issues") or []),
+                resource_usage=dict(outcome.get("resource_usage") or {}),
+                limit_breach=outcome.get("limit_breach") or None,
+            )
+            return replace(self._map_result(result, spec, step), run_dir=logs_dir)
+        except SlotCancelled:
+            return StepResult(status="cancelled", summary="Task cancelled", run_dir=logs_dir)
+        finally:
+            if snapshot is not None:
+                _drop_snapshot(prepared.project_dir, snapshot)
+            artifacts.finalize(run_dir)
@@ -0,0 +1,226 @@
+"""Scheduling policies that decide which runnable task is claimed next.
+
+A policy orders the runnable tasks; the task repository claims the first.
+``priority`` reproduces the historical order (priority, retry count, age).
+``critical_path`` ranks tasks that unblock the most remaining work first and
+boosts the priority of tasks that have waited too long so nothing starves.
+
+Select a policy with ``orchestrator.scheduling_policy`` and tune aging with
+``orchestrator.scheduling_aging_seconds`` (one priority level per interval).
+
+Urgent work (``orchestrator.urgent_priorities`` / ``urgent_task_types``,
+P0 and ``hotfix`` by default) may use ``orchestrator.reserved_slots`` that
+other tasks never occupy, and with ``orchestrator.preemption`` enabled it
+can ask running lower-priority tasks to park at their next step boundary.
+"""
+
+from __future__ import annotations
+
+import heapq
+from datetime import datetime, timezone
+from typing import Any, Optional, Protocol
+
+from ..domain.models import Task
+
+_TERMINAL = {"done", "cancelled"}
+_DEFAULT_AGING_SECONDS = 3600.0
+
+
+def _priority_rank(priority: str) -> int:
+    return {"P0": 0, "P1": 1, "P2": 2, "P3": 3}.get(priority, 99)
+
+
+def _parse_ts(value: str) -> Optional[datetime]:
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+class SchedulingPolicy(Protocol):
+    name: str
+
+    def order(self, runnable: list[Task], tasks: list[Task], *, now: Optional[datetime] = None) -> list[Task]:
+        """Return *runnable* sorted best-first; *tasks* is the whole board."""
+        ...
+
+
+class PriorityPolicy:
+    """Order by priority, then fewest retries, then oldest."""
+
+    name = "priority"
+
+    def order(self, runnable: list[Task], tasks: list[Task], *, now: Optional[datetime] = None) -> list[Task]:
+        return sorted(runnable, key=lambda t: (_priority_rank(t.priority), t.retry_count, t.created_at))
+
+
+class CriticalPathPolicy:
+    """Prefer tasks on the longest remaining dependency chain, with aging.
+
+    Tasks are ordered by effective priority, then by the length of the
+    longest chain of unfinished dependents (``blocked_by`` reversed), then by
+    the number of unfinished transitive dependents.  Every
+    ``aging_seconds`` a task has existed lowers its effective priority rank
+    by one level, down to P0.
+    """
+
+    name = "critical_path"
+
+    def __init__(self, *, aging_seconds: float = _DEFAULT_AGING_SECONDS) -> None:
+        self.aging_seconds = max(float(aging_seconds), 0.0)
+
+    def order(self, runnable: list[Task], tasks: list[Task], *, now: Optional[datetime] = None) -> list[Task]:
+        now = now or datetime.now(timezone.utc)
+        path_len, downstream = dependency_weights(tasks)
+
+        def _key(task: Task) -> tuple[Any, ...]:
+            return (
+                self._effective_rank(task, now),
+                -path_len.get(task.id, 1),
+                -downstream.get(task.id, 0),
+                task.retry_count,
+                task.created_at,
+            )
+
+        return sorted(runnable, key=_key)
+
+    def _effective_rank(self, task: Task, now: datetime) -> int:
+        rank = _priority_rank(task.priority)
+        if not self.aging_seconds:
+            return rank
+        created = _parse_ts(task.created_at)
+        if created is None:
+            return rank
+        levels = int(max((now - created).total_seconds(), 0.0) // self.aging_seconds)
+        return max(rank - levels, 0)
+
+
+def dependency_weights(tasks: list[Task]) -> tuple[dict[str, int], dict[str, int]]:
+    """Return (critical-path length, transitive dependent count) per open task.
+
+    Only unfinished tasks count.  The path length includes the task itself,
+    so a leaf has length 1.  Cycles are tolerated: a back edge is ignored.
+    """
+    open_ids = {t.id for t in tasks if t.status not in _TERMINAL}
+    dependents: dict[str, list[str]] = {task_id: [] for task_id in open_ids}
+    for task in tasks:
+        if task.id not in open_ids:
+            continue
+        for dep_id in task.blocked_by:
+            if dep_id in open_ids and dep_id != task.id:
+                dependents[dep_id].append(task.id)
+
+    path_len: dict[str, int] = {}
+    reach: dict[str, set[str]] = {}
+    visiting: set[str] = set()
+
+    def _visit(task_id: str) -> None:
+        # Iterative post-order DFS: deep PRD-imported chains must not hit the recursion limit.
+        stack: list[tuple[str, int]] = [(task_id, 0)]
+        visiting.add(task_id)
+        while stack:
+            node, idx = stack[-1]
+            children = dependents[node]
+            if idx < len(children):
+                stack[-1] = (node, idx + 1)
+                child = children[idx]
+                if child not in path_len and child not in visiting:
+                    visiting.add(child)
+                    stack.append((child, 0))
+                continue
+            stack.pop()
+            visiting.discard(node)
+            done = [c for c in children if c in path_len]
+            path_len[node] = 1 + max((path_len[c] for c in done), default=0)
+            below: set[str] = set()
+            for child in done:
+                below.add(child)
+                below |= reach[child]
+            reach[node] = below
+
+    for task_id in open_ids:
+        if task_id not in path_len:
+            _visit(task_id)
+    return path_len, {task_id: len(below) for task_id, below in reach.items()}
+
+
+def is_urgent(task: Task, orchestrator_cfg: dict[str, Any]) -> bool:
+    """Return True when *task* belongs to a class that may use reserved slots."""
+    priorities = orchestrator_cfg.get("urgent_priorities", ["P0"]) or []
+    task_types = orchestrator_cfg.get("urgent_task_types", ["hotfix"]) or []
+    return task.priority in set(priorities) or task.task_type in set(task_types)
+
+
+def pick_preemption_victims(running: list[Task], count: int, orchestrator_cfg: dict[str, Any]) -> list[Task]:
+    """Choose up to *count* non-urgent running tasks to park, lowest priority and newest first."""
+    if count <= 0:
+        return []
+    candidates = [t for t in running if not is_urgent(t, orchestrator_cfg)]
+    candidates.sort(key=lambda t: (_priority_rank(t.priority), t.created_at), reverse=True)
+    return candidates[:count]
+
+
+_POLICIES = {PriorityPolicy.name: PriorityPolicy, CriticalPathPolicy.name: CriticalPathPolicy}
+
+
+def policy_from_config(orchestrator_cfg: dict[str, Any]) -> SchedulingPolicy:
+    """Build the policy named by ``orchestrator.scheduling_policy`` (default ``priority``)."""
+    name = str(orchestrator_cfg.get("scheduling_policy") or PriorityPolicy.name).strip().lower()
+    if name == CriticalPathPolicy.name:
+        aging = orchestrator_cfg.get("scheduling_aging_seconds", _DEFAULT_AGING_SECONDS)
+        try:
+            return CriticalPathPolicy(aging_seconds=float(aging))
+        except (TypeError, ValueError):
+            return CriticalPathPolicy()
+    policy: type[SchedulingPolicy] = _POLICIES.get(name, PriorityPolicy)
+    return policy()
+
+
+def simulate_makespan(
+    tasks: list[Task],
+    durations: dict[str, float],
+    *,
+    workers: int,
+    policy: SchedulingPolicy,
+) -> float:
+    """Return the simulated time to finish *tasks* on *workers* slots.
+
+    A discrete-event simulation of the claim loop: whenever a slot is free
+    the policy picks among tasks whose blockers are all finished.  Used to
+    benchmark policies against generated DAGs; *tasks* are not mutated.
+    """
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    board = {t.id: Task.from_dict(t.to_dict()) for t in tasks}
+    for task in board.values():
+        if task.status not in _TERMINAL:
+            task.status = "ready"
+    created = [ts for ts in (_parse_ts(t.created_at) for t in board.values()) if ts]
+    start = min(created) if created else datetime.now(timezone.utc)
+
+    clock = 0.0
+    running: list[tuple[float, str]] = []
+    pending = sum(1 for t in board.values() if t.status == "ready")
+    while pending or running:
+        runnable = [
+            t
+            for t in board.values()
+            if t.status == "ready" and all(board[d].status in _TERMINAL for d in t.blocked_by if d in board)
+        ]
+        if runnable and len(running) < workers:
+            now = datetime.fromtimestamp(start.timestamp() + clock, tz=timezone.utc)
+            ordered = policy.order(runnable, list(board.values()), now=now)
+            for task in ordered[: workers - len(running)]:
+                task.status = "in_progress"
+                pending -= 1
+                heapq.heappush(running, (clock + float(durations.get(task.id, 1.0)), task.id))
+            continue
+        if not running:
+            # Remaining tasks are blocked on something outside the board (or a cycle).
+            break
+        clock, finished_id = heapq.heappop(running)
+        board[finished_id].status = "done"
+        while running and running[0][0] == clock:
+            board[heapq.heappop(running)[1]].status = "done"
+    return clock
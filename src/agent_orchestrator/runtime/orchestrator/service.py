@@ -1,22 +1,50 @@
 from __future__ import annotations
 
+import copy
 import logging
+import random
 import subprocess
 import threading
 import time
-from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from ...collaboration.modes import should_gate
-from ...pipelines.registry import PipelineRegistry
+from ...pipelines.conditions import ConditionError, evaluate_condition
+from ...pipelines.registry import PipelineTemplate, StepDef, project_registry
+from ...workers.cancellation import cancellation_registry
+from ...workers.limits import SlotCancelled
 from ..domain.models import ReviewCycle, ReviewFinding, RunRecord, Task, now_iso
 from ..events.bus import EventBus
+from ..storage.artifacts import ArtifactJanitor, retention_from_config
 from ..storage.container import Container
+from ..storage.interfaces import TaskOrder
+from .dependency_analysis import DebouncedWorker, DependencyCache, task_fingerprint
+from .lanes import ExecutionLanes, lane_capacities, lane_for_step
+from .merge_queue import MERGED, MergeQueue
+from .overlap import (
+    changed_files,
+    defer_overlapping,
+    overlap_enabled,
+    overlap_threshold,
+    predicted_files,
+    record_predicted_files,
+)
+from .scheduling import is_urgent, pick_preemption_victims, policy_from_config
+from .similarity import TfidfIndex, cluster_pairs
+from .sparse import create_sparse_worktree, dirs_outside_cone, sparse_enabled, sparse_hints, widen_sparse_checkout
 from .worker_adapter import DefaultWorkerAdapter, StepResult, WorkerAdapter
+from .worktree_pool import WorktreePool
+
+if TYPE_CHECKING:
+    from .supervisor import ProjectSupervisor
 
 logger = logging.getLogger(__name__)
 
+# Steps that inherit the retry policy of another template step.
+_STEP_RETRY_ALIASES = {"implement_fix": "implement"}
+
 
 def _has_cycle(adj: dict[str, list[str]], from_id: str, to_id: str) -> bool:
     """Return True if adding an edge from_id→to_id would create a cycle.
@@ -36,6 +64,66 @@ def _has_cycle(adj: dict[str, list[str]], from_id: str, to_id: str) -> bool:
     return False
 
 
+def _task_capacity(orchestrator_cfg: dict[str, Any]) -> int:
+    """Tasks that may be in flight: ``concurrency``, or the sum of lane capacities if larger."""
+    concurrency = int(orchestrator_cfg.get("concurrency", 2) or 2)
+    return max(concurrency, sum(lane_capacities(orchestrator_cfg).values()))
+
+
+def _merge_metadata(task: Task, baseline: dict[str, Any], changed: dict[str, Any]) -> None:
+    """Copy into *task* the metadata keys a step's copy set or dropped relative to *baseline*."""
+    for key, value in changed.items():
+        if key not in baseline or baseline[key] != value:
+            task.metadata[key] = value
+    for key in baseline:
+        if key not in changed:
+            task.metadata.pop(key, None)
+
+
+def _diff_stats(cwd: Path) -> dict[str, Any]:
+    """Summarize uncommitted changes (tracked and untracked) in *cwd*.
+
+    Returns an empty dict when *cwd* is not a git checkout so conditions that
+    reference ``diff`` fail open instead of skipping steps.
+    """
+    try:
+        numstat = subprocess.run(
+            ["git", "diff", "--numstat", "HEAD", "--", ".", ":(exclude).agent_orchestrator"],
+            cwd=cwd, check=True, capture_output=True, text=True,
+        ).stdout
+        untracked = subprocess.run(
+            ["git", "ls-files", "--others", "--exclude-standard", "--", ".", ":(exclude).agent_orchestrator"],
+            cwd=cwd, check=True, capture_output=True, text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return {}
+    added = removed = 0
+    files: list[str] = []
+    for line in numstat.splitlines():
+        parts = line.split("\t", 2)
+        if len(parts) != 3:
+            continue
+        # Binary files report "-" for both counts.
+        added += int(parts[0]) if parts[0].isdigit() else 0
+        removed += int(parts[1]) if parts[1].isdigit() else 0
+        files.append(parts[2])
+    for name in untracked.splitlines():
+        if not name:
+            continue
+        files.append(name)
+        try:
+            added += len((cwd / name).read_text(errors="replace").splitlines())
+        except OSError:
+            continue
+    return {
+        "files": files,
+        "files_changed": len(files),
+        "lines_added": added,
+        "lines_removed": removed,
+        "lines_changed": added + removed,
+    }
+
+
 class OrchestratorService:
     _GATE_MAPPING: dict[str, str] = {
         "plan": "before_plan",
@@ -44,6 +132,10 @@ class OrchestratorService:
         "commit": "before_commit",
     }
     _HUMAN_INTERVENTION_GATE = "human_intervention"
+    # A rebased branch can still conflict if the run branch moved meanwhile.
+    _MERGE_REBASE_ATTEMPTS = 3
+    # Upper bound on conflicting commits resolved within one rebase.
+    _MERGE_REBASE_MAX_STOPS = 20
 
     def __init__(
         self,
@@ -51,41 +143,86 @@ class OrchestratorService:
         bus: EventBus,
         *,
         worker_adapter: WorkerAdapter | None = None,
+        supervisor: ProjectSupervisor | None = None,
     ) -> None:
         self.container = container
         self.bus = bus
         self.worker_adapter = worker_adapter or DefaultWorkerAdapter()
+        self._supervisor = supervisor
+        self._supervised = False
         self._lock = threading.RLock()
         self._thread: Optional[threading.Thread] = None
         self._stop = threading.Event()
         self._drain = False
         self._run_branch: Optional[str] = None
         self._pool: ThreadPoolExecutor | None = None
-        self._futures: dict[str, Future] = {}
+        self._step_pool: ThreadPoolExecutor | None = None
+        self._futures: dict[str, Future[None]] = {}
         self._futures_lock = threading.Lock()
+        self._parallel_steps = 0
+        self._preempt_requests: set[str] = set()
+        self._lanes = ExecutionLanes()
+        self._worktree_pool: WorktreePool | None = None
         self._merge_lock = threading.Lock()
+        self._merge_queue = MergeQueue(container.project_dir, self._merge_lock)
+        self._conflicts_avoided = 0
+        self._deps_cache = DependencyCache()
+        self._deps_stats = {"batches": 0, "failed_batches": 0, "similar_pairs": 0, "prefiltered": 0}
+        self._deps_worker = DebouncedWorker(self._maybe_analyze_dependencies, name="dependency-analysis")
         self._branch_lock = threading.Lock()
+        self._artifact_janitor = ArtifactJanitor(
+            container.artifacts, lambda: retention_from_config(self.container.config.load())
+        )
 
     def _get_pool(self) -> ThreadPoolExecutor:
         if self._pool is None:
             cfg = self.container.config.load()
-            max_workers = int(dict(cfg.get("orchestrator") or {}).get("concurrency", 2) or 2)
+            max_workers = _task_capacity(dict(cfg.get("orchestrator") or {}))
             self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchestrator-task")
         return self._pool
 
+    def _get_step_pool(self) -> ThreadPoolExecutor:
+        if self._step_pool is None:
+            cfg = self.container.config.load()
+            max_workers = _task_capacity(dict(cfg.get("orchestrator") or {}))
+            self._step_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchestrator-step")
+        return self._step_pool
+
     def status(self) -> dict[str, Any]:
         cfg = self.container.config.load()
         orchestrator_cfg = dict(cfg.get("orchestrator") or {})
         tasks = self.container.tasks.list()
         queue_depth = len([task for task in tasks if task.status == "ready"])
         in_progress = len([task for task in tasks if task.status == "in_progress"])
+        self._lanes.configure(lane_capacities(orchestrator_cfg))
         with self._futures_lock:
             active_workers = len(self._futures)
+            parallel_steps = self._parallel_steps
+            preempting = len(self._preempt_requests)
         return {
             "status": orchestrator_cfg.get("status", "running"),
             "queue_depth": queue_depth,
             "in_progress": in_progress,
             "active_workers": active_workers,
+            "parallel_steps": parallel_steps,
+            "scheduling_policy": policy_from_config(orchestrator_cfg).name,
+            "reserved_slots": int(orchestrator_cfg.get("reserved_slots", 0) or 0),
+            "preempting": preempting,
+            "lanes": self._lanes.snapshot(),
+            "worktree_pool": self._worktree_pool.stats() if self._worktree_pool else {"enabled": False},
+            "merge_queue": self._merge_queue.stats(),
+            "dependency_analysis": {
+                **self._deps_worker.stats(),
+                "cache_entries": len(self._deps_cache),
+                "cache_hits": self._deps_cache.hits,
+                **self._deps_stats,
+            },
+            "overlap": {
+                "enabled": overlap_enabled(orchestrator_cfg),
+                "threshold": overlap_threshold(orchestrator_cfg),
+                "conflicts_avoided": self._conflicts_avoided,
+            },
+            "supervisor": self._supervisor.stats() if self._supervisor else None,
             "draining": self._drain,
             "run_branch": self._run_branch,
         }
@@ -112,18 +249,29 @@ class OrchestratorService:
 
     def ensure_worker(self) -> None:
         with self._lock:
-            if self._thread and self._thread.is_alive():
+            if self._supervised or (self._thread and self._thread.is_alive()):
                 return
             self._recover_in_progress_tasks()
             self._cleanup_orphaned_worktrees()
+            self._artifact_janitor.start()
             self._stop.clear()
+            if self._supervisor is not None:
+                # The supervisor's thread schedules this project; see supervisor.py.
+                self._supervised = True
+                self._supervisor.register(self)
+                self._supervisor.start()
+                return
             self._thread = threading.Thread(target=self._loop, daemon=True, name="orchestrator")
             self._thread.start()
 
     def shutdown(self, *, timeout: float = 10.0) -> None:
+        self._artifact_janitor.stop()
         with self._lock:
             self._stop.set()
             thread = self._thread
+            if self._supervised and self._supervisor is not None:
+                self._supervisor.unregister(self)
+                self._supervised = False
 
         if thread and thread.is_alive():
             thread.join(timeout=max(timeout, 0.0))
@@ -137,6 +285,10 @@ class OrchestratorService:
         if pool is not None:
             pool.shutdown(wait=False, cancel_futures=False)
             self._pool = None
+        step_pool = self._step_pool
+        if step_pool is not None:
+            step_pool.shutdown(wait=False, cancel_futures=False)
+            self._step_pool = None
 
         with self._futures_lock:
             self._futures.clear()
@@ -171,12 +323,19 @@ class OrchestratorService:
                 payload={"reason": "orchestrator_restart"},
             )
 
+    def slots_in_use(self) -> int:
+        """Running tasks plus fanned-out parallel steps."""
+        self._sweep_futures()
+        with self._futures_lock:
+            return len(self._futures) + self._parallel_steps
+
     def _sweep_futures(self) -> None:
         """Remove completed futures and log any unexpected errors."""
         with self._futures_lock:
             done_ids = [tid for tid, f in self._futures.items() if f.done()]
             for tid in done_ids:
                 fut = self._futures.pop(tid)
+                self._preempt_requests.discard(tid)
                 exc = fut.exception()
                 if exc:
                     logger.error("Task %s raised unexpected error: %s", tid, exc, exc_info=exc)
@@ -189,11 +348,41 @@ class OrchestratorService:
         if orchestrator_cfg.get("status", "running") != "running":
             return False
 
-        self._maybe_analyze_dependencies()
+        self._get_worktree_pool()
+
+        # Steps fanned out from parallel groups occupy slots of the same budget.
+        with self._futures_lock:
+            parallel_steps = self._parallel_steps
+        max_in_progress = max(_task_capacity(orchestrator_cfg) - parallel_steps, 0)
+        # Claim and submit under the service lock so an explicit run_task of
+        # the same task either sees our future or is skipped by the claim.
+        with self._lock:
+            return self._claim_and_submit(orchestrator_cfg, max_in_progress)
 
-        max_in_progress = int(orchestrator_cfg.get("concurrency", 2) or 2)
-        claimed = self.container.tasks.claim_next_runnable(max_in_progress=max_in_progress)
+    def _claim_and_submit(self, orchestrator_cfg: dict[str, Any], max_in_progress: int) -> bool:
+        policy = policy_from_config(orchestrator_cfg)
+        held = self._hold_for_dependency_analysis(policy.order, orchestrator_cfg)
+        with self._futures_lock:
+            inflight = set(self._futures)
+
+        def order(runnable: list[Task], tasks: list[Task]) -> list[Task]:
+            return held([t for t in runnable if t.id not in inflight], tasks)
+
+        reserved = min(max(int(orchestrator_cfg.get("reserved_slots", 0) or 0), 0), max_in_progress)
+        claimed = None
+        if reserved or orchestrator_cfg.get("preemption"):
+            # Urgent work may use every slot, including the reserved ones.
+            claimed = self.container.tasks.claim_next_runnable(
+                max_in_progress=max_in_progress,
+                order=lambda runnable, tasks: order(
+                    [t for t in runnable if is_urgent(t, orchestrator_cfg)], tasks
+                ),
+            )
+        if not claimed:
+            claimed = self._claim_avoiding_overlap(orchestrator_cfg, max_in_progress - reserved, order)
         if not claimed:
+            if orchestrator_cfg.get("preemption"):
+                self._request_preemption(orchestrator_cfg, order)
             return False
 
         self.bus.emit(channel="queue", event_type="task.claimed", entity_id=claimed.id, payload={"status": claimed.status})
@@ -202,6 +391,155 @@ class OrchestratorService:
             self._futures[claimed.id] = future
         return True
 
+    def _claim_avoiding_overlap(
+        self, orchestrator_cfg: dict[str, Any], max_in_progress: int, order: Any
+    ) -> Optional[Task]:
+        """Claim with *order*, moving tasks that clash with running work to the back.
+
+        See ``overlap.py``.  Footprints of running tasks combine their
+        predicted files with what their worktree currently changes.
+        """
+        if not overlap_enabled(orchestrator_cfg):
+            return self.container.tasks.claim_next_runnable(max_in_progress=max_in_progress, order=order)
+        tasks = self.container.tasks.list()
+        if not any(t.status == "ready" and predicted_files(t) for t in tasks):
+            return self.container.tasks.claim_next_runnable(max_in_progress=max_in_progress, order=order)
+        running: dict[str, set[str]] = {}
+        for task in tasks:
+            if task.status != "in_progress":
+                continue
+            footprint = predicted_files(task)
+            worktree_dir = task.metadata.get("worktree_dir")
+            if worktree_dir and Path(worktree_dir).exists():
+                footprint |= changed_files(Path(worktree_dir))
+            if footprint:
+                running[task.id] = footprint
+        threshold = overlap_threshold(orchestrator_cfg)
+        outcome: dict[str, Any] = {}
+
+        def _order(runnable: list[Task], board: list[Task]) -> list[Task]:
+            ordered = order(runnable, board)
+            reordered, clashes = defer_overlapping(ordered, running, threshold)
+            outcome["preferred"] = ordered[0].id if ordered else None
+            outcome["clashes"] = clashes
+            return reordered
+
+        claimed = self.container.tasks.claim_next_runnable(max_in_progress=max_in_progress, order=_order)
+        clashes = outcome.get("clashes") or {}
+        if claimed and claimed.id not in clashes and outcome.get("preferred") in clashes:
+            # The policy's first choice would have collided with running work.
+            task_id = outcome["preferred"]
+            other_id, shared = clashes[task_id]
+            self._conflicts_avoided += 1
+            logger.info("Deferred task %s: predicted overlap with running task %s", task_id, other_id)
+            self.bus.emit(
+                channel="queue",
+                event_type="task.overlap_deferred",
+                entity_id=task_id,
+                payload={"running_task_id": other_id, "files": shared[:20], "claimed_instead": claimed.id},
+            )
+        return claimed
+
+    def _request_preemption(self, orchestrator_cfg: dict[str, Any], order: TaskOrder) -> None:
+        """Ask running lower-priority tasks to park so waiting urgent tasks can start.
+
+        Preemption is cooperative: a flagged task parks at its next step
+        boundary (see ``_park_task``) and its slot is claimed on a later tick.
+        Only urgent tasks the claim *order* would accept count as waiting, so
+        work held back for dependency analysis never parks a running task.
+        """
+        tasks = self.container.tasks.list()
+        by_id = {t.id: t for t in tasks}
+        terminal = {"done", "cancelled"}
+        waiting = [
+            t
+            for t in tasks
+            if t.status == "ready"
+            and not t.pending_gate
+            and is_urgent(t, orchestrator_cfg)
+            and all(dep in by_id and by_id[dep].status in terminal for dep in t.blocked_by)
+        ]
+        if waiting:
+            waiting = order(waiting, tasks)
+        if not waiting:
+            return
+        with self._futures_lock:
+            needed = len(waiting) - len(self._preempt_requests)
+            running = [
+                by_id[tid]
+                for tid, future in self._futures.items()
+                if tid in by_id and not future.done() and tid not in self._preempt_requests
+            ]
+            victims = pick_preemption_victims(running, needed, orchestrator_cfg)
+            self._preempt_requests.update(t.id for t in victims)
+        for victim in victims:
+            logger.info("Requesting preemption of task %s for urgent work", victim.id)
+            self.bus.emit(
+                channel="queue",
+                event_type="task.preempt_requested",
+                entity_id=victim.id,
+                payload={"waiting": [t.id for t in waiting]},
+            )
+
+    def _preemption_requested(self, task_id: str) -> bool:
+        with self._futures_lock:
+            if task_id in self._preempt_requests:
+                self._preempt_requests.discard(task_id)
+                return True
+            return False
+
+    def _park_task(self, task: Task, run: RunRecord, worktree_dir: Optional[Path], completed_steps: set[str]) -> None:
+        """Return a preempted task to ``ready`` with a checkpoint to resume from.
+
+        The worktree and run record are kept; the next execution skips the
+        steps listed in the checkpoint instead of starting over.
+        """
+        task.metadata.pop("worktree_dir", None)
+        task.metadata["checkpoint"] = {
+            "run_id": run.id,
+            "completed_steps": sorted(completed_steps),
+            "worktree_dir": str(worktree_dir) if worktree_dir else None,
+            "parked_at": now_iso(),
+        }
+        task.status = "ready"
+        task.current_agent_id = None
+        run.status = "parked"
+        run.summary = "Parked for higher-priority work"
+        self.container.runs.upsert(run)
+        self.container.tasks.upsert(task)
+        self.bus.emit(
+            channel="queue",
+            event_type="task.preempted",
+            entity_id=task.id,
+            payload={"run_id": run.id, "completed_steps": sorted(completed_steps)},
+        )
+
+    def _resume_checkpoint(self, task: Task) -> Optional[tuple[RunRecord, Optional[Path], set[str]]]:
+        """Restore the run, worktree and completed steps of a parked task, if any."""
+        checkpoint = task.metadata.pop("checkpoint", None) if isinstance(task.metadata, dict) else None
+        if not isinstance(checkpoint, dict):
+            return None
+        run = next((r for r in self.container.runs.list() if r.id == checkpoint.get("run_id")), None)
+        raw_worktree = checkpoint.get("worktree_dir")
+        worktree_dir = Path(raw_worktree) if raw_worktree else None
+        if run is None or (worktree_dir is not None and not worktree_dir.exists()):
+            logger.warning("Discarding stale checkpoint for task %s; starting a fresh run", task.id)
+            if worktree_dir is not None:
+                subprocess.run(
+                    ["git", "branch", "-D", f"task-{task.id}"],
+                    cwd=self.container.project_dir,
+                    capture_output=True,
+                    text=True,
+                )
+            return None
+        run.status = "in_progress"
+        run.summary = None
+        self.container.runs.upsert(run)
+        if worktree_dir is not None:
+            task.metadata["worktree_dir"] = str(worktree_dir)
+        self.bus.emit(channel="queue", event_type="task.resumed", entity_id=task.id, payload={"run_id": run.id})
+        return run, worktree_dir, set(checkpoint.get("completed_steps") or [])
+
     def run_task(self, task_id: str) -> Task:
         wait_existing = False
         with self._lock:
@@ -214,7 +552,9 @@ class OrchestratorService:
             # the same task; this avoids request races with the background loop.
             if task.status in {"in_review", "done"}:
                 return task
-            if task.status == "in_progress":
+            with self._futures_lock:
+                existing_future = self._futures.get(task_id)
+            if task.status == "in_progress" or existing_future is not None:
                 wait_existing = True
             if task.status in {"cancelled"}:
                 raise ValueError(f"Task {task_id} cannot be run from status={task.status}")
@@ -227,10 +567,13 @@ class OrchestratorService:
                         raise ValueError(f"Task {task_id} has unresolved blocker {dep_id}")
                 task.status = "ready"
                 self.container.tasks.upsert(task)
+                # Registered under the lock: the background claim skips tasks
+                # that already have a future.
+                future = self._get_pool().submit(self._execute_task, task)
+                with self._futures_lock:
+                    self._futures[task_id] = future
 
         if wait_existing:
-            with self._futures_lock:
-                existing_future = self._futures.get(task_id)
             if existing_future:
                 existing_future.result()
             updated = self.container.tasks.get(task_id)
@@ -238,9 +581,6 @@ class OrchestratorService:
                 raise ValueError(f"Task disappeared during execution: {task_id}")
             return updated
 
-        future = self._get_pool().submit(self._execute_task, task)
-        with self._futures_lock:
-            self._futures[task_id] = future
         try:
             future.result()
         finally:
@@ -251,24 +591,74 @@ class OrchestratorService:
             raise ValueError(f"Task disappeared during execution: {task_id}")
         return updated
 
+    def cancel_task(self, task_id: str) -> int:
+        """Stop *task_id*'s running steps; returns worker process groups signalled.
+
+        The caller records the ``cancelled`` status.  A task with no running
+        execution is left alone, so a later retry starts cleanly.
+        """
+        with self._futures_lock:
+            running = task_id in self._futures
+        if not running:
+            return 0
+        return cancellation_registry.cancel(task_id)
+
     def _loop(self) -> None:
         while not self._stop.is_set():
             handled = self.tick_once()
-            with self._futures_lock:
-                has_inflight = bool(self._futures)
-            if self._drain and not handled and not has_inflight:
-                self.control("pause")
-                self._drain = False
+            if not self._after_tick(handled):
                 break
             time.sleep(1 if handled else 2)
 
+    def _after_tick(self, handled: bool) -> bool:
+        """Finish a drain once idle; False when the loop should stop."""
+        with self._futures_lock:
+            has_inflight = bool(self._futures)
+        if self._drain and not handled and not has_inflight:
+            self.control("pause")
+            self._drain = False
+            return False
+        return True
+
+    def _get_worktree_pool(self) -> Optional[WorktreePool]:
+        """Return the warm worktree pool, (re)sized from ``orchestrator.worktree_pool_size``."""
+        if not (self.container.project_dir / ".git").exists():
+            return None
+        cfg = self.container.config.load()
+        size = int(dict(cfg.get("orchestrator") or {}).get("worktree_pool_size", 0) or 0)
+        if size <= 0 and self._worktree_pool is None:
+            return None
+        with self._branch_lock:
+            if self._worktree_pool is None:
+                self._worktree_pool = WorktreePool(
+                    self.container.project_dir, self.container.state_root / "worktree_pool"
+                )
+        self._worktree_pool.configure(size)
+        return self._worktree_pool
+
     def _create_worktree(self, task: Task) -> Optional[Path]:
         git_dir = self.container.project_dir / ".git"
         if not git_dir.exists():
             return None
-        self._ensure_branch()  # ensure run branch exists as merge target
+        run_branch = self._ensure_branch()  # ensure run branch exists as merge target
         worktree_dir = self.container.state_root / "worktrees" / task.id
         branch = f"task-{task.id}"
+        task.metadata.pop("sparse_checkout", None)
+        orchestrator_cfg = dict(self.container.config.load().get("orchestrator") or {})
+        if sparse_enabled(orchestrator_cfg):
+            cone = sparse_hints(task, orchestrator_cfg, self.container.project_dir)
+            if cone:
+                started = time.monotonic()
+                create_sparse_worktree(self.container.project_dir, worktree_dir, branch, cone)
+                task.metadata["sparse_checkout"] = {
+                    "dirs": cone,
+                    "widened": [],
+                    "create_seconds": round(time.monotonic() - started, 3),
+                }
+                return worktree_dir
+        pool = self._get_worktree_pool()
+        if pool is not None and run_branch and pool.acquire(worktree_dir, branch, run_branch):
+            return worktree_dir
         subprocess.run(
             ["git", "worktree", "add", str(worktree_dir), "-b", branch],
             cwd=self.container.project_dir,
@@ -279,43 +669,144 @@ class OrchestratorService:
         return worktree_dir
 
     def _merge_and_cleanup(self, task: Task, worktree_dir: Path) -> None:
+        """Merge ``task-<id>`` into the run branch, then discard the worktree.
+
+        The branch goes through the merge queue, which integrates it in memory
+        (batched with other finished branches) without a working-tree merge.
+        On conflict the task branch is rebased onto the run branch inside the
+        task worktree, where ``resolve_merge`` runs outside ``_merge_lock``,
+        and is queued again.  When the in-memory path is unavailable this
+        falls back to a regular ``git merge`` in ``project_dir``.
+        """
         branch = f"task-{task.id}"
-        merge_failed = False
-        with self._merge_lock:
-            try:
-                subprocess.run(
-                    ["git", "merge", branch, "--no-edit"],
-                    cwd=self.container.project_dir,
-                    check=True,
-                    capture_output=True,
-                    text=True,
-                )
-            except subprocess.CalledProcessError:
-                resolved = self._resolve_merge_conflict(task, branch)
-                if not resolved:
-                    subprocess.run(
-                        ["git", "merge", "--abort"],
-                        cwd=self.container.project_dir,
-                        capture_output=True,
-                        text=True,
-                    )
-                    merge_failed = True
-                    task.metadata["merge_conflict"] = True
-        # Always clean up worktree
-        subprocess.run(
-            ["git", "worktree", "remove", str(worktree_dir), "--force"],
-            cwd=self.container.project_dir,
-            capture_output=True,
-            text=True,
+        orchestrator_cfg = dict(self.container.config.load().get("orchestrator") or {})
+        self._merge_queue.configure(
+            int(orchestrator_cfg.get("merge_batch_size", 8) or 8),
+            float(orchestrator_cfg.get("merge_batch_wait_seconds", 0) or 0),
         )
-        # Only delete branch if merge succeeded; preserve it for recovery on failure
-        if not merge_failed:
+        merged = False
+        for _ in range(self._MERGE_REBASE_ATTEMPTS):
+            outcome = self._merge_queue.merge(branch)
+            if outcome is None:
+                with self._merge_lock:
+                    merged = self._merge_in_working_tree(task, branch)
+                break
+            if outcome == MERGED:
+                merged = True
+                break
+            if not self._rebase_onto_run_branch(task, worktree_dir, outcome):
+                break
+        if not merged:
+            task.metadata["merge_conflict"] = True
+        # Always clean up worktree; only delete the branch if the merge
+        # succeeded, preserving it for recovery on failure.
+        self._discard_worktree(task, worktree_dir, delete_branch=merged)
+
+    def _merge_in_working_tree(self, task: Task, branch: str) -> bool:
+        try:
+            subprocess.run(
+                ["git", "merge", branch, "--no-edit"],
+                cwd=self.container.project_dir,
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            return True
+        except subprocess.CalledProcessError:
+            if self._resolve_merge_conflict(task, branch):
+                return True
             subprocess.run(
-                ["git", "branch", "-D", branch],
+                ["git", "merge", "--abort"],
                 cwd=self.container.project_dir,
                 capture_output=True,
                 text=True,
             )
+            return False
+
+    def _rebase_onto_run_branch(self, task: Task, worktree_dir: Path, onto: str) -> bool:
+        """Rebase the task branch onto *onto* in its worktree, resolving conflicts there."""
+
+        def _git(*args: str) -> subprocess.CompletedProcess[str]:
+            return subprocess.run(["git", *args], cwd=worktree_dir, capture_output=True, text=True)
+
+        result = _git("rebase", onto)
+        try:
+            for _ in range(self._MERGE_REBASE_MAX_STOPS):
+                if result.returncode == 0:
+                    return True
+                conflicted = [
+                    f for f in _git("diff", "--name-only", "--diff-filter=U").stdout.splitlines() if f
+                ]
+                if not conflicted:
+                    break
+                task.metadata["merge_conflict_files"] = {
+                    fpath: (worktree_dir / fpath).read_text(errors="replace")
+                    for fpath in conflicted
+                    if (worktree_dir / fpath).exists()
+                }
+                task.metadata["merge_other_tasks"] = [
+                    f"- {other.title}: {other.description}"
+                    for other in self.container.tasks.list()
+                    if other.id != task.id and other.status == "done"
+                ]
+                self.container.tasks.upsert(task)
+                step_result = self._run_worker_step(task, "resolve_merge")
+                if step_result.status != "ok":
+                    break
+                _git("add", "-A")
+                result = _git("-c", "core.editor=true", "rebase", "--continue")
+        except Exception:
+            logger.exception("Failed to resolve merge conflict for task %s", task.id)
+        finally:
+            task.metadata.pop("merge_conflict_files", None)
+            task.metadata.pop("merge_other_tasks", None)
+        _git("rebase", "--abort")
+        return False
+
+    def _discard_worktree(self, task: Task, worktree_dir: Path, *, delete_branch: bool = True) -> None:
+        """Return *worktree_dir* to the warm pool, or remove it, and drop the task branch."""
+        pool = None if task.metadata.get("sparse_checkout") else self._worktree_pool
+        if pool is None or not pool.release(worktree_dir):
+            subprocess.run(
+                ["git", "worktree", "remove", str(worktree_dir), "--force"],
+                cwd=self.container.project_dir,
+                capture_output=True,
+                text=True,
+            )
+        if delete_branch:
+            subprocess.run(
+                ["git", "branch", "-D", f"task-{task.id}"],
+                cwd=self.container.project_dir,
+                capture_output=True,
+                text=True,
+            )
+
+    def _widen_sparse_worktree(self, task: Task, worktree_dir: Optional[Path]) -> None:
+        """Grow a sparse worktree's cone to new plan hints and files written outside it."""
+        sparse = task.metadata.get("sparse_checkout")
+        if not worktree_dir or not isinstance(sparse, dict):
+            return
+        cone = list(sparse.get("dirs") or [])
+        orchestrator_cfg = dict(self.container.config.load().get("orchestrator") or {})
+        wanted = sparse_hints(task, orchestrator_cfg, self.container.project_dir)
+        wanted += dirs_outside_cone(worktree_dir, cone)
+        added = [d for d in dict.fromkeys(wanted) if not any(d == c or d.startswith(c + "/") for c in cone)]
+        if not added:
+            return
+        try:
+            widen_sparse_checkout(worktree_dir, added)
+        except subprocess.CalledProcessError as exc:
+            logger.warning("Could not widen sparse worktree for task %s: %s", task.id, exc.stderr or exc)
+            return
+        sparse["dirs"] = cone + added
+        sparse["widened"] = list(sparse.get("widened") or []) + added
+        self.container.tasks.upsert(task)
+        self.bus.emit(
+            channel="tasks",
+            event_type="task.sparse_widened",
+            entity_id=task.id,
+            payload={"added": added, "dirs": sparse["dirs"]},
+        )
 
     def _resolve_merge_conflict(self, task: Task, branch: str) -> bool:
         saved_worktree_dir = task.metadata.get("worktree_dir")
@@ -354,7 +845,7 @@ class OrchestratorService:
             self.container.tasks.upsert(task)
 
             # Dispatch worker to resolve
-            step_result = self.worker_adapter.run_step(task=task, step="resolve_merge", attempt=1)
+            step_result = self._run_worker_step(task, "resolve_merge")
 
             if step_result.status != "ok":
                 return False
@@ -483,17 +974,263 @@ class OrchestratorService:
             counts[sev] += 1
         return any(counts[sev] > int(gate.get(sev, 0)) for sev in counts)
 
-    def _run_non_review_step(self, task: Task, run: RunRecord, step: str, attempt: int = 1) -> bool:
-        result = self.worker_adapter.run_step(task=task, step=step, attempt=attempt)
+    def _run_non_review_step(
+        self,
+        task: Task,
+        run: RunRecord,
+        step: str,
+        attempt: int = 1,
+        template: PipelineTemplate | None = None,
+    ) -> bool:
+        retries: list[dict[str, Any]] = []
+        result = self._run_worker_step(
+            task, step, attempt=attempt, retry_limit=self._retry_limit(template, step), retries=retries
+        )
+        return self._apply_step_result(task, run, step, result, retries=retries)
+
+    @staticmethod
+    def _retry_limit(template: PipelineTemplate | None, step: str) -> int:
+        """Return how many transient failures of *step* may be retried."""
+        if template is None:
+            return 0
+        step_def = template.step_def(step) or template.step_def(_STEP_RETRY_ALIASES.get(step, step))
+        return max(int(step_def.retry_limit), 0) if step_def else 0
+
+    def _retry_delay(self, retry: int) -> float:
+        """Jittered exponential backoff before the *retry*-th re-run of a step."""
+        cfg = dict(self.container.config.load().get("orchestrator") or {})
+        base = max(float(cfg.get("step_retry_backoff_seconds", 2.0) or 0.0), 0.0)
+        cap = max(float(cfg.get("step_retry_max_backoff_seconds", 60.0) or 0.0), 0.0)
+        delay = min(cap, base * 2.0 ** (retry - 1))
+        # Equal jitter keeps a floor while de-synchronising parallel retries.
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def _run_worker_step(
+        self,
+        task: Task,
+        step: str,
+        *,
+        attempt: int = 1,
+        retry_limit: int = 0,
+        retries: list[dict[str, Any]] | None = None,
+    ) -> StepResult:
+        """Invoke the worker for *step*, retrying transient failures with backoff.
+
+        Every worker call, including merge resolution, task generation and
+        dependency analysis, takes a slot in the step's lane.  Only results
+        flagged ``retryable`` are retried, at most *retry_limit* times.  Each
+        discarded failure is appended to *retries* so the final step log
+        shows what happened.
+        """
+        orchestrator_cfg = dict(self.container.config.load().get("orchestrator") or {})
+        self._lanes.configure(lane_capacities(orchestrator_cfg))
+        lane = lane_for_step(step, orchestrator_cfg)
+        retry = 0
+        while True:
+            if cancellation_registry.is_cancelled(task.id):
+                return StepResult(status="cancelled", summary="Task cancelled")
+            # The lane slot is released during backoff so waiting steps can run.
+            try:
+                with self._lanes.slot(lane, cancelled=lambda: cancellation_registry.is_cancelled(task.id)):
+                    result = self.worker_adapter.run_step(task=task, step=step, attempt=attempt)
+            except SlotCancelled:
+                return StepResult(status="cancelled", summary="Task cancelled")
+            if result.status == "ok" or not result.retryable or retry >= retry_limit:
+                return result
+            retry += 1
+            delay = self._retry_delay(retry)
+            if retries is not None:
+                entry = {"retry": retry, "ts": now_iso(), "summary": result.summary, "delay_seconds": round(delay, 3)}
+                if result.run_dir:
+                    entry["run_dir"] = result.run_dir
+                retries.append(entry)
+            logger.info(
+                "Transient failure in step %s for task %s (retry %d/%d in %.1fs): %s",
+                step, task.id, retry, retry_limit, delay, result.summary,
+            )
+            self.bus.emit(
+                channel="tasks",
+                event_type="task.step_retry",
+                entity_id=task.id,
+                payload={"step": step, "retry": retry, "retry_limit": retry_limit, "delay_seconds": delay, "error": result.summary},
+            )
+            if self._stop.wait(delay):
+                return result
+
+    def _reserve_parallel_slot(self) -> bool:
+        """Claim a slot of the global concurrency budget for a fanned-out step."""
+        cfg = self.container.config.load()
+        limit = _task_capacity(dict(cfg.get("orchestrator") or {}))
+        if self._supervisor is not None and self._supervised and not self._supervisor.has_capacity():
+            return False
+        with self._futures_lock:
+            if len(self._futures) + self._parallel_steps >= limit:
+                return False
+            self._parallel_steps += 1
+            return True
+
+    def _run_reserved_step(
+        self, task: Task, step: str, retry_limit: int, retries: list[dict[str, Any]]
+    ) -> StepResult:
+        try:
+            return self._run_worker_step(task, step, retry_limit=retry_limit, retries=retries)
+        finally:
+            with self._futures_lock:
+                self._parallel_steps -= 1
+
+    def _run_step_group(
+        self,
+        task: Task,
+        run: RunRecord,
+        group: list[str],
+        template: PipelineTemplate | None = None,
+    ) -> bool:
+        """Run a group of independent steps, concurrently where capacity allows.
+
+        Steps whose ``condition`` is false (or optional steps, when
+        ``orchestrator.skip_optional_steps`` is set) are recorded as skipped
+        without invoking a worker.  Of the rest, the first runs on the task's
+        own thread; the others are fanned out to the step pool while free
+        slots remain and run inline otherwise.  Each fanned-out step works on
+        its own copy of *task*, so steps never write to the same object
+        concurrently.  After the join, the metadata changes from the copies
+        and the results are applied in template order on this thread, so
+        ``run.steps`` and task metadata match a sequential run.
+        """
+        step_defs = {step: template.step_def(step) if template else None for step in group}
+        skipped: dict[str, str] = {}
+        for step in group:
+            reason = self._skip_reason(task, run, step_defs[step])
+            if reason:
+                skipped[step] = reason
+        runnable = [step for step in group if step not in skipped]
+
+        results: dict[str, StepResult] = {}
+        retries: dict[str, list[dict[str, Any]]] = {step: [] for step in runnable}
+        limits = {step: self._retry_limit(template, step) for step in runnable}
+        if runnable:
+            task.current_step = runnable[0]
+            self.container.tasks.upsert(task)
+
+            futures: dict[str, Future[StepResult]] = {}
+            copies: dict[str, Task] = {}
+            inline: list[str] = []
+            baseline = copy.deepcopy(task.metadata)
+            for step in runnable[1:]:
+                if self._reserve_parallel_slot():
+                    copies[step] = copy.deepcopy(task)
+                    futures[step] = self._get_step_pool().submit(
+                        self._run_reserved_step, copies[step], step, limits[step], retries[step]
+                    )
+                else:
+                    inline.append(step)
+
+            try:
+                for step in [runnable[0], *inline]:
+                    results[step] = self._run_worker_step(
+                        task, step, retry_limit=limits[step], retries=retries[step]
+                    )
+            finally:
+                # Never leave fanned-out steps running past the group boundary.
+                wait(list(futures.values()))
+            for step, future in futures.items():
+                results[step] = future.result()
+            for step in runnable:
+                if step in copies:
+                    _merge_metadata(task, baseline, copies[step].metadata)
+
+        for step in group:
+            if step in skipped:
+                self._record_skipped_step(task, run, step, skipped[step])
+                continue
+            step_def = step_defs[step]
+            required = step_def.required if step_def else True
+            if not self._apply_step_result(
+                task, run, step, results[step], required=required, retries=retries[step]
+            ):
+                return False
+        return True
+
+    def _skip_reason(self, task: Task, run: RunRecord, step_def: StepDef | None) -> Optional[str]:
+        """Return why *step_def* should be skipped for this run, or None to run it."""
+        if step_def is None:
+            return None
+        if not step_def.required:
+            cfg = self.container.config.load()
+            if dict(cfg.get("orchestrator") or {}).get("skip_optional_steps", False):
+                return "optional step skipped by orchestrator.skip_optional_steps"
+        if not step_def.condition:
+            return None
+        try:
+            if evaluate_condition(step_def.condition, self._condition_context(task, run)):
+                return None
+        except ConditionError as exc:
+            # Fail open: a broken condition must never silently drop work.
+            logger.warning("Condition for step %s on task %s not evaluable (%s); running step", step_def.name, task.id, exc)
+            return None
+        return f"condition not met: {step_def.condition}"
+
+    def _condition_context(self, task: Task, run: RunRecord) -> dict[str, Any]:
+        previous: dict[str, dict[str, Any]] = {}
+        for entry in run.steps:
+            if isinstance(entry, dict) and entry.get("step"):
+                previous[str(entry["step"])] = entry
+        worktree = task.metadata.get("worktree_dir") if isinstance(task.metadata, dict) else None
+        cwd = Path(worktree) if worktree else self.container.project_dir
+        return {
+            "task": task.to_dict(),
+            "run": {"id": run.id, "branch": run.branch, "steps": list(run.steps)},
+            "previous": previous,
+            "diff": lambda: _diff_stats(cwd),
+        }
+
+    def _record_skipped_step(self, task: Task, run: RunRecord, step: str, reason: str) -> None:
+        run.steps.append({"step": step, "status": "skipped", "ts": now_iso(), "reason": reason})
+        self.container.runs.upsert(run)
+        self.bus.emit(
+            channel="tasks",
+            event_type="task.step_skipped",
+            entity_id=task.id,
+            payload={"run_id": run.id, "step": step, "reason": reason},
+        )
+
+    def _apply_step_result(
+        self,
+        task: Task,
+        run: RunRecord,
+        step: str,
+        result: StepResult,
+        *,
+        required: bool = True,
+        retries: list[dict[str, Any]] | None = None,
+    ) -> bool:
         step_log: dict[str, Any] = {"step": step, "status": result.status, "ts": now_iso(), "summary": result.summary}
+        if retries:
+            step_log["retries"] = list(retries)
         if result.human_blocking_issues:
             step_log["human_blocking_issues"] = result.human_blocking_issues
+        if result.resource_usage:
+            step_log["resources"] = result.resource_usage
+        if result.failure_reason:
+            step_log["failure_reason"] = result.failure_reason
+        if result.run_dir:
+            step_log["run_dir"] = result.run_dir
+        if not required:
+            step_log["optional"] = True
         run.steps.append(step_log)
         task.current_step = step
         self.container.tasks.upsert(task)
         if result.human_blocking_issues:
             self._block_for_human_issues(task, run, step, result.summary, result.human_blocking_issues)
             return False
+        if result.status == "cancelled":
+            self._finish_cancelled(task, run, step)
+            return False
+        if result.status != "ok" and not required:
+            # Optional steps (required=False) never block the pipeline.
+            logger.info("Optional step %s failed for task %s; continuing", step, task.id)
+            self.container.runs.upsert(run)
+            return True
         if result.status != "ok":
             task.status = "blocked"
             task.error = result.summary or f"{step} failed"
@@ -515,14 +1252,38 @@ class OrchestratorService:
                 task.metadata = {}
             plans = task.metadata.setdefault("plans", [])
             plans.append({"step": step, "ts": now_iso(), "content": result.summary})
+            record_predicted_files(task, predicted_files(task))
             self.container.tasks.upsert(task)
 
+        # Remember what implementation actually touched for later overlap checks
+        worktree_dir = task.metadata.get("worktree_dir")
+        if step in ("implement", "implement_fix") and worktree_dir and Path(worktree_dir).exists():
+            if record_predicted_files(task, changed_files(Path(worktree_dir))):
+                self.container.tasks.upsert(task)
+
         # Handle generate_tasks: create child tasks from step output
         if step == "generate_tasks" and result.generated_tasks:
             self._create_child_tasks(task, result.generated_tasks)
 
         return True
 
+    def _finish_cancelled(self, task: Task, run: RunRecord, step: str) -> None:
+        """Close *run* after a cancel stopped *step*, keeping the task cancelled."""
+        task.status = "cancelled"
+        task.pending_gate = None
+        task.current_step = step
+        self.container.tasks.upsert(task)
+        run.status = "cancelled"
+        run.finished_at = now_iso()
+        run.summary = f"Cancelled during {step}"
+        self.container.runs.upsert(run)
+        self.bus.emit(
+            channel="tasks",
+            event_type="task.step_cancelled",
+            entity_id=task.id,
+            payload={"run_id": run.id, "step": step},
+        )
+
     def _create_child_tasks(
         self, parent: Task, task_defs: list[dict[str, Any]], *, apply_deps: bool = False
     ) -> list[str]:
@@ -599,7 +1360,7 @@ class OrchestratorService:
         self.container.tasks.upsert(task)
 
         try:
-            result = self.worker_adapter.run_step(task=task, step="generate_tasks", attempt=1)
+            result = self._run_worker_step(task, "generate_tasks")
             if result.status != "ok":
                 raise ValueError(f"generate_tasks step failed: {result.summary or result.status}")
             task_defs = list(result.generated_tasks or [])
@@ -611,8 +1372,16 @@ class OrchestratorService:
 
         return created_ids
 
-    def _findings_from_result(self, task: Task, review_attempt: int) -> tuple[list[ReviewFinding], StepResult]:
-        result = self.worker_adapter.run_step(task=task, step="review", attempt=review_attempt)
+    def _findings_from_result(
+        self,
+        task: Task,
+        review_attempt: int,
+        retry_limit: int = 0,
+        retries: list[dict[str, Any]] | None = None,
+    ) -> tuple[list[ReviewFinding], StepResult]:
+        result = self._run_worker_step(
+            task, "review", attempt=review_attempt, retry_limit=retry_limit, retries=retries
+        )
         raw_findings = list(result.findings or [])
         findings: list[ReviewFinding] = []
         for idx, finding in enumerate(raw_findings):
@@ -715,42 +1484,282 @@ class OrchestratorService:
             payload={"error": task.error},
         )
 
+    @staticmethod
+    def _needs_dependency_analysis(task: Task) -> bool:
+        if task.status != "ready" or task.source == "prd_import":
+            return False
+        metadata = task.metadata if isinstance(task.metadata, dict) else {}
+        if not metadata.get("deps_analyzed"):
+            return True
+        # Re-analyze tasks whose title/description/labels changed since.
+        stored = metadata.get("deps_fingerprint")
+        return bool(stored) and stored != task_fingerprint(task)
+
+    def _hold_for_dependency_analysis(self, order: TaskOrder, orchestrator_cfg: dict[str, Any]) -> TaskOrder:
+        """Wrap a claim *order* so tasks awaiting dependency analysis are not claimed.
+
+        Seeing candidates also (re)schedules the background analysis; see
+        ``dependency_analysis.py``.  A lone candidate is not held, matching
+        the analysis itself, which needs at least two.
+        """
+        if not orchestrator_cfg.get("auto_deps", True):
+            return order
+        window = float(orchestrator_cfg.get("dependency_debounce_seconds", 2.0))
+        max_wait = float(orchestrator_cfg.get("dependency_debounce_max_seconds", 10.0))
+
+        def _order(runnable: list[Task], tasks: list[Task]) -> list[Task]:
+            candidates = {t.id for t in tasks if self._needs_dependency_analysis(t)}
+            if candidates:
+                self._deps_worker.notify(candidates, window=window, max_wait=max_wait)
+            if len(candidates) >= 2:
+                runnable = [t for t in runnable if t.id not in candidates]
+            return order(runnable, tasks)
+
+        return _order
+
     def _maybe_analyze_dependencies(self) -> None:
-        """Run automatic dependency analysis on unanalyzed ready tasks."""
+        """Run automatic dependency analysis on unanalyzed ready tasks.
+
+        Called from the background ``dependency-analysis`` worker.  Candidates
+        with a cached fingerprint reuse their cached edges; only the rest
+        are sent to the worker, against a compact summary of existing tasks.
+        """
         cfg = self.container.config.load()
         orchestrator_cfg = dict(cfg.get("orchestrator") or {})
         if not orchestrator_cfg.get("auto_deps", True):
             return
 
         all_tasks = self.container.tasks.list()
-        candidates = [
-            t for t in all_tasks
-            if t.status == "ready"
-            and not (isinstance(t.metadata, dict) and t.metadata.get("deps_analyzed"))
-            and t.source != "prd_import"
-        ]
-
-        # Mark all candidates analyzed regardless of outcome
-        def _mark_analyzed(tasks: list[Task]) -> None:
-            for t in tasks:
-                if not isinstance(t.metadata, dict):
-                    t.metadata = {}
-                t.metadata["deps_analyzed"] = True
-                self.container.tasks.upsert(t)
+        candidates = [t for t in all_tasks if self._needs_dependency_analysis(t)]
 
         if len(candidates) < 2:
-            _mark_analyzed(candidates)
+            self._mark_dependencies_analyzed(candidates, {}, orchestrator_cfg)
             return
 
-        # Gather already-analyzed non-terminal tasks as context
         terminal = {"done", "cancelled"}
-        existing = [
-            t for t in all_tasks
-            if isinstance(t.metadata, dict) and t.metadata.get("deps_analyzed")
-            and t.status not in terminal
+        fingerprints = {t.id: task_fingerprint(t) for t in all_tasks}
+        # Resolve cached fingerprints to current tasks, preferring candidates,
+        # then unfinished tasks.
+        by_fingerprint: dict[str, str] = {}
+        for t in sorted(all_tasks, key=lambda t: t.status not in terminal):
+            by_fingerprint[fingerprints[t.id]] = t.id
+        for t in candidates:
+            by_fingerprint[fingerprints[t.id]] = t.id
+
+        edges: list[dict[str, str]] = []
+        uncached: list[Task] = []
+        for t in candidates:
+            cached = self._deps_cache.get(fingerprints[t.id])
+            if cached is None:
+                uncached.append(t)
+                continue
+            for from_fp, to_fp, reason in cached:
+                if from_fp in by_fingerprint and to_fp in by_fingerprint:
+                    edges.append({"from": by_fingerprint[from_fp], "to": by_fingerprint[to_fp], "reason": reason})
+
+        # Compact context: the most recently updated analyzed, unfinished tasks
+        uncached_ids = {t.id for t in uncached}
+        context_limit = int(orchestrator_cfg.get("dependency_context_limit", 100) or 100)
+        existing = sorted(
+            (
+                t for t in all_tasks
+                if t.id not in uncached_ids
+                and t.status not in terminal
+                and (t in candidates or (isinstance(t.metadata, dict) and t.metadata.get("deps_analyzed")))
+            ),
+            key=lambda t: t.updated_at,
+            reverse=True,
+        )[:context_limit]
+
+        for t in candidates:
+            if isinstance(t.metadata, dict):
+                t.metadata.pop("deps_analysis_failed", None)
+        failed: dict[str, str] = {}
+        try:
+            batches, unrelated = self._dependency_batches(uncached, existing, orchestrator_cfg)
+            # Candidates with no lexically similar task get no worker call.
+            self._cache_dependency_edges(unrelated, [], fingerprints)
+            results, failures = self._run_dependency_batches(batches, orchestrator_cfg)
+            for (batch, _), inferred in zip(batches, results):
+                if inferred is None:
+                    continue
+                edges.extend(inferred)
+                self._cache_dependency_edges(batch, inferred, fingerprints)
+            # When every batch failed (e.g. the worker is unavailable) the
+            # analysis as a whole failed; tasks then run without inferred deps.
+            if len(failures) < len(batches):
+                failed = {t.id: reason for idx, reason in failures.items() for t in batches[idx][0]}
+            for idx, reason in failures.items():
+                for t in batches[idx][0]:
+                    if isinstance(t.metadata, dict):
+                        t.metadata["deps_analysis_failed"] = reason
+            # Edges from every chunk that succeeded are merged and go through
+            # the same cycle check as a single-call analysis.
+            unique: dict[tuple[str, str], dict[str, str]] = {}
+            for edge in edges:
+                unique.setdefault((str(edge.get("from", "")), str(edge.get("to", ""))), edge)
+            if unique:
+                self._apply_dependency_edges(candidates, list(unique.values()), all_tasks)
+        except Exception:
+            logger.exception("Dependency analysis failed; tasks will run without inferred deps")
+            failed = {}
+        finally:
+            self._mark_dependencies_analyzed(candidates, failed, orchestrator_cfg)
+
+    def _mark_dependencies_analyzed(
+        self, candidates: list[Task], failed: dict[str, str], orchestrator_cfg: dict[str, Any]
+    ) -> None:
+        """Stamp *candidates* ``deps_analyzed``, except those in *failed* chunks.
+
+        Tasks of a failed or timed-out chunk stay candidates, so the next
+        analysis pass retries them, up to ``dependency_max_attempts``
+        (default 3) passes; after that they run without inferred deps and
+        keep ``deps_analysis_failed``.
+        """
+        max_attempts = max(int(orchestrator_cfg.get("dependency_max_attempts", 3) or 1), 1)
+        for t in candidates:
+            if not isinstance(t.metadata, dict):
+                t.metadata = {}
+            if t.id in failed:
+                attempts = int(t.metadata.get("deps_analysis_attempts", 0) or 0) + 1
+                t.metadata["deps_analysis_attempts"] = attempts
+                if attempts < max_attempts:
+                    self.container.tasks.upsert(t)
+                    continue
+                logger.warning("Giving up dependency analysis of task %s after %d attempts", t.id, attempts)
+            else:
+                t.metadata.pop("deps_analysis_attempts", None)
+            t.metadata["deps_analyzed"] = True
+            t.metadata["deps_fingerprint"] = task_fingerprint(t)
+            self.container.tasks.upsert(t)
+
+    def _dependency_batches(
+        self, uncached: list[Task], existing: list[Task], orchestrator_cfg: dict[str, Any]
+    ) -> tuple[list[tuple[list[Task], list[Task]]], list[Task]]:
+        """Split analysis work into ``(candidates, context)`` batches.
+
+        Sets below ``dependency_prefilter_min_tasks`` (default 50) go out in
+        chunks of ``dependency_chunk_size``, so mid-sized sets are split and
+        analyzed concurrently.  From there on, the TF-IDF pre-filter
+        (``similarity.py``) keeps only candidates with a similar task; those
+        are clustered into batches whose context holds their similar tasks.
+        Returns the batches plus the candidates that need no worker call.
+        """
+        if not uncached:
+            return [], []
+        min_tasks = int(orchestrator_cfg.get("dependency_prefilter_min_tasks", 50) or 0)
+        if not orchestrator_cfg.get("dependency_prefilter", True) or len(uncached) + len(existing) < min_tasks:
+            return self._chunk_dependency_candidates(uncached, existing, orchestrator_cfg), []
+        threshold = float(orchestrator_cfg.get("dependency_similarity_threshold", 0.15))
+        batch_size = max(int(orchestrator_cfg.get("dependency_batch_size", 12) or 12), 2)
+        by_id = {t.id: t for t in [*uncached, *existing]}
+        uncached_ids = {t.id for t in uncached}
+        pairs = TfidfIndex.from_tasks(by_id.values()).similar_pairs(uncached_ids, threshold)
+        related: dict[str, set[str]] = {}
+        for a, b, _ in pairs:
+            related.setdefault(a, set()).add(b)
+            related.setdefault(b, set()).add(a)
+        batches: list[tuple[list[Task], list[Task]]] = []
+        for cluster in cluster_pairs(pairs, batch_size):
+            batch = [by_id[i] for i in cluster if i in uncached_ids]
+            if not batch:
+                continue
+            context_ids = [i for i in cluster if i not in uncached_ids]
+            for task in batch:
+                context_ids += [i for i in sorted(related.get(task.id, ())) if i not in cluster]
+            batches.append((batch, [by_id[i] for i in dict.fromkeys(context_ids)]))
+        unrelated = [t for t in uncached if t.id not in related]
+        self._deps_stats["similar_pairs"] += len(pairs)
+        self._deps_stats["prefiltered"] += len(unrelated)
+        logger.info(
+            "Dependency pre-filter: %d candidates, %d similar pairs, %d batches, %d skipped",
+            len(uncached), len(pairs), len(batches), len(unrelated),
+        )
+        return batches, unrelated
+
+    @staticmethod
+    def _chunk_dependency_candidates(
+        uncached: list[Task], existing: list[Task], orchestrator_cfg: dict[str, Any]
+    ) -> list[tuple[list[Task], list[Task]]]:
+        """Partition *uncached* into chunks of ``dependency_chunk_size`` (default 25).
+
+        Each chunk's context lists the other chunks' candidates (id, title and
+        status only) next to the existing tasks, so edges that cross chunks
+        can still be inferred.
+        """
+        chunk_size = max(int(orchestrator_cfg.get("dependency_chunk_size", 25) or 25), 2)
+        if len(uncached) <= chunk_size:
+            return [(uncached, existing)]
+        chunks = [uncached[i:i + chunk_size] for i in range(0, len(uncached), chunk_size)]
+        return [
+            (chunk, [*existing, *(t for other in chunks if other is not chunk for t in other)])
+            for chunk in chunks
         ]
 
-        # Build synthetic task with metadata for the worker
+    def _run_dependency_batches(
+        self, batches: list[tuple[list[Task], list[Task]]], orchestrator_cfg: dict[str, Any]
+    ) -> tuple[list[Optional[list[dict[str, str]]]], dict[int, str]]:
+        """Run batches concurrently; return per-batch edges and failure reasons.
+
+        Up to ``dependency_parallelism`` (default 4) batches run at once.  A
+        batch still running ``dependency_chunk_timeout_seconds`` (default 600)
+        after it started is abandoned as ``timeout``.  Its result is None, and
+        batches that finished keep their edges.
+        """
+        results: list[Optional[list[dict[str, str]]]] = [None] * len(batches)
+        failures: dict[int, str] = {}
+        if not batches:
+            return results, failures
+        timeout = float(orchestrator_cfg.get("dependency_chunk_timeout_seconds", 600) or 600)
+        parallelism = max(int(orchestrator_cfg.get("dependency_parallelism", 4) or 1), 1)
+        started: dict[int, float] = {}
+
+        def _run(idx: int) -> Optional[list[dict[str, str]]]:
+            started[idx] = time.monotonic()
+            batch, context = batches[idx]
+            return self._run_dependency_batch(batch, context)
+
+        pool = ThreadPoolExecutor(max_workers=min(parallelism, len(batches)), thread_name_prefix="dependency-chunk")
+        try:
+            futures = {pool.submit(_run, idx): idx for idx in range(len(batches))}
+            self._deps_stats["batches"] += len(batches)
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for future in done:
+                    idx = futures[future]
+                    try:
+                        results[idx] = future.result()
+                    except Exception:
+                        logger.exception("Dependency analysis chunk %d failed", idx)
+                    if results[idx] is None:
+                        failures[idx] = "error"
+                now = time.monotonic()
+                for future in list(pending):
+                    idx = futures[future]
+                    if idx in started and now - started[idx] > timeout:
+                        logger.warning("Dependency analysis chunk %d timed out after %.0fs", idx, timeout)
+                        pending.discard(future)
+                        failures[idx] = "timeout"
+        finally:
+            # Abandoned chunks finish (and are ignored) in the background.
+            pool.shutdown(wait=False, cancel_futures=True)
+        if failures:
+            self._deps_stats["failed_batches"] += len(failures)
+            self.bus.emit(
+                channel="system",
+                event_type="dependency_analysis.partial",
+                entity_id=self.container.project_id,
+                payload={
+                    "batches": len(batches),
+                    "failed": sorted(set(failures.values())),
+                    "task_ids": [t.id for idx in failures for t in batches[idx][0]],
+                },
+            )
+        return results, failures
+
+    def _run_dependency_batch(self, batch: list[Task], context: list[Task]) -> Optional[list[dict[str, str]]]:
+        """Ask the worker for edges among *batch* (and *context*); None on failure."""
         candidate_data = [
             {
                 "id": t.id,
@@ -759,13 +1768,9 @@ class OrchestratorService:
                 "task_type": t.task_type,
                 "labels": t.labels,
             }
-            for t in candidates
-        ]
-        existing_data = [
-            {"id": t.id, "title": t.title, "status": t.status}
-            for t in existing
+            for t in batch
         ]
-
+        existing_data = [{"id": t.id, "title": t.title[:80], "status": t.status} for t in context]
         synthetic = Task(
             title="Dependency analysis",
             description="Analyze task dependencies",
@@ -776,15 +1781,23 @@ class OrchestratorService:
                 "existing_tasks": existing_data,
             },
         )
+        result = self._run_worker_step(synthetic, "analyze_deps")
+        if result.status != "ok":
+            return None
+        return [e for e in result.dependency_edges or [] if isinstance(e, dict)]
 
-        try:
-            result = self.worker_adapter.run_step(task=synthetic, step="analyze_deps", attempt=1)
-            if result.status == "ok" and result.dependency_edges:
-                self._apply_dependency_edges(candidates, result.dependency_edges, all_tasks)
-        except Exception:
-            logger.exception("Dependency analysis failed; tasks will run without inferred deps")
-        finally:
-            _mark_analyzed(candidates)
+    def _cache_dependency_edges(
+        self, analyzed: list[Task], edges: list[dict[str, str]], fingerprints: dict[str, str]
+    ) -> None:
+        for task in analyzed:
+            own = [
+                (fingerprints[str(e.get("from"))], fingerprints[str(e.get("to"))], str(e.get("reason", "")))
+                for e in edges
+                if task.id in (e.get("from"), e.get("to"))
+                and str(e.get("from")) in fingerprints
+                and str(e.get("to")) in fingerprints
+            ]
+            self._deps_cache.put(fingerprints[task.id], own)
 
     def _apply_dependency_edges(
         self,
@@ -860,32 +1873,41 @@ class OrchestratorService:
             task.status = "blocked"
             task.error = "Internal error during execution"
             self.container.tasks.upsert(task)
+        finally:
+            cancellation_registry.clear(task.id)
 
     def _execute_task_inner(self, task: Task) -> None:
         worktree_dir: Optional[Path] = None
         try:
-            worktree_dir = self._create_worktree(task)
-            if worktree_dir:
-                task.metadata["worktree_dir"] = str(worktree_dir)
+            resumed = self._resume_checkpoint(task)
+            if resumed:
+                run, worktree_dir, completed_steps = resumed
                 self.container.tasks.upsert(task)
+            else:
+                completed_steps = set()
+                worktree_dir = self._create_worktree(task)
+                if worktree_dir:
+                    task.metadata["worktree_dir"] = str(worktree_dir)
+                    self.container.tasks.upsert(task)
 
-            task_branch = f"task-{task.id}" if worktree_dir else self._ensure_branch()
-            run = RunRecord(task_id=task.id, status="in_progress", started_at=now_iso(), branch=task_branch)
-            run.steps = []
-            self.container.runs.upsert(run)
+                task_branch = f"task-{task.id}" if worktree_dir else self._ensure_branch()
+                run = RunRecord(task_id=task.id, status="in_progress", started_at=now_iso(), branch=task_branch)
+                run.steps = []
+                self.container.runs.upsert(run)
 
             cfg = self.container.config.load()
             max_review_attempts = int(dict(cfg.get("orchestrator") or {}).get("max_review_attempts", 3) or 3)
 
             # Resolve pipeline template from registry
-            registry = PipelineRegistry()
+            registry = project_registry(self.container.state_root)
             template = registry.resolve_for_task_type(task.task_type)
             steps = task.pipeline_template if task.pipeline_template else template.step_names()
             task.pipeline_template = steps
             has_review = "review" in steps
             has_commit = "commit" in steps
 
-            task.run_ids.append(run.id)
+            if run.id not in task.run_ids:
+                task.run_ids.append(run.id)
             task.current_step = steps[0] if steps else None
             task.status = "in_progress"
             task.current_agent_id = self._choose_agent_for_task(task)
@@ -899,19 +1921,37 @@ class OrchestratorService:
 
             mode = getattr(task, "hitl_mode", "autopilot") or "autopilot"
 
-            # Phase 1: Run all pre-review/pre-commit steps
-            for step in steps:
-                if step in ("review", "commit"):
+            # Phase 1: Run all pre-review/pre-commit steps, one group at a time
+            phase_steps = [step for step in steps if step not in ("review", "commit")]
+            for group in template.step_groups(phase_steps):
+                if all(step in completed_steps for step in group):
                     continue
-                gate_name = self._GATE_MAPPING.get(step)
-                if gate_name and should_gate(mode, gate_name):
-                    if not self._wait_for_gate(task, gate_name):
-                        self._abort_for_gate(task, run, gate_name)
-                        return
-                if not self._run_non_review_step(task, run, step, attempt=1):
+                if self._preemption_requested(task.id):
+                    self._park_task(task, run, worktree_dir, completed_steps)
+                    worktree_dir = None  # keep the worktree for the resumed run
+                    return
+                for step in group:
+                    gate_name = self._GATE_MAPPING.get(step)
+                    if gate_name and should_gate(mode, gate_name):
+                        if not self._wait_for_gate(task, gate_name):
+                            self._abort_for_gate(task, run, gate_name)
+                            return
+                if not self._run_step_group(task, run, group, template):
                     return
+                completed_steps.update(group)
+                self._widen_sparse_worktree(task, worktree_dir)
+
+            if (has_review or has_commit) and self._preemption_requested(task.id):
+                self._park_task(task, run, worktree_dir, completed_steps)
+                worktree_dir = None
+                return
 
             # Phase 2: Review loop (only if template has "review")
+            if has_review:
+                review_skip = self._skip_reason(task, run, template.step_def("review"))
+                if review_skip:
+                    self._record_skipped_step(task, run, "review", review_skip)
+                    has_review = False
             if has_review:
                 gate_name = self._GATE_MAPPING.get("review")
                 if gate_name and should_gate(mode, gate_name):
@@ -926,7 +1966,10 @@ class OrchestratorService:
                     review_attempt += 1
                     task.current_step = "review"
                     self.container.tasks.upsert(task)
-                    findings, review_result = self._findings_from_result(task, review_attempt)
+                    review_retries: list[dict[str, Any]] = []
+                    findings, review_result = self._findings_from_result(
+                        task, review_attempt, self._retry_limit(template, "review"), review_retries
+                    )
                     if review_result.human_blocking_issues:
                         self._block_for_human_issues(
                             task,
@@ -936,6 +1979,12 @@ class OrchestratorService:
                             review_result.human_blocking_issues,
                         )
                         return
+                    if review_result.status == "cancelled":
+                        run.steps.append(
+                            {"step": "review", "status": "cancelled", "ts": now_iso(), "summary": review_result.summary}
+                        )
+                        self._finish_cancelled(task, run, "review")
+                        return
                     if review_result.status != "ok":
                         task.status = "blocked"
                         task.error = review_result.summary or "Review step failed"
@@ -960,7 +2009,16 @@ class OrchestratorService:
                         decision="changes_requested" if self._exceeds_quality_gate(task, findings) else "approved",
                     )
                     self.container.reviews.append(cycle)
-                    run.steps.append({"step": "review", "status": cycle.decision, "ts": now_iso(), "open_counts": open_counts})
+                    review_log: dict[str, Any] = {
+                        "step": "review", "status": cycle.decision, "ts": now_iso(), "open_counts": open_counts
+                    }
+                    if review_retries:
+                        review_log["retries"] = review_retries
+                    if review_result.resource_usage:
+                        review_log["resources"] = review_result.resource_usage
+                    if review_result.run_dir:
+                        review_log["run_dir"] = review_result.run_dir
+                    run.steps.append(review_log)
                     self.bus.emit(
                         channel="review",
                         event_type="task.reviewed",
@@ -981,7 +2039,7 @@ class OrchestratorService:
                     for fix_step in ["implement_fix", "verify"]:
                         task.retry_count += 1
                         self.container.tasks.upsert(task)
-                        if not self._run_non_review_step(task, run, fix_step, attempt=review_attempt):
+                        if not self._run_non_review_step(task, run, fix_step, attempt=review_attempt, template=template):
                             return
                     task.metadata.pop("review_findings", None)
 
@@ -1004,6 +2062,7 @@ class OrchestratorService:
                         self._abort_for_gate(task, run, "before_commit")
                         return
 
+                self._widen_sparse_worktree(task, worktree_dir)
                 commit_sha = self._commit_for_task(task, worktree_dir)
                 run.steps.append({"step": "commit", "status": "ok", "ts": now_iso(), "commit": commit_sha})
 
@@ -1046,18 +2105,7 @@ class OrchestratorService:
                 # Templates without commit (research, repo_review, security_audit, review)
                 # Clean up worktree if present — no merge needed for non-commit pipelines
                 if worktree_dir:
-                    subprocess.run(
-                        ["git", "worktree", "remove", str(worktree_dir), "--force"],
-                        cwd=self.container.project_dir,
-                        capture_output=True,
-                        text=True,
-                    )
-                    subprocess.run(
-                        ["git", "branch", "-D", f"task-{task.id}"],
-                        cwd=self.container.project_dir,
-                        capture_output=True,
-                        text=True,
-                    )
+                    self._discard_worktree(task, worktree_dir)
                     worktree_dir = None  # prevent double-cleanup in finally
 
                 task.status = "done"
@@ -1074,18 +2122,7 @@ class OrchestratorService:
         finally:
             # Clean up worktree on any failure path
             if worktree_dir and worktree_dir.exists():
-                subprocess.run(
-                    ["git", "worktree", "remove", str(worktree_dir), "--force"],
-                    cwd=self.container.project_dir,
-                    capture_output=True,
-                    text=True,
-                )
-                subprocess.run(
-                    ["git", "branch", "-D", f"task-{task.id}"],
-                    cwd=self.container.project_dir,
-                    capture_output=True,
-                    text=True,
-                )
+                self._discard_worktree(task, worktree_dir)
             if task.metadata.pop("worktree_dir", None):
                 self.container.tasks.upsert(task)
 
@@ -1095,11 +2132,12 @@ def create_orchestrator(
     bus: EventBus,
     *,
     worker_adapter: WorkerAdapter | None = None,
+    supervisor: ProjectSupervisor | None = None,
 ) -> OrchestratorService:
     if worker_adapter is None:
         from .live_worker_adapter import LiveWorkerAdapter
 
         worker_adapter = LiveWorkerAdapter(container)
-    orchestrator = OrchestratorService(container, bus, worker_adapter=worker_adapter)
+    orchestrator = OrchestratorService(container, bus, worker_adapter=worker_adapter, supervisor=supervisor)
     orchestrator.ensure_worker()
     return orchestrator
@@ -0,0 +1,115 @@
+"""Lexical TF-IDF similarity used to pre-filter dependency analysis.
+
+Sending every candidate and every open task to an ``analyze_deps`` worker
+makes the prompt grow with the board.  Tasks that share no vocabulary or
+files rarely depend on each other.  So before calling a worker, the
+orchestrator indexes titles, descriptions, labels and referenced file paths.
+It then keeps only candidate pairs whose cosine similarity reaches
+``orchestrator.dependency_similarity_threshold``.  Connected pairs form
+clusters, split into batches of at most ``dependency_batch_size``, and each
+batch is analyzed on its own.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from ..domain.models import Task
+from .overlap import files_from_text
+
+_WORD_RE = re.compile(r"[a-z][a-z0-9_]{2,}")
+_STOPWORDS = frozenset(
+    "the and for with that this from into when then than should must will can are was were "
+    "not but all any each its our their there have has had been also via per use using able "
+    "task tasks new make sure".split()
+)
+
+
+def task_terms(task: Task) -> list[str]:
+    """Index terms for *task*: words plus ``file:`` terms for referenced paths."""
+    text = " ".join([task.title or "", task.description or "", " ".join(task.labels or [])])
+    terms = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+    for path in files_from_text(text):
+        terms.append(f"file:{path}")
+        # Sharing a directory is weaker evidence than sharing the file.
+        if "/" in path:
+            terms.append(f"dir:{path.rsplit('/', 1)[0]}")
+    return terms
+
+
+class TfidfIndex:
+    """Inverted index of L2-normalised TF-IDF vectors."""
+
+    def __init__(self, documents: dict[str, list[str]]) -> None:
+        count = len(documents)
+        df: Counter[str] = Counter()
+        for terms in documents.values():
+            df.update(set(terms))
+        idf = {term: math.log((1 + count) / (1 + freq)) + 1.0 for term, freq in df.items()}
+        self._vectors: dict[str, dict[str, float]] = {}
+        self._postings: dict[str, list[tuple[str, float]]] = defaultdict(list)
+        for doc_id, terms in documents.items():
+            tf = Counter(terms)
+            vector = {term: (1.0 + math.log(n)) * idf[term] for term, n in tf.items()}
+            norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+            vector = {term: w / norm for term, w in vector.items()}
+            self._vectors[doc_id] = vector
+            for term, weight in vector.items():
+                self._postings[term].append((doc_id, weight))
+
+    @classmethod
+    def from_tasks(cls, tasks: Iterable[Task]) -> "TfidfIndex":
+        return cls({task.id: task_terms(task) for task in tasks})
+
+    def similar_pairs(self, query_ids: Iterable[str], threshold: float) -> list[tuple[str, str, float]]:
+        """Pairs (query, other, score) with cosine similarity >= *threshold*.
+
+        Each unordered pair is reported once.
+        """
+        pairs: dict[tuple[str, str], float] = {}
+        for query in query_ids:
+            scores: dict[str, float] = defaultdict(float)
+            for term, weight in self._vectors.get(query, {}).items():
+                for other, other_weight in self._postings[term]:
+                    if other != query:
+                        scores[other] += weight * other_weight
+            for other, score in scores.items():
+                if score >= threshold:
+                    key = (query, other) if query < other else (other, query)
+                    pairs[key] = max(pairs.get(key, 0.0), score)
+        return [(a, b, round(score, 4)) for (a, b), score in sorted(pairs.items(), key=lambda item: -item[1])]
+
+
+def cluster_pairs(pairs: list[tuple[str, str, float]], max_size: int) -> list[list[str]]:
+    """Group similar ids into batches of at most *max_size*.
+
+    Connected components of the similarity graph are split greedily, walking
+    outward from the strongest edges, so the most similar tasks share a batch.
+    """
+    neighbours: dict[str, list[tuple[float, str]]] = defaultdict(list)
+    for a, b, score in pairs:
+        neighbours[a].append((score, b))
+        neighbours[b].append((score, a))
+    for items in neighbours.values():
+        items.sort(reverse=True)
+    batches: list[list[str]] = []
+    placed: set[str] = set()
+    for a, b, _ in pairs:  # strongest edges first
+        if a in placed and b in placed:
+            continue
+        seed = a if a not in placed else b
+        batch = [seed]
+        placed.add(seed)
+        frontier = [seed]
+        while frontier and len(batch) < max_size:
+            node = frontier.pop(0)
+            for _, other in neighbours[node]:
+                if other not in placed and len(batch) < max_size:
+                    placed.add(other)
+                    batch.append(other)
+                    frontier.append(other)
+        batches.append(batch)
+    return batches
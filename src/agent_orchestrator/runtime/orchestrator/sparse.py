@@ -0,0 +1,155 @@
+"""Sparse-checkout task worktrees scoped to the directories a task touches.
+
+A full ``git worktree add`` materialises the whole repository for every task,
+even one that only edits a single package.  With sparse worktrees enabled::
+
+    orchestrator:
+      sparse_worktrees: true
+      sparse_patterns:            # optional, per task type
+        docs: [docs]
+        frontend: [web, packages/ui]
+
+the orchestrator creates each worktree with ``--no-checkout``, sets a cone
+mode sparse-checkout and only then populates it.  The cone is built from
+directory hints:
+
+* ``path:<dir>`` task labels,
+* directories named in plan output (``metadata["plans"]``) that exist in the
+  tree,
+* ``sparse_patterns`` for the task type.
+
+A task without hints gets a regular full checkout.  Top-level files are
+always part of a cone.  After each step group the cone is widened to cover
+new plan hints and any directory the worker wrote to outside it, so the
+final ``git add -A`` sees every change.
+"""
+
+from __future__ import annotations
+
+import re
+import subprocess
+from pathlib import Path
+from typing import Any, Iterable
+
+from ..domain.models import Task
+
+_LABEL_PREFIX = "path:"
+# ``a/b`` or ``a/`` style tokens; a bare word is too ambiguous to treat as a path.
+_PATH_TOKEN_RE = re.compile(r"(?<![\w./-])\.?/?([A-Za-z0-9_][\w.-]*(?:(?:/[\w.-]+)+/?|/))")
+
+
+def sparse_enabled(orchestrator_cfg: dict[str, Any]) -> bool:
+    return bool(orchestrator_cfg.get("sparse_worktrees"))
+
+
+def _normalize_dir(raw: Any) -> str | None:
+    value = str(raw or "").strip().strip("/")
+    if value.startswith("./"):
+        value = value[2:]
+    if not value or value == "." or any(part in ("", ".", "..") for part in value.split("/")):
+        return None
+    return value
+
+
+def _git(cwd: Path, *args: str, check: bool = True) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(["git", *args], cwd=cwd, check=check, capture_output=True, text=True)
+
+
+def existing_dirs(project_dir: Path, candidates: Iterable[str], rev: str = "HEAD") -> set[str]:
+    """Return the subset of *candidates* that are directories in *rev*."""
+    wanted = sorted({c for c in candidates if c})
+    if not wanted:
+        return set()
+    result = _git(project_dir, "ls-tree", "-r", "-d", "--name-only", rev, "--", *wanted, check=False)
+    if result.returncode != 0:
+        return set()
+    return set(result.stdout.splitlines()) & set(wanted)
+
+
+def plan_path_hints(texts: Iterable[str], project_dir: Path, rev: str = "HEAD") -> list[str]:
+    """Directories mentioned in free-form plan text, resolved against the tree.
+
+    A mention of ``src/pkg/module.py`` yields ``src/pkg``: each token is cut
+    back to the deepest prefix that is a directory in *rev*.
+    """
+    tokens: list[list[str]] = []
+    for text in texts:
+        for match in _PATH_TOKEN_RE.finditer(str(text or "")):
+            token = _normalize_dir(match.group(1).rstrip(".").rstrip("/"))
+            if not token:
+                continue
+            parts = token.split("/")
+            tokens.append(["/".join(parts[:i]) for i in range(len(parts), 0, -1)])
+    known = existing_dirs(project_dir, (prefix for prefixes in tokens for prefix in prefixes), rev)
+    hints: list[str] = []
+    for prefixes in tokens:
+        deepest = next((prefix for prefix in prefixes if prefix in known), None)
+        if deepest and deepest not in hints:
+            hints.append(deepest)
+    return hints
+
+
+def sparse_hints(task: Task, orchestrator_cfg: dict[str, Any], project_dir: Path, rev: str = "HEAD") -> list[str]:
+    """Collect the sparse cone for *task*; an empty list means full checkout."""
+    hints: list[str] = []
+
+    def _add(raw: Any) -> None:
+        value = _normalize_dir(raw)
+        if value and value not in hints:
+            hints.append(value)
+
+    for label in task.labels or []:
+        if str(label).startswith(_LABEL_PREFIX):
+            _add(str(label)[len(_LABEL_PREFIX):])
+    plans = (task.metadata or {}).get("plans") if isinstance(task.metadata, dict) else None
+    if isinstance(plans, list):
+        texts = [str(item.get("content") or "") for item in plans if isinstance(item, dict)]
+        for hint in plan_path_hints(texts, project_dir, rev):
+            _add(hint)
+    patterns = orchestrator_cfg.get("sparse_patterns")
+    if isinstance(patterns, dict):
+        configured = patterns.get(task.task_type)
+        for raw in configured if isinstance(configured, list) else []:
+            _add(raw)
+    return hints
+
+
+def create_sparse_worktree(project_dir: Path, worktree_dir: Path, branch: str, dirs: list[str]) -> None:
+    """Add *worktree_dir* on a new *branch* with only *dirs* (plus top-level files) checked out."""
+    _git(project_dir, "worktree", "add", "--no-checkout", str(worktree_dir), "-b", branch)
+    try:
+        _git(worktree_dir, "sparse-checkout", "set", "--cone", "--", *dirs)
+        _git(worktree_dir, "read-tree", "-mu", "HEAD")
+    except subprocess.CalledProcessError:
+        _git(project_dir, "worktree", "remove", str(worktree_dir), "--force", check=False)
+        _git(project_dir, "branch", "-D", branch, check=False)
+        raise
+
+
+def _inside(path: str, cone: list[str]) -> bool:
+    return any(path == d or path.startswith(d + "/") for d in cone)
+
+
+def dirs_outside_cone(worktree_dir: Path, cone: list[str]) -> list[str]:
+    """Directories holding changed or untracked files that the cone does not cover."""
+    result = _git(worktree_dir, "status", "--porcelain", "-z", "--untracked-files=all", check=False)
+    if result.returncode != 0:
+        return []
+    outside: list[str] = []
+    entries = result.stdout.split("\0")
+    idx = 0
+    while idx < len(entries):
+        entry = entries[idx]
+        idx += 1
+        if len(entry) < 4:
+            continue
+        if entry[0] in "RC":
+            idx += 1  # skip the rename source
+        parent = entry[3:].rsplit("/", 1)[0] if "/" in entry[3:] else ""
+        if parent and not _inside(parent, cone) and parent not in outside:
+            outside.append(parent)
+    return outside
+
+
+def widen_sparse_checkout(worktree_dir: Path, dirs: list[str]) -> None:
+    _git(worktree_dir, "sparse-checkout", "add", "--", *dirs)
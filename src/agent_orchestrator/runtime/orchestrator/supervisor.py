@@ -0,0 +1,169 @@
+"""One scheduler thread sharing a global worker budget across projects.
+
+Without a supervisor every :class:`OrchestratorService` runs its own loop
+thread and fills its own ``concurrency``.  Ten busy projects can therefore
+run ten times that many agents.  The server instead attaches each project's
+service to a :class:`ProjectSupervisor`.  The supervisor owns the only
+scheduler thread and a single budget of ``max_workers`` slots, covering
+running tasks and fanned-out parallel steps.
+
+Each scheduling round fills the free slots one claim at a time.  It always
+offers the next slot to the project with the fewest slots in use per unit of
+weight (``orchestrator.weight`` in that project's config, default 1), with
+ties going to the project served least recently.  A project that has nothing
+to claim drops out for the rest of the round.  Per-project ``concurrency``
+still caps each project on top of the shared budget.
+
+When no budget is given, it defaults to the largest per-project capacity
+among attached projects.  A single project then behaves exactly as it did
+with its own loop.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter
+from typing import Any, Optional
+
+from .service import OrchestratorService, _task_capacity
+
+logger = logging.getLogger(__name__)
+
+
+class _Member:
+    def __init__(self, service: OrchestratorService) -> None:
+        self.service = service
+        self.claims = 0
+        self.last_served = 0
+
+
+class ProjectSupervisor:
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        *,
+        poll_seconds: float = 1.0,
+        idle_seconds: float = 2.0,
+    ) -> None:
+        self._max_workers = max(int(max_workers), 1) if max_workers else None
+        self._poll_seconds = poll_seconds
+        self._idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._members: dict[str, _Member] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._seq = 0
+        self._rounds = 0
+
+    # -- membership ------------------------------------------------------
+
+    def register(self, service: OrchestratorService) -> None:
+        with self._lock:
+            self._members.setdefault(service.container.project_id, _Member(service))
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="orchestrator-supervisor")
+                self._thread.start()
+
+    def unregister(self, service: OrchestratorService) -> None:
+        with self._lock:
+            member = self._members.get(service.container.project_id)
+            if member is not None and member.service is service:
+                del self._members[service.container.project_id]
+
+    def shutdown(self, *, timeout: float = 10.0) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread and thread.is_alive():
+            thread.join(timeout=max(timeout, 0.0))
+        self._thread = None
+
+    # -- budget ----------------------------------------------------------
+
+    @staticmethod
+    def _orchestrator_cfg(service: OrchestratorService) -> dict[str, Any]:
+        return dict(service.container.config.load().get("orchestrator") or {})
+
+    @classmethod
+    def _weight(cls, service: OrchestratorService) -> float:
+        try:
+            weight = float(cls._orchestrator_cfg(service).get("weight", 1) or 1)
+        except (TypeError, ValueError):
+            weight = 1.0
+        return weight if weight > 0 else 1.0
+
+    def _budget(self, members: list[_Member]) -> int:
+        if self._max_workers:
+            return self._max_workers
+        return max((_task_capacity(self._orchestrator_cfg(m.service)) for m in members), default=0)
+
+    def has_capacity(self) -> bool:
+        """True while attached projects use fewer slots than the budget."""
+        with self._lock:
+            members = list(self._members.values())
+        return sum(m.service.slots_in_use() for m in members) < self._budget(members)
+
+    # -- scheduling ------------------------------------------------------
+
+    def schedule_once(self) -> int:
+        """Run one fair-share round; returns the number of tasks claimed."""
+        with self._lock:
+            members = list(self._members.values())
+        self._rounds += 1
+        budget = self._budget(members)
+        weights = {id(m): self._weight(m.service) for m in members}
+        in_use = {id(m): m.service.slots_in_use() for m in members}
+        claimed: Counter[int] = Counter()
+        exhausted: set[int] = set()
+        while sum(in_use.values()) < budget:
+            eligible = [m for m in members if id(m) not in exhausted]
+            if not eligible:
+                break
+            member = min(eligible, key=lambda m: (in_use[id(m)] / weights[id(m)], m.last_served))
+            try:
+                handled = member.service.tick_once()
+            except Exception:
+                logger.exception("Scheduling round failed for project %s", member.service.container.project_id)
+                handled = False
+            if not handled:
+                exhausted.add(id(member))
+                continue
+            self._seq += 1
+            member.last_served = self._seq
+            member.claims += 1
+            claimed[id(member)] += 1
+            in_use[id(member)] = max(member.service.slots_in_use(), in_use[id(member)] + 1)
+        for member in members:
+            member.service._after_tick(claimed[id(member)] > 0)
+        return sum(claimed.values())
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.schedule_once()
+            except Exception:
+                logger.exception("Supervisor round failed")
+                claimed = 0
+            self._stop.wait(self._poll_seconds if claimed else self._idle_seconds)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            members = list(self._members.values())
+        projects = {
+            m.service.container.project_id: {
+                "weight": self._weight(m.service),
+                "slots_in_use": m.service.slots_in_use(),
+                "claims": m.claims,
+            }
+            for m in members
+        }
+        return {
+            "max_workers": self._budget(members),
+            "slots_in_use": sum(p["slots_in_use"] for p in projects.values()),
+            "rounds": self._rounds,
+            "projects": projects,
+        }
@@ -14,6 +14,17 @@ class StepResult:
     generated_tasks: list[dict[str, Any]] | None = None
     dependency_edges: list[dict[str, str]] | None = None
     human_blocking_issues: list[dict[str, str]] | None = None
+    # True when the failure is transient (stall, network, rate limit) and the
+    # orchestrator may retry the step; deterministic failures block at once.
+    retryable: bool = False
+    # CPU time, peak RSS and child-process counts of the worker subprocess.
+    resource_usage: dict[str, Any] | None = None
+    # Machine-readable cause for failures with a dedicated remedy, e.g.
+    # "resource_limit:memory".
+    failure_reason: str | None = None
+    # Directory holding prompt.txt, stdout.log and stderr.log, relative to
+    # the state root.
+    run_dir: str | None = None
 
 
 class WorkerAdapter(Protocol):
@@ -45,6 +56,7 @@ class DefaultWorkerAdapter:
                         if isinstance(raw.get("human_blocking_issues"), list)
                         else None
                     ),
+                    retryable=bool(raw.get("retryable", False)),
                 )
 
         if step == "review":
@@ -0,0 +1,204 @@
+"""Pool of pre-created git worktrees kept warm for task execution.
+
+``git worktree add`` on a large repository costs seconds of checkout I/O per
+task.  With ``orchestrator.worktree_pool_size`` set, the orchestrator keeps
+that many detached worktrees under ``.agent_orchestrator/worktree_pool/``.
+A task takes one, moves it to ``worktrees/<task_id>`` and creates
+``task-<id>`` at the run branch head.  When ``task-<id>`` already exists
+(for example kept as ``unmerged_branch`` after a merge conflict) the pool
+refuses, like ``git worktree add -b`` on the slow path, so the branch is
+never reset and its work is kept.  Afterwards the worktree is scrubbed
+(detached, reset, ``clean -ffdx``) and returned to the pool.  Ignored files
+such as ``node_modules``, virtualenvs and build output are removed too, so
+nothing carries over from one task to the next; what stays warm is the
+checkout of tracked files.
+"""
+
+from __future__ import annotations
+
+import logging
+import subprocess
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def _branch_exists(project_dir: Path, branch: str) -> bool:
+    """Return True when the local branch *branch* exists in *project_dir*."""
+    result = subprocess.run(
+        ["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"],
+        cwd=project_dir,
+        capture_output=True,
+        text=True,
+    )
+    return result.returncode == 0
+
+
+class WorktreePool:
+    def __init__(self, project_dir: Path, pool_dir: Path) -> None:
+        self._project_dir = project_dir
+        self._pool_dir = pool_dir
+        self._lock = threading.Lock()
+        self._free: list[Path] = []
+        self._size = 0
+        self._creating = 0
+        self._refill_thread: threading.Thread | None = None
+        self._hits = 0
+        self._misses = 0
+        self._created = 0
+        self._create_seconds_total = 0.0
+        self._last_create_seconds = 0.0
+        self._adopt_existing()
+
+    def _git(self, *args: str, cwd: Path | None = None) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            ["git", *args],
+            cwd=cwd or self._project_dir,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+
+    def _adopt_existing(self) -> None:
+        """Reuse pool worktrees left by a previous process."""
+        if not self._pool_dir.exists():
+            return
+        for child in sorted(self._pool_dir.iterdir()):
+            if child.is_dir() and (child / ".git").exists():
+                self._free.append(child)
+
+    def configure(self, size: int) -> None:
+        with self._lock:
+            self._size = max(int(size), 0)
+            surplus = self._free[self._size:]
+            del self._free[self._size:]
+        for path in surplus:
+            self._remove(path)
+        self.refill_async()
+
+    # -- acquisition -----------------------------------------------------
+
+    def acquire(self, target_dir: Path, branch: str, base: str) -> bool:
+        """Turn a warm worktree into *target_dir* on a new *branch* at *base*.
+
+        Returns False on a pool miss, when *branch* already exists, or when
+        preparing the worktree fails; the caller then creates a worktree the
+        slow way.
+        """
+        if _branch_exists(self._project_dir, branch):
+            return False
+        with self._lock:
+            path = self._free.pop() if self._free else None
+            if path is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        self.refill_async()
+        if path is None:
+            return False
+        try:
+            target_dir.parent.mkdir(parents=True, exist_ok=True)
+            self._git("worktree", "move", str(path), str(target_dir))
+            self._git("checkout", "--force", "-b", branch, base, cwd=target_dir)
+            self._git("clean", "-ffdx", cwd=target_dir)
+            return True
+        except subprocess.CalledProcessError as exc:
+            logger.warning("Warm worktree %s unusable (%s); creating a fresh one", path, exc.stderr or exc)
+            self._remove(target_dir if target_dir.exists() else path)
+            return False
+
+    def release(self, worktree_dir: Path) -> bool:
+        """Scrub *worktree_dir* and return it to the pool.
+
+        Returns False when the pool is full or scrubbing failed; the caller
+        then removes the worktree as usual.
+        """
+        with self._lock:
+            if len(self._free) + self._creating >= self._size:
+                return False
+        path = self._pool_dir / uuid.uuid4().hex[:12]
+        try:
+            self._git("checkout", "--force", "--detach", cwd=worktree_dir)
+            self._git("reset", "--hard", cwd=worktree_dir)
+            self._git("clean", "-ffdx", cwd=worktree_dir)
+            self._pool_dir.mkdir(parents=True, exist_ok=True)
+            self._git("worktree", "move", str(worktree_dir), str(path))
+        except subprocess.CalledProcessError as exc:
+            logger.warning("Could not return worktree %s to pool: %s", worktree_dir, exc.stderr or exc)
+            return False
+        with self._lock:
+            self._free.append(path)
+        return True
+
+    # -- background refill -----------------------------------------------
+
+    def refill_async(self) -> None:
+        with self._lock:
+            if len(self._free) + self._creating >= self._size:
+                return
+            if self._refill_thread is not None and self._refill_thread.is_alive():
+                return
+            self._refill_thread = threading.Thread(target=self._refill, daemon=True, name="worktree-pool")
+            self._refill_thread.start()
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._free) + self._creating >= self._size:
+                    return
+                self._creating += 1
+            path = self._pool_dir / uuid.uuid4().hex[:12]
+            started = time.monotonic()
+            try:
+                self._pool_dir.mkdir(parents=True, exist_ok=True)
+                self._git("worktree", "add", "--detach", str(path), "HEAD")
+            except subprocess.CalledProcessError as exc:
+                logger.warning("Failed to pre-create worktree: %s", exc.stderr or exc)
+                with self._lock:
+                    self._creating -= 1
+                return
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._creating -= 1
+                self._free.append(path)
+                self._created += 1
+                self._create_seconds_total += elapsed
+                self._last_create_seconds = elapsed
+
+    def _remove(self, path: Path) -> None:
+        subprocess.run(
+            ["git", "worktree", "remove", str(path), "--force"],
+            cwd=self._project_dir,
+            capture_output=True,
+            text=True,
+        )
+
+    def wait_warm(self, timeout: float = 30.0) -> bool:
+        """Block until the pool holds ``size`` warm worktrees (used by tests and startup)."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if len(self._free) >= self._size:
+                    return True
+            time.sleep(0.05)
+        return False
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._size > 0,
+                "size": self._size,
+                "warm": len(self._free),
+                "creating": self._creating,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "created": self._created,
+                "avg_create_seconds": round(self._create_seconds_total / self._created, 3) if self._created else 0.0,
+                "last_create_seconds": round(self._last_create_seconds, 3),
+            }
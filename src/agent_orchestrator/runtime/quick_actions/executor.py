@@ -7,7 +7,6 @@ from __future__ import annotations
 
 import shlex
 import subprocess
-import tempfile
 from pathlib import Path
 
 from ...workers.config import get_workers_runtime_config, resolve_worker_for_step
@@ -130,34 +129,38 @@ class QuickActionExecutor:
                 )
                 return run
 
-            run_dir = Path(tempfile.mkdtemp(dir=str(self._container.state_root)))
+            artifacts = self._container.artifacts
+            run_dir = artifacts.create_run_dir()
             progress_path = run_dir / "progress.json"
 
-            result = run_worker(
-                spec=spec,
-                prompt=run.prompt,
-                project_dir=self._container.project_dir,
-                run_dir=run_dir,
-                timeout_seconds=120,
-                heartbeat_seconds=30,
-                heartbeat_grace_seconds=15,
-                progress_path=progress_path,
-            )
+            try:
+                result = run_worker(
+                    spec=spec,
+                    prompt=run.prompt,
+                    project_dir=self._container.project_dir,
+                    run_dir=run_dir,
+                    timeout_seconds=120,
+                    heartbeat_seconds=30,
+                    heartbeat_grace_seconds=15,
+                    progress_path=progress_path,
+                )
 
-            if result.timed_out:
-                run.exit_code = result.exit_code
-                run.status = "failed"
-                run.result_summary = "Worker timed out"
-            else:
-                output = result.response_text
-                if not output and result.stdout_path:
-                    try:
-                        output = Path(result.stdout_path).read_text(errors="replace")
-                    except Exception:
-                        output = ""
-                run.exit_code = result.exit_code
-                run.status = "completed" if result.exit_code == 0 else "failed"
-                run.result_summary = (output[:_MAX_OUTPUT] if output else "(no output)")
+                if result.timed_out:
+                    run.exit_code = result.exit_code
+                    run.status = "failed"
+                    run.result_summary = "Worker timed out"
+                else:
+                    output = result.response_text
+                    if not output and result.stdout_path:
+                        try:
+                            output = Path(result.stdout_path).read_text(errors="replace")
+                        except Exception:
+                            output = ""
+                    run.exit_code = result.exit_code
+                    run.status = "completed" if result.exit_code == 0 else "failed"
+                    run.result_summary = (output[:_MAX_OUTPUT] if output else "(no output)")
+            finally:
+                artifacts.finalize(run_dir)
 
         except ValueError as exc:
             run.status = "failed"
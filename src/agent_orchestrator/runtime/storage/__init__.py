@@ -1,4 +1,12 @@
+from .artifacts import ArtifactJanitor, ArtifactStore, RetentionPolicy, retention_from_config
 from .bootstrap import ensure_state_root
 from .container import Container
 
-__all__ = ["Container", "ensure_state_root"]
+__all__ = [
+    "ArtifactJanitor",
+    "ArtifactStore",
+    "Container",
+    "RetentionPolicy",
+    "ensure_state_root",
+    "retention_from_config",
+]
@@ -0,0 +1,303 @@
+"""Managed storage for worker run directories.
+
+Every worker step gets a run directory under ``<state_root>/artifacts/runs``.
+Each directory holds ``prompt.txt``, ``stdout.log``, ``stderr.log`` and
+``progress.json``.  :meth:`ArtifactStore.finalize` runs once the step's
+result has been read:
+
+* ``prompt.txt`` is deduplicated by content hash.  The text is kept once in
+  ``artifacts/prompts/<sha256>.txt``, and each run's ``prompt.txt`` becomes
+  a hard link to it.  Readers still find an ordinary file.
+* logs of 1 KiB or more are gzip-compressed to ``<name>.gz``.
+  :meth:`ArtifactStore.log_path` finds either form.
+
+Retention is configured in ``config.yaml``::
+
+    artifacts:
+      max_age_days: 14                 # delete run dirs older than this
+      max_total_mb: 2048               # then oldest first down to this size
+      janitor_interval_seconds: 600
+
+:class:`ArtifactJanitor` applies it on a daemon thread.  Prompt blobs no run
+links to any more are removed with their last run.  Run directories created
+directly under the state root by earlier versions are pruned the same way.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_LOG_FILES = ("stdout.log", "stderr.log")
+_COMPRESS_MIN_BYTES = 1024
+# Size-based pruning leaves directories touched this recently alone.
+_MIN_PRUNE_AGE_SECONDS = 300.0
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    max_age_seconds: Optional[float] = 14 * 24 * 3600.0
+    max_total_bytes: Optional[int] = 2048 * 1024 * 1024
+    interval_seconds: float = 600.0
+
+
+def retention_from_config(cfg: dict[str, Any]) -> RetentionPolicy:
+    """Read the ``artifacts`` section of a project config; 0 disables a limit."""
+    section = cfg.get("artifacts")
+    raw: dict[str, Any] = section if isinstance(section, dict) else {}
+    default = RetentionPolicy()
+
+    def _number(key: str) -> Optional[float]:
+        value = raw.get(key)
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0 else None
+
+    days = _number("max_age_days")
+    total_mb = _number("max_total_mb")
+    interval = _number("janitor_interval_seconds")
+    return RetentionPolicy(
+        max_age_seconds=default.max_age_seconds if days is None else (days * 24 * 3600.0 or None),
+        max_total_bytes=default.max_total_bytes if total_mb is None else (int(total_mb * 1024 * 1024) or None),
+        interval_seconds=max(interval, 1.0) if interval else default.interval_seconds,
+    )
+
+
+class ArtifactStore:
+    """Run directories, deduplicated prompts and compressed logs of one project."""
+
+    def __init__(self, state_root: Path) -> None:
+        self.state_root = state_root
+        self.root = state_root / "artifacts"
+        self.runs_dir = self.root / "runs"
+        self.prompts_dir = self.root / "prompts"
+        self._lock = threading.Lock()
+        self._active: set[Path] = set()
+        self._stats = {
+            "run_dirs_created": 0,
+            "prompts_deduplicated": 0,
+            "logs_compressed": 0,
+            "compression_saved_bytes": 0,
+            "run_dirs_pruned": 0,
+            "pruned_bytes": 0,
+        }
+        self._usage: Optional[dict[str, int]] = None
+        self._last_prune: Optional[float] = None
+
+    # -- step lifecycle ------------------------------------------------------
+
+    def create_run_dir(self) -> Path:
+        self.runs_dir.mkdir(parents=True, exist_ok=True)
+        run_dir = Path(tempfile.mkdtemp(prefix=time.strftime("%Y%m%d-%H%M%S-"), dir=str(self.runs_dir)))
+        with self._lock:
+            self._active.add(run_dir)
+            self._stats["run_dirs_created"] += 1
+        return run_dir
+
+    def finalize(self, run_dir: Path) -> None:
+        """Deduplicate the prompt and compress the logs of a finished step."""
+        try:
+            self._dedupe_prompt(run_dir / "prompt.txt")
+            for name in _LOG_FILES:
+                self._compress(run_dir / name)
+        except OSError as exc:
+            logger.warning("Could not finalize artifacts in %s: %s", run_dir, exc)
+        finally:
+            with self._lock:
+                self._active.discard(run_dir)
+            self._usage = None
+
+    def log_path(self, run_dir: Path, name: str) -> Path:
+        """Path of *name* in *run_dir*, plain or compressed, whichever exists."""
+        plain = run_dir / name
+        compressed = run_dir / f"{name}.gz"
+        return compressed if not plain.exists() and compressed.exists() else plain
+
+    def _dedupe_prompt(self, prompt: Path) -> None:
+        if not prompt.is_file() or prompt.stat().st_nlink > 1:
+            return
+        digest = hashlib.sha256(prompt.read_bytes()).hexdigest()
+        self.prompts_dir.mkdir(parents=True, exist_ok=True)
+        blob = self.prompts_dir / f"{digest}.txt"
+        try:
+            os.link(prompt, blob)
+            return
+        except FileExistsError:
+            pass
+        # Same text already stored: point this run at the existing blob.
+        staged = prompt.with_name(".prompt.txt.link")
+        try:
+            os.link(blob, staged)
+        except OSError:
+            return
+        os.replace(staged, prompt)
+        with self._lock:
+            self._stats["prompts_deduplicated"] += 1
+
+    def _compress(self, path: Path) -> None:
+        if not path.is_file():
+            return
+        size = path.stat().st_size
+        if size < _COMPRESS_MIN_BYTES:
+            return
+        target = path.with_name(f"{path.name}.gz")
+        with open(path, "rb") as source, gzip.open(target, "wb", compresslevel=6) as sink:
+            shutil.copyfileobj(source, sink)
+        path.unlink()
+        with self._lock:
+            self._stats["logs_compressed"] += 1
+            self._stats["compression_saved_bytes"] += max(size - target.stat().st_size, 0)
+
+    # -- retention -----------------------------------------------------------
+
+    def _run_dirs(self) -> Iterator[Path]:
+        if self.runs_dir.is_dir():
+            yield from (path for path in self.runs_dir.iterdir() if path.is_dir())
+        # Directories from before the store existed: mkdtemp names in the state root.
+        for path in self.state_root.glob("tmp*"):
+            if path.is_dir() and (path / "prompt.txt").exists():
+                yield path
+
+    @staticmethod
+    def _scan(run_dir: Path) -> tuple[float, int]:
+        """Newest mtime in *run_dir* and its bytes, not counting hard-linked prompts."""
+        newest = run_dir.stat().st_mtime
+        size = 0
+        for entry in os.scandir(run_dir):
+            stat = entry.stat(follow_symlinks=False)
+            # A shared prompt blob's mtime says nothing about this run.
+            if stat.st_nlink <= 1:
+                newest = max(newest, stat.st_mtime)
+                size += stat.st_size
+        return newest, size
+
+    def prune(self, policy: RetentionPolicy, *, now: Optional[float] = None) -> dict[str, int]:
+        """Apply *policy*; returns how many run dirs and bytes were removed."""
+        now = time.time() if now is None else now
+        with self._lock:
+            active = set(self._active)
+        candidates: list[tuple[float, int, Path]] = []
+        total = self._blob_bytes()
+        for run_dir in self._run_dirs():
+            try:
+                newest, size = self._scan(run_dir)
+            except OSError:
+                continue
+            total += size
+            if run_dir not in active:
+                candidates.append((newest, size, run_dir))
+        candidates.sort()
+
+        removed = removed_bytes = 0
+        for newest, size, run_dir in candidates:
+            age = now - newest
+            expired = policy.max_age_seconds is not None and age > policy.max_age_seconds
+            oversize = (
+                policy.max_total_bytes is not None
+                and total > policy.max_total_bytes
+                and age > _MIN_PRUNE_AGE_SECONDS
+            )
+            if not (expired or oversize):
+                continue
+            shutil.rmtree(run_dir, ignore_errors=True)
+            removed += 1
+            removed_bytes += size
+            total -= size
+        removed_bytes += self._drop_orphan_blobs()
+        with self._lock:
+            self._stats["run_dirs_pruned"] += removed
+            self._stats["pruned_bytes"] += removed_bytes
+        self._last_prune = now
+        self._usage = None
+        return {"run_dirs": removed, "bytes": removed_bytes}
+
+    def _blob_bytes(self) -> int:
+        if not self.prompts_dir.is_dir():
+            return 0
+        return sum(entry.stat().st_size for entry in os.scandir(self.prompts_dir))
+
+    def _drop_orphan_blobs(self) -> int:
+        """Delete prompt blobs no run directory links to; returns bytes freed."""
+        if not self.prompts_dir.is_dir():
+            return 0
+        freed = 0
+        for entry in os.scandir(self.prompts_dir):
+            stat = entry.stat()
+            if stat.st_nlink <= 1:
+                try:
+                    os.unlink(entry.path)
+                    freed += stat.st_size
+                except OSError:
+                    pass
+        return freed
+
+    # -- reporting -----------------------------------------------------------
+
+    def usage(self) -> dict[str, Any]:
+        """Disk usage and counters; the disk scan is cached until artifacts change."""
+        usage = self._usage
+        if usage is None:
+            run_dirs = bytes_on_disk = 0
+            for run_dir in self._run_dirs():
+                try:
+                    _newest, size = self._scan(run_dir)
+                except OSError:
+                    continue
+                run_dirs += 1
+                bytes_on_disk += size
+            blobs = len(list(self.prompts_dir.glob("*.txt"))) if self.prompts_dir.is_dir() else 0
+            prompt_bytes = self._blob_bytes()
+            usage = self._usage = {
+                "run_dirs": run_dirs,
+                "prompt_blobs": blobs,
+                "prompt_bytes": prompt_bytes,
+                "bytes": bytes_on_disk + prompt_bytes,
+            }
+        with self._lock:
+            stats = dict(self._stats)
+            active = len(self._active)
+        return {**usage, **stats, "active_run_dirs": active, "last_prune": self._last_prune}
+
+
+class ArtifactJanitor:
+    """Prune an :class:`ArtifactStore` on a daemon thread, re-reading the policy each round."""
+
+    def __init__(self, store: ArtifactStore, policy: Callable[[], RetentionPolicy], *, name: str = "artifact-janitor") -> None:
+        self._store = store
+        self._policy = policy
+        self._name = name
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, daemon=True, name=self._name)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_once(self) -> dict[str, int]:
+        return self._store.prune(self._policy())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            interval = RetentionPolicy().interval_seconds
+            try:
+                interval = self._policy().interval_seconds
+                removed = self.run_once()
+                if removed["run_dirs"]:
+                    logger.info("Pruned %d run dirs (%d bytes) from %s", removed["run_dirs"], removed["bytes"], self._store.root)
+            except Exception:
+                logger.exception("%s run failed", self._name)
+            self._stop.wait(interval)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from pathlib import Path
 
+from .artifacts import ArtifactStore
 from .bootstrap import ensure_state_root
 from .file_repos import (
     FileAgentRepository,
@@ -26,6 +27,7 @@ class Container:
         self.quick_actions = FileQuickActionRepository(self.state_root / "quick_actions.yaml", self.state_root / "quick_actions.lock")
         self.events = FileEventRepository(self.state_root / "events.jsonl", self.state_root / "events.lock")
         self.config = FileConfigRepository(self.state_root / "config.yaml", self.state_root / "config.lock")
+        self.artifacts = ArtifactStore(self.state_root)
 
     @property
     def project_id(self) -> str:
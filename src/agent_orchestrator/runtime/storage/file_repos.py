@@ -16,6 +16,7 @@ from .interfaces import (
     QuickActionRepository,
     ReviewRepository,
     RunRepository,
+    TaskOrder,
     TaskRepository,
 )
 
@@ -130,7 +131,17 @@ class FileTaskRepository(TaskRepository):
                 self._repo._save(keep)
         return True
 
-    def claim_next_runnable(self, *, max_in_progress: int) -> Optional[Task]:
+    def claim_next_runnable(
+        self,
+        *,
+        max_in_progress: int,
+        order: Optional[TaskOrder] = None,
+    ) -> Optional[Task]:
+        """Atomically claim the best runnable task.
+
+        *order* sorts the runnable tasks best-first given the whole board; it
+        defaults to (priority, retry_count, created_at).
+        """
         with self._repo._thread_lock:
             with self._repo._lock:
                 tasks = self._repo._load()
@@ -152,7 +163,10 @@ class FileTaskRepository(TaskRepository):
                     return True
 
                 runnable = [t for t in tasks if _is_runnable(t)]
-                runnable.sort(key=lambda t: (_priority_rank(t.priority), t.retry_count, t.created_at))
+                if order is not None:
+                    runnable = order(runnable, tasks)
+                else:
+                    runnable.sort(key=lambda t: (_priority_rank(t.priority), t.retry_count, t.created_at))
                 if not runnable:
                     return None
                 selected = runnable[0]
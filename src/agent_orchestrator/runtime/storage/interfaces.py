@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from ..domain.models import AgentRecord, QuickActionRun, ReviewCycle, RunRecord, Task
 
+# ``order(runnable, all_tasks)`` for ``claim_next_runnable``.  Declared here
+# because ``list`` inside the repository classes names their ``list()`` method.
+TaskOrder = Callable[[list[Task], list[Task]], list[Task]]
 
 class TaskRepository(ABC):
     @abstractmethod
@@ -24,7 +27,12 @@ class TaskRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def claim_next_runnable(self, *, max_in_progress: int) -> Optional[Task]:
+    def claim_next_runnable(
+        self,
+        *,
+        max_in_progress: int,
+        order: Optional[TaskOrder] = None,
+    ) -> Optional[Task]:
         raise NotImplementedError
 
 
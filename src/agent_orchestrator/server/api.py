@@ -13,7 +13,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from ..runtime.api import create_router
 from ..runtime.events import EventBus
 from ..runtime.events import hub
-from ..runtime.orchestrator import WorkerAdapter, create_orchestrator
+from ..runtime.orchestrator import ProjectSupervisor, RemoteWorkerAdapter, RemoteWorkerRegistry, WorkerAdapter, create_orchestrator
 from ..runtime.storage import Container
 
 
@@ -21,10 +21,12 @@ def create_app(
     project_dir: Optional[Path] = None,
     enable_cors: bool = True,
     worker_adapter: Optional[WorkerAdapter] = None,
+    max_workers: Optional[int] = None,
 ) -> FastAPI:
     @asynccontextmanager
     async def _lifespan(app: FastAPI):
         hub.attach_loop(asyncio.get_running_loop())
+        _start_pinned_projects()
         try:
             yield
         finally:
@@ -34,6 +36,7 @@ def create_app(
                     orchestrator.shutdown(timeout=10.0)
                 except Exception:
                     pass
+            app.state.supervisor.shutdown(timeout=10.0)
             app.state.orchestrators = {}
             app.state.containers = {}
             app.state.import_jobs = {}
@@ -58,6 +61,10 @@ def create_app(
     app.state.containers = {}
     app.state.orchestrators = {}
     app.state.import_jobs = {}
+    # One scheduler thread and worker budget shared by every project.
+    app.state.supervisor = ProjectSupervisor(max_workers)
+    # Worker agents on other machines (``agent-orchestrator worker serve``).
+    app.state.remote_workers = RemoteWorkerRegistry()
 
     def _resolve_project_dir(project_dir_param: Optional[str] = None) -> Path:
         if project_dir_param:
@@ -80,12 +87,29 @@ def create_app(
         cache = app.state.orchestrators
         if key not in cache:
             container = _resolve_container(project_dir_param)
-            cache[key] = create_orchestrator(container, bus=app.state.bus_factory(container), worker_adapter=worker_adapter)
+            cache[key] = create_orchestrator(
+                container,
+                bus=app.state.bus_factory(container),
+                worker_adapter=worker_adapter or RemoteWorkerAdapter(container, app.state.remote_workers),
+                supervisor=app.state.supervisor,
+            )
         return cache[key]
 
+    def _start_pinned_projects() -> None:
+        """Attach the default project's pinned projects to the supervisor."""
+        if not app.state.default_project_dir:
+            return
+        cfg = _resolve_container().config.load()
+        for entry in list(cfg.get("pinned_projects") or []):
+            path = Path(str(entry.get("path") or "")).expanduser()
+            if entry.get("path") and path.is_dir():
+                _resolve_orchestrator(str(path))
+
     app.state.bus_factory = lambda container: EventBus(container.events, container.project_id)
 
-    app.include_router(create_router(_resolve_container, _resolve_orchestrator, app.state.import_jobs))
+    app.include_router(
+        create_router(_resolve_container, _resolve_orchestrator, app.state.import_jobs, app.state.remote_workers)
+    )
 
     @app.get("/")
     async def root(project_dir: Optional[str] = Query(None)) -> dict[str, object]:
@@ -3,9 +3,6 @@
 from __future__ import annotations
 
 import shlex
-import subprocess
-import sys
-import threading
 import time
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
@@ -13,39 +10,7 @@ from typing import Any, Callable, Optional
 
 from .io_utils import _heartbeat_from_progress, _read_log_tail
 from .utils import _now_iso
-
-
-def _stream_pipe(pipe: Any, file_path: Path, label: str, to_stderr: bool, quiet: bool = True) -> None:
-    prefix = f"[codex {label}] "
-    with open(file_path, "w") as handle:
-        for line in iter(pipe.readline, ""):
-            handle.write(line)
-            handle.flush()
-            if quiet:
-                continue
-            if to_stderr:
-                sys.stderr.write(prefix + line)
-                sys.stderr.flush()
-            else:
-                sys.stdout.write(prefix + line)
-                sys.stdout.flush()
-    try:
-        pipe.close()
-    except Exception:
-        pass
-
-
-def _latest_mtime(paths: list[Path]) -> Optional[datetime]:
-    latest: Optional[datetime] = None
-    for path in paths:
-        try:
-            mtime = path.stat().st_mtime
-        except OSError:
-            continue
-        stamp = datetime.fromtimestamp(mtime, tz=timezone.utc)
-        if latest is None or stamp > latest:
-            latest = stamp
-    return latest
+from .worker_supervisor import WorkerLaunch, worker_supervisor
 
 
 def _run_codex_worker(
@@ -59,6 +24,7 @@ def _run_codex_worker(
     progress_path: Path,
     expected_run_id: Optional[str] = None,
     on_spawn: Optional[Callable[[int], None]] = None,
+    on_output: Optional[Callable[[str, str], None]] = None,
 ) -> dict[str, Any]:
     prompt_path = run_dir / "prompt.txt"
     prompt_path.write_text(prompt)
@@ -86,99 +52,35 @@ def _run_codex_worker(
     stderr_path = run_dir / "stderr.log"
     start_time = time.monotonic()
     start_iso = _now_iso()
-    timed_out = False
-    no_heartbeat = False
-    last_heartbeat = None
-
-    process = subprocess.Popen(
-        command_parts,
-        cwd=project_dir,
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-    )
-
-    if on_spawn:
-        try:
-            on_spawn(process.pid)
-        except Exception:
-            pass
-
-    stdout_thread = threading.Thread(
-        target=_stream_pipe,
-        args=(process.stdout, stdout_path, "stdout", False),
-        daemon=True,
-    )
-    stderr_thread = threading.Thread(
-        target=_stream_pipe,
-        args=(process.stderr, stderr_path, "stderr", True),
-        daemon=True,
-    )
-    stdout_thread.start()
-    stderr_thread.start()
 
-    if not uses_prompt_placeholder and expects_stdin:
-        if process.stdin:
-            try:
-                process.stdin.write(prompt)
-                process.stdin.flush()
-                process.stdin.close()
-            except BrokenPipeError:
-                pass
+    # A progress file left over from an earlier run does not count.
+    heartbeat_tolerance = timedelta(seconds=max(5, min(heartbeat_seconds // 2, 30)))
 
-    poll_interval = max(5, min(heartbeat_seconds // 2, 30))
-    heartbeat_tolerance = timedelta(seconds=poll_interval)
-
-    while True:
-        elapsed = time.monotonic() - start_time
-        if elapsed > timeout_seconds:
-            timed_out = True
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            break
-
-        heartbeat = _heartbeat_from_progress(progress_path, expected_run_id)
+    def _read_heartbeat(path: Path) -> Optional[datetime]:
+        heartbeat = _heartbeat_from_progress(path, expected_run_id)
         if heartbeat and heartbeat >= (start_wall - heartbeat_tolerance):
-            last_heartbeat = heartbeat
-
-        # Treat new stdout/stderr output as liveness even if progress heartbeats
-        # are delayed or skipped by the worker.
-        log_activity = _latest_mtime([stdout_path, stderr_path])
-
-        now = datetime.now(timezone.utc)
-        last_activity = start_wall
-        if last_heartbeat and last_heartbeat > last_activity:
-            last_activity = last_heartbeat
-        if log_activity and log_activity >= (start_wall - heartbeat_tolerance) and log_activity > last_activity:
-            last_activity = log_activity
-
-        age = (now - last_activity).total_seconds()
-        if age > heartbeat_grace_seconds:
-            no_heartbeat = True
-            process.terminate()
-            try:
-                process.wait(timeout=5)
-            except subprocess.TimeoutExpired:
-                process.kill()
-            break
-
-        try:
-            process.wait(timeout=poll_interval)
-            break
-        except subprocess.TimeoutExpired:
-            continue
-
-    exit_code = process.poll()
-    if exit_code is None:
-        exit_code = -1
-
-    stdout_thread.join(timeout=5)
-    stderr_thread.join(timeout=5)
+            return heartbeat
+        return None
+
+    # Output and writes in the run dir count as liveness even if progress
+    # heartbeats are delayed or skipped by the worker.
+    outcome = worker_supervisor.run(
+        WorkerLaunch(
+            command=command_parts,
+            cwd=project_dir,
+            stdout_path=stdout_path,
+            stderr_path=stderr_path,
+            stdin_text=prompt if not uses_prompt_placeholder and expects_stdin else None,
+            timeout_seconds=timeout_seconds,
+            stall_seconds=heartbeat_grace_seconds,
+            watch_dir=run_dir,
+            heartbeat_path=progress_path,
+            read_heartbeat=_read_heartbeat,
+            on_spawn=on_spawn,
+            on_output=on_output,
+        )
+    )
+    last_heartbeat = outcome.last_heartbeat
 
     end_iso = _now_iso()
     runtime_seconds = int(time.monotonic() - start_time)
@@ -191,8 +93,9 @@ def _run_codex_worker(
         "start_time": start_iso,
         "end_time": end_iso,
         "runtime_seconds": runtime_seconds,
-        "exit_code": exit_code,
-        "timed_out": timed_out,
-        "no_heartbeat": no_heartbeat,
+        "exit_code": outcome.exit_code,
+        "timed_out": outcome.timed_out,
+        "no_heartbeat": outcome.no_heartbeat,
         "last_heartbeat": last_heartbeat.isoformat() if last_heartbeat else None,
+        "resource_usage": outcome.resource_usage,
     }
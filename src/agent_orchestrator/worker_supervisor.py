@@ -0,0 +1,652 @@
+"""One asyncio loop that supervises every running worker subprocess.
+
+A single background thread runs an event loop shared by all workers.  For
+each worker the loop:
+
+* writes the prompt to stdin and copies stdout/stderr to their log files as
+  data arrives (``connect_read_pipe``, no thread per pipe);
+* notices the exit as soon as it happens, through a pidfd where the kernel
+  has one or a short ``wait4`` poll otherwise.  ``wait4`` also yields the
+  worker's rusage;
+* enforces the timeout with a timer;
+* tracks the worker's last activity and stops it once it has been idle for
+  longer than the stall grace (see below);
+* samples each worker's process group once a second, walking its process
+  tree in ``/proc`` rather than scanning every process;
+* stops the whole process group on timeout or stall, and cleans up anything
+  left in the group after the worker exits.
+
+Callers block in :meth:`WorkerSupervisor.run` on their own thread, for
+example the orchestrator's task thread.  No threads are added per worker;
+only the spawn itself runs on the loop's executor, so a slow fork does not
+hold up the other workers' timers.
+
+Activity is anything the worker writes: output on its pipes, any file
+written in its run directory, and heartbeats in its progress file.  On
+Linux the run directory is watched with inotify, through one descriptor
+shared by all workers.  Each write updates the worker's last-activity time
+as it happens.  The progress file is parsed only when a write to it
+completes.  Where inotify is unavailable, the directory is scanned for
+changed mtimes every second instead.  The stall deadline is re-armed from
+the last activity, so a worker is stopped when its grace runs out, not at
+the next poll.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import codecs
+import ctypes
+import logging
+import os
+import struct
+import signal
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Hard-kill signal; Windows has no SIGKILL, so SIGTERM stands in.
+SIGKILL = getattr(signal, "SIGKILL", signal.SIGTERM)
+_KILL_GRACE_SECONDS = 5.0
+# How often running workers' process groups are sampled from /proc.
+_SAMPLE_SECONDS = 1.0
+# Exit polling interval where pidfds are unavailable.
+_EXIT_POLL_SECONDS = 0.05
+# How long to wait for log pipes to drain after the worker exited.
+_DRAIN_SECONDS = 5.0
+# Run directory scan interval where inotify is unavailable.
+_WATCH_POLL_SECONDS = 1.0
+
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_IN_IGNORED = 0x8000
+_IN_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+# struct inotify_event: int wd; uint32 mask, cookie, len; char name[len].
+_IN_EVENT = struct.Struct("iIII")
+
+
+def signal_process_group(pid: int, sig: int) -> bool:
+    """Signal the process group led by *pid*; False when it no longer exists."""
+    try:
+        if hasattr(os, "killpg"):
+            os.killpg(pid, sig)
+        else:
+            os.kill(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        return False
+    return True
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _read_stat(pid: int) -> Optional[tuple[int, int]]:
+    """Return ``(pgrp, RSS bytes)`` of live process *pid*, or None."""
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # Fields after the parenthesised command: state, ppid, pgrp, ... rss is the 22nd.
+    fields = stat[stat.rfind(")") + 2 :].split()
+    if len(fields) < 22 or fields[0] == "Z":
+        return None
+    return int(fields[2]), int(fields[21]) * _PAGE_SIZE
+
+
+def _process_groups() -> Optional[dict[int, dict[int, int]]]:
+    """Map pgid -> {pid: RSS bytes} for live processes; None without /proc."""
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    groups: dict[int, dict[int, int]] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        stat = _read_stat(int(entry.name))
+        if stat is not None:
+            groups.setdefault(stat[0], {})[int(entry.name)] = stat[1]
+    return groups
+
+
+def _group_members(pgid: int, known: set[int]) -> Optional[dict[int, int]]:
+    """Map pid -> RSS bytes for process group *pgid* without scanning all of /proc.
+
+    Walks the leader's descendants through ``/proc/<pid>/task/<tid>/children``.
+    It also rechecks the pids in *known*, which finds members that were
+    reparented after their parent exited.  Returns None when the kernel does
+    not expose ``children``.
+    """
+    if Path(f"/proc/{pgid}").exists() and not Path(f"/proc/{pgid}/task/{pgid}/children").exists():
+        return None
+    members: dict[int, int] = {}
+    pending = [pgid, *known]
+    visited: set[int] = set()
+    while pending:
+        pid = pending.pop()
+        if pid in visited:
+            continue
+        visited.add(pid)
+        stat = _read_stat(pid)
+        if stat is None:
+            continue
+        if stat[0] == pgid:
+            members[pid] = stat[1]
+        try:
+            tasks = os.listdir(f"/proc/{pid}/task")
+        except OSError:
+            continue
+        for tid in tasks:
+            try:
+                pending.extend(int(child) for child in Path(f"/proc/{pid}/task/{tid}/children").read_text().split())
+            except OSError:
+                continue
+    return members
+
+
+class _Inotify:
+    """Minimal ctypes binding for Linux inotify."""
+
+    def __init__(self, libc: Any, fd: int) -> None:
+        self._libc = libc
+        self.fd = fd
+
+    @classmethod
+    def open(cls) -> Optional[_Inotify]:
+        """Return a non-blocking inotify instance, or None where there is none."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            logger.info("inotify unavailable (%s); polling run directories", os.strerror(ctypes.get_errno()))
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, path: Path) -> Optional[int]:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _IN_WATCH_MASK)
+        return wd if wd >= 0 else None
+
+    def rm_watch(self, wd: int) -> None:
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self) -> list[tuple[int, int, str]]:
+        """Drain pending events as ``(wd, mask, name)`` tuples."""
+        events: list[tuple[int, int, str]] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except (BlockingIOError, InterruptedError):
+                return events
+            offset = 0
+            while offset + _IN_EVENT.size <= len(data):
+                wd, mask, _cookie, length = _IN_EVENT.unpack_from(data, offset)
+                offset += _IN_EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+@dataclass
+class WorkerLaunch:
+    """What to run and how to watch it."""
+
+    command: list[str]
+    cwd: Path
+    stdout_path: Path
+    stderr_path: Path
+    stdin_text: Optional[str] = None
+    timeout_seconds: float = 600.0
+    # Stop the worker after this many seconds without activity; None disables it.
+    stall_seconds: Optional[float] = None
+    # Directory whose writes count as activity (the run directory).
+    watch_dir: Optional[Path] = None
+    # Progress file, and how to read its heartbeat; None when it should not count.
+    heartbeat_path: Optional[Path] = None
+    read_heartbeat: Optional[Callable[[Path], Optional[datetime]]] = None
+    on_spawn: Optional[Callable[[int], None]] = None
+    # Called on the loop thread with ("stdout"|"stderr", text) as output arrives.
+    on_output: Optional[Callable[[str, str], None]] = None
+
+
+@dataclass
+class WorkerExit:
+    exit_code: int
+    timed_out: bool = False
+    no_heartbeat: bool = False
+    last_heartbeat: Optional[datetime] = None
+    resource_usage: dict[str, Any] = field(default_factory=dict)
+
+
+class _PipeLog(asyncio.Protocol):
+    """Copy one output pipe into its log file as data arrives."""
+
+    def __init__(self, run: _Run, path: Path, stream: str) -> None:
+        self._run = run
+        self._stream = stream
+        self._handle = open(path, "wb")
+        # Multi-byte characters may straddle reads.
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.closed: asyncio.Future[None] = run.loop.create_future()
+
+    def data_received(self, data: bytes) -> None:
+        self._handle.write(data)
+        self._handle.flush()
+        self._run.touch()
+        self._emit(self._decoder.decode(data))
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        self._emit(self._decoder.decode(b"", final=True))
+        self._handle.close()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    def _emit(self, text: str) -> None:
+        on_output = self._run.launch.on_output
+        if on_output is None or not text:
+            return
+        try:
+            on_output(self._stream, text)
+        except Exception:
+            logger.debug("Worker output callback failed", exc_info=True)
+
+
+class _Run:
+    """State of one supervised worker; only touched on the loop thread."""
+
+    def __init__(self, launch: WorkerLaunch, loop: asyncio.AbstractEventLoop) -> None:
+        self.launch = launch
+        self.loop = loop
+        self.process: Optional[subprocess.Popen[bytes]] = None
+        self.exited = asyncio.Event()
+        self.last_activity = datetime.now(timezone.utc)
+        self.last_heartbeat: Optional[datetime] = None
+        self._dir_mtimes: dict[Path, dict[str, int]] = {}
+        self._rusage: Any = None
+        self._pidfd: Optional[int] = None
+        self._poll_handle: Optional[asyncio.TimerHandle] = None
+        # Every pid seen in the process group; the sampler rechecks them.
+        self.seen: set[int] = set()
+        self._peak_group_rss = 0
+        self._orphans_killed: Optional[int] = 0
+
+    # -- lifecycle -------------------------------------------------------
+
+    async def run(self) -> WorkerExit:
+        launch = self.launch
+        # fork/exec can take a while for a large parent; keep it off the shared loop.
+        process = await self.loop.run_in_executor(None, self._spawn)
+        self.process = process
+        started = time.monotonic()
+        logs = []
+        for pipe, path, stream in (
+            (process.stdout, launch.stdout_path, "stdout"),
+            (process.stderr, launch.stderr_path, "stderr"),
+        ):
+            log = _PipeLog(self, path, stream)
+            # The factory is called before connect_read_pipe returns, so late binding is safe.
+            await self.loop.connect_read_pipe(lambda: log, pipe)
+            logs.append(log)
+        await self._feed_stdin(launch.stdin_text)
+        self._watch_exit()
+        if launch.heartbeat_path is not None:
+            # Count a heartbeat written before the worker started.
+            self.refresh_heartbeat()
+
+        timed_out = no_heartbeat = False
+        while not self.exited.is_set():
+            wait = started + launch.timeout_seconds - time.monotonic()
+            if wait <= 0:
+                timed_out = True
+                await self._kill_tree()
+                break
+            if launch.stall_seconds is not None:
+                idle = (datetime.now(timezone.utc) - self.last_activity).total_seconds()
+                if idle > launch.stall_seconds:
+                    no_heartbeat = True
+                    await self._kill_tree()
+                    break
+                # Wake when the grace would run out; activity meanwhile pushes it back.
+                wait = min(wait, launch.stall_seconds - idle + 0.01)
+            if await self._wait_exit(wait):
+                break
+
+        # Test runners or dev servers the agent started must not outlive the step.
+        await self._kill_stragglers()
+        await asyncio.wait([log.closed for log in logs], timeout=_DRAIN_SECONDS)
+        self._stop_exit_watch()
+        exit_code = process.returncode if process.returncode is not None else -1
+        return WorkerExit(
+            exit_code=exit_code,
+            timed_out=timed_out,
+            no_heartbeat=no_heartbeat,
+            last_heartbeat=self.last_heartbeat,
+            resource_usage=self.usage(),
+        )
+
+    def _spawn(self) -> subprocess.Popen[bytes]:
+        """Start the worker and run the ``on_spawn`` hook; called on an executor thread."""
+        launch = self.launch
+        process = subprocess.Popen(
+            launch.command,
+            cwd=launch.cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            # Own process group, so the worker's whole tree can be signalled.
+            start_new_session=True,
+        )
+        if launch.on_spawn:
+            try:
+                launch.on_spawn(process.pid)
+            except Exception:
+                pass
+        return process
+
+    async def _feed_stdin(self, text: Optional[str]) -> None:
+        assert self.process is not None and self.process.stdin is not None
+        if not text:
+            self.process.stdin.close()
+            return
+        transport, _ = await self.loop.connect_write_pipe(asyncio.Protocol, self.process.stdin)
+        # close() flushes the buffered prompt first; a worker that exits early just drops it.
+        transport.write(text.encode("utf-8"))
+        transport.close()
+
+    # -- liveness ----------------------------------------------------------
+
+    def touch(self, when: Optional[datetime] = None) -> None:
+        when = when or datetime.now(timezone.utc)
+        if when > self.last_activity:
+            self.last_activity = when
+
+    def refresh_heartbeat(self) -> None:
+        launch = self.launch
+        if launch.heartbeat_path is None or launch.read_heartbeat is None:
+            return
+        heartbeat = launch.read_heartbeat(launch.heartbeat_path)
+        if heartbeat is not None:
+            self.last_heartbeat = heartbeat
+            self.touch(heartbeat)
+
+    def watched_dirs(self) -> set[Path]:
+        launch = self.launch
+        dirs = {launch.watch_dir} if launch.watch_dir is not None else set()
+        if launch.heartbeat_path is not None:
+            dirs.add(launch.heartbeat_path.parent)
+        return dirs
+
+    def file_written(self, directory: Path, name: str, complete: bool = True) -> None:
+        """React to a write to *name* in one of :meth:`watched_dirs`."""
+        launch = self.launch
+        path = directory / name
+        if path == launch.heartbeat_path:
+            # Parse once the write is complete, not on every partial write.
+            if complete:
+                self.refresh_heartbeat()
+        elif path not in (launch.stdout_path, launch.stderr_path) and directory == launch.watch_dir:
+            # Log writes are ours and already counted when the output arrives.
+            self.touch()
+
+    def scan_dirs(self) -> None:
+        """Polling fallback: report files whose mtime changed since the last scan."""
+        for directory in self.watched_dirs():
+            try:
+                mtimes = {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(directory) if entry.is_file()}
+            except OSError:
+                continue
+            previous = self._dir_mtimes.get(directory)
+            self._dir_mtimes[directory] = mtimes
+            if previous is None:
+                continue
+            for name, mtime in mtimes.items():
+                if previous.get(name) != mtime:
+                    self.file_written(directory, name)
+
+    # -- exit detection ----------------------------------------------------
+
+    def _watch_exit(self) -> None:
+        assert self.process is not None
+        if hasattr(os, "pidfd_open"):
+            try:
+                self._pidfd = os.pidfd_open(self.process.pid)
+                self.loop.add_reader(self._pidfd, self._check_exit)
+                self._check_exit()
+                return
+            except (OSError, NotImplementedError):
+                if self._pidfd is not None:
+                    os.close(self._pidfd)
+                    self._pidfd = None
+        self._poll_exit()
+
+    def _poll_exit(self) -> None:
+        if not self._check_exit():
+            self._poll_handle = self.loop.call_later(_EXIT_POLL_SECONDS, self._poll_exit)
+
+    def _check_exit(self) -> bool:
+        process = self.process
+        assert process is not None
+        if self.exited.is_set():
+            return True
+        if hasattr(os, "wait4"):
+            try:
+                pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            except ChildProcessError:
+                pid, status, rusage = process.pid, None, None
+            if not pid:
+                return False
+            process.returncode = os.waitstatus_to_exitcode(status) if status is not None else -1
+            self._rusage = rusage
+        elif process.poll() is None:
+            return False
+        self._stop_exit_watch()
+        self.exited.set()
+        return True
+
+    def _stop_exit_watch(self) -> None:
+        if self._pidfd is not None:
+            self.loop.remove_reader(self._pidfd)
+            os.close(self._pidfd)
+            self._pidfd = None
+        if self._poll_handle is not None:
+            self._poll_handle.cancel()
+            self._poll_handle = None
+
+    async def _wait_exit(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self.exited.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    # -- process group -----------------------------------------------------
+
+    async def _kill_tree(self) -> None:
+        """SIGTERM the worker's process group, then SIGKILL it after a grace period."""
+        assert self.process is not None
+        signal_process_group(self.process.pid, signal.SIGTERM)
+        if not await self._wait_exit(_KILL_GRACE_SECONDS):
+            signal_process_group(self.process.pid, SIGKILL)
+            await self._wait_exit(_KILL_GRACE_SECONDS)
+
+    async def _kill_stragglers(self) -> None:
+        assert self.process is not None
+        pgid = self.process.pid
+        groups = _process_groups()
+        if groups is None:
+            # No /proc: signal blindly, the group is usually already gone.
+            self._orphans_killed = None
+            signal_process_group(pgid, signal.SIGTERM)
+            return
+        members = groups.get(pgid)
+        if not members:
+            return
+        self.record_sample(members)
+        self._orphans_killed = len(members)
+        signal_process_group(pgid, signal.SIGTERM)
+        deadline = time.monotonic() + 1.0
+        while time.monotonic() < deadline and (_process_groups() or {}).get(pgid):
+            await asyncio.sleep(0.05)
+        signal_process_group(pgid, SIGKILL)
+
+    def record_sample(self, members: Optional[dict[int, int]]) -> None:
+        if members:
+            self.seen.update(members)
+            self._peak_group_rss = max(self._peak_group_rss, sum(members.values()))
+
+    def usage(self) -> dict[str, Any]:
+        pid = self.process.pid if self.process is not None else None
+        usage: dict[str, Any] = {
+            "child_processes": len(self.seen - {pid}),
+            "orphans_killed": self._orphans_killed,
+        }
+        peak_rss_kb = self._peak_group_rss // 1024
+        if self._rusage is not None:
+            usage["cpu_user_seconds"] = round(self._rusage.ru_utime, 3)
+            usage["cpu_system_seconds"] = round(self._rusage.ru_stime, 3)
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+            max_rss = self._rusage.ru_maxrss // (1024 if sys.platform == "darwin" else 1)
+            peak_rss_kb = max(peak_rss_kb, max_rss)
+        usage["peak_rss_kb"] = peak_rss_kb
+        return usage
+
+
+class WorkerSupervisor:
+    """Owns the event loop thread; :meth:`run` blocks the caller until the worker exits."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runs: set[_Run] = set()
+        # Loop-thread only: the shared inotify instance and its watches.
+        self._inotify: Optional[_Inotify] = None
+        self._inotify_failed = False
+        self._watches: dict[int, tuple[Path, set[_Run]]] = {}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _serve() -> None:
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.create_task(self._sample_forever())
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_serve, daemon=True, name="worker-supervisor")
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def run(self, launch: WorkerLaunch) -> WorkerExit:
+        future = asyncio.run_coroutine_threadsafe(self._supervise(launch), self._ensure_loop())
+        return future.result()
+
+    async def _supervise(self, launch: WorkerLaunch) -> WorkerExit:
+        run = _Run(launch, asyncio.get_running_loop())
+        self._runs.add(run)
+        poller = self._watch(run)
+        try:
+            return await run.run()
+        finally:
+            if poller is not None:
+                poller.cancel()
+            self._unwatch(run)
+            self._runs.discard(run)
+
+    # -- run directory watches --------------------------------------------
+
+    def _ensure_inotify(self) -> Optional[_Inotify]:
+        if self._inotify is None and not self._inotify_failed:
+            self._inotify = _Inotify.open()
+            if self._inotify is None:
+                self._inotify_failed = True
+            else:
+                asyncio.get_running_loop().add_reader(self._inotify.fd, self._dispatch_events)
+        return self._inotify
+
+    def _watch(self, run: _Run) -> Optional[asyncio.Task[None]]:
+        """Watch *run*'s directories; returns the polling task when inotify can't."""
+        dirs = run.watched_dirs()
+        if not dirs or run.launch.stall_seconds is None:
+            return None
+        inotify = self._ensure_inotify()
+        pending = set(dirs)
+        if inotify is not None:
+            for directory in dirs:
+                wd = inotify.add_watch(directory)
+                if wd is None:
+                    continue
+                # Watching the same directory again returns the existing descriptor.
+                self._watches.setdefault(wd, (directory, set()))[1].add(run)
+                pending.discard(directory)
+        if not pending:
+            return None
+        return asyncio.get_running_loop().create_task(self._poll_dirs(run))
+
+    def _unwatch(self, run: _Run) -> None:
+        for wd, (_directory, runs) in list(self._watches.items()):
+            runs.discard(run)
+            if not runs:
+                del self._watches[wd]
+                if self._inotify is not None:
+                    self._inotify.rm_watch(wd)
+
+    def _dispatch_events(self) -> None:
+        assert self._inotify is not None
+        for wd, mask, name in self._inotify.read_events():
+            if mask & _IN_IGNORED:
+                # The watch is gone (directory removed); nothing more will arrive for it.
+                self._watches.pop(wd, None)
+                continue
+            watch = self._watches.get(wd)
+            if watch is None or not name:
+                continue
+            directory, runs = watch
+            complete = bool(mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO))
+            for run in list(runs):
+                run.file_written(directory, name, complete)
+
+    async def _poll_dirs(self, run: _Run) -> None:
+        while True:
+            run.scan_dirs()
+            await asyncio.sleep(_WATCH_POLL_SECONDS)
+
+    async def _sample_forever(self) -> None:
+        while True:
+            await asyncio.sleep(_SAMPLE_SECONDS)
+            runs = [run for run in self._runs if run.process is not None and not run.exited.is_set()]
+            groups: Optional[dict[int, dict[int, int]]] = None
+            for run in runs:
+                assert run.process is not None
+                members = _group_members(run.process.pid, run.seen)
+                if members is None:
+                    # No children files: fall back to one full /proc scan per tick.
+                    if groups is None:
+                        groups = _process_groups() or {}
+                    members = groups.get(run.process.pid)
+                run.record_sample(members)
+
+    def running(self) -> int:
+        return len(self._runs)
+
+
+worker_supervisor = WorkerSupervisor()
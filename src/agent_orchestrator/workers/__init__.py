@@ -1,18 +1,28 @@
 """Worker provider integrations (Codex CLI, Ollama, etc.)."""
 
+from .cancellation import CancellationRegistry, cancellation_registry
 from .config import (
     WorkerProviderSpec,
     WorkersRuntimeConfig,
     get_workers_runtime_config,
     resolve_worker_for_step,
 )
+from .limits import ProviderLimiter, ProviderLimits, provider_limiter
 from .run import WorkerRunResult, run_worker
+from .sandbox import ResourceLimits, StepSandbox
 
 __all__ = [
+    "CancellationRegistry",
+    "ProviderLimiter",
+    "ProviderLimits",
+    "ResourceLimits",
+    "StepSandbox",
     "WorkerProviderSpec",
     "WorkersRuntimeConfig",
     "WorkerRunResult",
+    "cancellation_registry",
     "get_workers_runtime_config",
+    "provider_limiter",
     "resolve_worker_for_step",
     "run_worker",
 ]
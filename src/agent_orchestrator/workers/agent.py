@@ -0,0 +1,327 @@
+"""Worker agent that runs leased pipeline steps for a remote orchestrator.
+
+``agent-orchestrator worker serve --server http://host:8080`` registers this
+machine with the server's ``/api/worker-agents`` endpoints.  It then runs
+three things:
+
+* a heartbeat every ``heartbeat_seconds`` on a background thread, also while
+  a step is running.  The reply lists leases whose task was cancelled; their
+  workers' process groups are killed as for a local cancel;
+* a long-poll for the next lease matching its labels and capabilities,
+  whenever fewer than ``capacity`` leases are running;
+* ``run_worker`` for each lease on its own thread.
+
+A lease for a git project names a snapshot commit of the task worktree.
+With ``--checkout``, the agent fetches that commit from the lease's
+``repo_url`` (or ``--repo-url``) and runs the step in a temporary detached
+worktree of the checkout, removed afterwards.  Without a checkout it runs in
+the task worktree itself when visible (same host or shared filesystem).  A
+lease whose tree it cannot reproduce fails rather than running against the
+wrong files.
+
+Every call carries the server's ``workers.remote.token`` (``--token`` or
+``AGENT_ORCHESTRATOR_WORKER_TOKEN``) as a bearer token, and after
+registering also the agent's own key.  After each lease it posts back the
+exit status, response text and log tails.
+Several agents can run on one box by giving each its own ``--name``.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Callable, Iterable, Optional
+
+from loguru import logger
+
+from ..io_utils import _read_text_tail
+from .cancellation import CancellationRegistry
+from .config import WorkerProviderSpec
+from .run import WorkerRunResult, run_worker
+from .sandbox import parse_resource_limits
+
+# Log tail sent back with each result; the server only needs enough to
+# classify failures and show a summary.
+_LOG_TAIL_CHARS = 64_000
+
+# (path, JSON payload, extra headers) -> JSON reply
+Transport = Callable[[str, dict[str, Any], dict[str, str]], Optional[dict[str, Any]]]
+
+
+class AgentNotRegistered(Exception):
+    """The server does not know this agent (restarted, or reaped it)."""
+
+
+class LeaseSetupError(Exception):
+    """The task tree a lease refers to cannot be reproduced on this agent."""
+
+
+def http_transport(server_url: str, *, timeout: float = 60.0) -> Transport:
+    """POST JSON to ``{server_url}/api/worker-agents{path}``."""
+    base = server_url.rstrip("/") + "/api/worker-agents"
+
+    def _post(path: str, payload: dict[str, Any], headers: dict[str, str]) -> Optional[dict[str, Any]]:
+        request = urllib.request.Request(
+            base + path,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json", **headers},
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as resp:
+                reply: dict[str, Any] = json.loads(resp.read().decode("utf-8") or "{}")
+                return reply
+        except urllib.error.HTTPError as exc:
+            if exc.code == 404:
+                raise AgentNotRegistered(path) from exc
+            raise
+
+    return _post
+
+
+class WorkerAgent:
+    def __init__(
+        self,
+        transport: Transport,
+        *,
+        name: str,
+        labels: Iterable[str] = (),
+        capabilities: Iterable[str] = ("codex", "claude", "ollama"),
+        checkout: Optional[Path] = None,
+        repo_url: Optional[str] = None,
+        token: Optional[str] = None,
+        capacity: int = 1,
+        heartbeat_seconds: float = 10.0,
+        lease_wait_seconds: float = 20.0,
+        runner: Callable[..., WorkerRunResult] = run_worker,
+    ) -> None:
+        self._transport = transport
+        self._token = token
+        self.name = name
+        self.labels = sorted(set(labels))
+        self.capabilities = sorted(set(capabilities))
+        self.checkout = checkout
+        self.repo_url = repo_url
+        self.capacity = max(int(capacity), 1)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_wait_seconds = lease_wait_seconds
+        self._runner = runner
+        self.agent_id: Optional[str] = None
+        self._agent_key: Optional[str] = None
+        self._stop = threading.Event()
+        # Fetches and worktree changes in the shared checkout run one at a time.
+        self._checkout_lock = threading.Lock()
+        # Worker pids by lease id, for leases the server cancels.
+        self._cancellations = CancellationRegistry()
+        self._active: set[str] = set()
+        self._active_lock = threading.Lock()
+
+    def _post(self, path: str, payload: dict[str, Any]) -> Optional[dict[str, Any]]:
+        headers: dict[str, str] = {}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        if self._agent_key:
+            headers["X-Worker-Agent-Key"] = self._agent_key
+        return self._transport(path, payload, headers)
+
+    def register(self) -> str:
+        """Register with the server; stores the agent id and its private key."""
+        self._agent_key = None
+        reply = self._post(
+            "/register",
+            {"name": self.name, "labels": self.labels, "capabilities": self.capabilities, "capacity": self.capacity},
+        ) or {}
+        self.agent_id = str(reply["agent_id"])
+        self._agent_key = str(reply.get("agent_key") or "") or None
+        logger.info("Worker agent '{}' registered as {}", self.name, self.agent_id)
+        return self.agent_id
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_seconds):
+            try:
+                reply = self._post(f"/{self.agent_id}/heartbeat", {}) or {}
+                for lease_id in reply.get("cancel") or []:
+                    self.abort(str(lease_id))
+            except AgentNotRegistered:
+                logger.warning("Worker agent '{}' is no longer registered; re-registering", self.name)
+                try:
+                    self.register()
+                except Exception as exc:
+                    logger.warning("Re-registration failed: {}", exc)
+            except Exception as exc:
+                logger.warning("Heartbeat failed: {}", exc)
+
+    def serve(self, *, max_steps: Optional[int] = None) -> int:
+        """Lease and run steps until stopped (or *max_steps* ran); returns steps run.
+
+        Up to ``capacity`` leases run at once, each on its own thread.
+        """
+        while self.agent_id is None and not self._stop.is_set():
+            try:
+                self.register()
+            except (urllib.error.URLError, socket.timeout, ConnectionError) as exc:
+                logger.warning("Cannot reach the orchestrator server ({}); retrying", exc)
+                self._stop.wait(min(self.heartbeat_seconds, 5.0))
+        heartbeat = threading.Thread(target=self._heartbeat_loop, daemon=True, name="worker-agent-heartbeat")
+        heartbeat.start()
+        slots = threading.Semaphore(self.capacity)
+        running: list[threading.Thread] = []
+        finished: list[str] = []
+        try:
+            while not self._stop.is_set() and (max_steps is None or len(running) < max_steps):
+                if not slots.acquire(timeout=1.0):
+                    continue
+                try:
+                    reply = self._post(f"/{self.agent_id}/lease", {"wait_seconds": self.lease_wait_seconds}) or {}
+                except AgentNotRegistered:
+                    slots.release()
+                    self.register()
+                    continue
+                except (urllib.error.URLError, socket.timeout, ConnectionError) as exc:
+                    slots.release()
+                    logger.warning("Lease request failed: {}", exc)
+                    self._stop.wait(min(self.heartbeat_seconds, 5.0))
+                    continue
+                lease = reply.get("lease")
+                if not lease:
+                    slots.release()
+                    continue
+                thread = threading.Thread(
+                    target=self._run_and_report,
+                    args=(lease, slots, finished),
+                    daemon=True,
+                    name=f"worker-agent-{lease['lease_id']}",
+                )
+                thread.start()
+                running.append(thread)
+            for thread in running:
+                thread.join()
+        finally:
+            self._stop.set()
+            try:
+                self._post(f"/{self.agent_id}/deregister", {})
+            except Exception:
+                pass
+        return len(finished)
+
+    def abort(self, lease_id: str) -> None:
+        """Kill the workers of running lease *lease_id* (its task was cancelled)."""
+        with self._active_lock:
+            if lease_id not in self._active or self._cancellations.is_cancelled(lease_id):
+                return
+            self._cancellations.cancel(lease_id)
+        logger.info("Lease {} was cancelled by the server; stopping its worker", lease_id)
+
+    def _run_and_report(self, lease: dict[str, Any], slots: threading.Semaphore, finished: list[str]) -> None:
+        try:
+            result = self.run_lease(lease)
+            try:
+                self._post(f"/{self.agent_id}/leases/{lease['lease_id']}/complete", result)
+            except Exception as exc:
+                logger.warning("Could not report lease {}: {}", lease["lease_id"], exc)
+            finished.append(str(lease["lease_id"]))
+        finally:
+            slots.release()
+
+    def _git(self, *args: str) -> None:
+        with self._checkout_lock:
+            subprocess.run(["git", *args], cwd=self.checkout, check=True, capture_output=True, text=True)
+
+    def _project_dir(self, lease: dict[str, Any], run_dir: Path) -> Path:
+        git = lease.get("git") if isinstance(lease.get("git"), dict) else None
+        url = self.repo_url or (git or {}).get("url")
+        if git and self.checkout is not None and url:
+            tree = run_dir / "tree"
+            try:
+                self._git("fetch", "--no-tags", "--quiet", str(url), str(git["ref"]))
+                self._git("worktree", "add", "--detach", str(tree), str(git["commit"]))
+            except subprocess.CalledProcessError as exc:
+                raise LeaseSetupError(f"Cannot fetch {git['ref']} from {url}: {exc.stderr or exc}") from exc
+            return tree
+        # On the server's host (or a shared filesystem) use the task worktree itself.
+        worktree = Path(str(lease.get("worktree_dir") or ""))
+        if lease.get("worktree_dir") and worktree.is_dir():
+            return worktree
+        if git:
+            raise LeaseSetupError(
+                "Task tree is not visible here; run the agent with --checkout and set "
+                "workers.remote.repo_url (or --repo-url)"
+            )
+        if self.checkout is not None:
+            return self.checkout
+        return Path.cwd()
+
+    def _release_tree(self, run_dir: Path) -> None:
+        tree = run_dir / "tree"
+        if self.checkout is None or not tree.exists():
+            return
+        try:
+            self._git("worktree", "remove", "--force", str(tree))
+        except subprocess.CalledProcessError as exc:
+            logger.warning("Could not remove lease worktree {}: {}", tree, exc.stderr or exc)
+
+    def run_lease(self, lease: dict[str, Any]) -> dict[str, Any]:
+        """Run one leased step and return the payload posted back to the server."""
+        spec_fields = dict(lease.get("spec") or {})
+        logger.info(
+            "Running step '{}' of task {} on worker '{}'", lease.get("step"), lease.get("task_id"), spec_fields.get("name")
+        )
+        lease_id = str(lease.get("lease_id") or "")
+        run_dir = Path(tempfile.mkdtemp(prefix="lease-"))
+        started = time.monotonic()
+        with self._active_lock:
+            self._active.add(lease_id)
+        try:
+            with self._cancellations.scope(lease_id) as on_spawn:
+                result = self._runner(
+                    spec=WorkerProviderSpec(**spec_fields),
+                    prompt=str(lease.get("prompt") or ""),
+                    project_dir=self._project_dir(lease, run_dir),
+                    run_dir=run_dir,
+                    timeout_seconds=int(lease.get("timeout_seconds") or 600),
+                    heartbeat_seconds=30,
+                    heartbeat_grace_seconds=15,
+                    progress_path=run_dir / "progress.json",
+                    on_spawn=on_spawn,
+                    resource_limits=parse_resource_limits(lease.get("resource_limits")),
+                )
+        except Exception as exc:
+            return {
+                "agent": self.name,
+                "error": f"{exc.__class__.__name__}: {exc}",
+                "retryable": isinstance(exc, OSError),
+                "runtime_seconds": int(time.monotonic() - started),
+            }
+        finally:
+            self._release_tree(run_dir)
+            with self._active_lock:
+                self._active.discard(lease_id)
+                cancelled = self._cancellations.is_cancelled(lease_id)
+                self._cancellations.clear(lease_id)
+        if cancelled:
+            return {"agent": self.name, "cancelled": True, "runtime_seconds": result.runtime_seconds}
+        return {
+            "agent": self.name,
+            "exit_code": result.exit_code,
+            "timed_out": result.timed_out,
+            "no_heartbeat": result.no_heartbeat,
+            "runtime_seconds": result.runtime_seconds,
+            "start_time": result.start_time,
+            "end_time": result.end_time,
+            "response_text": result.response_text,
+            "human_blocking_issues": result.human_blocking_issues,
+            "resource_usage": result.resource_usage,
+            "limit_breach": result.limit_breach,
+            "stdout_tail": _read_text_tail(Path(result.stdout_path), max_chars=_LOG_TAIL_CHARS) if result.stdout_path else "",
+            "stderr_tail": _read_text_tail(Path(result.stderr_path), max_chars=_LOG_TAIL_CHARS) if result.stderr_path else "",
+        }
@@ -0,0 +1,103 @@
+"""Stop running worker processes when their task is cancelled.
+
+Codex/Claude workers run in their own process group (``start_new_session``).
+While a step runs, :meth:`CancellationRegistry.scope` records each spawned
+pid under the task id through ``run_worker``'s ``on_spawn`` hook.
+:meth:`CancellationRegistry.cancel` marks the task as cancelled and sends
+SIGTERM to every recorded process group.  Groups still alive after
+``kill_grace_seconds`` get SIGKILL.  The worker supervisor sees the exit at
+once, so the step returns promptly and the adapter reports it as
+``cancelled``.
+
+A cancel that arrives before a worker spawns is remembered.  The next spawn
+is then killed on registration, and the orchestrator stops before starting
+further steps.  The mark is cleared when the task's execution ends.  One
+process-wide registry is shared by every project, like the provider limiter.
+"""
+
+from __future__ import annotations
+
+import signal
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from ..worker_supervisor import SIGKILL, signal_process_group
+
+
+class CancellationRegistry:
+    """Worker process groups by task id, and the tasks cancelled while running."""
+
+    def __init__(self, *, kill_grace_seconds: float = 5.0) -> None:
+        self.kill_grace_seconds = kill_grace_seconds
+        self._lock = threading.Lock()
+        self._pids: dict[str, set[int]] = {}
+        self._cancelled: set[str] = set()
+
+    def track(self, task_id: str, pid: int) -> None:
+        with self._lock:
+            self._pids.setdefault(task_id, set()).add(pid)
+            cancelled = task_id in self._cancelled
+        if cancelled:
+            self._terminate(task_id, pid)
+
+    def untrack(self, task_id: str, pid: int) -> None:
+        with self._lock:
+            pids = self._pids.get(task_id)
+            if pids is None:
+                return
+            pids.discard(pid)
+            if not pids:
+                del self._pids[task_id]
+
+    @contextmanager
+    def scope(self, task_id: str) -> Iterator[Callable[[int], None]]:
+        """Yield an ``on_spawn`` callback; spawned pids are untracked on exit."""
+        spawned: list[int] = []
+
+        def _on_spawn(pid: int) -> None:
+            spawned.append(pid)
+            self.track(task_id, pid)
+
+        try:
+            yield _on_spawn
+        finally:
+            for pid in spawned:
+                self.untrack(task_id, pid)
+
+    def cancel(self, task_id: str) -> int:
+        """Mark *task_id* cancelled and terminate its workers; returns groups signalled."""
+        with self._lock:
+            self._cancelled.add(task_id)
+            pids = list(self._pids.get(task_id, ()))
+        return sum(1 for pid in pids if self._terminate(task_id, pid))
+
+    def is_cancelled(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._cancelled
+
+    def clear(self, task_id: str) -> None:
+        with self._lock:
+            self._cancelled.discard(task_id)
+
+    def running(self) -> dict[str, list[int]]:
+        with self._lock:
+            return {task_id: sorted(pids) for task_id, pids in self._pids.items()}
+
+    def _terminate(self, task_id: str, pid: int) -> bool:
+        if not signal_process_group(pid, signal.SIGTERM):
+            return False
+        timer = threading.Timer(self.kill_grace_seconds, self._kill_if_tracked, args=(task_id, pid))
+        timer.daemon = True
+        timer.start()
+        return True
+
+    def _kill_if_tracked(self, task_id: str, pid: int) -> None:
+        # An untracked pid was reaped by its runner and may since have been reused.
+        with self._lock:
+            alive = pid in self._pids.get(task_id, ())
+        if alive:
+            signal_process_group(pid, SIGKILL)
+
+
+cancellation_registry = CancellationRegistry()
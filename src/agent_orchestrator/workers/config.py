@@ -2,9 +2,12 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Literal, Optional
 
+from .limits import ProviderLimits, parse_limits
+from .sandbox import ResourceLimits, parse_resource_limits
+
 WorkerProviderType = Literal["codex", "ollama", "claude"]
 
 
@@ -20,6 +23,18 @@ class WorkerProviderSpec:
     endpoint: Optional[str] = None
     temperature: Optional[float] = None
     num_ctx: Optional[int] = None
+    # dispatch limits (see workers/limits.py)
+    limits: ProviderLimits = field(default_factory=ProviderLimits)
+    model_limits: dict[str, ProviderLimits] = field(default_factory=dict, hash=False, compare=False)
+    # memory/CPU/process caps for the worker subprocess (see workers/sandbox.py)
+    resource_limits: ResourceLimits = field(default_factory=ResourceLimits)
+
+    def limit_keys(self) -> list[tuple[str, ProviderLimits]]:
+        """Return the ``(key, limits)`` pairs a step on this provider must hold."""
+        keys = [(self.name, self.limits)]
+        if self.model and self.model in self.model_limits:
+            keys.append((f"{self.name}/{self.model}", self.model_limits[self.model]))
+        return keys
 
 
 @dataclass(frozen=True)
@@ -41,6 +56,14 @@ def _step_key(step: str) -> str:
     return str(step or "").strip()
 
 
+def _parse_model_limits(raw: Any) -> dict[str, ProviderLimits]:
+    return {
+        str(model).strip(): parse_limits(item)
+        for model, item in _as_dict(raw).items()
+        if isinstance(model, str) and model.strip()
+    }
+
+
 def get_workers_runtime_config(
     *,
     config: dict[str, Any],
@@ -69,6 +92,9 @@ def get_workers_runtime_config(
         command=codex_command,
         model=codex_model,
         reasoning_effort=codex_reasoning,
+        limits=parse_limits(codex_cfg),
+        model_limits=_parse_model_limits(codex_cfg.get("model_limits")),
+        resource_limits=parse_resource_limits(codex_cfg.get("resource_limits")),
     )
 
     for name, raw in providers_cfg.items():
@@ -93,6 +119,9 @@ def get_workers_runtime_config(
                 command=cmd,
                 model=model,
                 reasoning_effort=reasoning_effort,
+                limits=parse_limits(item),
+                model_limits=_parse_model_limits(item.get("model_limits")),
+                resource_limits=parse_resource_limits(item.get("resource_limits")),
             )
             continue
 
@@ -107,6 +136,8 @@ def get_workers_runtime_config(
             model=model,
             temperature=float(temperature) if isinstance(temperature, (int, float)) else None,
             num_ctx=int(num_ctx) if isinstance(num_ctx, int) else None,
+            limits=parse_limits(item),
+            model_limits=_parse_model_limits(item.get("model_limits")),
         )
 
     # Normalize routing values to strings.
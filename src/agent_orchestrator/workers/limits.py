@@ -0,0 +1,193 @@
+"""Per-provider concurrency caps and token-bucket rate limits for worker dispatch.
+
+Limits are declared on each entry of ``workers.providers``::
+
+    workers:
+      providers:
+        local:
+          type: ollama
+          endpoint: http://localhost:11434
+          model: llama3
+          max_concurrency: 1          # concurrent generations on this provider
+          rate_limit_per_minute: 30   # token bucket refill rate
+          rate_limit_burst: 2         # bucket size (default 1)
+          model_limits:               # optional caps per effective model
+            llama3:70b: {max_concurrency: 1}
+
+A step waits for every limit that applies to it (provider, then model)
+before ``run_worker`` starts.  A caller may pass a ``cancelled`` check, polled
+at least once a second while waiting; :class:`SlotCancelled` is raised when it
+turns true.  Limits live in one process-wide registry so
+every project served by the same process shares a provider's budget.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, Optional
+
+
+class SlotCancelled(Exception):
+    """The caller's ``cancelled`` check turned true while it waited for a slot."""
+
+
+@dataclass(frozen=True)
+class ProviderLimits:
+    max_concurrency: Optional[int] = None
+    rate_limit_per_minute: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return not self.max_concurrency and not self.rate_limit_per_minute
+
+
+def parse_limits(raw: Any) -> ProviderLimits:
+    """Read limit fields from a provider (or ``model_limits`` entry) config mapping."""
+    item = raw if isinstance(raw, dict) else {}
+    max_concurrency = item.get("max_concurrency")
+    rate = item.get("rate_limit_per_minute")
+    burst = item.get("rate_limit_burst")
+    return ProviderLimits(
+        max_concurrency=int(max_concurrency) if isinstance(max_concurrency, int) and max_concurrency > 0 else None,
+        rate_limit_per_minute=float(rate) if isinstance(rate, (int, float)) and rate > 0 else None,
+        rate_limit_burst=int(burst) if isinstance(burst, int) and burst > 0 else None,
+    )
+
+
+class _KeyState:
+    """Concurrency counter plus token bucket for one limit key."""
+
+    def __init__(self) -> None:
+        self.cond = threading.Condition()
+        self.limits = ProviderLimits()
+        self.active = 0
+        self.waiting = 0
+        self.tokens = 0.0
+        self.refilled_at = time.monotonic()
+        self.acquired = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _capacity(self) -> float:
+        return float(self.limits.rate_limit_burst or 1)
+
+    def configure(self, limits: ProviderLimits) -> None:
+        if limits != self.limits:
+            rate_was_unset = not self.limits.rate_limit_per_minute
+            self.limits = limits
+            if rate_was_unset:
+                # A freshly rate-limited key starts with a full bucket.
+                self.tokens = self._capacity()
+                self.refilled_at = time.monotonic()
+            self.tokens = min(self.tokens, self._capacity())
+            self.cond.notify_all()
+
+    def _refill(self, now: float) -> None:
+        rate = self.limits.rate_limit_per_minute
+        if rate:
+            self.tokens = min(self._capacity(), self.tokens + (now - self.refilled_at) * rate / 60.0)
+        self.refilled_at = now
+
+    def acquire(self, cancelled: Optional[Callable[[], bool]] = None) -> float:
+        """Block until a slot and a token are available; return seconds waited."""
+        started = time.monotonic()
+        with self.cond:
+            self.waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    cap = self.limits.max_concurrency
+                    rate = self.limits.rate_limit_per_minute
+                    slot_free = not cap or self.active < cap
+                    token_free = not rate or self.tokens >= 1.0
+                    if slot_free and token_free:
+                        break
+                    if cancelled is not None and cancelled():
+                        raise SlotCancelled()
+                    timeout = 1.0
+                    if slot_free and rate:
+                        timeout = max((1.0 - self.tokens) * 60.0 / rate, 0.01)
+                        if cancelled is not None:
+                            timeout = min(timeout, 1.0)
+                    self.cond.wait(timeout=timeout)
+                self.active += 1
+                if self.limits.rate_limit_per_minute:
+                    self.tokens -= 1.0
+            finally:
+                self.waiting -= 1
+            waited = time.monotonic() - started
+            self.acquired += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            return waited
+
+    def release(self) -> None:
+        with self.cond:
+            self.active = max(self.active - 1, 0)
+            self.cond.notify_all()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.cond:
+            return {
+                "max_concurrency": self.limits.max_concurrency,
+                "rate_limit_per_minute": self.limits.rate_limit_per_minute,
+                "active": self.active,
+                "waiting": self.waiting,
+                "acquired": self.acquired,
+                "total_wait_seconds": round(self.total_wait_seconds, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3),
+            }
+
+
+class ProviderLimiter:
+    """Registry of limit keys (``provider`` and ``provider/model``)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._keys: dict[str, _KeyState] = {}
+
+    def _state(self, key: str, limits: ProviderLimits) -> _KeyState:
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                state = self._keys[key] = _KeyState()
+        with state.cond:
+            state.configure(limits)
+        return state
+
+    @contextmanager
+    def slot(
+        self, limits: list[tuple[str, ProviderLimits]], cancelled: Optional[Callable[[], bool]] = None
+    ) -> Iterator[float]:
+        """Hold one slot of every ``(key, limits)`` pair; yields total seconds waited.
+
+        Keys are acquired in sorted order so concurrent callers cannot deadlock.
+        Raises :class:`SlotCancelled` (holding nothing) if *cancelled* turns
+        true while waiting.
+        """
+        held: list[_KeyState] = []
+        waited = 0.0
+        try:
+            for key, key_limits in sorted(limits, key=lambda item: item[0]):
+                if key_limits.unlimited:
+                    continue
+                state = self._state(key, key_limits)
+                waited += state.acquire(cancelled)
+                held.append(state)
+            yield waited
+        finally:
+            for state in reversed(held):
+                state.release()
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        with self._lock:
+            states = dict(self._keys)
+        return {key: state.snapshot() for key, state in sorted(states.items())}
+
+
+provider_limiter = ProviderLimiter()
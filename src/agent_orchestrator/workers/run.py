@@ -12,13 +12,15 @@ import urllib.request
 from dataclasses import dataclass, field, replace
 from functools import lru_cache
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
 
 from loguru import logger
 
+from ..io_utils import _read_text_tail
 from ..utils import _now_iso
 from ..worker import _run_codex_worker
 from .config import WorkerProviderSpec
+from .sandbox import ResourceLimits, StepSandbox
 
 
 @dataclass(frozen=True)
@@ -35,6 +37,9 @@ class WorkerRunResult:
     no_heartbeat: bool
     response_text: str = ""
     human_blocking_issues: list[dict[str, str]] = field(default_factory=list)
+    resource_usage: dict[str, Any] = field(default_factory=dict)
+    # Resource limit ("memory"/"processes") the worker ran into, if any.
+    limit_breach: Optional[str] = None
 
 
 def _build_codex_command(spec: WorkerProviderSpec) -> str:
@@ -170,6 +175,7 @@ def _run_ollama_generate(
     timeout_seconds: int,
     temperature: Optional[float] = None,
     num_ctx: Optional[int] = None,
+    on_output: Optional[Callable[[str, str], None]] = None,
 ) -> WorkerRunResult:
     run_dir.mkdir(parents=True, exist_ok=True)
     prompt_path = run_dir / "prompt.txt"
@@ -230,6 +236,8 @@ def _run_ollama_generate(
                     chunk = line.decode("utf-8", errors="replace")
                     err.write(chunk)
                     err.flush()
+                    if on_output:
+                        on_output("stderr", chunk)
                     continue
 
                 chunk = str(obj.get("response") or "")
@@ -237,6 +245,8 @@ def _run_ollama_generate(
                     response_text_parts.append(chunk)
                     out.write(chunk)
                     out.flush()
+                    if on_output:
+                        on_output("stdout", chunk)
 
                 if bool(obj.get("done")):
                     break
@@ -292,24 +302,53 @@ def run_worker(
     progress_path: Path,
     expected_run_id: Optional[str] = None,
     on_spawn: Optional[Callable[[int], None]] = None,
+    resource_limits: Optional[ResourceLimits] = None,
+    cgroup_parent: Optional[str] = None,
+    on_output: Optional[Callable[[str, str], None]] = None,
 ) -> WorkerRunResult:
-    """Run the selected provider and return a normalized run result."""
+    """Run the selected provider and return a normalized run result.
+
+    *resource_limits* (default: the provider's) cap the Codex/Claude
+    subprocess; Ollama generations run remotely and are not limited.
+    *on_output* receives ``("stdout"|"stderr", text)`` as output arrives.
+    """
     if spec.type in {"codex", "claude"}:
         provider_label = "Codex" if spec.type == "codex" else "Claude"
         logger.info("Starting {} worker provider='{}' (timeout={}s)", provider_label, spec.name, timeout_seconds)
         command = _build_codex_command(spec) if spec.type == "codex" else _build_claude_command(spec)
-        run_result = _run_codex_worker(
-            command=command,
-            prompt=prompt,
-            project_dir=project_dir,
-            run_dir=run_dir,
-            timeout_seconds=timeout_seconds,
-            heartbeat_seconds=heartbeat_seconds,
-            heartbeat_grace_seconds=heartbeat_grace_seconds,
-            progress_path=progress_path,
-            expected_run_id=expected_run_id,
-            on_spawn=on_spawn,
-        )
+        sandbox = StepSandbox(resource_limits or spec.resource_limits, cgroup_parent=cgroup_parent)
+
+        def _spawned(pid: int) -> None:
+            try:
+                sandbox.attach(pid)
+            finally:
+                if on_spawn:
+                    on_spawn(pid)
+
+        try:
+            run_result = _run_codex_worker(
+                command=command,
+                prompt=prompt,
+                project_dir=project_dir,
+                run_dir=run_dir,
+                timeout_seconds=timeout_seconds,
+                heartbeat_seconds=heartbeat_seconds,
+                heartbeat_grace_seconds=heartbeat_grace_seconds,
+                progress_path=progress_path,
+                expected_run_id=expected_run_id,
+                on_spawn=_spawned,
+                on_output=on_output,
+            )
+            exit_code = int(run_result.get("exit_code") or 0)
+            stderr_path = Path(str(run_result.get("stderr_path") or ""))
+            limit_breach = sandbox.breach(exit_code, _read_text_tail(stderr_path) if stderr_path.is_file() else "")
+        finally:
+            sandbox.close()
+        resource_usage = dict(run_result.get("resource_usage") or {})
+        if sandbox.mode:
+            resource_usage["sandbox"] = sandbox.mode
+        if sandbox.unenforced:
+            resource_usage["sandbox_unenforced"] = list(sandbox.unenforced)
         human_blocking_issues = _extract_human_blocking_issues(progress_path)
         return WorkerRunResult(
             provider=spec.name,
@@ -319,11 +358,13 @@ def run_worker(
             start_time=str(run_result.get("start_time") or _now_iso()),
             end_time=str(run_result.get("end_time") or _now_iso()),
             runtime_seconds=int(run_result.get("runtime_seconds") or 0),
-            exit_code=int(run_result.get("exit_code") or 0),
+            exit_code=exit_code,
             timed_out=bool(run_result.get("timed_out")),
             no_heartbeat=bool(run_result.get("no_heartbeat")),
             response_text="",
             human_blocking_issues=human_blocking_issues,
+            resource_usage=resource_usage,
+            limit_breach=limit_breach,
         )
 
     if spec.type == "ollama":
@@ -341,6 +382,7 @@ def run_worker(
             timeout_seconds=timeout_seconds,
             temperature=spec.temperature,
             num_ctx=spec.num_ctx,
+            on_output=on_output,
         )
         human_blocking_issues = _extract_human_blocking_issues(progress_path)
         if human_blocking_issues:
@@ -0,0 +1,297 @@
+"""Per-step memory, CPU and process limits for worker subprocesses.
+
+Limits are declared on a provider and may be overridden per step in a
+pipeline's ``config``::
+
+    workers:
+      cgroup_parent: /sys/fs/cgroup/agents.slice   # optional, see below
+      providers:
+        codex:
+          resource_limits:
+            memory_mb: 4096         # memory cap
+            cpu_quota: 2.0          # CPUs' worth of time
+            cpu_affinity: [0, 1]    # CPUs the worker may run on
+            max_processes: 256      # processes/threads
+
+    # .agent_orchestrator/pipelines/*.yaml
+    steps:
+      - name: verify
+        config:
+          resource_limits: {memory_mb: 8192}
+
+With ``workers.cgroup_parent`` set to a writable cgroup v2 directory, each
+step gets its own child cgroup there, enforcing ``memory.max``,
+``cpu.max``, ``cpuset.cpus`` and ``pids.max``.  The parent must be a cgroup
+without processes of its own (for example a delegated ``agents.slice``):
+cgroup v2 refuses to enable controllers for the children of a cgroup that
+holds processes, so the server's own cgroup cannot be used.
+
+Without a usable parent the sandbox falls back to rlimits through
+``prlimit``.  RLIMIT_DATA bounds the worker's data segment, a rougher cap
+than ``memory.max`` on resident memory.  ``sched_setaffinity`` pins the
+CPUs.  ``cpu_quota`` and ``max_processes`` are not enforced: there is no
+CPU-time rlimit with the same meaning, and RLIMIT_NPROC counts every process
+of the user, so it would fail unrelated forks.  Limits that cannot be
+enforced are logged as a warning and listed in the step's resource usage
+under ``sandbox_unenforced``.
+
+The limits are applied by :meth:`StepSandbox.attach` from the server right
+after the spawn, not in the child: a ``preexec_fn`` is unsafe in this
+multi-threaded process.  The worker therefore runs uncapped for the moment
+between exec and attach, which is too short to matter for memory or forks.
+
+When a failed step hit one of its limits, the breach is reported as
+``memory`` or ``processes``.  The step then fails with that reason instead
+of looking like a crash, and it is not retried.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+_CGROUP_ROOT = Path("/sys/fs/cgroup")
+_CPU_PERIOD_US = 100_000
+
+# Failure output of a worker that ran out of memory or could not fork under rlimits.
+_MEMORY_ERROR_RE = re.compile(
+    r"MemoryError|Cannot allocate memory|out of memory|\bENOMEM\b|bad_alloc", re.IGNORECASE
+)
+_PROCESS_ERROR_RE = re.compile(
+    r"fork: (?:retry|Resource temporarily unavailable)|can(?:no|')t fork|Cannot create thread"
+    r"|BlockingIOError: \[Errno 11\]",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    memory_mb: Optional[int] = None
+    cpu_quota: Optional[float] = None
+    cpu_affinity: tuple[int, ...] = ()
+    max_processes: Optional[int] = None
+
+    @property
+    def unlimited(self) -> bool:
+        return not (self.memory_mb or self.cpu_quota or self.cpu_affinity or self.max_processes)
+
+    def override(self, other: ResourceLimits) -> ResourceLimits:
+        """Return these limits with every field set on *other* replaced."""
+        return ResourceLimits(
+            memory_mb=other.memory_mb or self.memory_mb,
+            cpu_quota=other.cpu_quota or self.cpu_quota,
+            cpu_affinity=other.cpu_affinity or self.cpu_affinity,
+            max_processes=other.max_processes or self.max_processes,
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        raw: dict[str, Any] = {
+            "memory_mb": self.memory_mb,
+            "cpu_quota": self.cpu_quota,
+            "cpu_affinity": list(self.cpu_affinity),
+            "max_processes": self.max_processes,
+        }
+        return {key: value for key, value in raw.items() if value}
+
+
+def parse_resource_limits(raw: Any) -> ResourceLimits:
+    """Read a ``resource_limits`` mapping from provider or step config."""
+    item = raw if isinstance(raw, dict) else {}
+    memory = item.get("memory_mb")
+    quota = item.get("cpu_quota")
+    affinity = item.get("cpu_affinity")
+    processes = item.get("max_processes")
+    cpus: tuple[int, ...] = ()
+    if isinstance(affinity, list):
+        cpus = tuple(sorted({int(cpu) for cpu in affinity if isinstance(cpu, int) and cpu >= 0}))
+    return ResourceLimits(
+        memory_mb=int(memory) if isinstance(memory, int) and memory > 0 else None,
+        cpu_quota=float(quota) if isinstance(quota, (int, float)) and quota > 0 else None,
+        cpu_affinity=cpus,
+        max_processes=int(processes) if isinstance(processes, int) and processes > 0 else None,
+    )
+
+
+def _read_counters(path: Path) -> dict[str, int]:
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+    counters: dict[str, int] = {}
+    for line in lines:
+        key, _, value = line.partition(" ")
+        if value.strip().isdigit():
+            counters[key] = int(value)
+    return counters
+
+
+class StepSandbox:
+    """Apply :class:`ResourceLimits` to one worker process and report breaches.
+
+    ``mode`` is ``"cgroup"``, ``"rlimit"``, or None when there is nothing
+    to enforce.  ``unenforced`` names the configured limits the mode cannot
+    apply.
+    """
+
+    def __init__(
+        self,
+        limits: ResourceLimits,
+        *,
+        cgroup_parent: Optional[str | Path] = None,
+        cgroup_root: Path = _CGROUP_ROOT,
+    ) -> None:
+        self.limits = limits
+        self.mode: Optional[str] = None
+        self.unenforced: list[str] = []
+        self._cgroup: Optional[Path] = None
+        if limits.unlimited:
+            return
+        if cgroup_parent:
+            self._cgroup = self._create_cgroup(Path(cgroup_parent), cgroup_root)
+        if self._cgroup is not None:
+            self.mode = "cgroup"
+        else:
+            self._use_rlimits("the cgroup is unusable" if cgroup_parent else "workers.cgroup_parent is not set")
+
+    def _use_rlimits(self, reason: str) -> None:
+        self.mode = "rlimit"
+        limits = self.limits
+        unenforced = []
+        if limits.memory_mb and (resource is None or not hasattr(resource, "prlimit")):
+            unenforced.append("memory_mb")
+        if limits.cpu_quota:
+            unenforced.append("cpu_quota")
+        if limits.cpu_affinity and not hasattr(os, "sched_setaffinity"):
+            unenforced.append("cpu_affinity")
+        if limits.max_processes:
+            unenforced.append("max_processes")
+        self.unenforced = unenforced
+        if unenforced:
+            logger.warning("Worker limits %s are not enforced (%s)", ", ".join(unenforced), reason)
+
+    # -- setup -----------------------------------------------------------
+
+    def _controllers(self) -> set[str]:
+        wanted = set()
+        if self.limits.memory_mb:
+            wanted.add("memory")
+        if self.limits.cpu_quota:
+            wanted.add("cpu")
+        if self.limits.cpu_affinity:
+            wanted.add("cpuset")
+        if self.limits.max_processes:
+            wanted.add("pids")
+        return wanted
+
+    def _create_cgroup(self, parent: Path, root: Path) -> Optional[Path]:
+        if not (root / "cgroup.controllers").is_file() or not os.access(parent, os.W_OK):
+            logger.warning("cgroup parent %s is not a writable cgroup v2 directory; falling back to rlimits", parent)
+            return None
+        path = parent / f"agent-step-{uuid.uuid4().hex[:12]}"
+        try:
+            subtree = parent / "cgroup.subtree_control"
+            missing = self._controllers() - set(subtree.read_text().split())
+            if missing:
+                subtree.write_text(" ".join(f"+{name}" for name in sorted(missing)))
+            path.mkdir()
+            limits = self.limits
+            if limits.memory_mb:
+                (path / "memory.max").write_text(str(limits.memory_mb * 1024 * 1024))
+            if limits.cpu_quota:
+                (path / "cpu.max").write_text(f"{int(limits.cpu_quota * _CPU_PERIOD_US)} {_CPU_PERIOD_US}")
+            if limits.cpu_affinity:
+                (path / "cpuset.cpus").write_text(",".join(str(cpu) for cpu in limits.cpu_affinity))
+            if limits.max_processes:
+                (path / "pids.max").write_text(str(limits.max_processes))
+        except OSError as exc:
+            logger.warning("cgroup limits unavailable under %s (%s); falling back to rlimits", parent, exc)
+            self._remove_cgroup(path)
+            return None
+        return path
+
+    def attach(self, pid: int) -> None:
+        """Place the freshly spawned worker *pid* under the limits."""
+        if self._cgroup is not None:
+            try:
+                (self._cgroup / "cgroup.procs").write_text(str(pid))
+                return
+            except OSError as exc:
+                logger.warning("Could not move worker %d into %s (%s); using rlimits", pid, self._cgroup, exc)
+                self._remove_cgroup(self._cgroup)
+                self._cgroup = None
+                self._use_rlimits("the worker could not join the cgroup")
+        if self.mode == "rlimit":
+            self._apply_rlimits(pid)
+
+    def _apply_rlimits(self, pid: int) -> None:
+        limits = self.limits
+        if limits.cpu_affinity and hasattr(os, "sched_setaffinity"):
+            try:
+                os.sched_setaffinity(pid, set(limits.cpu_affinity))
+            except OSError as exc:
+                logger.warning("Could not pin worker %d to CPUs %s: %s", pid, limits.cpu_affinity, exc)
+        if limits.memory_mb and "memory_mb" not in self.unenforced:
+            value = limits.memory_mb * 1024 * 1024
+            try:
+                resource.prlimit(pid, resource.RLIMIT_DATA, (value, value))
+            except (OSError, ValueError) as exc:
+                logger.warning("Could not cap memory of worker %d at %d MB: %s", pid, limits.memory_mb, exc)
+                self.unenforced.append("memory_mb")
+
+    # -- outcome ---------------------------------------------------------
+
+    def breach(self, exit_code: int, stderr_tail: str = "") -> Optional[str]:
+        """Name the limit a failed worker ran into (``memory``/``processes``), if any."""
+        if self.mode is None or exit_code == 0:
+            return None
+        if self._cgroup is not None:
+            memory = _read_counters(self._cgroup / "memory.events")
+            if memory.get("oom_kill") or memory.get("oom"):
+                return "memory"
+            if _read_counters(self._cgroup / "pids.events").get("max"):
+                return "processes"
+        if self.limits.memory_mb and _MEMORY_ERROR_RE.search(stderr_tail):
+            return "memory"
+        if self._cgroup is not None and self.limits.max_processes and _PROCESS_ERROR_RE.search(stderr_tail):
+            return "processes"
+        return None
+
+    def close(self) -> None:
+        if self._cgroup is not None:
+            self._remove_cgroup(self._cgroup)
+            self._cgroup = None
+
+    @staticmethod
+    def _remove_cgroup(path: Path) -> None:
+        if not path.exists():
+            return
+        kill = path / "cgroup.kill"
+        try:
+            if kill.exists():
+                # Also reaches processes that left the worker's process group.
+                kill.write_text("1")
+        except OSError:
+            pass
+        for _ in range(20):
+            try:
+                path.rmdir()
+                return
+            except OSError as exc:
+                error = exc
+                if not kill.exists():
+                    break
+                time.sleep(0.05)
+        logger.debug("Could not remove cgroup %s: %s", path, error)
@@ -0,0 +1,100 @@
+"""Tests for the run-directory artifact store and its retention janitor."""
+from __future__ import annotations
+
+import os
+import time
+from pathlib import Path
+
+from agent_orchestrator.io_utils import _read_text_range
+from agent_orchestrator.runtime.storage import ArtifactStore, Container, RetentionPolicy, retention_from_config
+
+
+def _step(store: ArtifactStore, prompt: str, stdout: str = "") -> Path:
+    run_dir = store.create_run_dir()
+    (run_dir / "prompt.txt").write_text(prompt, encoding="utf-8")
+    (run_dir / "stdout.log").write_text(stdout, encoding="utf-8")
+    (run_dir / "stderr.log").write_text("", encoding="utf-8")
+    store.finalize(run_dir)
+    return run_dir
+
+
+def _age(run_dir: Path, seconds: float) -> None:
+    stamp = time.time() - seconds
+    for path in [run_dir, *run_dir.iterdir()]:
+        os.utime(path, (stamp, stamp), follow_symlinks=False)
+
+
+# ---------------------------------------------------------------------------
+# 1. Finished steps share prompt text and keep compressed logs readable
+# ---------------------------------------------------------------------------
+
+
+def test_finalize_dedupes_prompts_and_compresses_logs(tmp_path: Path) -> None:
+    store = Container(tmp_path).artifacts
+    log = "".join(f"running test {idx}\n" for idx in range(2000))
+
+    first = _step(store, "Implement the feature", stdout=log)
+    second = _step(store, "Implement the feature")
+
+    [blob] = list(store.prompts_dir.iterdir())
+    assert (first / "prompt.txt").read_text() == (second / "prompt.txt").read_text() == "Implement the feature"
+    assert (first / "prompt.txt").stat().st_ino == (second / "prompt.txt").stat().st_ino == blob.stat().st_ino
+
+    assert not (first / "stdout.log").exists()
+    path = store.log_path(first, "stdout.log")
+    assert path.name == "stdout.log.gz" and path.stat().st_size < len(log) // 4
+    assert store.log_path(first, "stderr.log").name == "stderr.log"
+    text, start, end, size = _read_text_range(path, max_bytes=len(log))
+    assert (text, start, end, size) == (log, 0, len(log), len(log))
+    assert _read_text_range(path, offset=len(log) - 18, max_bytes=100)[0] == "running test 1999\n"
+
+    usage = store.usage()
+    assert usage["run_dirs"] == 2 and usage["prompt_blobs"] == 1
+    assert usage["prompts_deduplicated"] == 1 and usage["logs_compressed"] == 1
+    assert usage["compression_saved_bytes"] > 0 and usage["active_run_dirs"] == 0
+
+
+# ---------------------------------------------------------------------------
+# 2. The janitor prunes by age, then oldest first down to the size budget
+# ---------------------------------------------------------------------------
+
+
+def test_prune_by_age_and_total_size(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    store = container.artifacts
+    noisy = "x" * 4000 + "\n"
+
+    ancient = _step(store, "old prompt", stdout="done\n")
+    _age(ancient, 30 * 86400)
+    older = _step(store, "shared prompt", stdout=noisy)
+    _age(older, 3600 * 2)
+    newer = _step(store, "shared prompt", stdout=noisy)
+    _age(newer, 3600)
+    running = store.create_run_dir()
+    (running / "stdout.log").write_text(noisy)
+    _age(running, 3 * 86400)
+    legacy = container.state_root / "tmpabc123"
+    legacy.mkdir()
+    (legacy / "prompt.txt").write_text("from an older version")
+    _age(legacy, 20 * 86400)
+
+    removed = store.prune(RetentionPolicy(max_age_seconds=7 * 86400, max_total_bytes=None))
+    assert removed["run_dirs"] == 2
+    assert not ancient.exists() and not legacy.exists()
+    assert running.exists(), "a step still running is never pruned"
+    # The blob only the ancient run used went with it.
+    assert len(list(store.prompts_dir.iterdir())) == 1
+
+    budget = store.usage()["bytes"] - 1
+    store.prune(RetentionPolicy(max_age_seconds=None, max_total_bytes=budget))
+    assert not older.exists() and newer.exists()
+    assert (newer / "prompt.txt").read_text() == "shared prompt"
+    assert store.usage()["run_dirs_pruned"] == 3
+
+
+def test_retention_from_config() -> None:
+    assert retention_from_config({}) == RetentionPolicy()
+    policy = retention_from_config(
+        {"artifacts": {"max_age_days": 2, "max_total_mb": 0, "janitor_interval_seconds": 30}}
+    )
+    assert policy == RetentionPolicy(max_age_seconds=2 * 86400, max_total_bytes=None, interval_seconds=30)
@@ -214,6 +214,8 @@ def test_legacy_compat_endpoints_available(tmp_path: Path) -> None:
         metrics = client.get("/api/metrics")
         assert metrics.status_code == 200
         assert "phases_total" in metrics.json()
+        assert metrics.json()["merge_queue_depth"] == 0
+        assert "avg_latency_seconds" in metrics.json()["merge_queue"]
 
         phases = client.get("/api/phases")
         assert phases.status_code == 200
@@ -347,6 +349,75 @@ def test_settings_endpoint_round_trip(tmp_path: Path) -> None:
         assert reloaded.json() == body
 
 
+def test_settings_preserve_provider_limits(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    with TestClient(app) as client:
+        updated = client.patch(
+            "/api/settings",
+            json={
+                "workers": {
+                    "providers": {
+                        "codex": {"type": "codex", "command": "codex", "max_concurrency": 4},
+                        "local": {
+                            "type": "ollama",
+                            "endpoint": "http://localhost:11434",
+                            "model": "llama3",
+                            "max_concurrency": 1,
+                            "rate_limit_per_minute": 30,
+                            "model_limits": {"llama3": {"max_concurrency": 1, "bogus": 5}},
+                        },
+                    },
+                },
+            },
+        )
+        assert updated.status_code == 200
+        providers = updated.json()["workers"]["providers"]
+        assert providers["codex"]["max_concurrency"] == 4
+        assert providers["local"]["max_concurrency"] == 1
+        assert providers["local"]["rate_limit_per_minute"] == 30.0
+        assert providers["local"]["model_limits"] == {"llama3": {"max_concurrency": 1}}
+
+        metrics = client.get("/api/metrics")
+        assert metrics.status_code == 200
+        assert "worker_queue_wait_seconds" in metrics.json()
+        assert isinstance(metrics.json()["worker_queues"], dict)
+
+
+def test_settings_preserve_sandbox_limits(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["workers"] = {
+        "cgroup_parent": "/sys/fs/cgroup/agents.slice",
+        "providers": {"codex": {"type": "codex", "command": "codex", "resource_limits": {"memory_mb": 4096}}},
+    }
+    container.config.save(cfg)
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    with TestClient(app) as client:
+        # The settings form sends providers without sandbox limits.
+        updated = client.patch(
+            "/api/settings",
+            json={
+                "workers": {
+                    "default": "codex",
+                    "providers": {
+                        "codex": {"type": "codex", "command": "codex --fast"},
+                        "claude": {"type": "claude", "resource_limits": {"max_processes": 64, "bogus": 1}},
+                    },
+                }
+            },
+        )
+        assert updated.status_code == 200
+        workers = updated.json()["workers"]
+        assert workers["cgroup_parent"] == "/sys/fs/cgroup/agents.slice"
+        assert workers["providers"]["codex"]["command"] == "codex --fast"
+        assert workers["providers"]["codex"]["resource_limits"] == {"memory_mb": 4096}
+        assert workers["providers"]["claude"]["resource_limits"] == {"max_processes": 64}
+
+    saved = Container(tmp_path).config.load()["workers"]
+    assert saved["cgroup_parent"] == "/sys/fs/cgroup/agents.slice"
+    assert saved["providers"]["codex"]["resource_limits"] == {"memory_mb": 4096}
+
+
 def test_create_task_worker_model_round_trip(tmp_path: Path) -> None:
     app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
     with TestClient(app) as client:
@@ -679,3 +750,46 @@ def test_generate_tasks_with_override(tmp_path: Path) -> None:
         assert resp.status_code == 200
         assert len(resp.json()["created_task_ids"]) == 1
         assert resp.json()["children"][0]["title"] == "From override"
+
+
+def test_step_logs_endpoint_reads_tail_and_ranges(tmp_path: Path) -> None:
+    from agent_orchestrator.runtime.domain.models import RunRecord
+
+    container = Container(tmp_path)
+    run_dir = container.state_root / "step-artifacts"
+    run_dir.mkdir(parents=True)
+    log = "".join(f"line {idx}\n" for idx in range(5000))
+    (run_dir / "stdout.log").write_text(log, encoding="utf-8")
+    (run_dir / "prompt.txt").write_text("Do the thing", encoding="utf-8")
+    run = RunRecord(
+        task_id="task-1",
+        steps=[
+            {"step": "implement", "status": "ok", "run_dir": "step-artifacts"},
+            {"step": "verify", "status": "ok", "run_dir": "../.."},
+        ],
+    )
+    container.runs.upsert(run)
+
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    with TestClient(app) as client:
+        tail = client.get(f"/api/runs/{run.id}/steps/0/logs", params={"limit": 1024}).json()
+        assert tail["step"] == "implement"
+        assert tail["size"] == len(log) and tail["next_offset"] == len(log) and tail["eof"] is True
+        assert log.endswith(tail["text"]) and len(tail["text"]) == 1024
+
+        chunks, offset = [], 0
+        while True:
+            page = client.get(f"/api/runs/{run.id}/steps/0/logs", params={"offset": offset, "limit": 16384}).json()
+            chunks.append(page["text"])
+            offset = page["next_offset"]
+            if page["eof"]:
+                break
+        assert "".join(chunks) == log
+
+        prompt = client.get(f"/api/runs/{run.id}/steps/0/logs", params={"file": "prompt"}).json()
+        assert prompt["text"] == "Do the thing"
+
+        assert client.get(f"/api/runs/{run.id}/steps/0/logs", params={"file": "secrets"}).status_code == 400
+        assert client.get(f"/api/runs/{run.id}/steps/1/logs").status_code == 404
+        assert client.get(f"/api/runs/{run.id}/steps/5/logs").status_code == 404
+        assert client.get("/api/runs/missing/steps/0/logs").status_code == 404
@@ -1,6 +1,8 @@
 """Tests for automatic dependency analysis feature."""
 from __future__ import annotations
 
+import threading
+import time
 from pathlib import Path
 
 from agent_orchestrator.runtime.domain.models import Task
@@ -10,10 +12,12 @@ from agent_orchestrator.runtime.orchestrator.worker_adapter import DefaultWorker
 from agent_orchestrator.runtime.storage.container import Container
 
 
-def _service(tmp_path: Path, *, auto_deps: bool = True, adapter=None) -> tuple[Container, OrchestratorService, EventBus]:
+def _service(
+    tmp_path: Path, *, auto_deps: bool = True, adapter=None, debounce: float = 0.0
+) -> tuple[Container, OrchestratorService, EventBus]:
     container = Container(tmp_path)
     cfg = container.config.load()
-    cfg["orchestrator"] = {"auto_deps": auto_deps, "concurrency": 2}
+    cfg["orchestrator"] = {"auto_deps": auto_deps, "concurrency": 2, "dependency_debounce_seconds": debounce}
     container.config.save(cfg)
     bus = EventBus(container.events, container.project_id)
     service = OrchestratorService(container, bus, worker_adapter=adapter or DefaultWorkerAdapter())
@@ -209,13 +213,17 @@ def test_tick_once_integrates_dep_analysis(tmp_path: Path) -> None:
 
     service.worker_adapter = DepThenWorkAdapter()
 
-    # First tick should run analysis then claim t1 (since t2 is now blocked)
-    service.tick_once()
+    # The tick does not wait for analysis; both candidates are held back meanwhile
+    assert service.tick_once() is False
+    assert service._deps_worker.wait_idle(timeout=10)
     assert analysis_done is True
 
-    # t2 should be blocked by t1
+    # t2 should be blocked by t1, so the next tick claims t1
     t2r = container.tasks.get(t2.id)
     assert t1.id in t2r.blocked_by
+    assert service.tick_once() is True
+    assert container.tasks.get(t1.id).status != "ready"
+    assert container.tasks.get(t2.id).status == "ready"
 
 
 # ---------------------------------------------------------------------------
@@ -302,3 +310,325 @@ def test_new_tasks_trigger_reanalysis(tmp_path: Path) -> None:
 
     service._maybe_analyze_dependencies()
     assert call_count == 2
+
+
+# ---------------------------------------------------------------------------
+# 11. Slow analysis does not block claiming
+# ---------------------------------------------------------------------------
+
+
+def test_slow_analysis_runs_off_the_scheduler_thread(tmp_path: Path) -> None:
+    release = threading.Event()
+
+    class SlowAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step == "analyze_deps":
+                release.wait(timeout=10)
+                return StepResult(status="ok", dependency_edges=[])
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=SlowAdapter())
+    analyzed = Task(title="Known", status="ready", task_type="chore", metadata={"deps_analyzed": True})
+    container.tasks.upsert(analyzed)
+    container.tasks.upsert(Task(title="New A", status="ready"))
+    container.tasks.upsert(Task(title="New B", status="ready"))
+
+    started = time.monotonic()
+    assert service.tick_once() is True
+    assert time.monotonic() - started < 5
+    # The already-analyzed task was claimed while analysis is still running
+    assert container.tasks.get(analyzed.id).status != "ready"
+
+    release.set()
+    assert service._deps_worker.wait_idle(timeout=10)
+    assert all(t.metadata.get("deps_analyzed") for t in container.tasks.list())
+
+
+# ---------------------------------------------------------------------------
+# 12. Candidates arriving within the debounce window are analyzed together
+# ---------------------------------------------------------------------------
+
+
+def test_debounce_batches_candidates(tmp_path: Path) -> None:
+    batches: list[int] = []
+
+    class CountingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            batches.append(len(task.metadata["candidate_tasks"]))
+            return StepResult(status="ok", dependency_edges=[])
+
+    container, service, _ = _service(tmp_path, adapter=CountingAdapter(), debounce=0.5)
+    container.tasks.upsert(Task(title="Task A", status="ready"))
+    container.tasks.upsert(Task(title="Task B", status="ready"))
+    service.tick_once()
+    time.sleep(0.2)
+    container.tasks.upsert(Task(title="Task C", status="ready"))
+    service.tick_once()
+
+    assert service._deps_worker.wait_idle(timeout=10)
+    assert batches == [3]
+    assert service.status()["dependency_analysis"]["runs"] == 1
+
+
+# ---------------------------------------------------------------------------
+# 13. Cached results are reused for identical task content
+# ---------------------------------------------------------------------------
+
+
+def test_cached_edges_reused_for_identical_tasks(tmp_path: Path) -> None:
+    calls = 0
+    holder: dict[str, str] = {}
+
+    class EdgeAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            nonlocal calls
+            calls += 1
+            return StepResult(status="ok", dependency_edges=[
+                {"from": holder["auth"], "to": holder["profile"], "reason": "Profile needs auth"}
+            ])
+
+    container, service, _ = _service(tmp_path, adapter=EdgeAdapter())
+    auth = Task(title="Add auth", description="Login flow", status="ready")
+    profile = Task(title="Add profile", description="Profile page", status="ready")
+    holder.update(auth=auth.id, profile=profile.id)
+    container.tasks.upsert(auth)
+    container.tasks.upsert(profile)
+    service._maybe_analyze_dependencies()
+    assert calls == 1
+
+    # The same work is imported again (e.g. a re-run PRD split) after the
+    # originals were cancelled: the cached analysis applies without a call.
+    for task in container.tasks.list():
+        task.status = "cancelled"
+        container.tasks.upsert(task)
+    auth2 = Task(title="Add auth", description="Login flow", status="ready")
+    profile2 = Task(title="Add profile", description="Profile page", status="ready")
+    container.tasks.upsert(auth2)
+    container.tasks.upsert(profile2)
+    service._maybe_analyze_dependencies()
+
+    assert calls == 1
+    assert container.tasks.get(profile2.id).blocked_by == [auth2.id]
+    assert service.status()["dependency_analysis"]["cache_hits"] == 2
+
+
+# ---------------------------------------------------------------------------
+# 14. Editing an analyzed task makes it a candidate again
+# ---------------------------------------------------------------------------
+
+
+def test_edited_task_is_reanalyzed(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    t1 = Task(title="Task A", status="ready")
+    t2 = Task(title="Task B", status="ready")
+    container.tasks.upsert(t1)
+    container.tasks.upsert(t2)
+    service._maybe_analyze_dependencies()
+
+    edited = container.tasks.get(t1.id)
+    assert not service._needs_dependency_analysis(edited)
+    edited.description = "Now also touches the billing module"
+    assert service._needs_dependency_analysis(edited)
+
+
+# ---------------------------------------------------------------------------
+# 15. Large candidate sets are pre-filtered and batched by similarity
+# ---------------------------------------------------------------------------
+
+
+def test_prefilter_sends_only_similar_tasks_in_batches(tmp_path: Path) -> None:
+    batches: list[tuple[set[str], set[str]]] = []
+
+    class RecordingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            cands = {c["title"] for c in task.metadata["candidate_tasks"]}
+            context = {e["title"] for e in task.metadata["existing_tasks"]}
+            batches.append((cands, context))
+            ids = {c["title"]: c["id"] for c in task.metadata["candidate_tasks"]}
+            if "Billing schema" in ids and "Billing API" in ids:
+                return StepResult(status="ok", dependency_edges=[
+                    {"from": ids["Billing schema"], "to": ids["Billing API"], "reason": "API reads the schema"}
+                ])
+            return StepResult(status="ok", dependency_edges=[])
+
+    container, service, _ = _service(tmp_path, adapter=RecordingAdapter())
+    cfg = container.config.load()
+    cfg["orchestrator"]["dependency_prefilter_min_tasks"] = 10
+    container.config.save(cfg)
+    specs = [
+        ("Billing schema", "Create invoice tables in db/billing.sql"),
+        ("Billing API", "Serve invoice records from db/billing.sql"),
+        ("Billing emails", "Send invoice receipts to billing contacts"),
+        ("Onboarding guide", "Rewrite the onboarding handbook chapter"),
+        ("Onboarding video", "Record an onboarding walkthrough for the handbook"),
+        ("Rotate TLS certs", "Renew certificates before expiry"),
+        ("Upgrade linter", "Bump ruff and fix warnings"),
+        ("Cache avatars", "Add CDN caching headers for profile pictures"),
+        ("Audit logging", "Emit structured security events"),
+        ("Dark mode", "Theme toggle in settings page"),
+    ]
+    tasks = {title: Task(title=title, description=desc, status="ready") for title, desc in specs}
+    for task in tasks.values():
+        container.tasks.upsert(task)
+
+    service._maybe_analyze_dependencies()
+
+    sent = set().union(*(cands for cands, _ in batches))
+    assert {"Billing schema", "Billing API", "Billing emails", "Onboarding guide", "Onboarding video"} <= sent
+    assert not sent & {"Rotate TLS certs", "Upgrade linter", "Dark mode"}
+    assert len(batches) >= 2
+    assert all(len(cands) < len(specs) for cands, _ in batches)
+    assert tasks["Billing schema"].id in container.tasks.get(tasks["Billing API"].id).blocked_by
+    stats = service.status()["dependency_analysis"]
+    assert stats["prefiltered"] >= 3
+    assert stats["batches"] == len(batches)
+    assert all(t.metadata.get("deps_analyzed") for t in container.tasks.list())
+
+
+# ---------------------------------------------------------------------------
+# 16. Large candidate sets are chunked and analyzed concurrently
+# ---------------------------------------------------------------------------
+
+
+def _chunked_service(tmp_path: Path, adapter, **orchestrator) -> tuple[Container, OrchestratorService]:
+    container, service, _ = _service(tmp_path, adapter=adapter)
+    cfg = container.config.load()
+    cfg["orchestrator"].update({"dependency_prefilter": False, "dependency_chunk_size": 4, **orchestrator})
+    container.config.save(cfg)
+    return container, service
+
+
+def test_large_candidate_set_is_chunked_concurrently(tmp_path: Path) -> None:
+    lock = threading.Lock()
+    active = 0
+    peak = 0
+    calls: list[tuple[int, int]] = []
+    first: dict[str, str] = {}
+
+    class ChunkAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.2)
+            with lock:
+                active -= 1
+                calls.append((len(task.metadata["candidate_tasks"]), len(task.metadata["existing_tasks"])))
+            ids = [c["id"] for c in task.metadata["candidate_tasks"]]
+            # Each chunk links its first candidate to the very first task,
+            # which only the other chunks see through their context summary.
+            if first["id"] in ids:
+                return StepResult(status="ok", dependency_edges=[])
+            return StepResult(status="ok", dependency_edges=[{"from": first["id"], "to": ids[0], "reason": "base"}])
+
+    container, service = _chunked_service(tmp_path, ChunkAdapter())
+    tasks = [Task(title=f"Item {i}", status="ready") for i in range(12)]
+    first["id"] = tasks[0].id
+    for task in tasks:
+        container.tasks.upsert(task)
+
+    service._maybe_analyze_dependencies()
+
+    assert sorted(calls) == [(4, 8), (4, 8), (4, 8)]
+    assert peak > 1
+    blocked = [t for t in container.tasks.list() if first["id"] in t.blocked_by]
+    assert len(blocked) == 2
+
+
+def test_mid_sized_candidate_set_is_chunked_by_default(tmp_path: Path) -> None:
+    calls: list[tuple[int, int]] = []
+    lock = threading.Lock()
+
+    class RecordingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            with lock:
+                calls.append((len(task.metadata["candidate_tasks"]), len(task.metadata["existing_tasks"])))
+            return StepResult(status="ok", dependency_edges=[])
+
+    container, service, _ = _service(tmp_path, adapter=RecordingAdapter())
+    for i in range(30):
+        container.tasks.upsert(Task(title=f"Item {i}", status="ready"))
+
+    service._maybe_analyze_dependencies()
+
+    assert sorted(calls) == [(5, 25), (25, 5)]
+    assert service.status()["dependency_analysis"]["batches"] == 2
+    assert all(t.metadata.get("deps_analyzed") for t in container.tasks.list())
+
+
+# ---------------------------------------------------------------------------
+# 17. A timed-out chunk does not discard the chunks that succeeded
+# ---------------------------------------------------------------------------
+
+
+def test_chunk_timeout_keeps_successful_chunks(tmp_path: Path) -> None:
+    release = threading.Event()
+    slow: dict[str, str] = {}
+
+    class SlowChunkAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            ids = [c["id"] for c in task.metadata["candidate_tasks"]]
+            if slow["id"] in ids:
+                release.wait(timeout=30)
+                slow["finished"] = "yes"
+                return StepResult(status="ok", dependency_edges=[])
+            return StepResult(status="ok", dependency_edges=[{"from": ids[0], "to": ids[1], "reason": "order"}])
+
+    container, service = _chunked_service(tmp_path, SlowChunkAdapter(), dependency_chunk_timeout_seconds=0.5)
+    tasks = [Task(title=f"Item {i}", status="ready") for i in range(8)]
+    slow["id"] = tasks[0].id
+    for task in tasks:
+        container.tasks.upsert(task)
+
+    service._maybe_analyze_dependencies()
+    # Analysis returned while the slow chunk was still blocked
+    assert "finished" not in slow
+    release.set()
+
+    stored = {t.id: t for t in container.tasks.list()}
+    assert tasks[4].id in stored[tasks[5].id].blocked_by
+    assert all(stored[t.id].metadata.get("deps_analysis_failed") == "timeout" for t in tasks[:4])
+    assert all("deps_analysis_failed" not in stored[t.id].metadata for t in tasks[4:])
+    # Only the chunk that finished counts as analyzed; the timed-out one is retried.
+    assert all(stored[t.id].metadata.get("deps_analyzed") for t in tasks[4:])
+    assert not any(stored[t.id].metadata.get("deps_analyzed") for t in tasks[:4])
+    partial = [e for e in container.events.list_recent(limit=100) if e.get("type") == "dependency_analysis.partial"]
+    assert partial and partial[0]["payload"]["failed"] == ["timeout"]
+    assert service.status()["dependency_analysis"]["failed_batches"] == 1
+
+    service._maybe_analyze_dependencies()
+    stored = {t.id: t for t in container.tasks.list()}
+    assert all(t.metadata.get("deps_analyzed") for t in stored.values())
+    assert not any("deps_analysis_failed" in t.metadata or "deps_analysis_attempts" in t.metadata for t in stored.values())
+
+
+def test_failing_chunk_is_retried_a_bounded_number_of_times(tmp_path: Path) -> None:
+    broken: dict[str, str] = {}
+    passes: list[int] = []
+
+    class FlakyChunkAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            ids = [c["id"] for c in task.metadata["candidate_tasks"]]
+            passes.append(len(ids))
+            if broken["id"] in ids:
+                return StepResult(status="error", summary="worker crashed")
+            return StepResult(status="ok", dependency_edges=[])
+
+    container, service = _chunked_service(tmp_path, FlakyChunkAdapter(), dependency_max_attempts=2)
+    tasks = [Task(title=f"Item {i}", status="ready") for i in range(8)]
+    broken["id"] = tasks[0].id
+    for task in tasks:
+        container.tasks.upsert(task)
+
+    service._maybe_analyze_dependencies()
+    first = container.tasks.get(tasks[0].id)
+    assert not first.metadata.get("deps_analyzed")
+    assert first.metadata["deps_analysis_attempts"] == 1
+
+    # The retry pass only sends the failed chunk, then gives up on it.
+    service._maybe_analyze_dependencies()
+    assert passes == [4, 4, 4]
+    first = container.tasks.get(tasks[0].id)
+    assert first.metadata.get("deps_analyzed") is True
+    assert first.metadata["deps_analysis_failed"] == "error"
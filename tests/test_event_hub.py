@@ -27,3 +27,78 @@ def test_publish_sync_from_background_thread_uses_attached_loop() -> None:
         assert received == [{"channel": "system", "type": "test"}]
 
     asyncio.run(_run())
+
+
+def _wait_for(predicate, timeout: float = 2.0) -> None:
+    import time
+
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_log_stream_coalesces_and_rate_limits_output() -> None:
+    from agent_orchestrator.runtime.events.logs import LogStream
+
+    published: list[dict[str, object]] = []
+    stream = LogStream(published.append, flush_seconds=0.2, max_chunk_chars=50)
+    write = stream.writer(project_id="p1", task_id="t1", run_id="r1", step="implement")
+
+    write("stdout", "first\n")
+    _wait_for(lambda: len(published) == 1)
+    for idx in range(20):
+        write("stdout", f"line {idx}\n")
+    _wait_for(lambda: len(published) == 2)
+    stream.flush("t1")
+
+    # One immediate event, then everything else coalesced into one rate-limited event.
+    assert len(published) == 2
+    first, second = published
+    assert first["channel"] == "logs" and first["entity_id"] == "t1" and first["project_id"] == "p1"
+    assert first["payload"] == {"task_id": "t1", "run_id": "r1", "step": "implement", "stream": "stdout", "text": "first\n"}
+    text = second["payload"]["text"]
+    assert len(text) == 50 and text.endswith("line 19\n")
+    assert second["payload"]["dropped_chars"] == sum(len(f"line {idx}\n") for idx in range(20)) - 50
+
+
+def test_log_stream_backlog_keeps_recent_whole_lines() -> None:
+    from agent_orchestrator.runtime.events.logs import LogStream
+
+    stream = LogStream(lambda event: None, backlog_lines=3)
+    write = stream.writer(project_id="p1", task_id="t1", run_id="r1", step="verify")
+    write("stdout", "a\nb\nc")
+    stream.flush("t1")
+    write("stderr", "d\ne\n")
+    stream.flush("t1")
+
+    [event] = stream.backlog(["t1", "t2"], ["p1"])
+    assert event["type"] == "backlog"
+    assert [line["line"] for line in event["payload"]["lines"]] == ["c", "d", "e"]
+    assert event["payload"]["lines"][-1] == {"run_id": "r1", "step": "verify", "stream": "stderr", "line": "e"}
+    assert stream.backlog(["t1"], ["other-project"]) == []
+
+
+def test_logs_channel_is_filtered_by_subscribed_task() -> None:
+    class _FakeWs:
+        def __init__(self) -> None:
+            self.sent: list[str] = []
+
+        async def send_text(self, text: str) -> None:
+            self.sent.append(text)
+
+    async def _run() -> None:
+        from agent_orchestrator.runtime.events.ws import _WsClient
+
+        hub = WebSocketHub()
+        watcher, everything = _FakeWs(), _FakeWs()
+        hub._clients = {
+            1: _WsClient(ws=watcher, channels={"logs"}, task_ids={"t1"}),  # type: ignore[arg-type]
+            2: _WsClient(ws=everything, channels={"logs"}),  # type: ignore[arg-type]
+        }
+        for task_id in ("t1", "t2"):
+            await hub.publish({"channel": "logs", "type": "worker.output", "entity_id": task_id, "payload": {}})
+
+        assert len(watcher.sent) == 1 and '"t1"' in watcher.sent[0]
+        assert len(everything.sent) == 2
+
+    asyncio.run(_run())
@@ -17,7 +17,9 @@ from agent_orchestrator.runtime.orchestrator.live_worker_adapter import (
 )
 from agent_orchestrator.runtime.orchestrator.worker_adapter import StepResult
 from agent_orchestrator.runtime.storage.container import Container
+from agent_orchestrator.workers.cancellation import CancellationRegistry
 from agent_orchestrator.workers.config import WorkerProviderSpec
+from agent_orchestrator.workers.limits import ProviderLimiter, ProviderLimits
 from agent_orchestrator.workers.run import WorkerRunResult
 
 
@@ -129,6 +131,8 @@ def test_codex_success_maps_to_ok(adapter: LiveWorkerAdapter) -> None:
         result = adapter.run_step(task=_make_task(), step="implement", attempt=1)
 
     assert result.status == "ok"
+    # The step's artifacts stay reachable from the run record.
+    assert result.run_dir and (adapter._container.state_root / result.run_dir).is_dir()
 
 
 # ---------------------------------------------------------------------------
@@ -326,6 +330,7 @@ def test_codex_failure_maps_to_error(adapter: LiveWorkerAdapter) -> None:
 
     assert result.status == "error"
     assert "code 1" in (result.summary or "")
+    assert result.retryable is False
 
 
 # ---------------------------------------------------------------------------
@@ -357,6 +362,7 @@ def test_codex_timeout_maps_to_error(adapter: LiveWorkerAdapter) -> None:
 
     assert result.status == "error"
     assert "timed out" in (result.summary or "").lower()
+    assert result.retryable is False
 
 
 # ---------------------------------------------------------------------------
@@ -388,6 +394,43 @@ def test_codex_no_heartbeat_maps_to_stalled_error(adapter: LiveWorkerAdapter) ->
 
     assert result.status == "error"
     assert "stalled" in (result.summary or "").lower()
+    assert result.retryable is True
+
+
+# ---------------------------------------------------------------------------
+# Transient failure classification
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.parametrize(
+    "exit_code,stderr,retryable",
+    [
+        (1, "[runner] Ollama URL error: <urlopen error [Errno 111] Connection refused>", True),
+        (1, "Error: 429 Too Many Requests", True),
+        (1, "upstream returned 503 Service Unavailable", True),
+        (-9, "", True),
+        (137, "", True),
+        (1, "SyntaxError: invalid syntax", False),
+        (2, "[runner] Ollama HTTP error: 404 model 'llama3' not found", False),
+        (1, "API Error: 529 {\"type\":\"overloaded_error\"}", True),
+        (1, "FAILED tests/test_api.py::test_health - assert 500 == 200", False),
+        (1, "E   Failed: Timeout >5.0s\nnetwork test timed out", False),
+        (1, "ConnectionRefusedError: [Errno 111] Connection refused", False),
+        (1, "Error: 429 Too Many Requests\n" + "test output\n" * 10 + "1 failed", False),
+    ],
+)
+def test_nonzero_exit_classified_as_transient_or_deterministic(
+    adapter: LiveWorkerAdapter, tmp_path: Path, exit_code: int, stderr: str, retryable: bool
+) -> None:
+    stderr_path = tmp_path / "stderr.log"
+    stderr_path.write_text(stderr)
+    run_result = _make_run_result(exit_code=exit_code)
+    run_result = WorkerRunResult(**{**run_result.__dict__, "stderr_path": str(stderr_path)})
+
+    result = adapter._map_result(run_result, _CODEX_SPEC, "implement")
+
+    assert result.status == "error"
+    assert result.retryable is retryable
 
 
 # ---------------------------------------------------------------------------
@@ -629,6 +672,48 @@ def test_worker_exception_returns_error(adapter: LiveWorkerAdapter) -> None:
     assert "Codex crashed" in (result.summary or "")
 
 
+# ---------------------------------------------------------------------------
+# Provider limits are held around run_worker
+# ---------------------------------------------------------------------------
+
+
+def test_run_worker_holds_provider_slot(container: Container) -> None:
+    limiter = ProviderLimiter()
+    adapter = LiveWorkerAdapter(container, limiter=limiter)
+    spec = WorkerProviderSpec(
+        name="local", type="ollama", endpoint="http://localhost:11434", model="llama3",
+        limits=ProviderLimits(max_concurrency=1),
+    )
+    seen: list[int] = []
+
+    def fake_run_worker(**kwargs):
+        seen.append(limiter.snapshot()["local"]["active"])
+        return _make_run_result(response_text='{"summary": "done"}')
+
+    with (
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.get_workers_runtime_config"
+        ),
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.resolve_worker_for_step",
+            return_value=spec,
+        ),
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.test_worker",
+            return_value=(True, "ok"),
+        ),
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.run_worker",
+            side_effect=fake_run_worker,
+        ),
+    ):
+        result = adapter.run_step(task=_make_task(), step="implement", attempt=1)
+
+    assert result.status == "ok"
+    assert seen == [1]
+    assert limiter.snapshot()["local"]["active"] == 0
+
+
 # ---------------------------------------------------------------------------
 # Ollama verify step maps pass/fail
 # ---------------------------------------------------------------------------
@@ -1094,3 +1179,30 @@ def test_run_step_reads_project_commands_from_config(container: Container, adapt
     prompt = captured_prompt["text"]
     assert "## Project commands" in prompt
     assert ".venv/bin/pytest -x" in prompt
+
+
+def test_step_cancelled_while_queued_finalizes_its_run_dir(container: Container) -> None:
+    cancellations = CancellationRegistry()
+    adapter = LiveWorkerAdapter(container, cancellations=cancellations)
+    task = _make_task()
+    cancellations.cancel(task.id)
+
+    with (
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.get_workers_runtime_config"
+        ),
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.resolve_worker_for_step",
+            return_value=_CODEX_SPEC,
+        ),
+        patch(
+            "agent_orchestrator.runtime.orchestrator.live_worker_adapter.test_worker",
+            return_value=(True, "ok"),
+        ),
+        patch("agent_orchestrator.runtime.orchestrator.live_worker_adapter.run_worker") as run_worker,
+    ):
+        result = adapter.run_step(task=task, step="verify", attempt=1)
+
+    assert result.status == "cancelled"
+    run_worker.assert_not_called()
+    assert container.artifacts.usage()["active_run_dirs"] == 0
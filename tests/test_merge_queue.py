@@ -0,0 +1,114 @@
+"""Tests for the batched merge queue."""
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from agent_orchestrator.runtime.orchestrator.merge_queue import MERGED, MergeQueue
+
+
+def _git(path: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=path, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _repo(path: Path) -> None:
+    _git(path, "init", "-b", "main")
+    _git(path, "config", "user.email", "test@test.com")
+    _git(path, "config", "user.name", "Test")
+    (path / "README.md").write_text("# init\n")
+    _git(path, "add", "-A")
+    _git(path, "commit", "-m", "initial")
+
+
+def _branch(path: Path, name: str, files: dict[str, str]) -> None:
+    """Commit *files* on a new branch *name* (from main) without touching the checkout."""
+    _git(path, "branch", name)
+    wt = path.parent / f"{path.name}-{name}"
+    _git(path, "worktree", "add", str(wt), name)
+    for rel, content in files.items():
+        (wt / rel).write_text(content)
+    _git(wt, "add", "-A")
+    _git(wt, "commit", "-m", f"work on {name}")
+    _git(path, "worktree", "remove", str(wt))
+
+
+def _merge_concurrently(queue: MergeQueue, lock: threading.Lock, branches: list[str]) -> dict[str, object]:
+    """Queue all *branches* while the lock is held so they land in one batch."""
+    outcomes: dict[str, object] = {}
+    with lock:
+        threads = [
+            threading.Thread(target=lambda b=b: outcomes.__setitem__(b, queue.merge(b))) for b in branches
+        ]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while queue.stats()["depth"] < len(branches) and time.monotonic() < deadline:
+            time.sleep(0.01)
+    for thread in threads:
+        thread.join(timeout=10)
+    return outcomes
+
+
+def test_batch_merges_all_branches_with_one_integration(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _repo(repo)
+    for name in ("a", "b", "c"):
+        _branch(repo, f"task-{name}", {f"{name}.txt": f"{name}\n"})
+    lock = threading.Lock()
+    queue = MergeQueue(repo, lock)
+
+    outcomes = _merge_concurrently(queue, lock, ["task-a", "task-b", "task-c"])
+
+    assert outcomes == {"task-a": MERGED, "task-b": MERGED, "task-c": MERGED}
+    assert all((repo / f"{name}.txt").exists() for name in ("a", "b", "c"))
+    assert _git(repo, "status", "--porcelain") == ""
+    stats = queue.stats()
+    assert stats["batches"] == 1
+    assert stats["last_batch_size"] == 3
+    assert stats["merged"] == 3
+    assert stats["bisections"] == 0
+    assert stats["depth"] == 0
+    assert stats["max_latency_seconds"] > 0
+
+
+def test_conflicting_branch_isolated_by_bisection(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _repo(repo)
+    _branch(repo, "task-a", {"a.txt": "a\n"})
+    _branch(repo, "task-b", {"README.md": "# from b\n"})
+    _branch(repo, "task-c", {"c.txt": "c\n"})
+    _branch(repo, "task-d", {"d.txt": "d\n"})
+    # The run branch moves on and edits the same line as task-b.
+    (repo / "README.md").write_text("# from main\n")
+    _git(repo, "commit", "-am", "main edit")
+    lock = threading.Lock()
+    queue = MergeQueue(repo, lock)
+
+    outcomes = _merge_concurrently(queue, lock, ["task-a", "task-b", "task-c", "task-d"])
+
+    head = _git(repo, "rev-parse", "HEAD")
+    assert outcomes["task-a"] == outcomes["task-c"] == outcomes["task-d"] == MERGED
+    # The conflicting branch is told which head to rebase onto.
+    assert outcomes["task-b"] == head
+    assert (repo / "README.md").read_text() == "# from main\n"
+    assert all((repo / f"{name}.txt").exists() for name in ("a", "c", "d"))
+    stats = queue.stats()
+    assert stats["batches"] == 1
+    assert stats["conflicts"] == 1
+    assert stats["bisections"] >= 1
+
+
+def test_detached_head_falls_back(tmp_path: Path) -> None:
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    _repo(repo)
+    _branch(repo, "task-a", {"a.txt": "a\n"})
+    _git(repo, "checkout", "--detach")
+    queue = MergeQueue(repo, threading.Lock())
+
+    assert queue.merge("task-a") is None
+    assert not (repo / "a.txt").exists()
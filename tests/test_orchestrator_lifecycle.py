@@ -21,16 +21,22 @@ def test_app_shutdown_stops_orchestrators(tmp_path: Path) -> None:
         values = list(app.state.orchestrators.values())
         assert values
         orchestrator = values[0]
-        assert orchestrator._thread is not None
-        assert orchestrator._thread.is_alive()
+        # Projects are scheduled by the shared supervisor thread.
+        assert orchestrator._supervised
+        assert app.state.supervisor._thread.is_alive()
 
     assert orchestrator is not None
     assert app.state.orchestrators == {}
-    assert orchestrator._thread is None
+    assert not orchestrator._supervised
+    assert app.state.supervisor._thread is None
 
 
 def test_in_progress_tasks_recover_on_worker_start(tmp_path: Path) -> None:
     container = Container(tmp_path)
+    # Paused so the worker loop does not claim the recovered task.
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"status": "paused"}
+    container.config.save(cfg)
     bus = EventBus(container.events, container.project_id)
 
     task = Task(
@@ -395,3 +395,219 @@ def test_status_reports_active_workers(tmp_path: Path) -> None:
     service._sweep_futures()
 
     assert service.status()["active_workers"] == 0
+
+
+def _wait_for_futures(service: OrchestratorService) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        with service._futures_lock:
+            if all(f.done() for f in service._futures.values()):
+                break
+        time.sleep(0.05)
+    service._sweep_futures()
+
+
+# ---------------------------------------------------------------------------
+# 9. Reserved slots are kept free for urgent work
+# ---------------------------------------------------------------------------
+
+
+def test_reserved_slot_only_claimed_by_urgent_task(tmp_path: Path) -> None:
+    gate = threading.Event()
+
+    class BlockingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            gate.wait(timeout=10)
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 2, "auto_deps": False, "reserved_slots": 1}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=BlockingAdapter())
+
+    for i in range(2):
+        container.tasks.upsert(Task(title=f"Feature {i}", task_type="chore", priority="P2", status="ready",
+                                    approval_mode="auto_approve"))
+
+    assert service.tick_once() is True
+    # The second slot is reserved: the other P2 task must wait.
+    assert service.tick_once() is False
+
+    hotfix = Task(title="Hotfix", task_type="hotfix", priority="P1", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(hotfix)
+    assert service.tick_once() is True
+    assert container.tasks.get(hotfix.id).status == "in_progress"
+    assert service.status()["reserved_slots"] == 1
+
+    gate.set()
+    _wait_for_futures(service)
+
+
+# ---------------------------------------------------------------------------
+# 10. Preemption parks a running task at a step boundary and resumes it
+# ---------------------------------------------------------------------------
+
+
+def test_preemption_parks_and_resumes_low_priority_task(tmp_path: Path) -> None:
+    started = threading.Event()
+    gate = threading.Event()
+    calls: list[tuple[str, str]] = []
+
+    class Adapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            calls.append((task.title, step))
+            if task.title == "Long" and step == "implement" and not gate.is_set():
+                started.set()
+                gate.wait(timeout=10)
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 1, "auto_deps": False, "preemption": True}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=Adapter())
+
+    long_task = Task(title="Long", task_type="chore", priority="P2", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(long_task)
+    assert service.tick_once() is True
+    assert started.wait(timeout=5)
+
+    urgent = Task(title="Urgent", task_type="chore", priority="P0", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(urgent)
+    assert service.tick_once() is False
+    assert service.status()["preempting"] == 1
+
+    gate.set()
+    _wait_for_futures(service)
+    parked = container.tasks.get(long_task.id)
+    assert parked.status == "ready"
+    assert parked.metadata["checkpoint"]["completed_steps"] == ["implement"]
+    parked_run = next(r for r in container.runs.list() if r.task_id == long_task.id)
+    assert parked_run.status == "parked"
+
+    assert service.tick_once() is True
+    _wait_for_futures(service)
+    assert container.tasks.get(urgent.id).status == "done"
+
+    assert service.tick_once() is True
+    _wait_for_futures(service)
+    resumed = container.tasks.get(long_task.id)
+    assert resumed.status == "done"
+    assert "checkpoint" not in resumed.metadata
+    assert resumed.run_ids == [parked_run.id]
+    assert calls.count(("Long", "implement")) == 1
+    run = next(r for r in container.runs.list() if r.id == parked_run.id)
+    assert [s["step"] for s in run.steps] == ["implement", "verify", "commit"]
+
+
+def test_no_preemption_for_urgent_tasks_held_for_dependency_analysis(tmp_path: Path) -> None:
+    started = threading.Event()
+    gate = threading.Event()
+
+    class Adapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if task.title == "Long" and step == "implement":
+                started.set()
+                gate.wait(timeout=10)
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {
+        "concurrency": 1,
+        "preemption": True,
+        "dependency_debounce_seconds": 60,
+        "dependency_debounce_max_seconds": 60,
+    }
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=Adapter())
+
+    long_task = Task(title="Long", task_type="chore", priority="P2", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(long_task)
+    assert service.tick_once() is True
+    assert started.wait(timeout=5)
+
+    # Two new urgent tasks wait for dependency analysis, so neither is claimable yet.
+    for i in range(2):
+        container.tasks.upsert(Task(title=f"Urgent {i}", task_type="chore", priority="P0", status="ready",
+                                    approval_mode="auto_approve"))
+    assert service.tick_once() is False
+    assert service.status()["preempting"] == 0
+
+    gate.set()
+    _wait_for_futures(service)
+    assert container.tasks.get(long_task.id).status == "done"
+
+
+# ---------------------------------------------------------------------------
+# 11. Light steps do not queue behind heavy ones when lanes are configured
+# ---------------------------------------------------------------------------
+
+
+def test_light_lane_runs_while_heavy_lane_is_busy(tmp_path: Path) -> None:
+    gate = threading.Event()
+    heavy_started = threading.Event()
+    planned = threading.Event()
+
+    class Adapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step == "plan":
+                planned.set()
+            if task.title == "Heavy" and step == "implement":
+                heavy_started.set()
+                gate.wait(timeout=10)
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 1, "auto_deps": False, "lanes": {"heavy": 1, "light": 1}}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=Adapter())
+
+    heavy = Task(title="Heavy", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(heavy)
+    assert service.tick_once() is True
+    assert heavy_started.wait(timeout=5)
+
+    light = Task(title="Light", task_type="feature", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(light)
+    # Lane capacities (1 + 1) raise the in-flight task limit above concurrency=1.
+    assert service.tick_once() is True
+    assert planned.wait(timeout=5)
+
+    deadline = time.time() + 5
+    while time.time() < deadline and service.status()["lanes"]["heavy"]["queued"] == 0:
+        time.sleep(0.05)
+    lanes = service.status()["lanes"]
+    assert lanes["heavy"] == {**lanes["heavy"], "capacity": 1, "active": 1, "queued": 1, "utilization": 1.0}
+
+    gate.set()
+    _wait_for_futures(service)
+    assert container.tasks.get(heavy.id).status == "done"
+    assert container.tasks.get(light.id).status == "done"
+
+
+def test_auxiliary_worker_steps_take_lane_slots(tmp_path: Path) -> None:
+    class Adapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            return StepResult(status="ok", generated_tasks=[{"title": "Child", "task_type": "chore"}])
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 1, "auto_deps": False, "lanes": {"heavy": 1, "light": 1}}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=Adapter())
+
+    parent = Task(title="Parent", task_type="feature", status="backlog")
+    container.tasks.upsert(parent)
+    assert len(service.generate_tasks_from_plan(parent.id, "1. Do the thing")) == 1
+
+    lanes = service.status()["lanes"]
+    assert lanes["light"]["acquired"] == 1
+    assert lanes["heavy"]["acquired"] == 0
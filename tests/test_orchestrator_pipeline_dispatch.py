@@ -1,11 +1,13 @@
 """Tests verifying template-driven pipeline dispatch per task type."""
 from __future__ import annotations
 
+import threading
 from pathlib import Path
 
 from agent_orchestrator.runtime.domain.models import Task
 from agent_orchestrator.runtime.events import EventBus
 from agent_orchestrator.runtime.orchestrator import OrchestratorService
+from agent_orchestrator.runtime.orchestrator.worker_adapter import StepResult
 from agent_orchestrator.runtime.storage.container import Container
 
 
@@ -120,6 +122,270 @@ def test_security_audit_runs_scan_steps(tmp_path: Path) -> None:
     assert steps == ["scan_deps", "scan_code", "report", "generate_tasks"]
 
 
+def test_security_audit_scans_run_concurrently(tmp_path: Path) -> None:
+    barrier = threading.Barrier(2, timeout=5)
+    seen: list[str] = []
+
+    class BarrierAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step in ("scan_deps", "scan_code"):
+                # Both scans must be in flight at the same time to pass.
+                barrier.wait()
+            seen.append(step)
+            return StepResult(status="ok", summary=f"{step} done")
+
+    container = Container(tmp_path)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=BarrierAdapter())
+    task = Task(
+        title="Security audit task",
+        task_type="security",
+        status="ready",
+        approval_mode="auto_approve",
+        hitl_mode="autopilot",
+    )
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    assert set(seen[:2]) == {"scan_deps", "scan_code"}
+    # Results are merged back in template order regardless of completion order.
+    assert _step_names(container, task.id) == ["scan_deps", "scan_code", "report", "generate_tasks"]
+    assert service.status()["parallel_steps"] == 0
+
+
+def test_parallel_group_runs_inline_without_spare_capacity(tmp_path: Path) -> None:
+    threads: dict[str, str] = {}
+
+    class RecordingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            threads[step] = threading.current_thread().name
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 1, "auto_deps": False}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=RecordingAdapter())
+    task = Task(title="Audit", task_type="security", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+    assert threads["scan_deps"] == threads["scan_code"]
+
+
+def test_parallel_steps_work_on_their_own_task_copy(tmp_path: Path) -> None:
+    barrier = threading.Barrier(2, timeout=5)
+    seen: dict[str, int] = {}
+
+    class MutatingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step in ("scan_deps", "scan_code"):
+                seen[step] = id(task)
+                task.metadata[f"{step}_note"] = step
+                barrier.wait()
+                # The other scan's write must not show up in this step's task.
+                assert f"{'scan_code' if step == 'scan_deps' else 'scan_deps'}_note" not in task.metadata
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=MutatingAdapter())
+    task = Task(title="Audit", task_type="security", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    assert seen["scan_deps"] != seen["scan_code"]
+    assert result.metadata["scan_deps_note"] == "scan_deps"
+    assert result.metadata["scan_code_note"] == "scan_code"
+
+
+def test_parallel_group_failure_blocks_in_template_order(tmp_path: Path) -> None:
+    class FailingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step == "scan_code":
+                return StepResult(status="error", summary="scanner crashed")
+            return StepResult(status="ok")
+
+    container = Container(tmp_path)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=FailingAdapter())
+    task = Task(title="Audit", task_type="security", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "blocked"
+    assert result.error == "scanner crashed"
+    assert _step_names(container, task.id) == ["scan_deps", "scan_code"]
+
+
+def _write_pipeline(tmp_path: Path, body: str) -> None:
+    pipelines_dir = tmp_path / ".agent_orchestrator" / "pipelines"
+    pipelines_dir.mkdir(parents=True, exist_ok=True)
+    (pipelines_dir / "custom.yaml").write_text(body)
+
+
+def test_step_condition_skips_step_and_records_it(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    _write_pipeline(
+        tmp_path,
+        "id: docs_fast\n"
+        "display_name: Docs Fast\n"
+        "task_types: [docs_fast]\n"
+        "steps:\n"
+        "  - name: implement\n"
+        "  - name: verify\n"
+        "    condition: \"not (task.labels contains 'docs')\"\n"
+        "  - name: report\n"
+        "    condition: \"previous.implement.status == 'ok'\"\n",
+    )
+    task = Task(title="Docs", task_type="docs_fast", labels=["docs"], status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    run = next(r for r in container.runs.list() if r.task_id == task.id)
+    statuses = [(s["step"], s["status"]) for s in run.steps]
+    assert statuses == [("implement", "ok"), ("verify", "skipped"), ("report", "ok")]
+    assert "task.labels contains 'docs'" in run.steps[1]["reason"]
+
+
+def test_invalid_condition_fails_open(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    _write_pipeline(
+        tmp_path,
+        "id: broken\n"
+        "task_types: [broken]\n"
+        "steps:\n"
+        "  - name: implement\n"
+        "    condition: \"task.labels >\"\n",
+    )
+    task = Task(title="Broken", task_type="broken", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+    assert _step_names(container, task.id) == ["implement"]
+
+
+def test_optional_step_failure_does_not_block(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    task = Task(
+        title="Review",
+        task_type="review",
+        status="ready",
+        approval_mode="auto_approve",
+        metadata={"scripted_steps": {"report": {"status": "error", "summary": "report failed"}}},
+    )
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    run = next(r for r in container.runs.list() if r.task_id == task.id)
+    report = [s for s in run.steps if s["step"] == "report"][0]
+    assert report["status"] == "error"
+    assert report["optional"] is True
+
+
+def test_skip_optional_steps_setting(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {**dict(cfg.get("orchestrator") or {}), "skip_optional_steps": True}
+    container.config.save(cfg)
+    task = Task(title="Research", task_type="research", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+    run = next(r for r in container.runs.list() if r.task_id == task.id)
+    assert [(s["step"], s["status"]) for s in run.steps][-1] == ("report", "skipped")
+
+
+class _FlakyAdapter:
+    """Fails ``step`` with the given result ``failures`` times, then succeeds."""
+
+    def __init__(self, step: str, failures: int, *, retryable: bool = True) -> None:
+        self.step = step
+        self.failures = failures
+        self.retryable = retryable
+        self.calls: list[str] = []
+
+    def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+        self.calls.append(step)
+        if step == self.step and self.calls.count(step) <= self.failures:
+            return StepResult(status="error", summary="rate limited", retryable=self.retryable)
+        return StepResult(status="ok")
+
+
+def _retry_service(tmp_path: Path, adapter: _FlakyAdapter) -> tuple[Container, OrchestratorService]:
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {**dict(cfg.get("orchestrator") or {}), "step_retry_backoff_seconds": 0}
+    container.config.save(cfg)
+    bus = EventBus(container.events, container.project_id)
+    return container, OrchestratorService(container, bus, worker_adapter=adapter)
+
+
+def test_transient_step_failure_is_retried(tmp_path: Path) -> None:
+    adapter = _FlakyAdapter("implement", failures=2)
+    container, service = _retry_service(tmp_path, adapter)
+    task = Task(title="Chore", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+    assert adapter.calls.count("implement") == 3
+    run = next(r for r in container.runs.list() if r.task_id == task.id)
+    implement = [s for s in run.steps if s["step"] == "implement"]
+    assert len(implement) == 1
+    assert implement[0]["status"] == "ok"
+    assert [r["retry"] for r in implement[0]["retries"]] == [1, 2]
+    assert implement[0]["retries"][0]["summary"] == "rate limited"
+
+
+def test_retries_stop_at_retry_limit(tmp_path: Path) -> None:
+    adapter = _FlakyAdapter("implement", failures=10)
+    container, service = _retry_service(tmp_path, adapter)
+    task = Task(title="Chore", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "blocked"
+    # retry_limit defaults to 3: one attempt plus three retries.
+    assert adapter.calls.count("implement") == 4
+
+
+def test_deterministic_failure_is_not_retried(tmp_path: Path) -> None:
+    adapter = _FlakyAdapter("implement", failures=1, retryable=False)
+    container, service = _retry_service(tmp_path, adapter)
+    task = Task(title="Chore", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "blocked"
+    assert adapter.calls.count("implement") == 1
+
+
+def test_retry_limit_from_custom_pipeline(tmp_path: Path) -> None:
+    adapter = _FlakyAdapter("implement", failures=1)
+    container, service = _retry_service(tmp_path, adapter)
+    _write_pipeline(
+        tmp_path,
+        "id: no_retry\n"
+        "task_types: [no_retry]\n"
+        "steps:\n"
+        "  - name: implement\n"
+        "    retry_limit: 0\n",
+    )
+    task = Task(title="No retry", task_type="no_retry", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "blocked"
+    assert adapter.calls == ["implement"]
+
+
 # ---------------------------------------------------------------------------
 # 5. Repo review skips review and commit
 # ---------------------------------------------------------------------------
@@ -722,3 +988,27 @@ def test_generate_tasks_from_plan_no_task_fails(tmp_path: Path) -> None:
     import pytest
     with pytest.raises(ValueError, match="Task not found"):
         service.generate_tasks_from_plan("nonexistent", "some plan")
+
+
+# ---------------------------------------------------------------------------
+# 24. Worker resource usage is recorded per step
+# ---------------------------------------------------------------------------
+
+
+def test_step_resource_usage_recorded_in_run(tmp_path: Path) -> None:
+    usage = {"cpu_user_seconds": 1.5, "cpu_system_seconds": 0.2, "peak_rss_kb": 20480, "child_processes": 3}
+
+    class MeteredAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            return StepResult(status="ok", resource_usage=dict(usage))
+
+    container = Container(tmp_path)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus, worker_adapter=MeteredAdapter())
+    task = Task(title="Research", task_type="research", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+    run = container.runs.list()[0]
+    assert run.steps
+    assert all(entry.get("resources") == usage for entry in run.steps if entry["status"] == "ok")
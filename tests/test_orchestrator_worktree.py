@@ -11,7 +11,9 @@ from agent_orchestrator.runtime.domain.models import Task
 from agent_orchestrator.runtime.events import EventBus
 from agent_orchestrator.runtime.orchestrator import OrchestratorService
 from agent_orchestrator.runtime.orchestrator.live_worker_adapter import build_step_prompt
+from agent_orchestrator.runtime.orchestrator.sparse import plan_path_hints
 from agent_orchestrator.runtime.orchestrator.worker_adapter import StepResult
+from agent_orchestrator.runtime.orchestrator.worktree_pool import WorktreePool
 from agent_orchestrator.runtime.storage.container import Container
 
 
@@ -193,7 +195,7 @@ def test_merge_conflict_resolved_by_worker(tmp_path: Path) -> None:
             if step == "resolve_merge":
                 conflict_files = task.metadata.get("merge_conflict_files", {})
                 for fpath in conflict_files:
-                    full = tmp_path / fpath
+                    full = Path(task.metadata["worktree_dir"]) / fpath
                     full.write_text("resolved content\n")
                 resolve_called.set()
             return StepResult(status="ok")
@@ -514,14 +516,14 @@ def test_worktree_creation_failure_falls_back(tmp_path: Path) -> None:
 
 
 # ---------------------------------------------------------------------------
-# 12. resolve_merge receives conflict metadata and runs in project_dir
+# 12. resolve_merge receives conflict metadata and runs in the task worktree
 # ---------------------------------------------------------------------------
 
 
-def test_resolve_merge_receives_metadata_and_runs_in_project_dir(tmp_path: Path) -> None:
+def test_resolve_merge_receives_metadata_and_runs_in_task_worktree(tmp_path: Path) -> None:
     """When resolve_merge is dispatched, the worker receives conflict files and
-    other task info in task.metadata, and worktree_dir is cleared so the worker
-    runs in project_dir (where the merge conflict lives)."""
+    other task info in task.metadata, and worktree_dir still points at the task
+    worktree, where the branch is being rebased onto the run branch."""
     write_barrier = threading.Barrier(2, timeout=5)
     resolve_metadata: list[dict] = []
 
@@ -542,7 +544,7 @@ def test_resolve_merge_receives_metadata_and_runs_in_project_dir(tmp_path: Path)
                 # Resolve the conflict
                 conflict_files = task.metadata.get("merge_conflict_files", {})
                 for fpath in conflict_files:
-                    full = tmp_path / fpath
+                    full = Path(wt) / fpath
                     full.write_text("resolved\n")
             return StepResult(status="ok")
 
@@ -568,8 +570,10 @@ def test_resolve_merge_receives_metadata_and_runs_in_project_dir(tmp_path: Path)
     content = meta["conflict_files"]["shared.txt"]
     assert "<<<<<<<" in content or "=======" in content
 
-    # worktree_dir should NOT be set during resolve_merge (worker uses project_dir)
-    assert meta["worktree_dir"] is None
+    # The worker resolves inside the task worktree, not project_dir
+    assert meta["worktree_dir"] is not None
+    assert Path(meta["worktree_dir"]) != tmp_path
+    assert (tmp_path / "shared.txt").read_text() == "resolved\n"
 
     # other_tasks should contain the first task's info (it merged before the conflict)
     assert len(meta["other_tasks"]) >= 1
@@ -674,3 +678,287 @@ def test_build_step_prompt_resolve_merge() -> None:
     # For ollama, should also include JSON schema
     prompt_ollama = build_step_prompt(task=task, step="resolve_merge", attempt=1, is_codex=False)
     assert "JSON" in prompt_ollama
+
+
+# ---------------------------------------------------------------------------
+# Diff-based step conditions see the task worktree
+# ---------------------------------------------------------------------------
+
+
+def test_diff_condition_evaluated_in_worktree(tmp_path: Path) -> None:
+    class WritingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step == "implement" and "touch" in task.labels:
+                wt = Path(task.metadata["worktree_dir"])
+                (wt / "new_module.py").write_text("a = 1\nb = 2\n")
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=WritingAdapter())
+    pipelines_dir = container.state_root / "pipelines"
+    pipelines_dir.mkdir()
+    (pipelines_dir / "lean.yaml").write_text(
+        "id: lean\n"
+        "task_types: [lean]\n"
+        "steps:\n"
+        "  - name: implement\n"
+        "  - name: verify\n"
+        "    condition: diff.lines_changed > 0\n"
+        "  - name: commit\n"
+    )
+
+    changed = Task(title="Changes", task_type="lean", labels=["touch"], status="ready", approval_mode="auto_approve")
+    noop = Task(title="No-op", task_type="lean", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(changed)
+    container.tasks.upsert(noop)
+
+    assert service.run_task(changed.id).status == "done"
+    assert service.run_task(noop.id).status == "done"
+
+    runs = {run.task_id: run for run in container.runs.list()}
+    assert [s["status"] for s in runs[changed.id].steps if s["step"] == "verify"] == ["ok"]
+    assert [s["status"] for s in runs[noop.id].steps if s["step"] == "verify"] == ["skipped"]
+
+
+# ---------------------------------------------------------------------------
+# Warm worktree pool
+# ---------------------------------------------------------------------------
+
+
+def test_warm_worktree_pool_reused_across_tasks(tmp_path: Path) -> None:
+    seen: list[tuple[str, str, bool]] = []
+
+    class FileWriter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            wt = Path(task.metadata["worktree_dir"])
+            if step == "implement":
+                head = subprocess.run(
+                    ["git", "rev-parse", "--abbrev-ref", "HEAD"], cwd=wt, capture_output=True, text=True
+                ).stdout.strip()
+                seen.append((wt.name, head, (wt / "first.txt").exists()))
+                (wt / f"{task.title}.txt").write_text(f"work by {task.id}\n")
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=FileWriter())
+    cfg = container.config.load()
+    cfg["orchestrator"]["worktree_pool_size"] = 1
+    container.config.save(cfg)
+    pool = service._get_worktree_pool()
+    assert pool is not None and pool.wait_warm()
+
+    first = Task(title="first", task_type="chore", status="ready", approval_mode="auto_approve")
+    second = Task(title="second", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(first)
+    container.tasks.upsert(second)
+
+    assert service.run_task(first.id).status == "done"
+    assert service.run_task(second.id).status == "done"
+
+    # Each task got the pooled worktree under its own name and branch, reset to
+    # the run branch head (which already contains the first task's work).
+    assert seen == [(first.id, f"task-{first.id}", False), (second.id, f"task-{second.id}", True)]
+    assert (tmp_path / "first.txt").exists() and (tmp_path / "second.txt").exists()
+
+    stats = service.status()["worktree_pool"]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 0
+    assert stats["warm"] == 1
+    assert stats["created"] >= 1
+    assert not (container.state_root / "worktrees" / second.id).exists()
+    branches = subprocess.run(["git", "branch", "--list", "task-*"], cwd=tmp_path, capture_output=True, text=True)
+    assert branches.stdout.strip() == ""
+
+
+def test_pool_scrub_removes_ignored_files(tmp_path: Path) -> None:
+    _git_init(tmp_path)
+    _commit_tree(tmp_path, {".gitignore": "build/\n"})
+    pool = WorktreePool(tmp_path, tmp_path / "pool")
+    pool._size = 1  # accept one returned worktree without starting a refill
+    worktree = tmp_path / "wt"
+    subprocess.run(["git", "worktree", "add", "--detach", str(worktree)], cwd=tmp_path, check=True, capture_output=True)
+    (worktree / "build").mkdir()
+    (worktree / "build" / "cache.bin").write_text("artifact\n")
+    (worktree / "scratch.txt").write_text("untracked\n")
+
+    assert pool.release(worktree) is True
+    [pooled] = list((tmp_path / "pool").iterdir())
+    assert sorted(p.name for p in pooled.iterdir()) == [".git", ".gitignore", "README.md"]
+
+
+def test_pool_never_resets_an_existing_task_branch(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"]["worktree_pool_size"] = 1
+    container.config.save(cfg)
+    pool = service._get_worktree_pool()
+    assert pool is not None and pool.wait_warm()
+
+    task = Task(title="retry", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+    # Work left on the task branch by an earlier attempt whose merge conflicted.
+    scratch = tmp_path / "scratch"
+    subprocess.run(
+        ["git", "worktree", "add", str(scratch), "-b", f"task-{task.id}"], cwd=tmp_path, check=True, capture_output=True
+    )
+    _commit_tree(scratch, {"unmerged.txt": "kept\n"})
+    subprocess.run(["git", "worktree", "remove", str(scratch)], cwd=tmp_path, check=True, capture_output=True)
+
+    assert service.run_task(task.id).status == "blocked"
+    shown = subprocess.run(
+        ["git", "show", f"task-{task.id}:unmerged.txt"], cwd=tmp_path, capture_output=True, text=True
+    )
+    assert shown.stdout == "kept\n"
+    assert service.status()["worktree_pool"]["warm"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Sparse-checkout worktrees
+# ---------------------------------------------------------------------------
+
+
+def _commit_tree(path: Path, files: dict[str, str]) -> None:
+    for rel, content in files.items():
+        (path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (path / rel).write_text(content)
+    subprocess.run(["git", "add", "-A"], cwd=path, check=True, capture_output=True, text=True)
+    subprocess.run(["git", "commit", "-m", "layout"], cwd=path, check=True, capture_output=True, text=True)
+
+
+def test_plan_path_hints_resolve_to_tree_directories(tmp_path: Path) -> None:
+    _git_init(tmp_path)
+    _commit_tree(tmp_path, {"pkg/core/api.py": "x\n", "pkg/web/app.ts": "y\n", "docs/guide.md": "z\n"})
+
+    hints = plan_path_hints(
+        ["Edit pkg/core/api.py and add pkg/core/new/thing.py.", "Update docs/ too; ignore http://x/y and ../etc"],
+        tmp_path,
+    )
+
+    assert hints == ["pkg/core", "docs"]
+
+
+def test_sparse_worktree_scoped_by_label_and_widened_on_write(tmp_path: Path) -> None:
+    seen: dict[str, bool] = {}
+
+    class ScopedWriter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            wt = Path(task.metadata["worktree_dir"])
+            if step == "implement":
+                seen["cone"] = (wt / "pkg" / "core" / "api.py").exists()
+                seen["outside"] = (wt / "pkg" / "web" / "app.ts").exists()
+                seen["top_level"] = (wt / "README.md").exists()
+                (wt / "pkg" / "core" / "api.py").write_text("changed\n")
+                (wt / "docs").mkdir(exist_ok=True)
+                (wt / "docs" / "new.md").write_text("written outside the cone\n")
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=ScopedWriter())
+    _commit_tree(tmp_path, {"pkg/core/api.py": "x\n", "pkg/web/app.ts": "y\n", "docs/guide.md": "z\n"})
+    cfg = container.config.load()
+    cfg["orchestrator"]["sparse_worktrees"] = True
+    container.config.save(cfg)
+
+    task = Task(
+        title="scoped", task_type="chore", status="ready", approval_mode="auto_approve", labels=["path:pkg/core"]
+    )
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    assert seen == {"cone": True, "outside": False, "top_level": True}
+    sparse = result.metadata["sparse_checkout"]
+    assert sparse["dirs"] == ["pkg/core", "docs"]
+    assert sparse["widened"] == ["docs"]
+    # Both the in-cone edit and the widened write reach the run branch, and the
+    # files the task never checked out are untouched.
+    assert (tmp_path / "pkg" / "core" / "api.py").read_text() == "changed\n"
+    assert (tmp_path / "docs" / "new.md").exists()
+    assert (tmp_path / "pkg" / "web" / "app.ts").read_text() == "y\n"
+
+
+def test_sparse_worktree_falls_back_to_full_checkout_without_hints(tmp_path: Path) -> None:
+    container, service, _ = _service(tmp_path, adapter=_SparseProbe())
+    cfg = container.config.load()
+    cfg["orchestrator"]["sparse_worktrees"] = True
+    cfg["orchestrator"]["sparse_patterns"] = {"docs": ["docs"]}
+    container.config.save(cfg)
+
+    task = Task(title="full", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    result = service.run_task(task.id)
+
+    assert result.status == "done"
+    assert "sparse_checkout" not in result.metadata
+    assert _SparseProbe.readme_seen is True
+
+
+class _SparseProbe:
+    readme_seen: Optional[bool] = None
+
+    def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+        wt = Path(task.metadata["worktree_dir"])
+        type(self).readme_seen = (wt / "README.md").exists()
+        return StepResult(status="ok")
+
+
+# ---------------------------------------------------------------------------
+# In-memory merge pre-check
+# ---------------------------------------------------------------------------
+
+
+def test_clean_merge_keeps_unrelated_local_edits(tmp_path: Path) -> None:
+    class Writer:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            if step == "implement":
+                (Path(task.metadata["worktree_dir"]) / "feature.txt").write_text("feature\n")
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=Writer())
+    service._ensure_branch()
+    (tmp_path / "README.md").write_text("# local edit\n")
+    task = Task(title="clean", task_type="chore", status="ready", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    assert service.run_task(task.id).status == "done"
+
+    assert (tmp_path / "feature.txt").read_text() == "feature\n"
+    assert (tmp_path / "README.md").read_text() == "# local edit\n"
+    tracked = subprocess.run(["git", "ls-files", "feature.txt"], cwd=tmp_path, capture_output=True, text=True)
+    assert tracked.stdout.strip() == "feature.txt"
+
+
+def test_conflict_resolution_runs_outside_merge_lock(tmp_path: Path) -> None:
+    write_barrier = threading.Barrier(2, timeout=5)
+    lock_free_during_resolve: list[bool] = []
+    holder: dict[str, OrchestratorService] = {}
+
+    class ResolvingAdapter:
+        def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+            wt = task.metadata.get("worktree_dir")
+            if wt and step == "implement":
+                (Path(wt) / "shared.txt").write_text(f"content by {task.title}\n")
+                write_barrier.wait()
+            if step == "resolve_merge":
+                lock = holder["service"]._merge_lock
+                acquired = lock.acquire(blocking=False)
+                if acquired:
+                    lock.release()
+                lock_free_during_resolve.append(acquired)
+                (Path(wt) / "shared.txt").write_text("merged\n")
+            return StepResult(status="ok")
+
+    container, service, _ = _service(tmp_path, adapter=ResolvingAdapter(), concurrency=2)
+    holder["service"] = service
+    for title in ("Alpha", "Beta"):
+        container.tasks.upsert(Task(title=title, task_type="chore", status="ready", approval_mode="auto_approve"))
+
+    assert service.tick_once() is True
+    assert service.tick_once() is True
+    _wait_futures(service, timeout=15)
+
+    assert lock_free_during_resolve == [True]
+    assert (tmp_path / "shared.txt").read_text() == "merged\n"
+    # The run branch history is linear: the resolved task branch fast-forwarded.
+    merges = subprocess.run(["git", "rev-list", "--merges", "HEAD"], cwd=tmp_path, capture_output=True, text=True)
+    assert merges.stdout.strip() == ""
+    assert all(t.status == "done" for t in container.tasks.list())
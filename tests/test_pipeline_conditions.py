@@ -0,0 +1,82 @@
+"""Tests for the StepDef.condition expression evaluator."""
+
+import pytest
+
+from agent_orchestrator.pipelines.conditions import ConditionError, evaluate_condition
+
+
+CONTEXT = {
+    "task": {"labels": ["docs", "api"], "priority": "P1", "task_type": "docs"},
+    "previous": {"verify": {"status": "ok", "summary": "all green"}},
+    "diff": {"lines_changed": 12, "files_changed": 2},
+}
+
+
+@pytest.mark.parametrize(
+    ("expression", "expected"),
+    [
+        ("diff.lines_changed > 0", True),
+        ("diff.lines_changed >= 13", False),
+        ("task.labels contains 'docs'", True),
+        ("'ui' in task.labels", False),
+        ("previous.verify.status == 'ok'", True),
+        ("previous.review.status == 'ok'", False),
+        ("previous.review == null", True),
+        ("task.priority != \"P0\" and not (diff.files_changed < 2)", True),
+        ("task.task_type == 'feature' or task.labels contains 'api'", True),
+        ("true", True),
+        ("not false and false", False),
+    ],
+)
+def test_evaluate_condition(expression: str, expected: bool) -> None:
+    assert evaluate_condition(expression, CONTEXT) is expected
+
+
+def test_lazy_context_values_are_called_on_demand() -> None:
+    calls: list[int] = []
+
+    def _diff() -> dict[str, int]:
+        calls.append(1)
+        return {"lines_changed": 0}
+
+    context = {"task": {"labels": []}, "diff": _diff}
+    assert evaluate_condition("task.labels contains 'x'", context) is False
+    assert calls == []
+    assert evaluate_condition("diff.lines_changed > 0", context) is False
+    assert calls == [1]
+
+
+@pytest.mark.parametrize(
+    "expression",
+    ["", "diff.lines_changed >", "(true", "task.labels ; rm -rf", "__import__('os')", "missing.value > 3"],
+)
+def test_invalid_conditions_raise(expression: str) -> None:
+    with pytest.raises(ConditionError):
+        evaluate_condition(expression, CONTEXT)
+
+
+def test_paths_only_traverse_plain_data() -> None:
+    steps = [{"step": "implement", "status": "ok"}]
+    context = {"run": {"steps": steps}, "previous": {"implement": steps[0]}}
+    assert evaluate_condition("run.steps.0.status == 'ok'", context) is True
+    # Methods of the underlying containers are neither reachable nor called.
+    assert evaluate_condition("previous.implement.clear == null", context) is True
+    assert evaluate_condition("run.steps.pop == null", context) is True
+    assert steps == [{"step": "implement", "status": "ok"}]
+    with pytest.raises(ConditionError):
+        evaluate_condition("run.__class__ == null", context)
+
+
+def test_and_or_short_circuit() -> None:
+    calls: list[int] = []
+
+    def _diff() -> dict[str, int]:
+        calls.append(1)
+        return {"lines_changed": 3}
+
+    context = {"task": {"task_type": "docs"}, "diff": _diff}
+    assert evaluate_condition("task.task_type == 'docs' or diff.lines_changed > 0", context) is True
+    assert evaluate_condition("false and diff.lines_changed > 'x'", context) is False
+    assert calls == []
+    assert evaluate_condition("true and diff.lines_changed > 0", context) is True
+    assert calls == [1]
@@ -47,6 +47,26 @@ class TestPipelineTemplate:
         assert "security" in tmpl.task_types
         assert "security_audit" in tmpl.task_types
 
+    def test_security_audit_scans_share_group(self):
+        tmpl = BUILTIN_TEMPLATES["security_audit"]
+        assert tmpl.step_groups() == [["scan_deps", "scan_code"], ["report"], ["generate_tasks"]]
+
+    def test_step_groups_only_merge_adjacent_steps(self):
+        tmpl = PipelineTemplate(
+            id="test",
+            display_name="Test",
+            description="Test pipeline",
+            steps=(
+                StepDef(name="a", group="g"),
+                StepDef(name="b", group="g"),
+                StepDef(name="c"),
+                StepDef(name="d", group="g"),
+            ),
+        )
+        assert tmpl.step_groups() == [["a", "b"], ["c"], ["d"]]
+        # Custom step lists reuse the template's group membership.
+        assert tmpl.step_groups(["b", "a", "x"]) == [["b", "a"], ["x"]]
+
     def test_step_names(self):
         tmpl = PipelineTemplate(
             id="test",
@@ -111,3 +131,27 @@ class TestPipelineRegistry:
         reg.unregister("research")
         with pytest.raises(KeyError):
             reg.get("research")
+
+    def test_load_yaml_parallel_block(self, tmp_path):
+        (tmp_path / "audit.yaml").write_text(
+            "id: fast_audit\n"
+            "display_name: Fast Audit\n"
+            "description: Scan in parallel\n"
+            "task_types: [fast_audit]\n"
+            "steps:\n"
+            "  - parallel:\n"
+            "      - name: scan_deps\n"
+            "      - name: scan_code\n"
+            "        timeout_seconds: 120\n"
+            "  - name: lint\n"
+            "    group: checks\n"
+            "  - name: typecheck\n"
+            "    group: checks\n"
+            "  - name: report\n"
+        )
+        reg = PipelineRegistry()
+        reg.load_from_yaml(tmp_path)
+        tmpl = reg.get("fast_audit")
+        assert tmpl.step_names() == ["scan_deps", "scan_code", "lint", "typecheck", "report"]
+        assert tmpl.step_groups() == [["scan_deps", "scan_code"], ["lint", "typecheck"], ["report"]]
+        assert tmpl.step_def("scan_code").timeout_seconds == 120
@@ -0,0 +1,436 @@
+"""Tests for remote worker agents and the remote worker adapter."""
+from __future__ import annotations
+
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from fastapi.testclient import TestClient
+
+from agent_orchestrator.runtime.domain.models import Task
+from agent_orchestrator.runtime.orchestrator import DefaultWorkerAdapter, RemoteWorkerAdapter, RemoteWorkerRegistry
+from agent_orchestrator.runtime.orchestrator.worker_adapter import StepResult
+from agent_orchestrator.runtime.storage.container import Container
+from agent_orchestrator.server.api import create_app
+from agent_orchestrator.workers.agent import AgentNotRegistered, WorkerAgent
+from agent_orchestrator.workers.cancellation import CancellationRegistry
+from agent_orchestrator.workers.run import WorkerRunResult
+
+
+_TOKEN = "agent-secret"
+_AUTH = {"Authorization": f"Bearer {_TOKEN}"}
+
+
+def _configure(container: Container, routing: dict[str, list[str]], fallback_local: bool = False) -> None:
+    cfg = container.config.load()
+    cfg["workers"] = {"remote": {"routing": routing, "fallback_local": fallback_local, "token": _TOKEN}}
+    container.config.save(cfg)
+
+
+def _transport(client: TestClient):
+    def _post(path: str, payload: dict[str, Any], headers: dict[str, str]) -> Optional[dict[str, Any]]:
+        response = client.post(f"/api/worker-agents{path}", json=payload, headers=headers)
+        if response.status_code == 404:
+            raise AgentNotRegistered(path)
+        response.raise_for_status()
+        return response.json()
+
+    return _post
+
+
+def _runner(name: str, calls: list[tuple[str, str]], *, exit_code: int = 0, stderr: str = ""):
+    def _run(*, spec, prompt, project_dir, run_dir, timeout_seconds, **_: Any) -> WorkerRunResult:
+        calls.append((name, spec.name))
+        (run_dir / "stdout.log").write_text(f"ran on {name}\n")
+        (run_dir / "stderr.log").write_text(stderr)
+        return WorkerRunResult(
+            provider=spec.name,
+            prompt_path=str(run_dir / "prompt.txt"),
+            stdout_path=str(run_dir / "stdout.log"),
+            stderr_path=str(run_dir / "stderr.log"),
+            start_time="2025-01-01T00:00:00Z",
+            end_time="2025-01-01T00:00:01Z",
+            runtime_seconds=1,
+            exit_code=exit_code,
+            timed_out=False,
+            no_heartbeat=False,
+        )
+
+    return _run
+
+
+# ---------------------------------------------------------------------------
+# 1. Routed steps are leased to the agent whose labels match
+# ---------------------------------------------------------------------------
+
+
+def test_steps_route_to_matching_agents(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    registry: RemoteWorkerRegistry = app.state.remote_workers
+    container = Container(tmp_path)
+    _configure(container, {"verify": ["gpu"], "review": []})
+    adapter = RemoteWorkerAdapter(container, registry)
+    calls: list[tuple[str, str]] = []
+
+    with TestClient(app) as client:
+        agents = [
+            WorkerAgent(_transport(client), token=_TOKEN, name="cpu-box", labels=["linux"], runner=_runner("cpu-box", calls), lease_wait_seconds=0.2),
+            WorkerAgent(_transport(client), token=_TOKEN, name="gpu-box", labels=["linux", "gpu"], runner=_runner("gpu-box", calls), lease_wait_seconds=0.2),
+        ]
+        threads = [threading.Thread(target=agent.serve, daemon=True) for agent in agents]
+        for thread in threads:
+            thread.start()
+        try:
+            deadline = time.time() + 5
+            while time.time() < deadline and len(client.get("/api/worker-agents", headers=_AUTH).json()["agents"]) < 2:
+                time.sleep(0.05)
+
+            for _ in range(3):
+                result = adapter.run_step(task=Task(title="Train model"), step="verify", attempt=1)
+                assert result.status == "ok"
+            assert {agent for agent, _ in calls} == {"gpu-box"}
+
+            result = adapter.run_step(task=Task(title="Review"), step="review", attempt=1)
+            assert result.status == "ok"
+            assert len(calls) == 4
+            assert all(worker == "codex" for _, worker in calls)
+
+            listing = client.get("/api/worker-agents", headers=_AUTH).json()
+            assert sum(agent["completed"] for agent in listing["agents"]) == 4
+            assert listing["pending"] == 0
+        finally:
+            for agent in agents:
+                agent.stop()
+            for thread in threads:
+                thread.join(timeout=5)
+
+
+# ---------------------------------------------------------------------------
+# 2. Remote failures map like local ones
+# ---------------------------------------------------------------------------
+
+
+def test_remote_failure_uses_returned_stderr(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    container = Container(tmp_path)
+    _configure(container, {"verify": []})
+    adapter = RemoteWorkerAdapter(container, app.state.remote_workers)
+    calls: list[tuple[str, str]] = []
+
+    with TestClient(app) as client:
+        agent = WorkerAgent(
+            _transport(client),
+            token=_TOKEN,
+            name="flaky",
+            runner=_runner("flaky", calls, exit_code=1, stderr="429 Too Many Requests"),
+            lease_wait_seconds=0.2,
+        )
+        thread = threading.Thread(target=agent.serve, kwargs={"max_steps": 1}, daemon=True)
+        thread.start()
+        result = adapter.run_step(task=Task(title="Check"), step="verify", attempt=1)
+        thread.join(timeout=5)
+
+    assert result.status == "error"
+    assert result.summary == "429 Too Many Requests"
+    assert result.retryable is True
+
+
+# ---------------------------------------------------------------------------
+# 3. A lost agent fails its lease as retryable
+# ---------------------------------------------------------------------------
+
+
+def test_lost_agent_fails_lease_as_retryable(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    _configure(container, {"verify": []})
+    registry = RemoteWorkerRegistry(agent_timeout_seconds=0.5)
+    adapter = RemoteWorkerAdapter(container, registry)
+    agent = registry.register("vanishing")
+
+    def _lease_and_vanish() -> None:
+        # Takes the lease, then never heartbeats or completes it.
+        deadline = time.time() + 5
+        while time.time() < deadline and registry.lease(agent.id, 0.1) is None:
+            pass
+
+    threading.Thread(target=_lease_and_vanish, daemon=True).start()
+    result = adapter.run_step(task=Task(title="Check"), step="verify", attempt=1)
+
+    assert result.status == "error"
+    assert "stopped heartbeating" in (result.summary or "")
+    assert result.retryable is True
+    assert registry.snapshot()["agents"] == []
+
+
+# ---------------------------------------------------------------------------
+# 4. Unrouted steps, or no live agent with fallback, run locally
+# ---------------------------------------------------------------------------
+
+
+def test_unmatched_steps_run_locally(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    _configure(container, {"verify": ["gpu"]}, fallback_local=True)
+    registry = RemoteWorkerRegistry()
+    registry.register("cpu-only", labels=["linux"])
+    adapter = RemoteWorkerAdapter(container, registry)
+    local: list[str] = []
+    adapter._execute_local = lambda task, step, prepared: local.append(step) or StepResult(status="ok")  # type: ignore[method-assign]
+
+    assert adapter.run_step(task=Task(title="A"), step="implement", attempt=1).status == "ok"
+    assert adapter.run_step(task=Task(title="B"), step="verify", attempt=1).status == "ok"
+    assert local == ["implement", "verify"]
+    assert registry.snapshot()["pending"] == 0
+
+
+def test_write_steps_never_leave_the_server(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    _configure(container, {"implement": [], "verify": []})
+    registry = RemoteWorkerRegistry()
+    registry.register("any")
+    adapter = RemoteWorkerAdapter(container, registry)
+    local: list[str] = []
+    adapter._execute_local = lambda task, step, prepared: local.append(step) or StepResult(status="ok")  # type: ignore[method-assign]
+
+    assert adapter.run_step(task=Task(title="A"), step="implement", attempt=1).status == "ok"
+    assert local == ["implement"]
+    assert registry.snapshot()["pending"] == 0
+
+
+# ---------------------------------------------------------------------------
+# 5. Agents run git leases on a fetched snapshot of the task tree
+# ---------------------------------------------------------------------------
+
+
+def _git(cwd: Path, *args: str) -> str:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+
+def test_agent_checks_out_snapshot_of_task_tree(tmp_path: Path) -> None:
+    server_dir = tmp_path / "server"
+    server_dir.mkdir()
+    _git(server_dir, "init")
+    _git(server_dir, "config", "user.email", "test@test.com")
+    _git(server_dir, "config", "user.name", "Test")
+    (server_dir / "README.md").write_text("committed\n")
+    _git(server_dir, "add", "-A")
+    _git(server_dir, "commit", "-m", "initial")
+    clone = tmp_path / "agent-checkout"
+    _git(tmp_path, "clone", "--quiet", str(server_dir), str(clone))
+    # Uncommitted work of the task that verify must see.
+    (server_dir / "README.md").write_text("edited\n")
+    (server_dir / "new_module.py").write_text("VALUE = 1\n")
+
+    app = create_app(project_dir=server_dir, worker_adapter=DefaultWorkerAdapter())
+    container = Container(server_dir)
+    cfg = container.config.load()
+    cfg["workers"] = {"remote": {"routing": {"verify": []}, "fallback_local": False, "repo_url": str(server_dir), "token": _TOKEN}}
+    container.config.save(cfg)
+    adapter = RemoteWorkerAdapter(container, app.state.remote_workers)
+    seen: dict[str, str] = {}
+
+    def _run(*, spec, prompt, project_dir, run_dir, timeout_seconds, **_: Any) -> WorkerRunResult:
+        seen["dir"] = str(project_dir)
+        seen["readme"] = (project_dir / "README.md").read_text()
+        seen["module"] = (project_dir / "new_module.py").read_text()
+        seen["state"] = str((project_dir / ".agent_orchestrator").exists())
+        return _runner("box", [])(spec=spec, prompt=prompt, project_dir=project_dir, run_dir=run_dir,
+                                  timeout_seconds=timeout_seconds)
+
+    with TestClient(app) as client:
+        agent = WorkerAgent(_transport(client), token=_TOKEN, name="box", checkout=clone, runner=_run, lease_wait_seconds=0.2)
+        thread = threading.Thread(target=agent.serve, kwargs={"max_steps": 1}, daemon=True)
+        thread.start()
+        result = adapter.run_step(task=Task(title="Check"), step="verify", attempt=1)
+        thread.join(timeout=10)
+
+    assert result.status == "ok"
+    assert seen["readme"] == "edited\n" and seen["module"] == "VALUE = 1\n"
+    assert seen["state"] == "False"
+    # The lease worktree is gone, and the server's index and refs are untouched.
+    assert not Path(seen["dir"]).exists()
+    assert _git(clone, "worktree", "list").count("\n") == 0
+    assert _git(server_dir, "for-each-ref", "refs/agent-orchestrator") == ""
+    assert _git(server_dir, "diff", "--cached", "--name-only") == ""
+    assert _git(server_dir, "diff", "--name-only") == "README.md"
+    # Returned logs are served from the step's run dir like a local run's.
+    assert result.run_dir and result.run_dir.startswith("artifacts/runs/")
+    assert (container.state_root / result.run_dir / "stdout.log").read_text() == "ran on box\n"
+
+
+def test_agent_without_a_way_to_the_tree_refuses_git_leases(tmp_path: Path) -> None:
+    agent = WorkerAgent(lambda path, payload, headers: {}, name="box", runner=_runner("box", []))
+    lease = {"lease_id": "lease-1", "spec": {"name": "codex", "type": "codex"}, "prompt": "p",
+             "git": {"ref": "refs/agent-orchestrator/leases/x", "commit": "abc", "url": None}}
+
+    reply = agent.run_lease(lease)
+
+    assert "LeaseSetupError" in reply["error"] and reply["retryable"] is False
+
+
+# ---------------------------------------------------------------------------
+# 6. An agent runs up to --capacity leases at once
+# ---------------------------------------------------------------------------
+
+
+def test_agent_runs_leases_concurrently_up_to_capacity(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    container = Container(tmp_path)
+    _configure(container, {"verify": []})
+    adapter = RemoteWorkerAdapter(container, app.state.remote_workers)
+    barrier = threading.Barrier(2, timeout=5)
+
+    def _run(**kwargs: Any) -> WorkerRunResult:
+        barrier.wait()  # only passes when both leases run at the same time
+        return _runner("box", [])(**kwargs)
+
+    with TestClient(app) as client:
+        agent = WorkerAgent(_transport(client), token=_TOKEN, name="box", capacity=2, runner=_run, lease_wait_seconds=0.2)
+        thread = threading.Thread(target=agent.serve, kwargs={"max_steps": 2}, daemon=True)
+        thread.start()
+        results: list[StepResult] = []
+        steps = [
+            threading.Thread(target=lambda: results.append(adapter.run_step(task=Task(title=f"T{i}"), step="verify", attempt=1)))
+            for i in range(2)
+        ]
+        for step in steps:
+            step.start()
+        for step in steps:
+            step.join(timeout=10)
+        thread.join(timeout=10)
+
+    assert [r.status for r in results] == ["ok", "ok"]
+
+
+# ---------------------------------------------------------------------------
+# 7. Cancelling a task withdraws or aborts its remote leases
+# ---------------------------------------------------------------------------
+
+
+def test_cancel_withdraws_pending_lease(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    _configure(container, {"verify": []})
+    registry = RemoteWorkerRegistry()
+    cancellations = CancellationRegistry()
+    adapter = RemoteWorkerAdapter(container, registry, cancellations=cancellations)
+    task = Task(title="Check")
+    outcome: dict[str, StepResult] = {}
+
+    thread = threading.Thread(
+        target=lambda: outcome.update(result=adapter.run_step(task=task, step="verify", attempt=1)), daemon=True
+    )
+    thread.start()
+    deadline = time.time() + 5
+    while time.time() < deadline and registry.snapshot()["pending"] == 0:
+        time.sleep(0.02)
+    cancellations.cancel(task.id)
+    thread.join(timeout=5)
+
+    assert outcome["result"].status == "cancelled"
+    assert outcome["result"].run_dir
+    assert registry.snapshot()["pending"] == 0
+
+
+def test_cancel_aborts_running_remote_lease(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    registry: RemoteWorkerRegistry = app.state.remote_workers
+    container = Container(tmp_path)
+    _configure(container, {"verify": []})
+    cancellations = CancellationRegistry()
+    adapter = RemoteWorkerAdapter(container, registry, cancellations=cancellations)
+    task = Task(title="Check")
+    spawned = threading.Event()
+    outcome: dict[str, Any] = {}
+
+    def _slow(*, run_dir: Path, on_spawn: Any, **kwargs: Any) -> WorkerRunResult:
+        proc = subprocess.Popen(["sleep", "30"], start_new_session=True)
+        on_spawn(proc.pid)
+        spawned.set()
+        outcome["exit_code"] = proc.wait()
+        return _runner("box", [], exit_code=proc.returncode)(run_dir=run_dir, **kwargs)
+
+    with TestClient(app) as client:
+        agent = WorkerAgent(_transport(client), token=_TOKEN, name="box", runner=_slow, heartbeat_seconds=0.1, lease_wait_seconds=0.2)
+        thread = threading.Thread(target=agent.serve, kwargs={"max_steps": 1}, daemon=True)
+        thread.start()
+        runner = threading.Thread(
+            target=lambda: outcome.update(result=adapter.run_step(task=task, step="verify", attempt=1)), daemon=True
+        )
+        runner.start()
+        assert spawned.wait(5)
+
+        started = time.monotonic()
+        cancellations.cancel(task.id)
+        runner.join(timeout=5)
+        assert outcome["result"].status == "cancelled"
+        # The agent hears about it on its next heartbeat and kills the worker.
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert time.monotonic() - started < 5
+        assert outcome["exit_code"] != 0
+        listing = client.get("/api/worker-agents", headers=_AUTH).json()
+        assert listing["leased"] == 0
+
+
+# ---------------------------------------------------------------------------
+# 8. Agent routes need the shared token, and agents act only as themselves
+# ---------------------------------------------------------------------------
+
+
+def test_worker_agent_routes_require_token_and_agent_key(tmp_path: Path) -> None:
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    registry: RemoteWorkerRegistry = app.state.remote_workers
+    container = Container(tmp_path)
+    register = {"name": "box", "labels": [], "capabilities": ["codex"], "capacity": 1}
+
+    with TestClient(app) as client:
+        # No token configured: remote agents are disabled.
+        assert client.post("/api/worker-agents/register", json=register, headers=_AUTH).status_code == 403
+        _configure(container, {"verify": []})
+        assert client.post("/api/worker-agents/register", json=register).status_code == 401
+        wrong = {"Authorization": "Bearer guess"}
+        assert client.post("/api/worker-agents/register", json=register, headers=wrong).status_code == 401
+        assert client.get("/api/worker-agents").status_code == 401
+
+        first = client.post("/api/worker-agents/register", json=register, headers=_AUTH).json()
+        second = client.post("/api/worker-agents/register", json=register, headers=_AUTH).json()
+        assert first["agent_key"] not in client.get("/api/worker-agents", headers=_AUTH).text
+        as_first = {**_AUTH, "X-Worker-Agent-Key": first["agent_key"]}
+        as_second = {**_AUTH, "X-Worker-Agent-Key": second["agent_key"]}
+        heartbeat = f"/api/worker-agents/{first['agent_id']}/heartbeat"
+        assert client.post(heartbeat, headers=_AUTH).status_code == 403
+        assert client.post(heartbeat, headers=as_second).status_code == 403
+        assert client.post(heartbeat, headers=as_first).status_code == 200
+
+        registry.submit({"step": "verify"}, [], "codex")
+        lease = client.post(
+            f"/api/worker-agents/{first['agent_id']}/lease", json={"wait_seconds": 0}, headers=as_first
+        ).json()["lease"]
+        stolen = client.post(
+            f"/api/worker-agents/{second['agent_id']}/leases/{lease['lease_id']}/complete",
+            json={"exit_code": 0, "response_text": "forged"},
+            headers=as_second,
+        )
+        assert stolen.status_code == 409
+        done = client.post(
+            f"/api/worker-agents/{first['agent_id']}/leases/{lease['lease_id']}/complete",
+            json={"exit_code": 0},
+            headers=as_first,
+        )
+        assert done.status_code == 200
+
+
+def test_settings_save_keeps_remote_workers_config(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    _configure(container, {"verify": ["gpu"]})
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter())
+    with TestClient(app) as client:
+        saved = client.patch("/api/settings", json={"workers": {"default": "codex", "routing": {"plan": "codex"}}})
+        assert saved.status_code == 200
+        # The token is not echoed back in the settings payload.
+        assert "remote" not in saved.json()["workers"]
+
+    workers = Container(tmp_path).config.load()["workers"]
+    assert workers["routing"] == {"plan": "codex"}
+    assert workers["remote"] == {"routing": {"verify": ["gpu"]}, "fallback_local": False, "token": _TOKEN}
@@ -0,0 +1,222 @@
+"""Tests for scheduling policies and the makespan simulation."""
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from agent_orchestrator.runtime.domain.models import Task
+from agent_orchestrator.runtime.events import EventBus
+from agent_orchestrator.runtime.orchestrator import OrchestratorService
+from agent_orchestrator.runtime.orchestrator.overlap import defer_overlapping, files_from_text
+from agent_orchestrator.runtime.orchestrator.scheduling import (
+    CriticalPathPolicy,
+    PriorityPolicy,
+    dependency_weights,
+    policy_from_config,
+    simulate_makespan,
+)
+from agent_orchestrator.runtime.storage.container import Container
+
+_T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _task(title: str, priority: str = "P2", blocked_by: list[str] | None = None, age_hours: float = 0) -> Task:
+    return Task(
+        title=title,
+        status="ready",
+        priority=priority,
+        blocked_by=list(blocked_by or []),
+        created_at=(_T0 - timedelta(hours=age_hours)).isoformat(),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Dependency weights
+# ---------------------------------------------------------------------------
+
+
+def test_dependency_weights_chain_and_fanout() -> None:
+    root = _task("root")
+    mid = _task("mid", blocked_by=[root.id])
+    leaf_a = _task("leaf_a", blocked_by=[mid.id])
+    leaf_b = _task("leaf_b", blocked_by=[root.id])
+    finished = _task("finished")
+    finished.status = "done"
+    after_finished = _task("after", blocked_by=[finished.id])
+
+    path_len, downstream = dependency_weights([root, mid, leaf_a, leaf_b, finished, after_finished])
+
+    assert path_len[root.id] == 3
+    assert downstream[root.id] == 3
+    assert path_len[mid.id] == 2
+    assert path_len[leaf_a.id] == 1
+    assert finished.id not in path_len
+    assert path_len[after_finished.id] == 1
+
+
+def test_dependency_weights_tolerate_cycles() -> None:
+    a = _task("a")
+    b = _task("b", blocked_by=[a.id])
+    a.blocked_by = [b.id]
+
+    path_len, _ = dependency_weights([a, b])
+
+    assert set(path_len) == {a.id, b.id}
+
+
+# ---------------------------------------------------------------------------
+# Policy ordering
+# ---------------------------------------------------------------------------
+
+
+def test_critical_path_prefers_task_with_most_dependents() -> None:
+    leaf = _task("leaf", age_hours=1)
+    hub = _task("hub")
+    dependents = [_task(f"dep-{i}", blocked_by=[hub.id]) for i in range(5)]
+    board = [leaf, hub, *dependents]
+
+    assert PriorityPolicy().order([leaf, hub], board)[0].id == leaf.id
+    assert CriticalPathPolicy(aging_seconds=0).order([leaf, hub], board, now=_T0)[0].id == hub.id
+
+
+def test_critical_path_respects_priority_before_dependents() -> None:
+    urgent_leaf = _task("urgent", priority="P0")
+    hub = _task("hub", priority="P2")
+    board = [urgent_leaf, hub, _task("dep", blocked_by=[hub.id])]
+
+    ordered = CriticalPathPolicy(aging_seconds=0).order([hub, urgent_leaf], board, now=_T0)
+
+    assert ordered[0].id == urgent_leaf.id
+
+
+def test_aging_boosts_starved_task() -> None:
+    old_low = _task("old", priority="P3", age_hours=3)
+    fresh_mid = _task("fresh", priority="P1")
+    policy = CriticalPathPolicy(aging_seconds=3600)
+
+    ordered = policy.order([fresh_mid, old_low], [fresh_mid, old_low], now=_T0)
+
+    # Three hours of waiting lifts P3 to an effective P0.
+    assert ordered[0].id == old_low.id
+
+
+def test_policy_from_config() -> None:
+    assert policy_from_config({}).name == "priority"
+    assert policy_from_config({"scheduling_policy": "nope"}).name == "priority"
+    policy = policy_from_config({"scheduling_policy": "critical_path", "scheduling_aging_seconds": 60})
+    assert isinstance(policy, CriticalPathPolicy)
+    assert policy.aging_seconds == 60
+
+
+def test_claim_next_runnable_uses_configured_policy(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {
+        **dict(cfg.get("orchestrator") or {}),
+        "scheduling_policy": "critical_path",
+        "scheduling_aging_seconds": 0,
+    }
+    container.config.save(cfg)
+    service = OrchestratorService(container, EventBus(container.events, container.project_id))
+    leaf = _task("leaf", age_hours=1)
+    hub = _task("hub")
+    for task in [leaf, hub, *[_task(f"dep-{i}", blocked_by=[hub.id]) for i in range(3)]]:
+        container.tasks.upsert(task)
+
+    policy = policy_from_config(cfg["orchestrator"])
+    claimed = container.tasks.claim_next_runnable(max_in_progress=4, order=policy.order)
+
+    assert claimed is not None and claimed.id == hub.id
+    assert service.status()["scheduling_policy"] == "critical_path"
+
+
+# ---------------------------------------------------------------------------
+# File-overlap avoidance
+# ---------------------------------------------------------------------------
+
+
+def test_files_from_text_finds_paths_not_prose() -> None:
+    text = "Update src/api/router.py and ./web/src/App.tsx, e.g. also README.md (v1.2). Skip ../etc/passwd.txt"
+
+    assert files_from_text(text) == ["src/api/router.py", "web/src/App.tsx", "README.md"]
+
+
+def test_defer_overlapping_keeps_order_and_reports_clash() -> None:
+    clashing = _task("clashing")
+    clashing.metadata["predicted_files"] = ["src/a.py", "src/b.py"]
+    clear = _task("clear")
+    clear.metadata["predicted_files"] = ["docs/guide.md"]
+    unknown = _task("unknown")
+
+    ordered, clashes = defer_overlapping([clashing, clear, unknown], {"run-1": {"src/a.py", "src/c.py"}}, 0.5)
+
+    assert [t.title for t in ordered] == ["clear", "unknown", "clashing"]
+    assert clashes == {clashing.id: ("run-1", ["src/a.py"])}
+
+
+def test_claim_skips_task_overlapping_running_work(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    bus = EventBus(container.events, container.project_id)
+    service = OrchestratorService(container, bus)
+    running = _task("running")
+    running.status = "in_progress"
+    running.metadata["predicted_files"] = ["src/core/engine.py"]
+    clashing = _task("clashing", priority="P1", age_hours=1)
+    clashing.description = "Refactor src/core/engine.py"
+    other = _task("other", priority="P2")
+    other.description = "Touch docs/index.md"
+    for task in (running, clashing, other):
+        container.tasks.upsert(task)
+    cfg = dict(container.config.load().get("orchestrator") or {})
+
+    claimed = service._claim_avoiding_overlap(cfg, 4, PriorityPolicy().order)
+
+    assert claimed is not None and claimed.id == other.id
+    assert service.status()["overlap"]["conflicts_avoided"] == 1
+    deferred = [e for e in container.events.list_recent(limit=50) if e.get("type") == "task.overlap_deferred"]
+    assert deferred and deferred[0]["entity_id"] == clashing.id
+
+    # With nothing else runnable the clashing task still starts.
+    assert service._claim_avoiding_overlap(cfg, 4, PriorityPolicy().order).id == clashing.id
+    assert service.status()["overlap"]["conflicts_avoided"] == 1
+
+
+# ---------------------------------------------------------------------------
+# Makespan benchmark
+# ---------------------------------------------------------------------------
+
+
+def _random_dag(rng: random.Random, size: int) -> tuple[list[Task], dict[str, float]]:
+    tasks: list[Task] = []
+    for idx in range(size):
+        # Later tasks depend on a few earlier ones; creation order is shuffled
+        # so the FIFO tie-break does not accidentally follow the DAG.
+        deps = rng.sample([t.id for t in tasks], k=min(len(tasks), rng.choice([0, 1, 1, 2]))) if idx > 2 else []
+        priority = rng.choice(["P1", "P2", "P3"])
+        tasks.append(_task(f"t{idx}", priority=priority, blocked_by=deps, age_hours=rng.random()))
+    durations = {t.id: float(rng.randint(1, 10)) for t in tasks}
+    return tasks, durations
+
+
+def test_simulate_makespan_serial_chain() -> None:
+    a = _task("a")
+    b = _task("b", blocked_by=[a.id])
+    c = _task("c")
+
+    makespan = simulate_makespan([a, b, c], {a.id: 2, b.id: 3, c.id: 4}, workers=2, policy=PriorityPolicy())
+
+    assert makespan == 5
+
+
+def test_critical_path_improves_makespan_on_generated_dags() -> None:
+    rng = random.Random(1234)
+    baseline = improved = 0.0
+    for _ in range(30):
+        tasks, durations = _random_dag(rng, 40)
+        baseline += simulate_makespan(tasks, durations, workers=4, policy=PriorityPolicy())
+        improved += simulate_makespan(
+            tasks, durations, workers=4, policy=CriticalPathPolicy(aging_seconds=0)
+        )
+
+    assert improved <= baseline * 0.95
@@ -0,0 +1,34 @@
+"""Tests for the TF-IDF dependency pre-filter."""
+from __future__ import annotations
+
+from agent_orchestrator.runtime.domain.models import Task
+from agent_orchestrator.runtime.orchestrator.similarity import TfidfIndex, cluster_pairs, task_terms
+
+
+def test_task_terms_include_words_labels_and_paths() -> None:
+    task = Task(title="Fix the login form", description="Validate input in web/src/Login.tsx", labels=["auth"])
+
+    terms = task_terms(task)
+
+    assert {"fix", "login", "form", "validate", "input", "auth"} <= set(terms)
+    assert "the" not in terms
+    assert "file:web/src/Login.tsx" in terms and "dir:web/src" in terms
+
+
+def test_similar_pairs_rank_shared_vocabulary() -> None:
+    schema = Task(title="Create billing invoice schema", description="Tables for invoices in db/billing.sql")
+    api = Task(title="Billing invoice API", description="Expose invoices stored by db/billing.sql")
+    docs = Task(title="Refresh onboarding screenshots", description="Update images in the handbook")
+    index = TfidfIndex.from_tasks([schema, api, docs])
+
+    pairs = index.similar_pairs([schema.id, api.id, docs.id], threshold=0.15)
+
+    assert [(a, b) for a, b, _ in pairs] == [tuple(sorted((schema.id, api.id)))]
+
+
+def test_cluster_pairs_respects_max_size() -> None:
+    pairs = [("a", "b", 0.9), ("b", "c", 0.8), ("c", "d", 0.7), ("x", "y", 0.5)]
+
+    batches = cluster_pairs(pairs, max_size=3)
+
+    assert batches == [["a", "b", "c"], ["d"], ["x", "y"]]
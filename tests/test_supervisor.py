@@ -0,0 +1,117 @@
+"""Tests for the multi-project supervisor and its global worker budget."""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from agent_orchestrator.runtime.domain.models import Task
+from agent_orchestrator.runtime.events import EventBus
+from agent_orchestrator.runtime.orchestrator import OrchestratorService, ProjectSupervisor
+from agent_orchestrator.runtime.orchestrator.worker_adapter import DefaultWorkerAdapter, StepResult
+from agent_orchestrator.runtime.storage.container import Container
+from agent_orchestrator.server.api import create_app
+
+
+class _BlockingAdapter:
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def run_step(self, *, task: Task, step: str, attempt: int) -> StepResult:
+        self.release.wait(timeout=10)
+        return StepResult(status="ok")
+
+
+def _project(
+    path: Path, supervisor: ProjectSupervisor, adapter: _BlockingAdapter, *, tasks: int, **orchestrator: object
+) -> OrchestratorService:
+    path.mkdir()
+    container = Container(path)
+    cfg = container.config.load()
+    cfg["orchestrator"] = {"concurrency": 4, "auto_deps": False, **orchestrator}
+    container.config.save(cfg)
+    for i in range(tasks):
+        container.tasks.upsert(
+            Task(title=f"Task {i}", task_type="chore", status="ready", approval_mode="auto_approve", hitl_mode="autopilot")
+        )
+    service = OrchestratorService(
+        container, EventBus(container.events, container.project_id), worker_adapter=adapter, supervisor=supervisor
+    )
+    supervisor.register(service)
+    return service
+
+
+def _finish(adapter: _BlockingAdapter, *services: OrchestratorService) -> None:
+    adapter.release.set()
+    deadline = time.time() + 10
+    while time.time() < deadline and any(s.slots_in_use() for s in services):
+        time.sleep(0.05)
+    for service in services:
+        service.shutdown(timeout=5)
+
+
+# ---------------------------------------------------------------------------
+# 1. The global budget is split by project weight
+# ---------------------------------------------------------------------------
+
+
+def test_global_budget_is_shared_by_weight(tmp_path: Path) -> None:
+    supervisor = ProjectSupervisor(max_workers=3)
+    adapter = _BlockingAdapter()
+    heavy = _project(tmp_path / "heavy", supervisor, adapter, tasks=4, weight=2)
+    light = _project(tmp_path / "light", supervisor, adapter, tasks=4)
+    try:
+        assert supervisor.schedule_once() == 3
+        assert heavy.slots_in_use() == 2
+        assert light.slots_in_use() == 1
+        # The budget is full: a further round claims nothing.
+        assert supervisor.schedule_once() == 0
+        stats = supervisor.stats()
+        assert stats["max_workers"] == 3
+        assert stats["slots_in_use"] == 3
+        assert stats["projects"][heavy.container.project_id]["weight"] == 2.0
+    finally:
+        _finish(adapter, heavy, light)
+
+
+# ---------------------------------------------------------------------------
+# 2. An idle project's share goes to busy projects
+# ---------------------------------------------------------------------------
+
+
+def test_idle_project_share_goes_to_busy_project(tmp_path: Path) -> None:
+    # Without an explicit budget the largest project capacity is used.
+    supervisor = ProjectSupervisor()
+    adapter = _BlockingAdapter()
+    busy = _project(tmp_path / "busy", supervisor, adapter, tasks=5, concurrency=3)
+    idle = _project(tmp_path / "idle", supervisor, adapter, tasks=0, concurrency=2)
+    try:
+        assert supervisor.schedule_once() == 3
+        assert busy.slots_in_use() == 3
+        assert idle.slots_in_use() == 0
+    finally:
+        _finish(adapter, busy, idle)
+
+
+# ---------------------------------------------------------------------------
+# 3. The server schedules every project from one supervisor thread
+# ---------------------------------------------------------------------------
+
+
+def test_app_projects_share_one_scheduler_thread(tmp_path: Path) -> None:
+    other = tmp_path / "other"
+    other.mkdir()
+    app = create_app(project_dir=tmp_path, worker_adapter=DefaultWorkerAdapter(), max_workers=5)
+    with TestClient(app) as client:
+        assert client.get("/api/orchestrator/status").status_code == 200
+        status = client.get("/api/orchestrator/status", params={"project_dir": str(other)}).json()
+        orchestrators = list(app.state.orchestrators.values())
+        assert len(orchestrators) == 2
+        assert all(o._thread is None for o in orchestrators)
+        assert app.state.supervisor._thread.is_alive()
+        assert status["supervisor"]["max_workers"] == 5
+        assert len(status["supervisor"]["projects"]) == 2
+
+    assert app.state.supervisor._thread is None
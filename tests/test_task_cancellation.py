@@ -0,0 +1,147 @@
+"""Tests for cancelling tasks whose worker processes are still running."""
+from __future__ import annotations
+
+import threading
+import time
+from pathlib import Path
+
+from agent_orchestrator.runtime.domain.models import Task
+from agent_orchestrator.runtime.events.bus import EventBus
+from agent_orchestrator.runtime.orchestrator.lanes import ExecutionLanes
+from agent_orchestrator.runtime.orchestrator.live_worker_adapter import LiveWorkerAdapter
+from agent_orchestrator.runtime.orchestrator.service import OrchestratorService
+from agent_orchestrator.runtime.storage.container import Container
+from agent_orchestrator.worker import _run_codex_worker
+from agent_orchestrator.workers.cancellation import CancellationRegistry, cancellation_registry
+from agent_orchestrator.workers.limits import ProviderLimiter, ProviderLimits, SlotCancelled
+
+# A shell that forks children, so only a process-group kill stops it quickly.
+_SLOW_COMMAND = "sh -c 'sleep 30; sleep 30'"
+
+
+def _wait_for(predicate, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+# ---------------------------------------------------------------------------
+# 1. Cancelling terminates the worker's whole process group
+# ---------------------------------------------------------------------------
+
+
+def test_cancel_terminates_process_group(tmp_path: Path) -> None:
+    registry = CancellationRegistry()
+    outcome: dict[str, object] = {}
+
+    def _run() -> None:
+        with registry.scope("task-1") as on_spawn:
+            outcome.update(
+                _run_codex_worker(
+                    command=_SLOW_COMMAND,
+                    prompt="hello",
+                    project_dir=tmp_path,
+                    run_dir=tmp_path,
+                    timeout_seconds=60,
+                    heartbeat_seconds=60,
+                    heartbeat_grace_seconds=60,
+                    progress_path=tmp_path / "progress.json",
+                    on_spawn=on_spawn,
+                )
+            )
+
+    thread = threading.Thread(target=_run, daemon=True)
+    thread.start()
+    assert _wait_for(lambda: "task-1" in registry.running())
+
+    started = time.monotonic()
+    assert registry.cancel("task-1") == 1
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 1.0
+    assert outcome["exit_code"] != 0
+    assert registry.running() == {}
+    assert registry.is_cancelled("task-1")
+
+
+# ---------------------------------------------------------------------------
+# 2. A cancelled task's running step ends as cancelled and frees its slot
+# ---------------------------------------------------------------------------
+
+
+def test_cancelled_task_stops_running_step(tmp_path: Path) -> None:
+    container = Container(tmp_path)
+    cfg = container.config.load()
+    cfg["workers"] = {"providers": {"codex": {"type": "codex", "command": _SLOW_COMMAND}}}
+    container.config.save(cfg)
+    service = OrchestratorService(
+        container, EventBus(container.events, container.project_id), worker_adapter=LiveWorkerAdapter(container)
+    )
+    task = Task(title="Long running", task_type="feature", approval_mode="auto_approve")
+    container.tasks.upsert(task)
+
+    runner = threading.Thread(target=service.run_task, args=(task.id,), daemon=True)
+    runner.start()
+    try:
+        assert _wait_for(lambda: task.id in cancellation_registry.running())
+
+        stored = container.tasks.get(task.id)
+        assert stored is not None
+        stored.status = "cancelled"
+        container.tasks.upsert(stored)
+        started = time.monotonic()
+        assert service.cancel_task(task.id) == 1
+        runner.join(timeout=5)
+
+        assert not runner.is_alive()
+        assert time.monotonic() - started < 1.0
+        assert service.slots_in_use() == 0
+        final = container.tasks.get(task.id)
+        assert final is not None and final.status == "cancelled"
+        run = container.runs.list()[0]
+        assert run.status == "cancelled"
+        assert run.steps[-1]["status"] == "cancelled"
+        # The mark is cleared once the execution ends, so a retry runs normally.
+        assert not cancellation_registry.is_cancelled(task.id)
+    finally:
+        service.shutdown(timeout=2)
+
+
+# ---------------------------------------------------------------------------
+# 3. A cancelled task stops waiting for lane and provider slots
+# ---------------------------------------------------------------------------
+
+
+def test_cancel_stops_slot_waits() -> None:
+    lanes = ExecutionLanes()
+    lanes.configure({"heavy": 1})
+    limiter = ProviderLimiter()
+    limits = [("codex", ProviderLimits(max_concurrency=1))]
+    cancelled = threading.Event()
+
+    with lanes.slot("heavy"), limiter.slot(limits):
+        for waiter in (lambda: lanes.slot("heavy", cancelled.is_set), lambda: limiter.slot(limits, cancelled.is_set)):
+            errors: list[BaseException] = []
+
+            def _wait(waiter=waiter) -> None:
+                try:
+                    with waiter():
+                        pass
+                except SlotCancelled as exc:
+                    errors.append(exc)
+
+            thread = threading.Thread(target=_wait, daemon=True)
+            thread.start()
+            time.sleep(0.1)
+            cancelled.set()
+            thread.join(timeout=3)
+            assert not thread.is_alive()
+            assert len(errors) == 1
+            cancelled.clear()
+
+    assert lanes.snapshot()["heavy"]["active"] == 0
+    assert limiter.snapshot()["codex"]["active"] == 0
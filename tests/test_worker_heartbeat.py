@@ -1,9 +1,14 @@
 """Test worker heartbeat detection and timeout behavior."""
 
 import json
+import os
+import signal
 import sys
+import time
 from pathlib import Path
 
+import pytest
+
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT / "src"))
 sys.path.insert(0, str(PROJECT_ROOT))
@@ -73,3 +78,251 @@ def test_plain_command_defaults_to_stdin_prompt(tmp_path: Path) -> None:
     assert result["exit_code"] == 0
     stdout = (run_dir / "stdout.log").read_text(encoding="utf-8")
     assert "ok" in stdout
+
+
+def _alive(pid: int) -> bool:
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return False
+    return stat[stat.rfind(")") + 2] != "Z"
+
+
+@pytest.mark.skipif(not Path("/proc").is_dir(), reason="needs /proc")
+def test_background_children_are_killed_with_the_worker(tmp_path: Path) -> None:
+    pid_file = tmp_path / "child.pid"
+    command = f"sh -c 'sleep 60 & echo $! > {pid_file}; exit 0'"
+
+    result = _run_codex_worker(
+        command=command,
+        prompt="hello",
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=20,
+        heartbeat_seconds=10,
+        heartbeat_grace_seconds=5,
+        progress_path=tmp_path / "progress.json",
+    )
+
+    assert result["exit_code"] == 0
+    assert not _alive(int(pid_file.read_text()))
+    usage = result["resource_usage"]
+    assert usage["orphans_killed"] == 1
+    assert usage["child_processes"] >= 1
+
+
+@pytest.mark.skipif(not Path("/proc/self/task").is_dir(), reason="needs /proc")
+def test_group_members_follow_the_tree_and_known_orphans(tmp_path: Path) -> None:
+    import subprocess
+
+    from agent_orchestrator.worker_supervisor import _group_members
+
+    pid_file = tmp_path / "orphan.pid"
+    leader = subprocess.Popen(
+        ["sh", "-c", f"sh -c 'sleep 30 & echo $! > {pid_file}'; sleep 30"], start_new_session=True
+    )
+    try:
+        deadline = time.monotonic() + 5
+        while not (pid_file.exists() and pid_file.read_text().strip()):
+            assert time.monotonic() < deadline
+            time.sleep(0.02)
+        orphan = int(pid_file.read_text())
+        members = _group_members(leader.pid, set())
+        if members is None:
+            pytest.skip("kernel does not expose /proc/<pid>/task/<tid>/children")
+        # The orphan's parent exited, so only the pids already seen can find it.
+        assert leader.pid in members and orphan not in members
+        assert orphan in (_group_members(leader.pid, {orphan}) or {})
+    finally:
+        os.killpg(leader.pid, signal.SIGKILL)
+        leader.wait()
+
+
+def test_worker_is_spawned_off_the_supervisor_loop(tmp_path: Path) -> None:
+    import threading
+
+    from agent_orchestrator.worker_supervisor import WorkerLaunch, worker_supervisor
+
+    spawn_threads: list[str] = []
+    worker_supervisor.run(
+        WorkerLaunch(
+            command=[sys.executable, "-c", "pass"],
+            cwd=tmp_path,
+            stdout_path=tmp_path / "stdout.log",
+            stderr_path=tmp_path / "stderr.log",
+            timeout_seconds=20,
+            on_spawn=lambda pid: spawn_threads.append(threading.current_thread().name),
+        )
+    )
+
+    assert spawn_threads and spawn_threads[0] != "worker-supervisor"
+
+
+def test_worker_reports_cpu_and_memory_usage(tmp_path: Path) -> None:
+    command = f"{sys.executable} -c \"data = bytearray(32 * 1024 * 1024); sum(range(3 * 10**6))\""
+
+    result = _run_codex_worker(
+        command=command,
+        prompt="hello",
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=20,
+        heartbeat_seconds=10,
+        heartbeat_grace_seconds=5,
+        progress_path=tmp_path / "progress.json",
+    )
+
+    usage = result["resource_usage"]
+    assert usage["cpu_user_seconds"] + usage["cpu_system_seconds"] > 0
+    assert usage["peak_rss_kb"] >= 32 * 1024
+    assert usage["orphans_killed"] == 0
+
+
+def test_concurrent_workers_share_one_supervisor_thread(tmp_path: Path) -> None:
+    import threading
+    import time
+
+    from agent_orchestrator.worker_supervisor import worker_supervisor
+
+    results: list[dict] = []
+    baseline = threading.active_count()
+
+    def _run(idx: int) -> None:
+        run_dir = tmp_path / f"run-{idx}"
+        run_dir.mkdir()
+        results.append(
+            _run_codex_worker(
+                command="sh -c 'cat >/dev/null; sleep 0.5'",
+                prompt="hello",
+                project_dir=tmp_path,
+                run_dir=run_dir,
+                timeout_seconds=20,
+                heartbeat_seconds=60,
+                heartbeat_grace_seconds=30,
+                progress_path=run_dir / "progress.json",
+            )
+        )
+
+    callers = [threading.Thread(target=_run, args=(idx,)) for idx in range(8)]
+    started = time.monotonic()
+    for caller in callers:
+        caller.start()
+    deadline = time.monotonic() + 5
+    while worker_supervisor.running() < 8 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # Eight blocked callers plus at most the shared loop thread; no per-pipe threads.
+    assert threading.active_count() <= baseline + len(callers) + 1
+    for caller in callers:
+        caller.join(timeout=10)
+
+    # Exits are noticed right away, not at the next 5s poll.
+    assert time.monotonic() - started < 3
+    assert [result["exit_code"] for result in results] == [0] * 8
+
+
+def test_large_prompt_round_trips_through_stdin(tmp_path: Path) -> None:
+    prompt = "x" * (1024 * 1024) + "\nend\n"
+
+    result = _run_codex_worker(
+        command="cat",
+        prompt=prompt,
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=20,
+        heartbeat_seconds=10,
+        heartbeat_grace_seconds=5,
+        progress_path=tmp_path / "progress.json",
+    )
+
+    assert result["exit_code"] == 0
+    assert (tmp_path / "stdout.log").read_text(encoding="utf-8") == prompt
+
+
+def test_stall_is_detected_when_the_grace_runs_out(tmp_path: Path) -> None:
+    import time
+
+    started = time.monotonic()
+    result = _run_codex_worker(
+        command="sleep 30",
+        prompt="hello",
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=30,
+        heartbeat_seconds=60,
+        heartbeat_grace_seconds=1,
+        progress_path=tmp_path / "progress.json",
+    )
+
+    assert result["no_heartbeat"] is True
+    # Not rounded up to a multi-second poll interval.
+    assert time.monotonic() - started < 3
+
+
+@pytest.mark.parametrize("inotify", [True, False], ids=["inotify", "polling"])
+def test_run_dir_writes_and_heartbeats_count_as_activity(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, inotify: bool
+) -> None:
+    from agent_orchestrator import worker_supervisor as supervisor_module
+
+    if not inotify:
+        monkeypatch.setattr(supervisor_module._Inotify, "open", classmethod(lambda cls: None))
+    supervisor = supervisor_module.WorkerSupervisor()
+    progress_path = tmp_path / "progress.json"
+    # Silent on stdout; writes a scratch file, then heartbeats, each every 0.4s.
+    script = (
+        "import json, sys, time, datetime, pathlib\n"
+        "run = pathlib.Path(sys.argv[1])\n"
+        "for i in range(5):\n"
+        "    (run / 'scratch.txt').write_text(str(i)); time.sleep(0.4)\n"
+        "for i in range(5):\n"
+        "    now = datetime.datetime.now(datetime.timezone.utc).isoformat()\n"
+        "    (run / 'progress.json').write_text(json.dumps({'run_id': 'run-9', 'heartbeat': now}))\n"
+        "    time.sleep(0.4)\n"
+    )
+    heartbeats: list[Path] = []
+
+    def _read(path: Path):
+        heartbeats.append(path)
+        if not path.exists():
+            return None
+        return supervisor_module.datetime.now(supervisor_module.timezone.utc)
+
+    outcome = supervisor.run(
+        supervisor_module.WorkerLaunch(
+            command=[sys.executable, "-c", script, str(tmp_path)],
+            cwd=tmp_path,
+            stdout_path=tmp_path / "stdout.log",
+            stderr_path=tmp_path / "stderr.log",
+            timeout_seconds=30,
+            stall_seconds=1.5,
+            watch_dir=tmp_path,
+            heartbeat_path=progress_path,
+            read_heartbeat=_read,
+        )
+    )
+
+    assert outcome.exit_code == 0
+    assert outcome.no_heartbeat is False
+    assert outcome.last_heartbeat is not None
+    # Parsed once per completed write, not on every check.
+    assert 2 <= len(heartbeats) <= 6
+
+
+def test_worker_output_is_streamed_as_it_arrives(tmp_path: Path) -> None:
+    chunks: list[tuple[str, str]] = []
+
+    result = _run_codex_worker(
+        command=f"{sys.executable} -c \"import sys; print('h\\u00e9llo', flush=True); print('oops', file=sys.stderr)\"",
+        prompt="hello",
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=20,
+        heartbeat_seconds=10,
+        heartbeat_grace_seconds=5,
+        progress_path=tmp_path / "progress.json",
+        on_output=lambda stream, text: chunks.append((stream, text)),
+    )
+
+    assert result["exit_code"] == 0
+    assert "".join(text for stream, text in chunks if stream == "stdout") == "héllo\n"
+    assert "".join(text for stream, text in chunks if stream == "stderr") == "oops\n"
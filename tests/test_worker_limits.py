@@ -0,0 +1,90 @@
+"""Tests for per-provider concurrency caps and rate limits."""
+from __future__ import annotations
+
+import threading
+import time
+
+from agent_orchestrator.workers.config import get_workers_runtime_config, resolve_worker_for_step
+from agent_orchestrator.workers.limits import ProviderLimiter, ProviderLimits, parse_limits
+
+
+def test_parse_limits_ignores_invalid_values() -> None:
+    assert parse_limits({"max_concurrency": 2, "rate_limit_per_minute": 30}) == ProviderLimits(2, 30.0, None)
+    assert parse_limits({"max_concurrency": 0, "rate_limit_per_minute": "fast"}).unlimited
+    assert parse_limits(None).unlimited
+
+
+def test_provider_limits_parsed_from_workers_config() -> None:
+    runtime = get_workers_runtime_config(
+        config={
+            "workers": {
+                "default": "local",
+                "providers": {
+                    "local": {
+                        "type": "ollama",
+                        "endpoint": "http://localhost:11434",
+                        "model": "llama3",
+                        "max_concurrency": 1,
+                        "model_limits": {"llama3": {"rate_limit_per_minute": 12}},
+                    }
+                },
+            }
+        },
+        codex_command_fallback="codex",
+    )
+    spec = resolve_worker_for_step(runtime, "implement")
+
+    keys = dict(spec.limit_keys())
+    assert keys["local"].max_concurrency == 1
+    assert keys["local/llama3"].rate_limit_per_minute == 12.0
+    assert runtime.providers["codex"].limit_keys() == [("codex", ProviderLimits())]
+
+
+def test_concurrency_cap_serializes_callers() -> None:
+    limiter = ProviderLimiter()
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def _work() -> None:
+        nonlocal active, peak
+        with limiter.slot([("local", ProviderLimits(max_concurrency=2))]):
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+    threads = [threading.Thread(target=_work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert peak == 2
+    stats = limiter.snapshot()["local"]
+    assert stats["acquired"] == 6
+    assert stats["active"] == 0
+    assert stats["total_wait_seconds"] > 0
+
+
+def test_token_bucket_spaces_out_requests() -> None:
+    limiter = ProviderLimiter()
+    limits = [("api", ProviderLimits(rate_limit_per_minute=600))]  # one token every 0.1s
+    started = time.monotonic()
+    for _ in range(3):
+        with limiter.slot(limits):
+            pass
+    elapsed = time.monotonic() - started
+
+    # The first call uses the initial token; the next two wait for refills.
+    assert elapsed >= 0.18
+    assert limiter.snapshot()["api"]["max_wait_seconds"] > 0
+
+
+def test_unlimited_provider_is_not_tracked() -> None:
+    limiter = ProviderLimiter()
+    with limiter.slot([("codex", ProviderLimits())]) as waited:
+        assert waited == 0.0
+    assert limiter.snapshot() == {}
@@ -0,0 +1,150 @@
+"""Tests for per-step resource limits on worker subprocesses."""
+from __future__ import annotations
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from agent_orchestrator.runtime.orchestrator.live_worker_adapter import LiveWorkerAdapter
+from agent_orchestrator.runtime.storage.container import Container
+from agent_orchestrator.workers.config import WorkerProviderSpec, get_workers_runtime_config
+from agent_orchestrator.workers.run import run_worker
+from agent_orchestrator.workers.sandbox import ResourceLimits, StepSandbox, parse_resource_limits
+
+
+def _fake_cgroup_tree(tmp_path: Path) -> tuple[Path, Path]:
+    root = tmp_path / "cgroup"
+    parent = root / "agents.slice"
+    parent.mkdir(parents=True)
+    (root / "cgroup.controllers").write_text("cpuset cpu memory pids\n")
+    (parent / "cgroup.subtree_control").write_text("\n")
+    return root, parent
+
+
+# ---------------------------------------------------------------------------
+# 1. Limits come from provider config, overridden per step
+# ---------------------------------------------------------------------------
+
+
+def test_provider_limits_parse_and_step_override() -> None:
+    runtime = get_workers_runtime_config(
+        config={
+            "workers": {
+                "providers": {
+                    "codex": {"resource_limits": {"memory_mb": 2048, "cpu_affinity": [1, 0, 1], "max_processes": "x"}}
+                }
+            }
+        },
+        codex_command_fallback="codex",
+    )
+    limits = runtime.providers["codex"].resource_limits
+    assert limits == ResourceLimits(memory_mb=2048, cpu_affinity=(0, 1))
+
+    merged = limits.override(parse_resource_limits({"memory_mb": 8192, "cpu_quota": 1.5}))
+    assert merged == ResourceLimits(memory_mb=8192, cpu_quota=1.5, cpu_affinity=(0, 1))
+    assert merged.to_dict() == {"memory_mb": 8192, "cpu_quota": 1.5, "cpu_affinity": [0, 1]}
+    assert ResourceLimits().unlimited
+
+
+# ---------------------------------------------------------------------------
+# 2. cgroup v2: a child cgroup per step, breaches read from its event counters
+# ---------------------------------------------------------------------------
+
+
+def test_cgroup_sandbox_writes_limits_and_reports_oom(tmp_path: Path) -> None:
+    root, parent = _fake_cgroup_tree(tmp_path)
+    limits = ResourceLimits(memory_mb=512, cpu_quota=1.5, cpu_affinity=(2, 3), max_processes=64)
+
+    sandbox = StepSandbox(limits, cgroup_parent=parent, cgroup_root=root)
+    assert sandbox.mode == "cgroup"
+    [cgroup] = [path for path in parent.iterdir() if path.is_dir()]
+    assert (parent / "cgroup.subtree_control").read_text() == "+cpu +cpuset +memory +pids"
+    assert (cgroup / "memory.max").read_text() == str(512 * 1024 * 1024)
+    assert (cgroup / "cpu.max").read_text() == "150000 100000"
+    assert (cgroup / "cpuset.cpus").read_text() == "2,3"
+    assert (cgroup / "pids.max").read_text() == "64"
+
+    sandbox.attach(4321)
+    assert (cgroup / "cgroup.procs").read_text() == "4321"
+
+    (cgroup / "memory.events").write_text("low 0\nhigh 0\nmax 12\noom 1\noom_kill 1\n")
+    assert sandbox.breach(0) is None
+    assert sandbox.breach(137) == "memory"
+    (cgroup / "memory.events").write_text("oom 0\noom_kill 0\n")
+    (cgroup / "pids.events").write_text("max 3\n")
+    assert sandbox.breach(1) == "processes"
+
+
+def test_unwritable_cgroup_falls_back_to_rlimits(tmp_path: Path) -> None:
+    root = tmp_path / "cgroup-v1"
+    root.mkdir()
+    sandbox = StepSandbox(ResourceLimits(memory_mb=256), cgroup_parent=root, cgroup_root=root)
+    assert sandbox.mode == "rlimit"
+    assert StepSandbox(ResourceLimits(), cgroup_parent=root, cgroup_root=root).mode is None
+
+
+def test_rlimit_mode_reports_limits_it_cannot_enforce(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    root, _parent = _fake_cgroup_tree(tmp_path)
+    limits = ResourceLimits(memory_mb=256, cpu_quota=1.0, max_processes=32)
+
+    with caplog.at_level("WARNING", logger="agent_orchestrator.workers.sandbox"):
+        sandbox = StepSandbox(limits, cgroup_root=root)
+
+    assert sandbox.mode == "rlimit"
+    assert sandbox.unenforced == ["cpu_quota", "max_processes"]
+    assert "cpu_quota, max_processes are not enforced" in caplog.text
+    assert sandbox.breach(1, "bash: fork: retry: Resource temporarily unavailable") is None
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs prlimit")
+def test_attach_sets_rlimits_on_the_running_worker(tmp_path: Path) -> None:
+    root = tmp_path / "cgroup-v1"
+    root.mkdir()
+    sandbox = StepSandbox(ResourceLimits(memory_mb=1024), cgroup_parent=root, cgroup_root=root)
+    proc = subprocess.Popen(["sleep", "5"], start_new_session=True)
+    try:
+        sandbox.attach(proc.pid)
+        limits = Path(f"/proc/{proc.pid}/limits").read_text()
+    finally:
+        proc.kill()
+        proc.wait()
+    [data] = [line for line in limits.splitlines() if line.startswith("Max data size")]
+    assert data.split()[3:5] == [str(1024 * 1024 * 1024)] * 2
+
+
+# ---------------------------------------------------------------------------
+# 3. A memory breach fails the step with its own reason
+# ---------------------------------------------------------------------------
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="needs prlimit")
+def test_memory_breach_is_a_distinct_failure(tmp_path: Path) -> None:
+    spec = WorkerProviderSpec(
+        name="hog",
+        type="codex",
+        command=f"{sys.executable} -c \"data = bytearray(512 * 1024 * 1024)\"",
+        resource_limits=ResourceLimits(memory_mb=128),
+    )
+
+    result = run_worker(
+        spec=spec,
+        prompt="hello",
+        project_dir=tmp_path,
+        run_dir=tmp_path,
+        timeout_seconds=20,
+        heartbeat_seconds=10,
+        heartbeat_grace_seconds=5,
+        progress_path=tmp_path / "progress.json",
+    )
+
+    assert result.exit_code != 0
+    assert result.limit_breach == "memory"
+    assert result.resource_usage["sandbox"] in {"cgroup", "rlimit"}
+
+    step = LiveWorkerAdapter(Container(tmp_path))._map_result(result, spec, "verify")
+    assert step.status == "error"
+    assert step.summary == "Worker exceeded its memory limit"
+    assert step.failure_reason == "resource_limit:memory"
+    assert step.retryable is False